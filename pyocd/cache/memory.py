@@ -15,21 +15,64 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from intervaltree import (Interval, IntervalTree)
+from collections import OrderedDict
 import logging
+from time import perf_counter
 
 from ..utility import conversion
 from .metrics import CacheMetrics
 from ..core.exceptions import TransferFaultError
+from ..core.target import Target
 
 LOG = logging.getLogger(__name__)
 
+class _CachePage(object):
+    """@brief One page of cached target memory.
+
+    The @a valid attribute is a bytearray with a nonzero byte for each cached byte of @a data, or
+    None once the whole page is cached.
+    """
+
+    __slots__ = ('data', 'valid')
+
+    def __init__(self, size):
+        self.data = bytearray(size)
+        self.valid = bytearray(size)
+
+    def fill(self, offset, value):
+        """@brief Store data in the page and mark it as cached."""
+        end = offset + len(value)
+        self.data[offset:end] = value
+        if self.valid is not None:
+            self.valid[offset:end] = b'\x01' * len(value)
+            if self.valid.find(0) == -1:
+                self.valid = None
+
+    def missing(self, offset, end):
+        """@brief Generator of (begin, end) offset pairs for uncached bytes in the given range."""
+        if self.valid is None:
+            return
+        valid = self.valid
+        begin = valid.find(0, offset, end)
+        while begin != -1:
+            stop = valid.find(1, begin, end)
+            if stop == -1:
+                stop = end
+            yield begin, stop
+            begin = valid.find(0, stop, end)
+
 class MemoryCache(object):
     """@brief Memory cache.
 
     Maintains a cache of target memory. The constructor is passed a backing DebugContext object that
     will be used to fill the cache.
 
+    Cached data is held in a sparse table of fixed size, aligned pages. Adjacent uncached bytes of an
+    access are filled with a single read of the backing context, even when they span several pages.
+    The total size of the cached pages is limited by a memory budget, and least recently used pages are
+    evicted when it is exceeded. If read ahead is enabled, reads that miss the cache are extended to
+    page boundaries (within the memory region), so nearby accesses that follow are hits.
+
     The cache is invalidated whenever the target has run since the last cache operation (based on run
     tokens). If the target is currently running, all accesses cause the cache to be invalidated.
 
@@ -39,198 +82,201 @@ class MemoryCache(object):
     region's cacheability flag is honoured.
     """
 
-    def __init__(self, context, core):
+    ## @brief Default size of cache pages in bytes. Must be a power of two.
+    DEFAULT_PAGE_SIZE = 1024
+
+    ## @brief Default maximum number of bytes of cached pages.
+    DEFAULT_BUDGET = 1024 * 1024
+
+    def __init__(self, context, core, page_size=DEFAULT_PAGE_SIZE, budget=DEFAULT_BUDGET,
+            read_ahead=False):
+        """@brief Constructor.
+        @param self
+        @param context Backing DebugContext used to fill the cache and for write-through.
+        @param core The core, used for the run token and memory map.
+        @param page_size Size in bytes of each cache page. Must be a power of two.
+        @param budget Maximum number of bytes of cached pages. At least one page is always kept.
+        @param read_ahead Whether to extend reads that miss the cache to page boundaries.
+        """
+        assert page_size > 0 and (page_size & (page_size - 1)) == 0, "page size must be a power of two"
         self._context = context
         self._core = core
+        self._page_size = page_size
+        self._page_shift = page_size.bit_length() - 1
+        self._max_pages = max(1, budget // page_size)
+        self._read_ahead = read_ahead
         self._run_token = -1
+        # Run token at which the core was last seen halted. A halted core stays halted until it is
+        # resumed, stepped, or reset, all of which change the run token.
+        self._halted_token = -1
+        self._metrics = CacheMetrics()
         self._reset_cache()
 
+    @property
+    def metrics(self):
+        """@brief CacheMetrics accumulated since the cache was created."""
+        return self._metrics
+
     def _reset_cache(self):
-        self._cache = IntervalTree()
-        self._metrics = CacheMetrics()
+        self._pages = OrderedDict()
 
     def _check_cache(self):
-        """@brief Invalidates the cache if appropriate."""
-        if self._core.is_running():
+        """@brief Invalidates the cache if appropriate.
+
+        The core state is read only until the core is seen halted. After that only the run token
+        is checked, so the cache is validated once per halt rather than once per access.
+        """
+        if self._halted_token == self._core.run_token:
+            return
+        state = self._core.get_state()
+        if state == Target.State.RUNNING:
             LOG.debug("core is running; invalidating cache")
             self._reset_cache()
-        elif self._run_token != self._core.run_token:
+        else:
+            self._check_run_token()
+            if state == Target.State.HALTED:
+                self._halted_token = self._run_token
+
+    def _check_run_token(self):
+        """@brief Invalidates the cache if the core has run since it was filled."""
+        if self._run_token != self._core.run_token:
             self._dump_metrics()
             LOG.debug("out of date run token; invalidating cache")
             self._reset_cache()
             self._run_token = self._core.run_token
 
-    def _get_ranges(self, addr, count):
-        """@brief Splits a memory address range into cached and uncached subranges.
-        @return Returns a 2-tuple with the first element being a set of Interval objects for each
-          of the cached subranges. The second element is a set of Interval objects for each of the
-          non-cached subranges.
-        """
-        cached = self._cache.overlap(addr, addr + count)
-        uncached = {Interval(addr, addr + count)}
-        for cachedIv in cached:
-            newUncachedSet = set()
-            for uncachedIv in uncached:
-
-                # No overlap.
-                if cachedIv.end < uncachedIv.begin or cachedIv.begin > uncachedIv.end:
-                    newUncachedSet.add(uncachedIv)
-                    continue
-
-                # Begin segment.
-                if cachedIv.begin - uncachedIv.begin > 0:
-                    newUncachedSet.add(Interval(uncachedIv.begin, cachedIv.begin))
-
-                # End segment.
-                if uncachedIv.end - cachedIv.end > 0:
-                    newUncachedSet.add(Interval(cachedIv.end, uncachedIv.end))
-            uncached = newUncachedSet
-        return cached, uncached
-
-    def _read_uncached(self, uncached):
-        """"@brief Reads uncached memory ranges and updates the cache.
-        @return A list of Interval objects is returned. Each Interval has its @a data attribute set
-          to a bytearray of the data read from target memory.
-        """
-        uncachedData = []
-        for uncachedIv in uncached:
-            data = self._context.read_memory_block8(uncachedIv.begin, uncachedIv.end - uncachedIv.begin)
-            iv = Interval(uncachedIv.begin, uncachedIv.end, bytearray(data))
-            self._cache.add(iv) # TODO merge contiguous cached intervals
-            uncachedData.append(iv)
-        return uncachedData
-
-    def _update_metrics(self, cached, uncached, addr, size):
-        cachedSize = 0
-        for iv in cached:
-            begin = iv.begin
-            end = iv.end
-            if iv.begin < addr:
-                begin = addr
-            if iv.end > addr + size:
-                end = addr + size
-            cachedSize += end - begin
-
-        uncachedSize = sum((iv.end - iv.begin) for iv in uncached)
-
-        self._metrics.reads += 1
-        self._metrics.hits += cachedSize
-        self._metrics.misses += uncachedSize
-
     def _dump_metrics(self):
         if self._metrics.total > 0:
-            LOG.debug("%d reads, %d bytes [%d%% hits, %d bytes]; %d bytes written",
+            LOG.debug("%d reads, %d bytes [%d%% hits, %d bytes]; %d bytes written; "
+                "%d fills, %.3f ms average; %d pages evicted",
                 self._metrics.reads, self._metrics.total, self._metrics.percent_hit,
-                self._metrics.hits, self._metrics.writes)
+                self._metrics.hits, self._metrics.writes, self._metrics.fills,
+                self._metrics.average_fill_time * 1000, self._metrics.evictions)
         else:
             LOG.debug("no reads")
 
-    def _read(self, addr, size):
-        """@brief Performs a cached read operation of an address range.
-        @return A list of Interval objects sorted by address.
-        """
-        # Get the cached and uncached subranges of the requested read.
-        cached, uncached = self._get_ranges(addr, size)
-        self._update_metrics(cached, uncached, addr, size)
-
-        # Read any uncached ranges.
-        uncachedData = self._read_uncached(uncached)
-
-        # Merged cached with data we just read
-        combined = list(cached) + uncachedData
-        combined.sort(key=lambda x: x.begin)
-        return combined
-
-    def _merge_data(self, combined, addr, size):
-        """@brief Extracts data from the intersection of an address range across a list of interval objects.
-
-        The range represented by @a addr and @a size are assumed to overlap the intervals. The first
-        and last interval in the list may have ragged edges not fully contained in the address range, in
-        which case the correct slice of those intervals is extracted.
-
-        @param self
-        @param combined List of Interval objects forming a contiguous range. The @a data attribute of
-          each interval must be a bytearray.
-        @param addr Start address. Must be within the range of the first interval.
-        @param size Number of bytes. (@a addr + @a size) must be within the range of the last interval.
-        @return A single bytearray object with all data from the intervals that intersects the address
-          range.
+    def _get_missing(self, addr, size):
+        """@brief Find the uncached parts of an address range.
+        @return List of [begin, end) address pairs, sorted by address. Adjacent pairs from
+          neighbouring pages are merged.
         """
+        page_size = self._page_size
+        end = addr + size
+        missing = []
+        page_addr = addr & ~(page_size - 1)
+        while page_addr < end:
+            begin = max(addr, page_addr)
+            stop = min(end, page_addr + page_size)
+            page = self._pages.get(page_addr >> self._page_shift)
+            if page is None:
+                spans = [(begin - page_addr, stop - page_addr)]
+            else:
+                spans = page.missing(begin - page_addr, stop - page_addr)
+            for span_begin, span_end in spans:
+                span_begin += page_addr
+                span_end += page_addr
+                if missing and missing[-1][1] == span_begin:
+                    missing[-1][1] = span_end
+                else:
+                    missing.append([span_begin, span_end])
+            page_addr += page_size
+        return missing
+
+    def _extend_to_pages(self, missing, region):
+        """@brief Extend uncached ranges to page boundaries, clipped to the memory region."""
+        mask = self._page_size - 1
+        extended = []
+        for begin, end in missing:
+            begin = max(begin & ~mask, region.start)
+            end = min((end + mask) & ~mask, region.end + 1)
+            if extended and extended[-1][1] >= begin:
+                extended[-1][1] = max(extended[-1][1], end)
+            else:
+                extended.append([begin, end])
+        return extended
+
+    def _fill(self, addr, data):
+        """@brief Copy data into the cache pages, creating pages as required."""
+        page_size = self._page_size
+        pages = self._pages
+        data = memoryview(data)
+        offset = 0
+        size = len(data)
+        while offset < size:
+            page_number = (addr + offset) >> self._page_shift
+            page_offset = (addr + offset) & (page_size - 1)
+            chunk = min(size - offset, page_size - page_offset)
+            page = pages.get(page_number)
+            if page is None:
+                page = pages[page_number] = _CachePage(page_size)
+            else:
+                pages.move_to_end(page_number)
+            page.fill(page_offset, data[offset:offset + chunk])
+            offset += chunk
+
+    def _align_to_words(self, missing, region):
+        """@brief Extend uncached ranges to word boundaries, clipped to the memory region."""
+        aligned = []
+        for begin, end in missing:
+            begin = max(begin & ~3, region.start)
+            end = min((end + 3) & ~3, region.end + 1)
+            if aligned and aligned[-1][1] >= begin:
+                aligned[-1][1] = max(aligned[-1][1], end)
+            else:
+                aligned.append([begin, end])
+        return aligned
+
+    def _read_missing(self, missing):
+        """@brief Read uncached ranges from the backing context and store them in the cache."""
+        for begin, end in missing:
+            start = perf_counter()
+            data = self._context.read_memory_bytes(begin, end - begin)
+            self._metrics.fill_time += perf_counter() - start
+            self._metrics.fills += 1
+            self._fill(begin, data)
+
+    def _extract(self, addr, size):
+        """@brief Copy a fully cached address range out of the cache pages."""
+        page_size = self._page_size
+        pages = self._pages
         result = bytearray()
-        resultAppend = bytearray()
-
-        # Check for fully contained subrange.
-        if len(combined) and combined[0].begin < addr and combined[0].end > addr + size:
-            offset = addr - combined[0].begin
-            endOffset = offset + size
-            result = combined[0].data[offset:endOffset]
-            return result
-
-        # Take slice of leading ragged edge.
-        if len(combined) and combined[0].begin < addr:
-            offset = addr - combined[0].begin
-            result += combined[0].data[offset:]
-            combined = combined[1:]
-        # Take slice of trailing ragged edge.
-        if len(combined) and combined[-1].end > addr + size:
-            offset = addr + size - combined[-1].begin
-            resultAppend = combined[-1].data[:offset]
-            combined = combined[:-1]
-
-        # Merge.
-        for iv in combined:
-            result += iv.data
-        result += resultAppend
-
-        return result
-
-    def _update_contiguous(self, cached, addr, value):
-        size = len(value)
         end = addr + size
-        leadBegin = addr
-        leadData = bytearray()
-        trailData = bytearray()
-        trailEnd = end
-
-        if cached[0].begin < addr and cached[0].end > addr:
-            offset = addr - cached[0].begin
-            leadData = cached[0].data[:offset]
-            leadBegin = cached[0].begin
-        if cached[-1].begin < end and cached[-1].end > end:
-            offset = end - cached[-1].begin
-            trailData = cached[-1].data[offset:]
-            trailEnd = cached[-1].end
-
-        self._cache.remove_overlap(addr, end)
+        while addr < end:
+            page_number = addr >> self._page_shift
+            page_offset = addr & (page_size - 1)
+            chunk = min(end - addr, page_size - page_offset)
+            pages.move_to_end(page_number)
+            result += pages[page_number].data[page_offset:page_offset + chunk]
+            addr += chunk
+        return result
 
-        data = leadData + value + trailData
-        self._cache.addi(leadBegin, trailEnd, data)
+    def _evict(self):
+        """@brief Discard least recently used pages until the cache is within its budget."""
+        while len(self._pages) > self._max_pages:
+            self._pages.popitem(last=False)
+            self._metrics.evictions += 1
 
     def _check_regions(self, addr, count):
-        """@return A bool indicating whether the given address range is fully contained within
-              one known memory region, and that region is cacheable.
+        """@return The memory region containing the given address range if it is cacheable, or None
+              if the range is not cacheable or is outside of all known regions.
         @exception TransferFaultError Raised if the access is not entirely contained within a single region.
         """
         regions = self._core.memory_map.get_intersecting_regions(addr, length=count)
 
         # If no regions matched, then allow an uncached operation.
         if len(regions) == 0:
-            return False
+            return None
 
         # Raise if not fully contained within one region.
         if len(regions) > 1 or not regions[0].contains_range(addr, length=count):
             raise TransferFaultError("individual memory accesses must not cross memory region boundaries")
 
-        # Otherwise return whether the region is cacheable.
-        return regions[0].is_cacheable
+        # Otherwise return the region if it is cacheable.
+        return regions[0] if regions[0].is_cacheable else None
 
     def read_memory(self, addr, transfer_size=32, now=True):
         # TODO use more optimal underlying read_memory calls
-        if transfer_size == 8:
-            data = self.read_memory_block8(addr, 1)[0]
-        else:
-            data = conversion.byte_list_to_nbit_le_list(self.read_memory_block8(addr, transfer_size // 8),
-                    transfer_size)[0]
+        data = int.from_bytes(self.read_memory_bytes(addr, transfer_size // 8), 'little')
 
         if now:
             return data
@@ -239,70 +285,165 @@ class MemoryCache(object):
                 return data
             return read_cb
 
-    def read_memory_block8(self, addr, size):
+    def read_memory_bytes(self, addr, size):
         if size <= 0:
-            return []
+            return bytearray()
 
         self._check_cache()
 
         # Validate memory regions.
-        if not self._check_regions(addr, size):
+        region = self._check_regions(addr, size)
+        if region is None:
             LOG.debug("range [%x:%x] is not cacheable", addr, addr+size)
-            return self._context.read_memory_block8(addr, size)
+            return self._context.read_memory_bytes(addr, size)
 
-        # Get the cached and uncached subranges of the requested read.
-        combined = self._read(addr, size)
+        missing = self._get_missing(addr, size)
+        missing_size = sum((end - begin) for begin, end in missing)
+        self._metrics.reads += 1
+        self._metrics.hits += size - missing_size
+        self._metrics.misses += missing_size
+
+        if missing:
+            if self._read_ahead:
+                try:
+                    self._read_missing(self._extend_to_pages(missing, region))
+                except TransferFaultError:
+                    # Part of the page may not be accessible, so read only what was requested.
+                    LOG.debug("read ahead of [%x:%x] faulted", addr, addr+size)
+                    self._read_missing(missing)
+            else:
+                self._read_missing(missing)
 
-        # Extract data out of combined intervals.
-        result = list(self._merge_data(combined, addr, size))
+        result = self._extract(addr, size)
+        self._evict()
         assert len(result) == size, "result size ({}) != requested size ({})".format(len(result), size)
         return result
 
+    def read_memory_block8(self, addr, size):
+        return list(self.read_memory_bytes(addr, size))
+
+    def prefetch(self, ranges):
+        """@brief Fill the cache with memory ranges that are expected to be read soon.
+
+        The uncached parts of all ranges are read from the backing context with a single
+        read_memory_ranges() call, so the reads can share probe round trips. Ranges are only
+        extended to word boundaries, not to pages as read ahead does, to keep the speculative
+        transfer small. Parts of ranges outside cacheable regions are skipped. Because the prefetch
+        is speculative, a fault is ignored and nothing is cached.
+
+        The core must be halted. Only the run token is checked, which saves reading DHCSR.
+
+        @param self
+        @param ranges Sequence of (address, size) pairs.
+        """
+        self._check_run_token()
+
+        missing = []
+        for addr, size in ranges:
+            region = self._core.memory_map.get_region_for_address(addr)
+            if (size <= 0) or (region is None) or not region.is_cacheable:
+                continue
+            size = min(size, region.end + 1 - addr)
+            range_missing = self._align_to_words(self._get_missing(addr, size), region)
+            missing += [(begin, end - begin) for begin, end in range_missing]
+        if not missing:
+            return
+
+        start = perf_counter()
+        try:
+            results = self._context.read_memory_ranges(missing)
+        except TransferFaultError as error:
+            LOG.debug("prefetch faulted: %s", error)
+            return
+        self._metrics.fill_time += perf_counter() - start
+        self._metrics.fills += 1
+        for (addr, _), data in zip(missing, results):
+            self._fill(addr, data)
+        self._evict()
+
+    def read_memory_ranges(self, ranges):
+        """@brief Read several blocks of memory, serving what is cached from the cache.
+
+        The uncached parts of all ranges, and the ranges outside cacheable regions, are read from
+        the backing context with a single read_memory_ranges() call, so the reads can share probe
+        round trips.
+
+        @param self
+        @param ranges Sequence of (address, size) pairs.
+        @return List of bytearrays with the contents of each range.
+        """
+        self._check_cache()
+
+        # Each entry is (address, size, whether it is to be cached).
+        reads = []
+        for addr, size in ranges:
+            if size <= 0:
+                continue
+            region = self._check_regions(addr, size)
+            if region is None:
+                reads.append((addr, size, False))
+                continue
+            missing = self._get_missing(addr, size)
+            missing_size = sum((end - begin) for begin, end in missing)
+            self._metrics.reads += 1
+            self._metrics.hits += size - missing_size
+            self._metrics.misses += missing_size
+            reads += [(begin, end - begin, True) for begin, end in missing]
+
+        uncached = {}
+        if reads:
+            start = perf_counter()
+            results = self._context.read_memory_ranges([(addr, size) for addr, size, _ in reads])
+            self._metrics.fill_time += perf_counter() - start
+            self._metrics.fills += 1
+            for (addr, size, cache), data in zip(reads, results):
+                if cache:
+                    self._fill(addr, data)
+                else:
+                    uncached[addr, size] = bytearray(data)
+
+        output = []
+        for addr, size in ranges:
+            if size <= 0:
+                output.append(bytearray())
+            elif (addr, size) in uncached:
+                output.append(uncached[addr, size])
+            else:
+                output.append(self._extract(addr, size))
+        self._evict()
+        return output
+
     def read_memory_block32(self, addr, size):
-        return conversion.byte_list_to_u32le_list(self.read_memory_block8(addr, size*4))
+        return conversion.bytes_to_u32le_list(self.read_memory_bytes(addr, size*4))
 
     def write_memory(self, addr, value, transfer_size=32):
-        if transfer_size == 8:
-            return self.write_memory_block8(addr, [value])
-        else:
-            return self.write_memory_block8(addr, conversion.nbit_le_list_to_byte_list([value], transfer_size))
+        return self.write_memory_bytes(addr, value.to_bytes(transfer_size // 8, 'little'))
 
-    def write_memory_block8(self, addr, value):
+    def write_memory_bytes(self, addr, value):
         if len(value) <= 0:
             return
 
         self._check_cache()
 
         # Validate memory regions.
-        cacheable = self._check_regions(addr, len(value))
+        region = self._check_regions(addr, len(value))
 
         # Write to the target first, so if it fails we don't update the cache.
-        result = self._context.write_memory_block8(addr, value)
-
-        if cacheable:
-            size = len(value)
-            end = addr + size
-            cached = sorted(self._cache.overlap(addr, end), key=lambda x:x.begin)
-            self._metrics.writes += size
+        result = self._context.write_memory_bytes(addr, value)
 
-            if len(cached):
-                # Write data is entirely within a single cached interval.
-                if addr >= cached[0].begin and end <= cached[0].end:
-                    beginOffset = addr - cached[0].begin
-                    endOffset = beginOffset + size
-                    cached[0].data[beginOffset:endOffset] = value
-
-                else:
-                    self._update_contiguous(cached, addr, bytearray(value))
-            else:
-                # No cached data in this range, so just add the entire interval.
-                self._cache.addi(addr, end, bytearray(value))
+        if region is not None:
+            self._metrics.writes += len(value)
+            self._fill(addr, value)
+            self._evict()
 
         return result
 
+    def write_memory_block8(self, addr, value):
+        return self.write_memory_bytes(addr, bytes(value))
+
     def write_memory_block32(self, addr, data):
-        return self.write_memory_block8(addr, conversion.u32le_list_to_byte_list(data))
+        return self.write_memory_bytes(addr, conversion.u32le_list_to_bytes(data))
 
     def invalidate(self):
         self._reset_cache()
-
+        self._halted_token = -1
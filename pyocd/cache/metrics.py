@@ -15,12 +15,21 @@
 # limitations under the License.
 
 class CacheMetrics(object):
-    """@brief Holds hit ratio metrics for the caches."""
+    """@brief Holds hit ratio and fill latency metrics for the caches."""
     def __init__(self):
+        self.reset()
+
+    def reset(self):
         self.hits = 0
         self.misses = 0
         self.reads = 0
         self.writes = 0
+        ## Number of reads from the backing context made to fill the cache.
+        self.fills = 0
+        ## Total time in seconds spent in fill reads.
+        self.fill_time = 0.0
+        ## Number of cache entries discarded to stay within the cache's budget.
+        self.evictions = 0
 
     @property
     def total(self):
@@ -40,3 +49,10 @@ class CacheMetrics(object):
         else:
             return 0
 
+
+    @property
+    def average_fill_time(self):
+        if self.fills > 0:
+            return self.fill_time / self.fills
+        else:
+            return 0
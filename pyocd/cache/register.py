@@ -17,6 +17,7 @@
 import logging
 
 from ..core import exceptions
+from ..core.target import Target
 from ..coresight.cortex_m_core_registers import (CortexMCoreRegisterInfo, index_for_reg)
 from .metrics import CacheMetrics
 
@@ -33,6 +34,11 @@ class RegisterCache(object):
     invalidate all five.
 
     Same logic applies for XPSR submasks.
+
+    The first register read after the core halts is extended to a snapshot of all general purpose and
+    special registers, so the reads that gdb, RTOS providers and commands make next are served from the
+    cache instead of each costing probe round trips. The floating point registers are likewise all
+    read together the first time any of them is read.
     """
 
     CFBP_INDEX = index_for_reg('cfbp')
@@ -56,15 +62,28 @@ class RegisterCache(object):
                     'iepsr',
                     ]]
 
+    ## @brief Registers read together on the first register access after the core halts.
+    SNAPSHOT_REGS = [index_for_reg(name) for name in [
+                    'r0', 'r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r8', 'r9', 'r10', 'r11', 'r12',
+                    'sp', 'lr', 'pc', 'xpsr', 'msp', 'psp', 'cfbp',
+                    ]]
+
+    ## @brief Registers read together on the first floating point register access after the core halts.
+    FP_SNAPSHOT_REGS = [index_for_reg(name) for name in ['fpscr'] + ['s%d' % n for n in range(32)]]
+
     def __init__(self, context, core):
         self._context = context
         self._core = core
         self._run_token = -1
+        # Run token at which the core was last seen halted.
+        self._halted_token = -1
         self._reset_cache()
 
     def _reset_cache(self):
         self._cache = {}
         self._metrics = CacheMetrics()
+        self._have_snapshot = False
+        self._have_fp_snapshot = False
 
     def _dump_metrics(self):
         if self._metrics.total > 0:
@@ -73,8 +92,15 @@ class RegisterCache(object):
             LOG.debug("no accesses")
 
     def _check_cache(self):
-        """@brief Invalidates the cache if needed and returns whether the core is running."""
-        if self._core.is_running():
+        """@brief Invalidates the cache if needed and returns whether the core is running.
+
+        As for MemoryCache, the core state is no longer read once the core has been seen halted
+        with the current run token.
+        """
+        if self._halted_token == self._core.run_token:
+            return False
+        state = self._core.get_state()
+        if state == Target.State.RUNNING:
             LOG.debug("core is running; invalidating cache")
             self._reset_cache()
             return True
@@ -83,6 +109,8 @@ class RegisterCache(object):
             LOG.debug("out of date run token; invalidating cache")
             self._reset_cache()
             self._run_token = self._core.run_token
+        if state == Target.State.HALTED:
+            self._halted_token = self._run_token
         return False
 
     def _convert_and_check_registers(self, reg_list):
@@ -91,6 +119,20 @@ class RegisterCache(object):
         self._core.check_reg_list(reg_list)
         return reg_list
 
+    def _add_snapshot_registers(self, read_list):
+        """@brief Extend a list of registers to be read with the snapshot registers not yet read."""
+        snapshot = []
+        if not self._have_snapshot:
+            snapshot += self.SNAPSHOT_REGS
+            self._have_snapshot = True
+        if not self._have_fp_snapshot \
+                and any(CortexMCoreRegisterInfo.get(r).is_float_register for r in read_list):
+            snapshot += self.FP_SNAPSHOT_REGS
+            self._have_fp_snapshot = True
+        present = self._core.core_registers.by_index
+        return read_list + [r for r in snapshot
+                if (r in present) and (r not in self._cache) and (r not in read_list)]
+
     def read_core_registers_raw(self, reg_list):
         # Invalidate the cache. If the core is still running, just read directly from it.
         if self._check_cache():
@@ -103,8 +145,13 @@ class RegisterCache(object):
         cached_set = set(r for r in reg_list if r in self._cache)
         self._metrics.hits += len(cached_set)
 
-        # Read uncached registers from the target.
+        # Read uncached registers from the target, along with any registers of the halt snapshot
+        # that have not been read yet.
         read_list = list(reg_set.difference(cached_set))
+        requested_count = len(read_list)
+        if read_list:
+            read_list = self._add_snapshot_registers(read_list)
+        reading_snapshot = len(read_list) > requested_count
         reading_cfbp = any(r for r in read_list if r in self.CFBP_REGS)
         reading_xpsr = any(r for r in read_list if r in self.XPSR_REGS)
         if reading_cfbp:
@@ -124,7 +171,12 @@ class RegisterCache(object):
             except exceptions.CoreRegisterAccessError:
                 # Invalidate cache on register read error just to be safe.
                 self._reset_cache()
-                raise
+                if not reading_snapshot:
+                    raise
+                # Retry without the snapshot registers, in case one of them caused the error.
+                self._have_snapshot = True
+                self._have_fp_snapshot = True
+                return self.read_core_registers_raw(reg_list)
         else:
             values = []
 
@@ -146,6 +198,10 @@ class RegisterCache(object):
                     continue
                 self._cache[r] = v & CortexMCoreRegisterInfo.get(r).psr_mask
 
+        # Cache the snapshot registers that were not requested.
+        for r, v in zip(read_list, values):
+            self._cache.setdefault(r, v)
+
         # Build the results list in the same order as requested registers.
         results = []
         for r in reg_list:
@@ -197,4 +253,5 @@ class RegisterCache(object):
 
     def invalidate(self):
         self._reset_cache()
+        self._halted_token = -1
 
@@ -634,7 +634,7 @@ class SavememCommand(CommandBase):
             except exceptions.FlashFailure:
                 region.flash.init(region.flash.Operation.ERASE)
 
-        data = bytearray(self.context.selected_ap.read_memory_block8(self.addr, self.count))
+        data = self.context.selected_ap.read_memory_bytes(self.addr, self.count)
 
         if flash_init_required:
             region.flash.cleanup()
@@ -745,14 +745,16 @@ class CompareCommand(CommandBase):
             chunk_size = min(end_addr - addr, CHUNK_SIZE)
             self.context.writei("Comparing %d bytes @ 0x%08x", chunk_size, addr)
 
-            data = bytearray(self.context.selected_ap.read_memory_block8(addr, chunk_size))
+            data = self.context.selected_ap.read_memory_bytes(addr, chunk_size)
 
-            for i in range(chunk_size):
-                if data[i] != file_data[offset+i]:
-                    mismatch = True
-                    self.context.writei("Mismatched byte at 0x%08x (offset 0x%x): 0x%02x (memory) != 0x%02x (file)",
-                        addr + i, offset + i, data[i], file_data[offset+i])
-                    break
+            # Only search for the mismatched byte if the whole chunk doesn't match.
+            if data != file_data[offset:offset + chunk_size]:
+                for i in range(chunk_size):
+                    if data[i] != file_data[offset+i]:
+                        mismatch = True
+                        self.context.writei("Mismatched byte at 0x%08x (offset 0x%x): 0x%02x (memory) != 0x%02x (file)",
+                            addr + i, offset + i, data[i], file_data[offset+i])
+                        break
 
             if mismatch:
                 break
@@ -886,7 +888,7 @@ class FindCommand(CommandBase):
             chunk_size = min(end_addr - addr, CHUNK_SIZE)
             self.context.writei("Read %d bytes @ 0x%08x", chunk_size, addr)
 
-            data = bytearray(self.context.selected_ap.read_memory_block8(addr, chunk_size))
+            data = self.context.selected_ap.read_memory_bytes(addr, chunk_size)
 
             offset = data.find(self.pattern)
             if (offset != -1) ^ self.negate:
@@ -14,7 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import (Optional, TYPE_CHECKING)
+from typing import (Callable, Optional, TYPE_CHECKING)
 
 from .target import (Target, TargetGraphNode)
 
@@ -42,6 +42,17 @@ class CoreTarget(TargetGraphNode):
     def elf(self, filename: "ELFBinaryFile") -> None:
         raise NotImplementedError()
 
+    def get_state_later(self) -> Callable[[], Target.State]:
+        """@brief Start reading the core's state.
+
+        Cores that can defer the read queue it, so the states of several cores can be read with
+        one probe round trip. By default the state is read immediately.
+
+        @return Callable that returns the Target.State.
+        """
+        state = self.get_state()
+        return lambda: state
+
     def set_reset_catch(self, reset_type: Target.ResetType) -> None:
         raise NotImplementedError()
 
@@ -15,11 +15,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import (Callable, Sequence, Union, cast, overload)
+from typing import (Callable, List, Sequence, Tuple, Union, cast, overload)
 from typing_extensions import Literal
 
 from ..utility import conversion
 
+## @brief Type of binary data accepted and returned by the bytes-based memory APIs.
+BytesLike = Union[bytes, bytearray, memoryview]
+
 class MemoryInterface:
     """@brief Interface for memory access."""
 
@@ -59,6 +62,37 @@ class MemoryInterface:
         """@brief Read an aligned block of 32-bit words."""
         raise NotImplementedError()
 
+    def read_memory_bytes(self, addr: int, size: int) -> BytesLike:
+        """@brief Read a block of unaligned bytes in memory into a bytes-like object.
+
+        This is the preferred API for reading large blocks of memory, since it avoids
+        building lists of Python integers. The default implementation is built on
+        read_memory_block8(); memory interfaces that can produce binary data natively
+        override it.
+
+        @return A bytearray or other mutable bytes-like object of length _size_.
+        """
+        return bytearray(self.read_memory_block8(addr, size))
+
+    def write_memory_bytes(self, addr: int, data: BytesLike) -> None:
+        """@brief Write a block of unaligned bytes from a bytes-like object to memory.
+
+        The default implementation is built on write_memory_block8().
+        """
+        self.write_memory_block8(addr, list(data))
+
+    def read_memory_ranges(self, ranges: Sequence[Tuple[int, int]]) -> List[BytesLike]:
+        """@brief Read several blocks of memory.
+
+        Memory interfaces that queue transfers issue every read before waiting for the results, so
+        the reads share probe round trips. The default implementation calls read_memory_bytes()
+        for each range in turn.
+
+        @param ranges Sequence of (address, size) pairs.
+        @return List of bytes-like objects with the contents of each range.
+        """
+        return [self.read_memory_bytes(addr, size) for addr, size in ranges]
+
     def write64(self, addr: int, value: int) -> None:
         """@brief Shorthand to write a 64-bit word."""
         self.write_memory(addr, value, 64)
@@ -15,6 +15,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from bisect import (bisect_left, bisect_right)
 from enum import Enum
 import collections.abc
 import copy
@@ -620,6 +621,60 @@ MEMORY_TYPE_CLASS_MAP: Dict[MemoryType, Type[MemoryRegion]] = {
         MemoryType.DEVICE:  DeviceRegion,
     }
 
+class _RegionIndex:
+    """@brief Sorted index of memory regions for address lookups.
+
+    Regions are kept in start address order, together with a running maximum of region end addresses.
+    The regions that can intersect an address range are those with a start at or below the range's end
+    and a running maximum end at or above the range's start, which are both found with a binary search.
+    This works for overlapping regions as well, such as aliases and subregions.
+    """
+
+    def __init__(self, regions: List["MemoryRegion"]) -> None:
+        self.regions = regions
+        self.starts = [r.start for r in regions]
+        self.max_ends: List[int] = []
+        max_end = -1
+        for r in regions:
+            max_end = max(max_end, r.end)
+            self.max_ends.append(max_end)
+
+        # Regions that do not overlap any other region in the index. Only these can be returned from
+        # the last hit cache, since for others an earlier overlapping region may have to be returned.
+        self.exclusive = set()
+        for i, r in enumerate(regions):
+            if (i > 0) and (self.max_ends[i - 1] >= r.start):
+                continue
+            if (i + 1 < len(regions)) and (regions[i + 1].start <= r.end):
+                continue
+            self.exclusive.add(id(r))
+
+        ## Region returned by the most recent address lookup.
+        self.last_hit: Optional["MemoryRegion"] = None
+
+    def candidates(self, start: int, end: int) -> List["MemoryRegion"]:
+        """@brief Return regions in start order that may intersect the given inclusive range.
+
+        The result is a superset of the intersecting regions, which callers filter.
+        """
+        lo = min(start, end)
+        hi = max(start, end)
+        first = bisect_left(self.max_ends, lo)
+        last = bisect_right(self.starts, hi)
+        return self.regions[first:last]
+
+    def find(self, address: int) -> Optional["MemoryRegion"]:
+        """@brief Return the first region containing an address."""
+        last_hit = self.last_hit
+        if (last_hit is not None) and last_hit.contains_address(address):
+            return last_hit
+        for r in self.candidates(address, address):
+            if r.contains_address(address):
+                if id(r) in self.exclusive:
+                    self.last_hit = r
+                return r
+        return None
+
 class MemoryMap(MemoryRangeBase, collections.abc.Sequence):
     """@brief Memory map consisting of memory regions.
 
@@ -643,11 +698,16 @@ class MemoryMap(MemoryRangeBase, collections.abc.Sequence):
     the order regions are added, the list of regions contained in the memory map is always
     maintained sorted by start address.
 
+    Address lookups use a sorted index of the regions, built on first use after regions are added or
+    removed, so their cost grows with the log of the number of regions. A separate index is kept for
+    each processor name (`pname`) that lookups are filtered by.
+
     MemoryMap objects implement the collections.abc.Sequence interface.
     """
 
     _regions: List[MemoryRegion]
     _region_validator: Callable[[MemoryRegion], bool]
+    _indices: Dict[Optional[str], _RegionIndex]
 
     def __init__(
             self,
@@ -677,9 +737,25 @@ class MemoryMap(MemoryRangeBase, collections.abc.Sequence):
             length=kwargs.get('length')
         )
         self._regions = []
+        self._indices = {}
         self._region_validator = kwargs.get('region_validator', lambda r: True)
         self.add_regions(*more_regions)
 
+    def _get_index(self, pname: Optional[str] = None) -> _RegionIndex:
+        """@brief Return the region index for a processor name, building it if required.
+
+        The index for a processor name contains the regions with a matching `pname` attribute and
+        the regions without one. The index for None contains all regions.
+        """
+        index = self._indices.get(pname)
+        if index is None:
+            if pname is None:
+                regions = self._regions
+            else:
+                regions = [r for r in self._regions if r.attributes.get('pname') in (None, pname)]
+            index = self._indices[pname] = _RegionIndex(regions)
+        return index
+
     @property
     def regions(self) -> List[MemoryRegion]:
         """@brief List of all memory regions.
@@ -758,6 +834,7 @@ class MemoryMap(MemoryRangeBase, collections.abc.Sequence):
         new_region.map = self
         self._regions.append(new_region)
         self._regions.sort()
+        self._indices = {}
 
     def remove_region(self, region: MemoryRegion) -> None:
         """@brief Removes a memory region from the map.
@@ -768,6 +845,28 @@ class MemoryMap(MemoryRangeBase, collections.abc.Sequence):
         for i, r in enumerate(self._regions):
             if r is region:
                 del self._regions[i]
+        self._indices = {}
+
+    def resize_region(self, region: MemoryRegion, start: Optional[int] = None,
+            end: Optional[int] = None) -> None:
+        """@brief Change the bounds of a region in the map.
+
+        Regions don't otherwise allow their bounds to be changed, so that regions in a map can't
+        be made to overlap. The region list is resorted and the address lookup indices are
+        rebuilt on the next lookup.
+
+        @param self
+        @param region The region to resize, which must be in this map.
+        @param start New start address. The start is not changed if None.
+        @param end New end address, inclusive. The end is not changed if None.
+        """
+        assert any(r is region for r in self._regions)
+        if start is not None:
+            region._start = start
+        if end is not None:
+            region._end = end
+        self._regions.sort()
+        self._indices = {}
 
     def get_boot_memory(self) -> Optional[MemoryRegion]:
         """@brief Returns the first region marked as boot memory.
@@ -785,14 +884,11 @@ class MemoryMap(MemoryRangeBase, collections.abc.Sequence):
 
         @param self
         @param address An integer target address.
+        @param pname Optional processor name. If provided, only regions without a `pname` attribute or
+            with a matching one are considered.
         @return MemoryRegion or None.
         """
-        for r in self._regions:
-            if (pname is not None) and (r.attributes.get('pname') not in (None, pname)):
-                continue
-            if r.contains_address(address):
-                return r
-        return None
+        return self._get_index(pname).find(address)
 
     def is_valid_address(self, address: int) -> bool:
         """@brief Determines whether an address is contained by any region.
@@ -821,7 +917,10 @@ class MemoryMap(MemoryRangeBase, collections.abc.Sequence):
             address range.
         """
         start, end = check_range(start, end, length, range)
-        return [r for r in self._regions if r.contained_by_range(start, end)]
+        index = self._get_index()
+        first = bisect_left(index.starts, start)
+        last = bisect_right(index.starts, end)
+        return [r for r in index.regions[first:last] if r.contained_by_range(start, end)]
 
     def get_intersecting_regions(
                 self,
@@ -841,7 +940,7 @@ class MemoryMap(MemoryRangeBase, collections.abc.Sequence):
             range.
         """
         start, end = check_range(start, end, length, range)
-        return [r for r in self._regions if r.intersects_range(start, end)]
+        return [r for r in self._get_index().candidates(start, end) if r.intersects_range(start, end)]
 
     def iter_matching_regions(self, **kwargs: Any) -> Iterator[MemoryRegion]:
         """@brief Iterate over regions matching given criteria.
@@ -39,6 +39,12 @@ BUILTIN_OPTIONS = [
         "Enable the memory read cache. Default is enabled."),
     OptionInfo('cache.enable_register', bool, True,
         "Enable the core register cache. Default is enabled."),
+    OptionInfo('cache.memory_budget', int, 1024 * 1024,
+        "Maximum number of bytes of target memory held by the memory cache. Least recently used pages are "
+        "discarded when it is exceeded. Default is 1 MB."),
+    OptionInfo('cache.read_ahead', bool, True,
+        "Extend memory cache reads that miss to the 1 kB page boundaries around them, within cacheable "
+        "memory regions. Default is enabled."),
     OptionInfo('cache.read_code_from_elf', bool, True,
         "Controls whether reads of code sections will be taken from an attached ELF file instead of the "
         "target memory."),
@@ -55,7 +61,11 @@ BUILTIN_OPTIONS = [
     OptionInfo('connect_mode', str, "halt",
         "One of 'halt', 'pre-reset', 'under-reset', 'attach'. Default is 'halt'."),
     OptionInfo('cpu.step.instruction.timeout', float, 0.0,
-        "Timeout in seconds for instruction step operations. Defaults to 0, or no timeout."),
+        "Timeout in seconds for instruction step operations, and for each run of the core through a "
+        "step range. Defaults to 0, or no timeout."),
+    OptionInfo('cpu.step.range.breakpoints', bool, True,
+        "Run through step ranges on the target using breakpoints on the range's exits, instead of "
+        "stepping each instruction from the host. Only used when interrupts are masked while stepping."),
     OptionInfo('dap_protocol', str, 'default',
         "Wire protocol, either 'swd', 'jtag', or 'default'."),
     OptionInfo('dap_swj_enable', bool, True,
@@ -72,6 +82,10 @@ BUILTIN_OPTIONS = [
     OptionInfo('fast_program', bool, False,
         "Setting this option to True will use CRC checks of existing flash sector contents to "
         "determine whether pages need to be programmed."),
+    OptionInfo('flash.compress', bool, False,
+        "Compress page data on the host and expand it in target RAM with a small decompressor before "
+        "programming. Reduces the amount of data transferred for compressible images. Requires a flash "
+        "algorithm with at least two page buffers."),
     OptionInfo('flash.timeout.init', float, 5.0,
         "Flash algorithm init and uninit timeout in seconds."),
     OptionInfo('flash.timeout.analyzer', float, 30.0,
@@ -108,6 +122,11 @@ BUILTIN_OPTIONS = [
     OptionInfo('primary_core', int, 0,
         "Core number for the primary/boot core of an asymmetric multicore target. This is the core that "
         "will control system reset when 'enable_multicore' is set."),
+    OptionInfo('probe.autotune', bool, False,
+        "Calibrate the SWD/JTAG frequency and probe queue depth when the session is opened, and cache the "
+        "result per probe and target type."),
+    OptionInfo('probe.autotune.cache_file', str, None,
+        "Path of the probe autotune cache file. Defaults to .pyocd_autotune.json in the user's home directory."),
     OptionInfo('probeserver.port', int, 5555,
         "TCP port for the debug probe server."),
     OptionInfo('project_dir', str, None,
@@ -162,6 +181,33 @@ BUILTIN_OPTIONS = [
         "for it to halt again."),
     OptionInfo('gdbserver_port', int, 3333,
         "Base TCP port for the gdbserver."),
+    OptionInfo('gdbserver.event_loop', bool, False,
+        "Whether gdbservers serve their connections, semihosting telnet, and RTT ports from one "
+        "shared event loop thread, with commands for all cores of a session handled in order on one "
+        "dispatcher thread, instead of using threads for each server and connection. Default is False."),
+    OptionInfo('gdbserver.expedited_registers', str, "r7,sp,lr,pc",
+        "Comma separated names of the registers whose values are sent in gdb stop replies. Default is "
+        "\"r7,sp,lr,pc\"."),
+    OptionInfo('gdbserver.packet_size', int, 0x20000,
+        "Maximum RSP packet size in bytes reported to gdb. Larger packets let gdb read and write "
+        "memory in fewer requests. Default is 0x20000 (128 kB)."),
+    OptionInfo('gdbserver.poll_interval_max', float, 0.2,
+        "Longest interval in seconds between target state checks while the target runs. Default is 0.2."),
+    OptionInfo('gdbserver.poll_interval_min', float, 0.01,
+        "Interval in seconds between target state checks right after the target is resumed. The "
+        "interval grows to gdbserver.poll_interval_max while nothing happens. Default is 0.01."),
+    OptionInfo('gdbserver.prefetch_code_size', int, 0x40,
+        "Number of bytes around the PC to read into the memory cache when the target stops. Set to 0 "
+        "to disable. Default is 0x40."),
+    OptionInfo('gdbserver.prefetch_stack_size', int, 0x80,
+        "Number of bytes from the SP to read into the memory cache when the target stops. Set to 0 to "
+        "disable. Default is 0x80."),
+    OptionInfo('gdbserver.stats_file', str, None,
+        "Path of a JSON file to which the gdbserver writes statistics of the RSP packets it handled when "
+        "gdb disconnects. \"{core}\" in the path is replaced by the core number. Not written if unset."),
+    OptionInfo('gdbserver.stream_flash', bool, True,
+        "Whether the gdbserver programs flash sectors while gdb is still sending data for a load, "
+        "instead of buffering all data until the load is complete. Default is True."),
     OptionInfo('persist', bool, False,
         "If True, the GDB server will not exit after GDB disconnects."),
     OptionInfo('report_core_number', bool, False,
@@ -189,6 +235,8 @@ BUILTIN_OPTIONS = [
         "Enable flag for the raw SWV stream server."),
     OptionInfo('swv_raw_port', int, 3443,
         "TCP port number for the raw SWV stream server."),
+    OptionInfo('swv_raw_file', str, None,
+        "Path of a file to which the raw SWO data is written while SWV is enabled."),
     OptionInfo('telnet_port', int, 4444,
         "Base TCP port number for the semihosting telnet server."),
     OptionInfo('vector_catch', str, 'h',
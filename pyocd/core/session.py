@@ -532,7 +532,8 @@ class Session(Notifier):
         script, if there is one. The user script will be available via the _user_script_proxy_
         property. Then it opens the debug probe and sets the clock rate from the `frequency` user
         option. Finally, it inits the board (which will init the target, which performs the
-        full target init sequence).
+        full target init sequence). If the `probe.autotune` option is enabled, cached probe
+        settings are applied before the board is inited, or the probe is calibrated afterwards.
 
         @param self
         @param init_board This parameter lets you prevent the board from being inited, which can
@@ -553,9 +554,20 @@ class Session(Notifier):
                 if self.target.debugger_clock is not None:
                     frequency = self.target.debugger_clock
             self._probe.set_clock(frequency)
+
+            # Apply cached probe settings before the board is inited, so init benefits as well.
+            autotuner = None
+            if self.options.get('probe.autotune'):
+                from ..probe.autotune import ProbeAutotuner
+                autotuner = ProbeAutotuner(self)
+                if autotuner.apply_cached():
+                    autotuner = None
+
             if init_board:
                 self._board.init()
                 self._inited = True
+                if autotuner is not None:
+                    autotuner.calibrate()
 
     def close(self) -> None:
         """@brief Close the session.
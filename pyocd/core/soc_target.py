@@ -18,7 +18,7 @@
 from __future__ import annotations
 
 import logging
-from typing import (Callable, Dict, List, Optional, overload, Sequence, Union, TYPE_CHECKING)
+from typing import (Callable, Dict, List, Optional, overload, Sequence, Tuple, Union, TYPE_CHECKING)
 from typing_extensions import Literal
 
 from .target import (Target, TargetGraphNode)
@@ -32,6 +32,7 @@ from ..utility.sequencer import CallSequence
 
 if TYPE_CHECKING:
     from .session import Session
+    from .memory_interface import BytesLike
     from .memory_map import MemoryMap
     from .core_registers import (CoreRegistersIndex, CoreRegisterNameOrNumberType, CoreRegisterValueType)
     from ..debug.context import DebugContext
@@ -70,6 +71,8 @@ class SoCTarget(TargetGraphNode):
         self._selected_core: int = -1
         self._new_core_num = 0
         self._elf = None
+        # The cores' caching debug contexts, which invalidate each other's memory caches on writes.
+        self._caching_contexts: List[CachingDebugContext] = []
 
         # Set our graph node name.
         self.node_name = 'soc'
@@ -146,6 +149,9 @@ class SoCTarget(TargetGraphNode):
                 core,
                 enable_memory=self.session.options['cache.enable_memory'],
                 enable_register=self.session.options['cache.enable_register'],
+                memory_budget=self.session.options['cache.memory_budget'],
+                read_ahead=self.session.options['cache.read_ahead'],
+                peers=self._caching_contexts,
                 )
         core.set_target_context(ctx)
         self.cores[core.core_number] = core
@@ -243,6 +249,15 @@ class SoCTarget(TargetGraphNode):
     def read_memory_block32(self, addr: int, size: int) -> Sequence[int]:
         return self.selected_core_or_raise.read_memory_block32(addr, size)
 
+    def write_memory_bytes(self, addr: int, data: BytesLike) -> None:
+        return self.selected_core_or_raise.write_memory_bytes(addr, data)
+
+    def read_memory_bytes(self, addr: int, size: int) -> BytesLike:
+        return self.selected_core_or_raise.read_memory_bytes(addr, size)
+
+    def read_memory_ranges(self, ranges: Sequence[Tuple[int, int]]) -> List[BytesLike]:
+        return self.selected_core_or_raise.read_memory_ranges(ranges)
+
     def read_core_register(self, id: CoreRegisterNameOrNumberType) -> CoreRegisterValueType:
         return self.selected_core_or_raise.read_core_register(id)
 
@@ -21,11 +21,14 @@ import logging
 from contextlib import contextmanager
 from functools import total_ordering
 from enum import Enum
-from typing import (Any, Callable, Dict, Generator, Optional, TYPE_CHECKING, Sequence, Set, Tuple, Type, Union, overload)
+from typing import (Any, Callable, Dict, Generator, List, Optional, TYPE_CHECKING, Sequence, Set, Tuple, Type, Union,
+        overload)
 from typing_extensions import Literal
 
 from ..core import (exceptions, memory_interface)
+from ..core.memory_interface import BytesLike
 from ..core.target import Target
+from ..utility import conversion
 from ..utility.concurrency import locked
 
 if TYPE_CHECKING:
@@ -93,6 +96,7 @@ MEM_APv2_CONTROL_REG_OFFSET = 0xD00
 MEM_AP_CSW = 0x00
 MEM_AP_TAR = 0x04
 MEM_AP_DRW = 0x0C
+MEM_AP_BD0 = 0x10
 MEM_AP_TRR = 0x24 # Only APv2 with ERRv1
 MEM_AP_BASE_HI = 0xF0
 MEM_AP_CFG = 0xF4
@@ -642,6 +646,11 @@ class MEM_AP(AccessPort, memory_interface.MemoryInterface):
             self.read_memory = self._read_memory
             self.write_memory_block32 = self._write_memory_block32
             self.read_memory_block32 = self._read_memory_block32
+            self.write_memory_block8 = self._write_memory_block8
+            self.read_memory_block8 = self._read_memory_block8
+            self.write_memory_bytes = self._write_memory_bytes
+            self.read_memory_bytes = self._read_memory_bytes
+            self.read_memory_ranges = self._read_memory_ranges
 
         # Subscribe to reset events.
         self.dp.session.subscribe(self._reset_did_occur, (Target.Event.PRE_RESET, Target.Event.POST_RESET))
@@ -1190,39 +1199,86 @@ class MEM_AP(AccessPort, memory_interface.MemoryInterface):
         else:
             return read_mem_cb
 
-    def _write_block32_page(self, addr: int, data: Sequence[int]) -> None:
+    @locked
+    def set_banked_address(self, addr: int) -> None:
+        """@brief Prepare word accesses through the banked data registers.
+
+        Sets TAR to the 16-byte aligned block containing _addr_, after which read_banked() and
+        write_banked() access the four words of that block without writing TAR again. Any other
+        memory access through this AP changes TAR, so callers should hold the AP's lock for the
+        whole sequence of banked accesses.
+        """
+        addr &= self._address_mask & ~0xf
+        self.write_reg(self._reg_offset + MEM_AP_CSW, self._csw | CSW_SIZE32)
+        self.write_reg(self._reg_offset + MEM_AP_TAR, addr)
+
+    def read_banked(self, index: int, now: bool = True) -> Union[int, Callable[[], int]]:
+        """@brief Read word _index_ (0-3) of the block selected by set_banked_address()."""
+        assert 0 <= index < 4
+        return self.read_reg(self._reg_offset + MEM_AP_BD0 + index * 4, now=now)
+
+    def write_banked(self, index: int, data: int) -> None:
+        """@brief Write word _index_ (0-3) of the block selected by set_banked_address()."""
+        assert 0 <= index < 4
+        self.write_reg(self._reg_offset + MEM_AP_BD0 + index * 4, data)
+
+    def _write_block32_page(self, addr: int, data: BytesLike) -> None:
         """@brief Write a single transaction's worth of aligned words.
 
         The transaction must not cross the MEM-AP's auto-increment boundary.
 
-        This method is not locked because it is only called by _write_memory_block32(), which is locked.
+        This method is not locked because it is only called by _write_memory_block32_bytes(), which is locked.
+
+        @param self
+        @param addr Word aligned start address.
+        @param data Bytes-like object holding the little-endian words to write.
         """
         assert (addr & 0x3) == 0
         num = self.dp.next_access_number
         TRACE.debug("_write_block32:%06d (ap=0x%x; addr=0x%08x, size=%d) {",
-            num, self.address.nominal_address, addr, len(data))
+            num, self.address.nominal_address, addr, len(data) // 4)
         # put address in TAR
         self.write_reg(self._reg_offset + MEM_AP_CSW, self._csw | CSW_SIZE32)
         self.write_reg(self._reg_offset + MEM_AP_TAR, addr)
         try:
-            self.dp.write_ap_multiple(self.address.address + self._reg_offset + MEM_AP_DRW, data)
+            self.dp.write_ap_multiple_bytes(self.address.address + self._reg_offset + MEM_AP_DRW, data)
         except exceptions.TransferFaultError as error:
             # Annotate error with target address.
             self._handle_error(error, num)
             error.fault_address = addr
-            error.fault_length = len(data) * 4
+            error.fault_length = len(data)
             raise
         except exceptions.Error as error:
             self._handle_error(error, num)
             raise
         TRACE.debug("_write_block32:%06d }", num)
 
-    def _read_block32_page(self, addr: int, size: int) -> Sequence[int]:
+    @overload
+    def _read_block32_page(self, addr: int, size: int) -> BytesLike:
+        ...
+
+    @overload
+    def _read_block32_page(self, addr: int, size: int, now: Literal[True] = True) -> BytesLike:
+        ...
+
+    @overload
+    def _read_block32_page(self, addr: int, size: int, now: Literal[False]) -> Callable[[], BytesLike]:
+        ...
+
+    def _read_block32_page(self, addr: int, size: int, now: bool = True) \
+            -> Union[BytesLike, Callable[[], BytesLike]]:
         """@brief Read a single transaction's worth of aligned words.
 
         The transaction must not cross the MEM-AP's auto-increment boundary.
 
-        This method is not locked because it is only called by _read_memory_block32(), which is locked.
+        This method is not locked because it is only called by _read_memory_block32_bytes() and
+        _read_memory_ranges(), which are locked.
+
+        @param self
+        @param addr Word aligned start address.
+        @param size Number of words to read.
+        @param now If False, the read is queued and a callback returning the result is returned.
+        @return Bytes-like object holding the little-endian words read.
         """
         assert (addr & 0x3) == 0
         num = self.dp.next_access_number
@@ -1232,7 +1288,8 @@ class MEM_AP(AccessPort, memory_interface.MemoryInterface):
         self.write_reg(self._reg_offset + MEM_AP_CSW, self._csw | CSW_SIZE32)
         self.write_reg(self._reg_offset + MEM_AP_TAR, addr)
         try:
-            resp = self.dp.read_ap_multiple(self.address.address + self._reg_offset + MEM_AP_DRW, size)
+            resp_cb = self.dp.read_ap_multiple_bytes(self.address.address + self._reg_offset + MEM_AP_DRW,
+                    size, now=False)
         except exceptions.TransferFaultError as error:
             # Annotate error with target address.
             self._handle_error(error, num)
@@ -1242,42 +1299,228 @@ class MEM_AP(AccessPort, memory_interface.MemoryInterface):
         except exceptions.Error as error:
             self._handle_error(error, num)
             raise
-        TRACE.debug("_read_block32:%06d }", num)
-        return resp
+
+        def read_block32_cb() -> BytesLike:
+            try:
+                resp = resp_cb()
+            except exceptions.TransferFaultError as error:
+                self._handle_error(error, num)
+                error.fault_address = addr
+                error.fault_length = size * 4
+                raise
+            except exceptions.Error as error:
+                self._handle_error(error, num)
+                raise
+            TRACE.debug("_read_block32:%06d }", num)
+            return resp
+
+        if now:
+            return read_block32_cb()
+        else:
+            return read_block32_cb
 
     @locked
-    def _write_memory_block32(self, addr: int, data: Sequence[int]) -> None:
-        """@brief Write a block of aligned words in memory."""
+    def _write_memory_block32_bytes(self, addr: int, data: BytesLike) -> None:
+        """@brief Write a block of aligned words in memory from a bytes-like object.
+
+        The length of _data_ must be a multiple of 4.
+        """
         assert (addr & 0x3) == 0
+        assert (len(data) & 0x3) == 0
         addr &= self._address_mask
-        size = len(data)
+        view = memoryview(data).cast('B')
+        offset = 0
+        size = len(view)
         while size > 0:
             n = self.auto_increment_page_size - (addr & (self.auto_increment_page_size - 1))
-            if size*4 < n:
-                n = (size*4) & 0xfffffffc
-            self._write_block32_page(addr, data[:n//4])
-            data = data[n//4:]
-            size -= n//4
+            if size < n:
+                n = size
+            self._write_block32_page(addr, view[offset:offset + n])
+            offset += n
+            size -= n
             addr += n
-        return
 
     @locked
-    def _read_memory_block32(self, addr: int, size: int) -> Sequence[int]:
-        """@brief Read a block of aligned words in memory.
+    def _read_memory_block32_bytes(self, addr: int, size: int) -> bytearray:
+        """@brief Read a block of aligned words in memory into a bytearray.
 
-        @return A list of word values.
+        @param self
+        @param addr Word aligned start address.
+        @param size Number of words to read.
+        @return A bytearray of length _size_ * 4.
         """
         assert (addr & 0x3) == 0
         addr &= self._address_mask
-        resp = []
+        result = bytearray(size * 4)
+        offset = 0
+        size *= 4
         while size > 0:
             n = self.auto_increment_page_size - (addr & (self.auto_increment_page_size - 1))
-            if size*4 < n:
-                n = (size*4) & 0xfffffffc
-            resp += self._read_block32_page(addr, n//4)
-            size -= n//4
+            if size < n:
+                n = size
+            result[offset:offset + n] = self._read_block32_page(addr, n // 4)
+            offset += n
+            size -= n
+            addr += n
+        return result
+
+    @locked
+    def _read_memory_ranges(self, ranges: Sequence[Tuple[int, int]]) -> List[BytesLike]:
+        """@brief Read several blocks of memory, queuing all of the transfers before waiting.
+
+        Word aligned ranges are read with deferred 32-bit block transfers, so the reads of all
+        ranges can share probe round trips. Other ranges are read with _read_memory_bytes().
+
+        @param self
+        @param ranges Sequence of (address, size) pairs.
+        @return List of bytearrays with the contents of each range.
+        """
+        # Every callback must be called, even after an error, to release the DP lock each one holds.
+        # An error from an earlier range can be raised while later ranges are being queued, in which
+        # case the callbacks already created are drained before the error is passed on.
+        pending: List[Union[BytesLike, List[Callable[[], BytesLike]]]] = []
+        try:
+            for addr, size in ranges:
+                if (addr & 0x3) or (size & 0x3):
+                    pending.append(self._read_memory_bytes(addr, size))
+                    continue
+                addr &= self._address_mask
+                callbacks: List[Callable[[], BytesLike]] = []
+                pending.append(callbacks)
+                while size > 0:
+                    n = min(size, self.auto_increment_page_size - (addr & (self.auto_increment_page_size - 1)))
+                    callbacks.append(self._read_block32_page(addr, n // 4, now=False))
+                    size -= n
+                    addr += n
+        except Exception:
+            for item in pending:
+                if isinstance(item, list):
+                    for cb in item:
+                        try:
+                            cb()
+                        except Exception:
+                            pass
+            raise
+
+        results: List[BytesLike] = []
+        first_error: Optional[Exception] = None
+        for item in pending:
+            if not isinstance(item, list):
+                results.append(item)
+                continue
+            data = bytearray()
+            for cb in item:
+                try:
+                    data += cb()
+                except Exception as error:
+                    if first_error is None:
+                        first_error = error
+            results.append(data)
+        if first_error is not None:
+            raise first_error
+        return results
+
+    @locked
+    def _write_memory_block32(self, addr: int, data: Sequence[int]) -> None:
+        """@brief Write a block of aligned words in memory."""
+        self._write_memory_block32_bytes(addr, conversion.u32le_list_to_bytes(data))
+
+    @locked
+    def _read_memory_block32(self, addr: int, size: int) -> Sequence[int]:
+        """@brief Read a block of aligned words in memory.
+
+        @return A list of word values.
+        """
+        return conversion.bytes_to_u32le_list(self._read_memory_block32_bytes(addr, size))
+
+    @locked
+    def _read_memory_bytes(self, addr: int, size: int) -> bytearray:
+        """@brief Read a block of unaligned bytes in memory.
+
+        Unaligned leading and trailing bytes are read with 8- and 16-bit transfers. The remainder is
+        read with 32-bit block transfers directly into the result.
+
+        @return A bytearray of length _size_.
+        """
+        result = bytearray()
+
+        if (size > 0) and (addr & 0x01):
+            result.append(self.read8(addr))
+            size -= 1
+            addr += 1
+
+        if (size > 1) and (addr & 0x02):
+            result += self.read16(addr).to_bytes(2, 'little')
+            size -= 2
+            addr += 2
+
+        if size >= 4:
+            words = size // 4
+            if result:
+                result += self._read_memory_block32_bytes(addr, words)
+            else:
+                result = self._read_memory_block32_bytes(addr, words)
+            size -= words * 4
+            addr += words * 4
+
+        if size > 1:
+            result += self.read16(addr).to_bytes(2, 'little')
+            size -= 2
+            addr += 2
+
+        if size > 0:
+            result.append(self.read8(addr))
+
+        return result
+
+    @locked
+    def _write_memory_bytes(self, addr: int, data: BytesLike) -> None:
+        """@brief Write a block of unaligned bytes in memory.
+
+        Unaligned leading and trailing bytes are written with 8- and 16-bit transfers. The remainder is
+        written with 32-bit block transfers straight from _data_.
+        """
+        view = memoryview(data).cast('B')
+        size = len(view)
+        idx = 0
+
+        if (size > 0) and (addr & 0x01):
+            self.write8(addr, view[idx])
+            size -= 1
+            addr += 1
+            idx += 1
+
+        if (size > 1) and (addr & 0x02):
+            self.write16(addr, view[idx] | (view[idx + 1] << 8))
+            size -= 2
+            addr += 2
+            idx += 2
+
+        if size >= 4:
+            n = size & ~0x03
+            self._write_memory_block32_bytes(addr, view[idx:idx + n])
+            size -= n
             addr += n
-        return resp
+            idx += n
+
+        if size > 1:
+            self.write16(addr, view[idx] | (view[idx + 1] << 8))
+            size -= 2
+            addr += 2
+            idx += 2
+
+        if size > 0:
+            self.write8(addr, view[idx])
+
+    def _read_memory_block8(self, addr: int, size: int) -> Sequence[int]:
+        """@brief Read a block of unaligned bytes in memory.
+        @return A list of byte values.
+        """
+        return list(self._read_memory_bytes(addr, size))
+
+    def _write_memory_block8(self, addr: int, data: Sequence[int]) -> None:
+        """@brief Write a block of unaligned bytes in memory."""
+        self._write_memory_bytes(addr, bytes(data))
 
     # Note: the "type: ignore"s below are ok because the accelerated memory interface accepts
     # attribute keyword args. The MemoryInterface class should be extended to accept attribute args
@@ -19,7 +19,7 @@ from __future__ import annotations
 
 import logging
 from time import sleep
-from typing import (Any, Callable, List, Optional, Set, Tuple, overload, Sequence, TYPE_CHECKING, Union, cast)
+from typing import (Any, Callable, Dict, List, Optional, Set, Tuple, overload, Sequence, TYPE_CHECKING, Union, cast)
 from typing_extensions import Literal
 
 from ..core.target import Target
@@ -30,12 +30,14 @@ from ..utility import (cmdline, timeout)
 from .component import (CoreSightComponent, CoreSightCoreComponent)
 from .fpb import FPB
 from .dwt import DWT
+from .range_step import analyze_step_range
 from .core_ids import (CORE_TYPE_NAME, CoreArchitecture, CortexMExtension)
 from .cortex_m_core_registers import (
     CortexMCoreRegisterInfo,
     CoreRegisterGroups,
     )
 from ..debug.breakpoints.manager import BreakpointManager
+from ..debug.breakpoints.provider import Breakpoint
 from ..debug.breakpoints.software import SoftwareBreakpointProvider
 from .ap import MEM_AP
 
@@ -48,7 +50,7 @@ if TYPE_CHECKING:
         CoreRegisterValueType,
     )
     from ..core.session import Session
-    from ..core.memory_interface import MemoryInterface
+    from ..core.memory_interface import (BytesLike, MemoryInterface)
     from ..core.memory_map import MemoryMap
     from ..debug.context import DebugContext
     from ..debug.elf.elf import ELFBinaryFile
@@ -141,6 +143,11 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
     # Debug Core Register Data Register
     DCRDR = 0xE000EDF8
 
+    # Word indices of DHCSR, DCRSR and DCRDR within their 16-byte block, for MEM-AP banked accesses.
+    DHCSR_BANK = 0
+    DCRSR_BANK = 1
+    DCRDR_BANK = 2
+
     # Coprocessor Access Control Register
     CPACR = 0xE000ED88
     CPACR_CP10_CP11_MASK = (3 << 20) | (3 << 22)
@@ -638,12 +645,34 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
         else:
             return read_memory_cb
 
+    def read_memory_bytes(self, addr: int, size: int) -> BytesLike:
+        """@brief Read a block of unaligned bytes in memory.
+
+        Software breakpoint instructions are replaced with the original memory contents.
+
+        @return A bytearray or other mutable bytes-like object of length _size_.
+        """
+        data = self.ap.read_memory_bytes(addr, size)
+        return self.bp_manager.filter_memory_bytes(addr, data)
+
+    def read_memory_ranges(self, ranges: Sequence[Tuple[int, int]]) -> List[BytesLike]:
+        """@brief Read several blocks of memory, with the AP queuing all of the transfers together.
+
+        Software breakpoint instructions are replaced with the original memory contents.
+        """
+        results = self.ap.read_memory_ranges(ranges)
+        return [self.bp_manager.filter_memory_bytes(addr, data)
+                for (addr, _), data in zip(ranges, results)]
+
+    def write_memory_bytes(self, addr: int, data: BytesLike) -> None:
+        """@brief Write a block of unaligned bytes in memory from a bytes-like object."""
+        self.ap.write_memory_bytes(addr, data)
+
     def read_memory_block8(self, addr: int, size: int) -> Sequence[int]:
         """@brief Read a block of unaligned bytes in memory.
         @return an array of byte values
         """
-        data = self.ap.read_memory_block8(addr, size)
-        return self.bp_manager.filter_memory_unaligned_8(addr, size, data)
+        return list(self.read_memory_bytes(addr, size))
 
     def write_memory_block8(self, addr: int, data: Sequence[int]) -> None:
         """@brief Write a block of unaligned bytes in memory."""
@@ -668,6 +697,9 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
         self.flush()
         self.session.notify(Target.Event.POST_HALT, self, Target.HaltReason.USER)
 
+    ## Largest address range, in bytes, that is run on the target with breakpoints when range stepping.
+    _MAX_BREAKPOINT_STEP_RANGE = 0x1000
+
     def step(self, disable_interrupts: bool = True, start: int = 0, end: int = 0,
             hook_cb: Optional[Callable[[], bool]] = None) -> None:
         """@brief Perform an instruction level step.
@@ -734,37 +766,27 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
         # Get the step timeout. A timeout of 0 means no timeout, so we have to pass None to the Timeout class.
         step_timeout = self.session.options.get('cpu.step.instruction.timeout') or None
 
-        exit_step_loop = False
+        # Running through the range with breakpoints requires interrupts to be masked, or else
+        # handlers would run without stopping.
+        use_breakpoints = (start != end) and disable_interrupts \
+                and self.session.options.get('cpu.step.range.breakpoints')
+
         while True:
-            # Single step using current C_MASKINTS setting
-            self.write32(CortexM.DHCSR, dhcsr_step)
-
-            # Wait for halt to auto set.
-            #
-            # Note that it may take a very long time for this loop to exit in cases such as stepping over
-            # a branch into the Secure world where the debugger doesn't have secure debug access, or similar
-            # for Privileged code in the case of UDE.
-            with timeout.Timeout(step_timeout) as tmo:
-                while tmo.check():
-                    # Invoke the callback if provided. If it returns True, then exit the loop.
-                    if (hook_cb is not None) and hook_cb():
-                        exit_step_loop = True
-                        break
-                    if (self.read32(CortexM.DHCSR) & CortexM.C_HALT) != 0:
-                        break
+            exit_step_loop = self._step_instruction(dhcsr_step, step_timeout, hook_cb)
 
             # Range is empty, 'range step' will degenerate to 'step'
             if (start == end) or exit_step_loop:
                 break
 
-            # Read program counter and compare to [start, end)
-            program_counter = self.read_core_register_raw('pc')
-            if (program_counter < start) or (end <= program_counter):
+            if not self._is_in_step_range(start, end):
                 break
 
-            # Check for stop reasons other than HALTED, which will have been set by our step action.
-            if (self.read32(CortexM.DFSR) & ~CortexM.DFSR_HALTED) != 0:
-                break
+            # Run the rest of the range on the target. Host stepping continues only if the
+            # breakpoints couldn't be set.
+            if use_breakpoints:
+                if self._run_step_range(start, end, dhcsr_step, step_timeout, hook_cb):
+                    break
+                use_breakpoints = False
 
         # Restore interrupt mask state.
         if maskints_differs:
@@ -775,6 +797,131 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
 
         self.session.notify(Target.Event.POST_RUN, self, Target.RunType.STEP)
 
+    def _step_instruction(self, dhcsr_step: int, step_timeout: Optional[float],
+            hook_cb: Optional[Callable[[], bool]]) -> bool:
+        """@brief Single step using the provided DHCSR value and wait for the core to halt.
+        @return Boolean indicating whether the hook callback requested stepping to stop.
+        """
+        self.write32(CortexM.DHCSR, dhcsr_step)
+
+        # Wait for halt to auto set.
+        #
+        # Note that it may take a very long time for this loop to exit in cases such as stepping over
+        # a branch into the Secure world where the debugger doesn't have secure debug access, or similar
+        # for Privileged code in the case of UDE.
+        with timeout.Timeout(step_timeout) as tmo:
+            while tmo.check():
+                # Invoke the callback if provided. If it returns True, then exit the loop.
+                if (hook_cb is not None) and hook_cb():
+                    return True
+                if (self.read32(CortexM.DHCSR) & CortexM.C_HALT) != 0:
+                    break
+        return False
+
+    def _is_in_step_range(self, start: int, end: int) -> bool:
+        """@brief Whether range stepping should continue after a step."""
+        # Read program counter and compare to [start, end)
+        program_counter = self.read_core_register_raw('pc')
+        if (program_counter < start) or (end <= program_counter):
+            return False
+
+        # Check for stop reasons other than HALTED, which will have been set by our step action.
+        return (self.read32(CortexM.DFSR) & ~CortexM.DFSR_HALTED) == 0
+
+    def _set_step_range_breakpoint(self, addr: int) -> Optional[Breakpoint]:
+        """@brief Set a temporary breakpoint for range stepping, preferring a hardware breakpoint."""
+        if (self.fpb is not None) and self.fpb.can_support_address(addr) \
+                and (self.fpb.available_breakpoints > 0):
+            return self.fpb.set_breakpoint(addr)
+        elif self.sw_bp.can_support_address(addr):
+            return self.sw_bp.set_breakpoint(addr)
+        else:
+            return None
+
+    def _run_step_range(self, start: int, end: int, dhcsr_step: int, step_timeout: Optional[float],
+            hook_cb: Optional[Callable[[], bool]]) -> bool:
+        """@brief Run the core until it leaves the range [_start_, _end_).
+
+        The code in the range is decoded to find where execution can leave it. Temporary breakpoints
+        are set on those addresses and on the instructions whose destination isn't known, then the
+        core is resumed with the interrupt mask and PMOV settings of _dhcsr_step_. Instructions with
+        an unknown destination are stepped from the host when the core halts on them.
+
+        The core must be halted within the range, with its first instruction already executed. If
+        the core doesn't halt within _step_timeout_ seconds of being resumed, it is halted wherever
+        it is.
+
+        @return False if breakpoints could not be set for the range, in which case the core has
+            not been resumed and the caller should step from the host. Otherwise True.
+        """
+        if end - start > self._MAX_BREAKPOINT_STEP_RANGE:
+            return False
+        try:
+            code = self.read_memory_block8(start, end - start + 2)
+        except exceptions.TransferError:
+            return False
+        exits, stops = analyze_step_range(start, end, bytes(code))
+
+        # Breakpoints we set, by address. Existing breakpoints, such as those set by the user,
+        # are left in place and stop the range step.
+        breakpoints: Dict[int, Breakpoint] = {}
+
+        def remove_breakpoint(bp: Breakpoint) -> None:
+            assert bp.provider is not None
+            bp.provider.remove_breakpoint(bp)
+            bp.provider.flush()
+
+        try:
+            for addr in sorted(exits | stops):
+                if self.bp_manager.find_breakpoint(addr & ~1) is not None:
+                    continue
+                bp = self._set_step_range_breakpoint(addr & ~1)
+                if bp is None:
+                    LOG.debug("unable to set breakpoint at %#010x for range step", addr)
+                    return False
+                breakpoints[bp.addr] = bp
+            LOG.debug("range step with %d breakpoints", len(breakpoints))
+
+            dhcsr_run = dhcsr_step & ~CortexM.C_STEP
+            program_counter = self.read_core_register_raw('pc')
+            while True:
+                if program_counter in breakpoints:
+                    # The instruction's destination isn't known, so step it from the host with its
+                    # breakpoint removed.
+                    remove_breakpoint(breakpoints.pop(program_counter))
+                    self.clear_debug_cause_bits()
+                    if self._step_instruction(dhcsr_step, step_timeout, hook_cb) \
+                            or not self._is_in_step_range(start, end):
+                        return True
+                    bp = self._set_step_range_breakpoint(program_counter)
+                    if bp is None:
+                        return True
+                    breakpoints[bp.addr] = bp
+                    program_counter = self.read_core_register_raw('pc')
+                    continue
+
+                self.clear_debug_cause_bits()
+                self.write32(CortexM.DHCSR, dhcsr_run)
+                with timeout.Timeout(step_timeout) as tmo:
+                    while (self.read32(CortexM.DHCSR) & CortexM.C_HALT) == 0:
+                        if (hook_cb is not None) and hook_cb():
+                            self.write32(CortexM.DHCSR, dhcsr_run | CortexM.C_HALT)
+                            return True
+                        if not tmo.check():
+                            LOG.debug("range step timed out; halting")
+                            self.write32(CortexM.DHCSR, dhcsr_run | CortexM.C_HALT)
+                            return True
+
+                # Continue only if the core halted on one of our breakpoints inside the range. The
+                # exit breakpoints are all outside of it.
+                program_counter = self.read_core_register_raw('pc')
+                if (program_counter not in stops) or (program_counter not in breakpoints) \
+                        or (self.read32(CortexM.DFSR) & ~CortexM.DFSR_BKPT) != 0:
+                    return True
+        finally:
+            for bp in breakpoints.values():
+                remove_breakpoint(bp)
+
     def clear_debug_cause_bits(self):
         self.write32(CortexM.DFSR,
                 CortexM.DFSR_EXTERNAL
@@ -1165,7 +1312,18 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
                 LOG.warning("T bit in XPSR is invalid; the vector table may be invalid or corrupt")
 
     def get_state(self):
-        dhcsr = self.read_memory(CortexM.DHCSR)
+        return self.get_state_later()()
+
+    def get_state_later(self) -> Callable[[], Target.State]:
+        """@brief Queue a DHCSR read and return a callable that decodes the core state from it."""
+        dhcsr_cb = self.read_memory(CortexM.DHCSR, 32, now=False)
+
+        def get_state_cb() -> Target.State:
+            return self._state_from_dhcsr(dhcsr_cb())
+
+        return get_state_cb
+
+    def _state_from_dhcsr(self, dhcsr: int) -> Target.State:
         if dhcsr & CortexM.S_RESET_ST:
             # Reset is a special case because the bit is sticky and really means
             # "core was reset since last read of DHCSR". We have to re-read the
@@ -1216,6 +1374,76 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
         self.flush()
         self.session.notify(Target.Event.POST_RUN, self, Target.RunType.RESUME)
 
+    ## Registers saved and restored around call_routine().
+    _ROUTINE_SAVED_REGISTERS = ['r0', 'r1', 'r2', 'r3', 'r4', 'r5', 'r6', 'r7', 'r12', 'sp', 'lr', 'pc',
+            'xpsr']
+
+    def call_routine(self, address: int, args: Sequence[int], routine_timeout: Optional[float] = None) -> int:
+        """@brief Run a routine on the halted core and return its result.
+
+        The routine is entered in Thumb state with up to four arguments in r0-r3, and must stop by
+        executing a BKPT instruction with its result in r0. Interrupts are masked while it runs, and
+        a HardFault halts the core instead of running the program's handler.
+        The core is halted again afterwards with its registers and interrupt mask restored, so the
+        call is invisible to the program being debugged apart from any memory the routine changes.
+        The caller is responsible for loading the routine and for memory it uses. No run events
+        are sent, but the run token changes so cached state is discarded.
+
+        @param self The object.
+        @param address Address of the first instruction of the routine.
+        @param args Sequence of up to four integer arguments.
+        @param routine_timeout Timeout in seconds, or None to wait indefinitely.
+        @return The value of r0 when the routine stops.
+
+        @exception DebugError The core is not halted, or the routine stopped for a reason other than
+            a BKPT instruction.
+        @exception TimeoutError The routine did not stop before the timeout.
+        """
+        assert len(args) <= 4
+        dhcsr = self.read32(CortexM.DHCSR)
+        if (dhcsr & (CortexM.C_DEBUGEN | CortexM.S_HALT)) != (CortexM.C_DEBUGEN | CortexM.S_HALT):
+            raise exceptions.DebugError('cannot call routine: core not halted')
+
+        saved_registers = self.read_core_registers_raw(self._ROUTINE_SAVED_REGISTERS)
+        saved_dfsr = self.read32(CortexM.DFSR)
+        saved_demcr = self.read32(CortexM.DEMCR)
+        self._run_token += 1
+        dhcsr_run = CortexM.DBGKEY | CortexM.C_DEBUGEN | CortexM.C_MASKINTS | (dhcsr & CortexM.C_PMOV)
+        try:
+            self.write_core_registers_raw(['r0', 'r1', 'r2', 'r3'][:len(args)] + ['pc', 'xpsr'],
+                    list(args) + [address & ~1, CortexM.XPSR_THUMB])
+            self.write32(CortexM.DEMCR, saved_demcr | CortexM.DEMCR_VC_HARDERR)
+
+            # C_HALT must be set when changing C_MASKINTS.
+            self.write32(CortexM.DHCSR, dhcsr_run | CortexM.C_HALT)
+            self.write32(CortexM.DHCSR, dhcsr_run)
+
+            with timeout.Timeout(routine_timeout) as tmo:
+                while tmo.check():
+                    if (self.read32(CortexM.DHCSR) & CortexM.S_HALT) != 0:
+                        break
+                else:
+                    self.write32(CortexM.DHCSR, dhcsr_run | CortexM.C_HALT)
+                    raise exceptions.TimeoutError('routine at %#010x did not complete' % address)
+
+            # DFSR may already have had BKPT set from the halt before the call, so check the
+            # instruction the core stopped on instead.
+            program_counter = self.read_core_register_raw('pc')
+            if (self.read16(program_counter) & 0xff00) != 0xbe00:
+                raise exceptions.DebugError('routine at %#010x stopped unexpectedly at %#010x'
+                        % (address, program_counter))
+            return self.read_core_register_raw('r0')
+        finally:
+            self.write32(CortexM.DEMCR, saved_demcr)
+            self.write_core_registers_raw(self._ROUTINE_SAVED_REGISTERS, saved_registers)
+            self.write32(CortexM.DHCSR, CortexM.DBGKEY | CortexM.C_DEBUGEN | CortexM.C_HALT
+                    | (dhcsr & (CortexM.C_MASKINTS | CortexM.C_PMOV)))
+            # Clear the debug events caused by the routine, leaving the original halt reason.
+            new_events = self.read32(CortexM.DFSR) & ~saved_dfsr
+            if new_events:
+                self.write32(CortexM.DFSR, new_events)
+            self.flush()
+
     def find_breakpoint(self, addr):
         return self.bp_manager.find_breakpoint(addr)
 
@@ -1286,6 +1514,15 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
         self.check_reg_list(reg_list)
         return self._base_read_core_registers_raw(reg_list)
 
+    @property
+    def _use_banked_debug_registers(self) -> bool:
+        """@brief Whether to access the core register transfer registers as MEM-AP banked registers.
+
+        Banked accesses are raw AP register transfers. When the probe provides an accelerated memory
+        interface for the AP, as STLink and J-Link do, memory accesses go through it instead.
+        """
+        return self.ap._accelerated_memory_interface is None
+
     def _base_read_core_registers_raw(self, reg_list: List[int]) -> List[int]:
         """@brief Private core register read routine.
 
@@ -1321,26 +1558,42 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
                 singleRegList += (-reg, -reg + 1)
             singleValues = self._base_read_core_registers_raw(singleRegList)
 
-        # Begin all reads and writes
+        # Begin all reads and writes. DHCSR, DCRSR and DCRDR share a 16-byte block, so unless the probe
+        # accelerates memory accesses they are accessed through the MEM-AP banked data registers, and
+        # TAR is written only once. All of the transfers are queued, to be sent to the probe together.
         dhcsr_cb_list = []
         reg_cb_list = []
-        for reg in reg_list:
-            if CortexMCoreRegisterInfo.get(reg).is_cfbp_subregister:
-                reg = CortexMCoreRegisterInfo.get('cfbp').index
-            elif CortexMCoreRegisterInfo.get(reg).is_psr_subregister:
-                reg = CortexMCoreRegisterInfo.get('xpsr').index
-
-            # write id in DCRSR
-            self.write_memory(CortexM.DCRSR, reg)
+        use_banked = self._use_banked_debug_registers
+        self.ap.lock()
+        try:
+            if use_banked:
+                self.ap.set_banked_address(CortexM.DHCSR)
+            for reg in reg_list:
+                if CortexMCoreRegisterInfo.get(reg).is_cfbp_subregister:
+                    reg = CortexMCoreRegisterInfo.get('cfbp').index
+                elif CortexMCoreRegisterInfo.get(reg).is_psr_subregister:
+                    reg = CortexMCoreRegisterInfo.get('xpsr').index
+
+                # write id in DCRSR
+                if use_banked:
+                    self.ap.write_banked(CortexM.DCRSR_BANK, reg)
+                else:
+                    self.write_memory(CortexM.DCRSR, reg)
 
-            # Technically, we need to poll S_REGRDY in DHCSR here before reading DCRDR. But
-            # we're running so slow compared to the target that it's not necessary.
-            # Read it and check that S_REGRDY is set.
+                # Technically, we need to poll S_REGRDY in DHCSR here before reading DCRDR. But
+                # we're running so slow compared to the target that it's not necessary.
+                # Read it and check that S_REGRDY is set.
 
-            dhcsr_cb = self.read32(CortexM.DHCSR, now=False)
-            reg_cb = self.read32(CortexM.DCRDR, now=False)
-            dhcsr_cb_list.append(dhcsr_cb)
-            reg_cb_list.append(reg_cb)
+                if use_banked:
+                    dhcsr_cb = self.ap.read_banked(CortexM.DHCSR_BANK, now=False)
+                    reg_cb = self.ap.read_banked(CortexM.DCRDR_BANK, now=False)
+                else:
+                    dhcsr_cb = self.read32(CortexM.DHCSR, now=False)
+                    reg_cb = self.read32(CortexM.DCRDR, now=False)
+                dhcsr_cb_list.append(dhcsr_cb)
+                reg_cb_list.append(reg_cb)
+        finally:
+            self.ap.unlock()
 
         # Read all results
         reg_vals = []
@@ -1475,35 +1728,49 @@ class CortexM(CoreTarget, CoreSightCoreComponent): # lgtm[py/multiple-calls-to-i
                 # Other register, just copy directly.
                 reg_data_list.append((reg, data))
 
-        # Write out registers
+        # Write out registers, using MEM-AP banked accesses as for reads.
         dhcsr_cb_list = []
-        for reg, data in reg_data_list:
-            if CortexMCoreRegisterInfo.get(reg).is_cfbp_subregister:
-                # Mask in the new special register value so we don't modify the other register
-                # values that share the same DCRSR number.
-                shift = (-reg - 1) * 8
-                mask = 0xffffffff ^ (0xff << shift)
-                data = (cfbpValue & mask) | ((data & 0xff) << shift)
-                cfbpValue = data # update special register for other writes that might be in the list
-                reg = CortexMCoreRegisterInfo.get('cfbp').index
-            elif CortexMCoreRegisterInfo.get(reg).is_psr_subregister:
-                mask = CortexMCoreRegisterInfo.get(reg).psr_mask
-                assert xpsrValue is not None
-                data = (xpsrValue & (0xffffffff ^ mask)) | (data & mask)
-                xpsrValue = data
-                reg = CortexMCoreRegisterInfo.get('xpsr').index
-
-            # write DCRDR
-            self.write_memory(CortexM.DCRDR, data)
-
-            # write id in DCRSR and flag to start write transfer
-            self.write_memory(CortexM.DCRSR, reg | CortexM.DCRSR_REGWnR)
-
-            # Technically, we need to poll S_REGRDY in DHCSR here to ensure the
-            # register write has completed.
-            # Read it and assert that S_REGRDY is set
-            dhcsr_cb = self.read32(CortexM.DHCSR, now=False)
-            dhcsr_cb_list.append(dhcsr_cb)
+        use_banked = self._use_banked_debug_registers
+        self.ap.lock()
+        try:
+            if use_banked:
+                self.ap.set_banked_address(CortexM.DHCSR)
+            for reg, data in reg_data_list:
+                if CortexMCoreRegisterInfo.get(reg).is_cfbp_subregister:
+                    # Mask in the new special register value so we don't modify the other register
+                    # values that share the same DCRSR number.
+                    shift = (-reg - 1) * 8
+                    mask = 0xffffffff ^ (0xff << shift)
+                    data = (cfbpValue & mask) | ((data & 0xff) << shift)
+                    cfbpValue = data # update special register for other writes that might be in the list
+                    reg = CortexMCoreRegisterInfo.get('cfbp').index
+                elif CortexMCoreRegisterInfo.get(reg).is_psr_subregister:
+                    mask = CortexMCoreRegisterInfo.get(reg).psr_mask
+                    assert xpsrValue is not None
+                    data = (xpsrValue & (0xffffffff ^ mask)) | (data & mask)
+                    xpsrValue = data
+                    reg = CortexMCoreRegisterInfo.get('xpsr').index
+
+                if use_banked:
+                    # write DCRDR
+                    self.ap.write_banked(CortexM.DCRDR_BANK, data)
+
+                    # write id in DCRSR and flag to start write transfer
+                    self.ap.write_banked(CortexM.DCRSR_BANK, reg | CortexM.DCRSR_REGWnR)
+                else:
+                    self.write_memory(CortexM.DCRDR, data)
+                    self.write_memory(CortexM.DCRSR, reg | CortexM.DCRSR_REGWnR)
+
+                # Technically, we need to poll S_REGRDY in DHCSR here to ensure the
+                # register write has completed.
+                # Read it and assert that S_REGRDY is set
+                if use_banked:
+                    dhcsr_cb = self.ap.read_banked(CortexM.DHCSR_BANK, now=False)
+                else:
+                    dhcsr_cb = self.read32(CortexM.DHCSR, now=False)
+                dhcsr_cb_list.append(dhcsr_cb)
+        finally:
+            self.ap.unlock()
 
         # Make sure S_REGRDY was set for all register writes.
         fail_list = []
@@ -25,6 +25,7 @@ from typing import (cast, Callable, Dict, List, NamedTuple, Optional, Sequence,
 from typing_extensions import Literal
 
 from ..core import (exceptions, memory_interface)
+from ..core.memory_interface import BytesLike
 from ..core.target import Target
 from ..core.target_delegate import DelegateHavingMixIn
 from ..probe.debug_probe import DebugProbe
@@ -1006,6 +1007,80 @@ class DebugPort(DelegateHavingMixIn):
         else:
             return read_ap_multiple_cb
 
+    def write_ap_multiple_bytes(self, addr: int, data: BytesLike) -> None:
+        """@brief Write one AP register multiple times with little-endian words from a bytes-like object."""
+        assert isinstance(addr, int)
+        num = self.next_access_number
+        did_lock = False
+
+        try:
+            did_lock = self._select_ap(addr)
+            TRACE.debug("write_ap_multiple_bytes:%06d (addr=0x%08x) = (%i bytes)", num, addr, len(data))
+            return self.probe.write_ap_multiple_bytes(addr, data)
+        except exceptions.TargetError as error:
+            self._handle_error(error, num)
+            raise
+        finally:
+            if did_lock:
+                self.unlock()
+
+    @overload
+    def read_ap_multiple_bytes(self, addr: int, count: int = 1) -> BytesLike:
+        ...
+
+    @overload
+    def read_ap_multiple_bytes(self, addr: int, count: int, now: Literal[True] = True) -> BytesLike:
+        ...
+
+    @overload
+    def read_ap_multiple_bytes(self, addr: int, count: int, now: Literal[False]) -> Callable[[], BytesLike]:
+        ...
+
+    @overload
+    def read_ap_multiple_bytes(self, addr: int, count: int, now: bool) -> Union[BytesLike, Callable[[], BytesLike]]:
+        ...
+
+    def read_ap_multiple_bytes(self, addr: int, count: int = 1, now: bool = True) \
+             -> Union[BytesLike, Callable[[], BytesLike]]:
+        """@brief Read one AP register multiple times, returning the words as a bytes-like object.
+
+        The result holds _count_ words in little-endian order.
+        """
+        assert isinstance(addr, int)
+        num = self.next_access_number
+        did_lock = False
+
+        try:
+            did_lock = self._select_ap(addr)
+            TRACE.debug("read_ap_multiple_bytes:%06d (addr=0x%08x, count=%i)", num, addr, count)
+            result_cb = self.probe.read_ap_multiple_bytes(addr, count, now=False)
+        except exceptions.TargetError as error:
+            self._handle_error(error, num)
+            if did_lock:
+                self.unlock()
+            raise
+        except Exception:
+            if did_lock:
+                self.unlock()
+            raise
+
+        # Need to wrap the deferred callback to convert exceptions.
+        def read_ap_multiple_bytes_cb() -> BytesLike:
+            try:
+                return result_cb()
+            except exceptions.TargetError as error:
+                TRACE.debug("read_ap_multiple_bytes:%06d %s(addr=0x%08x) -> error (%s)", num, "" if now else "...", addr, error)
+                self._handle_error(error, num)
+                raise
+            finally:
+                if did_lock:
+                    self.unlock()
+
+        if now:
+            return read_ap_multiple_bytes_cb()
+        else:
+            return read_ap_multiple_bytes_cb
+
     def _handle_error(self, error: Exception, num: int) -> None:
         TRACE.debug("error:%06d %s", num, error)
         # Clear sticky error for fault errors.
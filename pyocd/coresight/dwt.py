@@ -72,6 +72,15 @@ class DWT(CoreSightComponent):
     DWT_CTRL_POSTRESET_SHIFT = 1
     DWT_CTRL_CYCCNTENA_MASK = (1 << 0)
 
+    ## Value read from DWT_PCSR when the PC can't be sampled, for instance while the core is halted.
+    DWT_PCSR_NO_SAMPLE = 0xffffffff
+
+    ## Number of cycles between POSTCNT decrements, indexed by the CYCTAP bit.
+    CYCTAP_DIVIDERS = (64, 1024)
+
+    ## Largest POSTCNT reload value plus one.
+    POSTCNT_RANGE = 16
+
     WATCH_TYPE_TO_FUNCT = {
                             Target.WatchpointType.READ: 5,
                             Target.WatchpointType.WRITE: 6,
@@ -119,6 +128,82 @@ class DWT(CoreSightComponent):
         self.ap.write32(self.address + self.DWT_CTRL, self.DWT_CTRL_CYCCNTENA_MASK)
         self.dwt_configured = True
 
+    def enable_pc_sampling(self, interval):
+        """@brief Enable periodic PC sample packets.
+
+        A PC sample packet is generated each time the POSTCNT counter underflows. POSTCNT is
+        decremented every 64 or 1024 cycles, selected by CYCTAP, and reloaded from POSTPRESET, so
+        the supported intervals are multiples of 64 cycles up to 16384 cycles. The packets are only
+        output if the ITM is enabled and forwards DWT packets.
+
+        @param self
+        @param interval Requested number of processor cycles between samples.
+        @return The number of cycles between samples that was configured, the closest to the
+            requested interval.
+        """
+        cyctap = 0 if (interval <= self.POSTCNT_RANGE * self.CYCTAP_DIVIDERS[0]) else 1
+        divider = self.CYCTAP_DIVIDERS[cyctap]
+        postpreset = max(1, min(self.POSTCNT_RANGE, round(interval / divider))) - 1
+
+        # Make sure trace is enabled.
+        demcr = self.ap.read32(DEMCR)
+        if (demcr & DEMCR_TRCENA) == 0:
+            self.ap.write32(DEMCR, demcr | DEMCR_TRCENA)
+
+        # The counter setup must be written while PC sampling is disabled.
+        ctrl = self.ap.read32(self.address + self.DWT_CTRL)
+        ctrl &= ~(self.DWT_CTRL_PCSAMPLENA_MASK | self.DWT_CTRL_CYCTAP_MASK
+                | self.DWT_CTRL_POSTINIT_MASK | self.DWT_CTRL_POSTRESET_MASK)
+        ctrl |= ((cyctap * self.DWT_CTRL_CYCTAP_MASK)
+                | (postpreset << self.DWT_CTRL_POSTINIT_SHIFT)
+                | (postpreset << self.DWT_CTRL_POSTRESET_SHIFT)
+                | self.DWT_CTRL_CYCCNTENA_MASK)
+        self.ap.write32(self.address + self.DWT_CTRL, ctrl)
+        self.ap.write32(self.address + self.DWT_CTRL, ctrl | self.DWT_CTRL_PCSAMPLENA_MASK)
+        return (postpreset + 1) * divider
+
+    def disable_pc_sampling(self):
+        """@brief Stop generating periodic PC sample packets."""
+        ctrl = self.ap.read32(self.address + self.DWT_CTRL)
+        self.ap.write32(self.address + self.DWT_CTRL, ctrl & ~self.DWT_CTRL_PCSAMPLENA_MASK)
+
+    def read_pc_samples(self, count):
+        """@brief Sample the PC of the running core by reading DWT_PCSR.
+
+        The reads don't halt or otherwise disturb the core. They are all queued before any result
+        is waited for, so the samples are taken as quickly as the probe can make the reads.
+
+        @param self
+        @param count Number of samples to take.
+        @return List of sampled PC values. DWT_PCSR_NO_SAMPLE is returned for samples taken while
+            the core was halted.
+        """
+        # Every result callback must be called, even after an error, to release the lock that
+        # each queued read holds. The first error is raised once they have all been called.
+        results = []
+        try:
+            for _ in range(count):
+                results.append(self.ap.read32(self.address + self.DWT_PCSR, now=False))
+        except Exception:
+            for result in results:
+                try:
+                    result()
+                except Exception:
+                    pass
+            raise
+
+        samples = []
+        first_error = None
+        for result in results:
+            try:
+                samples.append(result())
+            except Exception as error:
+                if first_error is None:
+                    first_error = error
+        if first_error is not None:
+            raise first_error
+        return samples
+
     def find_watchpoint(self, addr, size, type):
         for watch in self.watchpoints:
             if watch.addr == addr and watch.size == size and watch.func == self.WATCH_TYPE_TO_FUNCT[type]:
@@ -85,6 +85,15 @@ class GenericMemAPTarget(Target, CoreSightCoreComponent):
     def read_memory_block32(self, addr, size):
         return self.ap.read_memory_block32(addr, size)
 
+    def write_memory_bytes(self, addr, data):
+        self.ap.write_memory_bytes(addr, data)
+
+    def read_memory_bytes(self, addr, size):
+        return self.ap.read_memory_bytes(addr, size)
+
+    def read_memory_ranges(self, ranges):
+        return self.ap.read_memory_ranges(ranges)
+
     def halt(self):
         pass
 
@@ -0,0 +1,147 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Control flow analysis of Thumb code for range stepping.
+
+To step through an address range without the host stepping each instruction, the core is run
+with breakpoints on every location where execution can leave the range. analyze_step_range()
+decodes the instructions in the range to find those locations.
+"""
+
+from typing import (NamedTuple, Optional, Sequence, Set)
+
+class StepRangeExits(NamedTuple):
+    """@brief Result of analyzing an address range for range stepping."""
+    ## Addresses outside the range that execution reaches directly from inside it. This includes
+    # the address following the last instruction, and the targets of direct branches and calls.
+    exits: Set[int]
+    ## Addresses of instructions inside the range whose destination can't be determined without
+    # executing them, such as indirect branches, loads of the PC, and exception generating
+    # instructions. These must be single stepped.
+    stops: Set[int]
+
+def _sign_extend(value: int, bits: int) -> int:
+    sign = 1 << (bits - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+def _is_32bit(hw1: int) -> bool:
+    return (hw1 >> 11) in (0b11101, 0b11110, 0b11111)
+
+def _decode_16bit(addr: int, hw1: int) -> Optional[Sequence[int]]:
+    """@brief Return the branch targets of a 16-bit instruction.
+    @return Empty list for instructions that don't branch, a list of direct branch targets, or None
+        if the destination can't be determined statically.
+    """
+    if (hw1 & 0xf000) == 0xd000:
+        cond = (hw1 >> 8) & 0xf
+        if cond >= 0xe:
+            # UDF and SVC.
+            return None
+        # B<cond>
+        return [addr + 4 + _sign_extend(hw1 & 0xff, 8) * 2]
+    if (hw1 & 0xf800) == 0xe000:
+        # B
+        return [addr + 4 + _sign_extend(hw1 & 0x7ff, 11) * 2]
+    if (hw1 & 0xf500) == 0xb100:
+        # CBZ, CBNZ
+        return [addr + 4 + ((((hw1 >> 9) & 1) << 6) | (((hw1 >> 3) & 0x1f) << 1))]
+    if (hw1 & 0xff00) == 0x4700:
+        # BX, BLX (register)
+        return None
+    if (hw1 & 0xfc00) == 0x4400 and ((hw1 >> 8) & 3) != 1 and (hw1 & 0x87) == 0x87:
+        # ADD or MOV (register) with the PC as destination.
+        return None
+    if (hw1 & 0xff00) == 0xbd00:
+        # POP including the PC.
+        return None
+    if (hw1 & 0xff00) == 0xbe00:
+        # BKPT
+        return None
+    return []
+
+def _decode_32bit(addr: int, hw1: int, hw2: int) -> Optional[Sequence[int]]:
+    """@brief Return the branch targets of a 32-bit instruction. See _decode_16bit()."""
+    if (hw1 & 0xf800) == 0xf000 and (hw2 & 0x8000):
+        s = (hw1 >> 10) & 1
+        j1 = (hw2 >> 13) & 1
+        j2 = (hw2 >> 11) & 1
+        if (hw2 & 0x5000) == 0x0000:
+            cond = (hw1 >> 6) & 0xf
+            if cond < 0xe:
+                # B<cond>.W
+                offset = (s << 20) | (j2 << 19) | (j1 << 18) | ((hw1 & 0x3f) << 12) | ((hw2 & 0x7ff) << 1)
+                return [addr + 4 + _sign_extend(offset, 21)]
+            if hw1 == 0xf3de and (hw2 & 0xff00) == 0x8f00:
+                # SUBS PC, LR
+                return None
+            if (hw1 & 0xfff0) == 0xf7f0 and (hw2 & 0xf000) == 0xa000:
+                # UDF.W
+                return None
+            # Other miscellaneous control instructions don't branch.
+            return []
+        if (hw2 & 0x5000) == 0x1000 or (hw2 & 0x5000) == 0x5000:
+            # B.W and BL
+            offset = (s << 24) | ((1 - (j1 ^ s)) << 23) | ((1 - (j2 ^ s)) << 22) \
+                    | ((hw1 & 0x3ff) << 12) | ((hw2 & 0x7ff) << 1)
+            return [addr + 4 + _sign_extend(offset, 25)]
+        # BLX (immediate) changes to ARM state, so it's not expected in M-profile code.
+        return None
+    if (hw1 & 0xfe50) == 0xe810 and (hw2 & 0x8000):
+        # LDM or LDMDB including the PC.
+        return None
+    if (hw1 & 0xfff0) == 0xe8d0 and (hw2 & 0xffe0) == 0xf000:
+        # TBB, TBH
+        return None
+    if (hw1 & 0xff70) == 0xf850 and (hw2 & 0xf000) == 0xf000:
+        # LDR with the PC as destination.
+        return None
+    return []
+
+def analyze_step_range(start: int, end: int, code: bytes) -> StepRangeExits:
+    """@brief Find where execution can leave an address range.
+
+    Instructions are decoded linearly from _start_, so the range must begin on an instruction
+    boundary.
+
+    @param start Start address of the range.
+    @param end Address just past the end of the range.
+    @param code Memory contents from _start_, including at least the first halfword past _end_ so
+        that an instruction straddling the end can be decoded.
+    @return A StepRangeExits instance.
+    """
+    exits: Set[int] = set()
+    stops: Set[int] = set()
+    addr = start
+    while addr < end:
+        offset = addr - start
+        hw1 = int.from_bytes(code[offset:offset + 2], 'little')
+        if _is_32bit(hw1):
+            hw2 = int.from_bytes(code[offset + 2:offset + 4], 'little')
+            targets = _decode_32bit(addr, hw1, hw2)
+            size = 4
+        else:
+            targets = _decode_16bit(addr, hw1)
+            size = 2
+
+        if targets is None:
+            stops.add(addr)
+        else:
+            exits.update(target for target in targets if not (start <= target < end))
+        addr += size
+
+    # Falling through past the last instruction.
+    exits.add(addr)
+    return StepRangeExits(exits, stops)
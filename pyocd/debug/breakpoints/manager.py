@@ -288,6 +288,18 @@ class BreakpointManager:
                 data[i] = provider.filter_memory(addr + i, 8, d)
         return data
 
+    def filter_memory_bytes(self, addr: int, data: bytearray) -> bytearray:
+        """@brief Replace breakpoint instructions in a block of memory with the original contents.
+
+        @param self
+        @param addr Start address of _data_.
+        @param data Mutable bytes-like object that is updated in place.
+        @return _data_.
+        """
+        for provider in [p for p in self._providers.values() if p.do_filter_memory]:
+            provider.filter_memory_bytes(addr, data)
+        return data
+
     def filter_memory_aligned_32(self, addr: int, size: int, data: MutableSequence[int]) -> Sequence[int]:
         for provider in [p for p in self._providers.values() if p.do_filter_memory]:
             for i, d in enumerate(data):
@@ -62,6 +62,14 @@ class BreakpointProvider:
     def filter_memory(self, addr: int, size: int, data: int) -> int:
         return data
 
+    def filter_memory_bytes(self, addr: int, data: bytearray) -> None:
+        """@brief Filter a block of memory in place.
+
+        The default implementation passes each byte through filter_memory().
+        """
+        for i, d in enumerate(data):
+            data[i] = self.filter_memory(addr + i, 8, d)
+
     def flush(self) -> None:
         pass
 
@@ -119,5 +119,14 @@ class SoftwareBreakpointProvider(BreakpointProvider):
 
         return data
 
+    def filter_memory_bytes(self, addr: int, data: bytearray) -> None:
+        end = addr + len(data)
+        for bp in self._breakpoints.values():
+            # Restore each byte of the original 16-bit instruction that lies within the block.
+            for offset in range(2):
+                byte_addr = bp.addr + offset
+                if addr <= byte_addr < end:
+                    data[byte_addr - addr] = (bp.original_instr >> (8 * offset)) & 0xff
+
 
 
@@ -15,30 +15,52 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from typing import (List, Optional)
+
 from .context import DebugContext
 from ..cache.memory import MemoryCache
 from ..cache.register import RegisterCache
 
 class CachingDebugContext(DebugContext):
-    """@brief Debug context combining register and memory caches."""
+    """@brief Debug context combining register and memory caches.
+
+    One of these is created for each core by SoCTarget and installed as the core's target context,
+    so the gdbserver, RTOS thread providers, and semihosting all share its caches. Memory writes
+    go through to the target and update this cache, and drop the memory caches of the other
+    cores' contexts, passed as @a peers, since the cores may share the memory written.
+    """
 
-    def __init__(self, parent, enable_memory: bool = True, enable_register: bool = True) -> None:
+    def __init__(self, parent, enable_memory: bool = True, enable_register: bool = True,
+            memory_budget: int = MemoryCache.DEFAULT_BUDGET, read_ahead: bool = False,
+            peers: Optional[List["CachingDebugContext"]] = None) -> None:
         super().__init__(parent)
         self._enable_memory = enable_memory
         self._enable_register = enable_register
         self._regcache = RegisterCache(parent, self.core) if enable_register else parent
-        self._memcache = MemoryCache(parent, self.core) if enable_memory else parent
+        self._memcache = MemoryCache(parent, self.core, budget=memory_budget,
+                read_ahead=read_ahead) if enable_memory else parent
+        self._peers = peers if (peers is not None) else []
+        self._peers.append(self)
+
+    def _invalidate_peers(self):
+        """@brief Drop the other cores' cached memory, which may hold stale copies of a write."""
+        for peer in self._peers:
+            if (peer is not self) and peer._enable_memory:
+                peer._memcache.invalidate()
 
     def write_memory(self, addr, value, transfer_size=32):
+        self._invalidate_peers()
         return self._memcache.write_memory(addr, value, transfer_size)
 
     def read_memory(self, addr, transfer_size=32, now=True):
         return self._memcache.read_memory(addr, transfer_size, now)
 
     def write_memory_block8(self, addr, value):
+        self._invalidate_peers()
         return self._memcache.write_memory_block8(addr, value)
 
     def write_memory_block32(self, addr, data):
+        self._invalidate_peers()
         return self._memcache.write_memory_block32(addr, data)
 
     def read_memory_block8(self, addr, size):
@@ -47,6 +69,20 @@ class CachingDebugContext(DebugContext):
     def read_memory_block32(self, addr, size):
         return self._memcache.read_memory_block32(addr, size)
 
+    def write_memory_bytes(self, addr, data):
+        self._invalidate_peers()
+        return self._memcache.write_memory_bytes(addr, data)
+
+    def read_memory_bytes(self, addr, size):
+        return self._memcache.read_memory_bytes(addr, size)
+
+    def read_memory_ranges(self, ranges):
+        return self._memcache.read_memory_ranges(ranges)
+
+    def prefetch_memory(self, ranges):
+        if self._enable_memory:
+            self._memcache.prefetch(ranges)
+
     def read_core_registers_raw(self, reg_list):
         return self._regcache.read_core_registers_raw(reg_list)
 
@@ -80,6 +80,39 @@ class DebugContext(MemoryInterface):
     def read_memory_block32(self, addr, size):
         return self._parent.read_memory_block32(addr, size)
 
+    def write_memory_bytes(self, addr, data):
+        return self._parent.write_memory_bytes(addr, data)
+
+    def read_memory_bytes(self, addr, size):
+        return self._parent.read_memory_bytes(addr, size)
+
+    def read_memory_ranges(self, ranges):
+        return self._parent.read_memory_ranges(ranges)
+
+    def prefetch_memory(self, ranges):
+        """@brief Hint that memory ranges are likely to be read soon.
+
+        Contexts that cache memory read the ranges they don't hold yet, all together. Other
+        contexts pass the hint to their parent.
+
+        @param self The debug context.
+        @param ranges Sequence of (address, size) pairs.
+        """
+        if isinstance(self._parent, DebugContext):
+            self._parent.prefetch_memory(ranges)
+
+    def invalidate(self):
+        """@brief Discard any cached target state.
+
+        Contexts that cache memory or registers drop their contents. Other contexts pass the call
+        to their parent. This must be called after the target is changed other than through the
+        context, for instance by writing memory directly through a core or AP.
+
+        @param self The debug context.
+        """
+        if isinstance(self._parent, DebugContext):
+            self._parent.invalidate()
+
     def read_core_register(self, reg):
         """@brief Read one core register.
 
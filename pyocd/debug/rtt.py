@@ -21,12 +21,20 @@
 
 from abc import ABC, abstractmethod
 from ctypes import Structure, c_char, c_int32, c_uint32, sizeof
+import hashlib
+import logging
 import struct
-from typing import Optional, Sequence
+from time import monotonic
+from typing import (Dict, Iterable, List, Optional, Sequence, Tuple)
+
+from elftools.common.exceptions import ELFError
 
 from ..core.memory_map import MemoryMap, MemoryRegion, MemoryType
 from ..core.soc_target import SoCTarget
 from ..core import exceptions
+from ..utility.timeout import PollInterval
+
+LOG = logging.getLogger(__name__)
 
 
 class SEGGER_RTT_BUFFER_UP(Structure):
@@ -63,12 +71,101 @@ class SEGGER_RTT_CB(Structure):
     ]
 
 
+def _read_ranges(target: SoCTarget, ranges: Sequence[Tuple[int, int]]) -> List[bytes]:
+    """@brief Read byte ranges of target RAM with one read_memory_ranges() call.
+
+    The ranges are widened to whole words, since only word aligned ranges are queued together
+    with the other reads. The extra bytes are in the same words of RAM, so are safe to read.
+    """
+    aligned = []
+    for addr, size in ranges:
+        start = addr & ~0x3
+        end = (addr + size + 3) & ~0x3
+        aligned.append((start, end - start))
+    results = target.read_memory_ranges(aligned) if aligned else []
+    return [bytes(data[addr - start:addr - start + size])
+            for (addr, size), (start, _), data in zip(ranges, aligned, results)]
+
+
+class RTTChannelStats:
+    """@brief Traffic counters for an RTT up channel.
+
+    An overflow is counted each time a read finds the buffer full. Unless the channel is in
+    blocking mode, the target drops data it can't fit in a full buffer, so some data was probably
+    lost.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        """@brief Zero the counters and restart the throughput measurement."""
+        self.bytes = 0
+        self.reads = 0
+        self.overflows = 0
+        ## Fraction of the buffer that held data at the last read.
+        self.last_fill = 0.0
+        self.max_fill = 0.0
+        self._start = monotonic()
+
+    @property
+    def throughput(self) -> float:
+        """@brief Average bytes per second since the counters were reset."""
+        elapsed = monotonic() - self._start
+        return (self.bytes / elapsed) if (elapsed > 0) else 0.0
+
+    def record(self, length: int, size: int) -> None:
+        """@brief Account for a read of the channel.
+
+        @param self
+        @param length Number of bytes read, which is the number that was available.
+        @param size Size of the channel's buffer. One byte of the buffer is always left unused.
+        """
+        capacity = max(size - 1, 1)
+        self.last_fill = length / capacity
+        self.max_fill = max(self.max_fill, self.last_fill)
+        if length:
+            self.bytes += length
+            self.reads += 1
+            if length >= capacity:
+                self.overflows += 1
+
+
+class RTTPollInterval(PollInterval):
+    """@brief Interval between polls of RTT up channels that adapts to the traffic.
+
+    The interval goes back to the minimum whenever data is read, and backs off while the channels
+    are idle. When a buffer is found at least BURST_FILL full, the next poll is made without
+    waiting, because the target is writing faster than the host is reading.
+    """
+
+    ## Fill level of an up buffer from which the next poll is made immediately.
+    BURST_FILL = 0.5
+
+    def __init__(self, minimum: float = 0.001, maximum: float = 0.05) -> None:
+        super().__init__(minimum, maximum)
+
+    def update(self, length: int, fill: float) -> float:
+        """@brief Return the time to wait before the next poll.
+
+        @param self
+        @param length Number of bytes read by the last poll.
+        @param fill The highest fill level of the buffers polled, from 0 to 1.
+        """
+        if fill >= self.BURST_FILL:
+            self.reset()
+            return 0.0
+        if length:
+            self.reset()
+        return self.next()
+
 
 class RTTUpChannel(ABC):
     """@brief Wrapper for an RTT up channel for target to host data transfer. """
 
     name: Optional[str]
     size: int
+    stats: RTTChannelStats
 
     @abstractmethod
     def read(self) -> bytes:
@@ -139,6 +236,19 @@ class RTTControlBlock(ABC):
         return GenericRTTControlBlock(target, address = address, size = size,
                                       control_block_id = control_block_id)
 
+    def read_up_channels(self, channels: Optional[Iterable[int]] = None) -> Dict[int, bytes]:
+        """@brief Read all available data from several up channels.
+
+        The default implementation reads each channel in turn. Subclasses may read the channels
+        together.
+
+        @param channels Indices of the up channels to read. All up channels are read if None.
+        @return Dict of the data read from each channel, which is empty for a channel with no data.
+        """
+        if channels is None:
+            channels = range(len(self.up_channels))
+        return {i: self.up_channels[i].read() for i in channels}
+
 
 
 
@@ -162,6 +272,7 @@ class GenericRTTUpChannel(RTTUpChannel):
         self._target = target
         self._desc_addr = desc_addr
         self._offsets_addr = self._desc_addr + SEGGER_RTT_BUFFER_UP.WrOff.offset
+        self.stats = RTTChannelStats()
 
         self._read_descriptor()
 
@@ -191,63 +302,76 @@ class GenericRTTUpChannel(RTTUpChannel):
         self.size = descriptor.SizeOfBuffer
 
     @property
-    def bytes_available(self) -> int:
-        """@brief Number of bytes available to be read from up channel. """
-        if (self.size == 0) or (self._buffer_address == 0):
-            # descriptor is not yet populated
-            self._read_descriptor()
-            if (self.size == 0) or (self._buffer_address == 0):
-                # descriptor is still not populated
-                return 0
-
-        # Get offsets
-        write_off, read_off = self.target.read_memory_block32(self._offsets_addr, 2)
-
-        if (write_off >= self.size) or (read_off >= self.size):
-            raise exceptions.RTTError("Invalid up buffer")
-        elif write_off == self.read_off:
-            return 0
-        elif write_off > read_off:
-            return write_off - read_off
-        else:
-            return (self.size - read_off) + write_off
+    def _is_populated(self) -> bool:
+        return (self.size != 0) and (self._buffer_address != 0)
 
-    def read(self) -> bytes:
-        """@brief Read all available data from RTT channel. """
-        if (self.size == 0) or (self._buffer_address == 0):
-            # descriptor is not yet populated
-            self._read_descriptor()
-            if (self.size == 0) or (self._buffer_address == 0):
-                # descriptor is still not populated
-                return b''
+    def _update_descriptor(self, descriptor: Optional[SEGGER_RTT_BUFFER_UP] = None) -> bool:
+        """@brief Read the descriptor again if it was not yet populated.
 
-        # Get offsets
-        write_off, read_off = self._target.read_memory_block32(self._offsets_addr, 2)
+        @param self
+        @param descriptor A copy of the descriptor that was just read, if there is one. The
+            descriptor is only read from the target if this copy shows it has been populated.
+        @return Whether the descriptor is populated.
+        """
+        if not self._is_populated:
+            if (descriptor is None) or ((descriptor.SizeOfBuffer != 0) and (descriptor.pBuffer != 0)):
+                self._read_descriptor()
+        return self._is_populated
 
+    def _get_data_ranges(self, write_off: int, read_off: int) -> List[Tuple[int, int]]:
+        """@brief Return the (address, size) ranges of the buffer that hold unread data."""
         if (write_off >= self.size) or (read_off >= self.size):
             raise exceptions.RTTError("Invalid up buffer")
-        elif write_off == read_off:
-            # empty
-            return b''
-        elif write_off > read_off:
+        elif write_off >= read_off:
             """
             |oooooo|xxxxxxxxxxxx|oooooo|
             0    rdOff        WrOff    SizeOfBuffer
             """
-            data = self._target.read_memory_block8(self._buffer_address + read_off,
-                                                   write_off - read_off)
+            ranges = [(self._buffer_address + read_off, write_off - read_off)]
         else:
             """
             |xxxxxx|oooooooooooo|xxxxxx|
             0    WrOff        RdOff    SizeOfBuffer
             """
-            data = self._target.read_memory_block8(self._buffer_address + read_off,
-                                                   self.size - read_off)
-            data += self._target.read_memory_block8(self._buffer_address, write_off)
+            ranges = [(self._buffer_address + read_off, self.size - read_off),
+                      (self._buffer_address, write_off)]
+        return [r for r in ranges if r[1] > 0]
+
+    def _consume(self, write_off: int, data: bytes) -> None:
+        """@brief Move the read offset past data that was read, and count it in the statistics."""
+        if data:
+            self._target.write32(self._offsets_addr + 4, write_off)
+        self.stats.record(len(data), self.size)
+
+    @property
+    def bytes_available(self) -> int:
+        """@brief Number of bytes available to be read from up channel. """
+        if not self._update_descriptor():
+            # descriptor is still not populated
+            return 0
+
+        # Get offsets
+        write_off, read_off = self._target.read_memory_block32(self._offsets_addr, 2)
+        return sum(size for _, size in self._get_data_ranges(write_off, read_off))
+
+    def read(self) -> bytes:
+        """@brief Read all available data from RTT channel. """
+        if not self._update_descriptor():
+            # descriptor is still not populated
+            return b''
 
-        # Update read offset
-        self._target.write32(self._offsets_addr + 4, write_off)
-        return bytes(data)
+        # Get offsets
+        write_off, read_off = self._target.read_memory_block32(self._offsets_addr, 2)
+
+        # Both parts of wrapped data are read in one transaction.
+        ranges = self._get_data_ranges(write_off, read_off)
+        data = b''.join(_read_ranges(self._target, ranges))
+
+        # Update read offset, and make sure the target sees it before the host waits again.
+        self._consume(write_off, data)
+        if data:
+            self._target.flush()
+        return data
 
 
 class GenericRTTDownChannel(RTTDownChannel):
@@ -388,8 +512,22 @@ class GenericRTTControlBlock(RTTControlBlock):
 
     target: SoCTarget
     _cb_search_address: int
+    _cb_search_address_is_default: bool
     _cb_search_size_bytes: int
-    _control_block_id: Sequence[int]
+    _control_block_id: bytes
+
+    ## Name of the control block variable in the SEGGER RTT sources.
+    CONTROL_BLOCK_SYMBOL = "_SEGGER_RTT"
+
+    ## Number of bytes read at once when searching memory for the control block.
+    SEARCH_CHUNK_SIZE = 0x8000
+
+    ## Number of bytes at the start of boot memory that identify the firmware image.
+    IMAGE_HASH_SIZE = 0x400
+
+    ## Control block addresses found by searching, keyed by the hash of the firmware image, the
+    # search range, and the control block ID.
+    _found_addresses: Dict[Tuple[bytes, int, int, bytes], int] = {}
 
     def __init__(self, target: SoCTarget, address: int = None,
                  size: int = None, control_block_id: bytes = b'SEGGER RTT'):
@@ -406,6 +544,7 @@ class GenericRTTControlBlock(RTTControlBlock):
         self.up_channels = list()
         self.down_channels = list()
 
+        self._cb_search_address_is_default = address is None
         if address is None:
             memory_map: MemoryMap = self.target.get_memory_map()
             ram_region: MemoryRegion = memory_map.get_default_region_of_type(MemoryType.RAM)
@@ -422,39 +561,157 @@ class GenericRTTControlBlock(RTTControlBlock):
             self._cb_search_size_bytes = 0
         else:
             self._cb_search_size_bytes = size
-        self._control_block_id = control_block_id
+        self._control_block_id = bytes(control_block_id)
+
+    def _has_control_block_id(self, addr: int) -> bool:
+        """@brief Check whether the control block ID is present at an address."""
+        id_len = len(self._control_block_id)
+        try:
+            return bytes(self.target.read_memory_bytes(addr, id_len)) == self._control_block_id
+        except exceptions.TransferError:
+            return False
+
+    def _find_control_block_symbol(self) -> Optional[int]:
+        """@brief Look up the control block in the ELF, if the target has one."""
+        elf = getattr(self.target, 'elf', None)
+        if elf is None:
+            return None
+        try:
+            symbol = elf.symbol_decoder.get_symbol_for_name(self.CONTROL_BLOCK_SYMBOL)
+        # An ELF without a symbol table raises AttributeError when the symbol decoder is created.
+        except (AttributeError, ELFError) as err:
+            LOG.debug("RTT control block symbol lookup failed: %s", err)
+            return None
+        if symbol is None:
+            return None
+        if not self._has_control_block_id(symbol.address):
+            # The firmware may not have initialised RTT yet.
+            LOG.debug("%s at %#010x does not hold the control block ID", self.CONTROL_BLOCK_SYMBOL,
+                    symbol.address)
+            return None
+        return symbol.address
+
+    def _get_image_hash(self) -> Optional[bytes]:
+        """@brief Hash the start of the boot memory, which includes the vector table.
+
+        The hash is only used to find a previous search result, which is verified before use, so
+        it doesn't matter that it doesn't cover the whole firmware image.
+        """
+        boot_memory = self.target.get_memory_map().get_boot_memory()
+        if boot_memory is None:
+            return None
+        try:
+            data = self.target.read_memory_bytes(boot_memory.start,
+                    min(self.IMAGE_HASH_SIZE, boot_memory.length))
+        except exceptions.TransferError:
+            return None
+        return hashlib.sha1(bytes(data)).digest()
+
+    def _search_for_control_block(self) -> Optional[int]:
+        """@brief Search the memory range for the control block ID.
+
+        Memory is read in large blocks that overlap by the length of the ID less one byte, so an ID
+        spanning two blocks is still found. Only word aligned matches are accepted, since the
+        control block is a structure of words.
+        """
+        control_block_id = self._control_block_id
+        overlap = len(control_block_id) - 1
+        addr = self._cb_search_address & ~0x3
+        end = self._cb_search_address + max(self._cb_search_size_bytes, len(control_block_id))
+        tail = b''
+
+        while addr < end:
+            read_size = min(self.SEARCH_CHUNK_SIZE, end - addr)
+            try:
+                data = tail + bytes(self.target.read_memory_bytes(addr, read_size))
+            except exceptions.TransferFaultError as err:
+                LOG.debug("skipping RTT control block search of [%#010x:%#010x]: %s", addr,
+                        addr + read_size, err)
+                tail = b''
+                addr += read_size
+                continue
+
+            base = addr - len(tail)
+            offset = data.find(control_block_id)
+            while offset != -1:
+                if (base + offset) % 4 == 0:
+                    return base + offset
+                offset = data.find(control_block_id, offset + 1)
+
+            tail = data[len(data) - overlap:] if overlap else b''
+            addr += read_size
+
+        return None
 
     def _find_control_block(self) -> Optional[int]:
-        addr: int = self._cb_search_address & ~0x3
-        search_size: int  = self._cb_search_size_bytes
-        if search_size < len(self._control_block_id):
-            search_size = len(self._control_block_id)
+        """@brief Find the control block address.
 
-        id_len = len(self._control_block_id)
-        offset: int = 0
-
-        while search_size:
-            read_size = min(search_size, 32)
-            data = self.target.read_memory_block8(addr, read_size)
-
-            if not data:
-                break
-
-            for byte in data:
-                if byte == self._control_block_id[offset]:
-                    offset += 1
-                    if offset == id_len:
-                        break
-                else:
-                    num_skip_words = (offset + 1)
-                    addr += (num_skip_words * 1)
-                    search_size -= num_skip_words
-                    offset = 0
-
-            if offset == id_len:
-                break
-
-        return addr if offset == id_len else None
+        If no search address was given, the control block symbol in the ELF is used first. Then
+        the address found by an earlier search of the same firmware image is tried, and only if
+        that fails is memory searched.
+        """
+        if self._cb_search_address_is_default:
+            addr = self._find_control_block_symbol()
+            if addr is not None:
+                return addr
+
+        image_hash = self._get_image_hash()
+        key = None
+        if image_hash is not None:
+            key = (image_hash, self._cb_search_address, self._cb_search_size_bytes,
+                    self._control_block_id)
+            addr = self._found_addresses.get(key)
+            if (addr is not None) and self._has_control_block_id(addr):
+                return addr
+
+        addr = self._search_for_control_block()
+        if (addr is not None) and (key is not None):
+            self._found_addresses[key] = addr
+        return addr
+
+    def read_up_channels(self, channels: Optional[Iterable[int]] = None) -> Dict[int, bytes]:
+        """@brief Read all available data from several up channels together.
+
+        The descriptors of the channels, which hold the offsets, are read with one block read of
+        the up buffer array. Then the data of every channel is read with one read_memory_ranges()
+        call, which queues all of the reads in one probe transaction. So a poll takes the same
+        number of round trips no matter how many channels are read.
+
+        @param channels Indices of the up channels to read. All up channels are read if None.
+        @return Dict of the data read from each channel, which is empty for a channel with no data.
+        """
+        indices = sorted(set(range(len(self.up_channels)) if channels is None else channels))
+        if not indices:
+            return {}
+        up_channels: List[GenericRTTUpChannel] = [self.up_channels[i] for i in indices]
+
+        # Read the descriptors from the first to the last channel in one block.
+        desc_words = sizeof(SEGGER_RTT_BUFFER_UP) // 4
+        first = indices[0]
+        words = self.target.read_memory_block32(up_channels[0]._desc_addr,
+                (indices[-1] - first + 1) * desc_words)
+
+        ranges: List[Tuple[int, int]] = []
+        reads: List[Tuple[int, GenericRTTUpChannel, int, int]] = []
+        for i, chan in zip(indices, up_channels):
+            offset = (i - first) * desc_words
+            descriptor = SEGGER_RTT_BUFFER_UP(*words[offset:offset + desc_words])
+            if not chan._update_descriptor(descriptor):
+                continue
+            chan_ranges = chan._get_data_ranges(descriptor.WrOff, descriptor.RdOff)
+            reads.append((i, chan, descriptor.WrOff, len(chan_ranges)))
+            ranges.extend(chan_ranges)
+
+        results = iter(_read_ranges(self.target, ranges))
+        data: Dict[int, bytes] = {i: b'' for i in indices}
+        for i, chan, write_off, range_count in reads:
+            data[i] = b''.join(next(results) for _ in range(range_count))
+            chan._consume(write_off, data[i])
+
+        # Send the read offset updates now, so the target has the space back while the host waits.
+        if ranges:
+            self.target.flush()
+        return data
 
     def start(self):
         """@brief Find the RTT control block on the target.
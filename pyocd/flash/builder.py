@@ -61,6 +61,22 @@ class ProgrammingInfo:
     erase_sector_count: int = 0
     skipped_byte_count: int = 0
     skipped_page_count: int = 0
+    transferred_byte_count: int = 0         # Bytes of page data written to target RAM, after compression
+    compressed: bool = False                # Whether page data was transferred compressed
+
+    @property
+    def compression_ratio(self) -> float:
+        """@brief Ratio of programmed bytes to bytes transferred to the target."""
+        if self.transferred_byte_count == 0:
+            return 1.0
+        return self.program_byte_count / self.transferred_byte_count
+
+    @property
+    def throughput(self) -> float:
+        """@brief Effective programming throughput in bytes per second."""
+        if self.program_time == 0:
+            return 0.0
+        return self.program_byte_count / self.program_time
 
 class MemoryBuilder(abc.ABC):
     """@brief Abstract class for memory builders."""
@@ -146,7 +162,7 @@ class _FlashPage:
         self.erased: Optional[bool] = None # Whether the data all matches the erased value.
         self.same: Optional[bool] = None
         self.crc: int = 0
-        self.cached_estimate_data: Optional[List[int]] = None
+        self.cached_estimate_data: Optional[bytearray] = None
 
     def get_program_weight(self):
         """@brief Get time to program a page including the data transfer."""
@@ -202,6 +218,7 @@ class FlashBuilder(MemoryBuilder):
         self.page_list: List[_FlashPage] = []
         self.perf = ProgrammingInfo()
         self.enable_double_buffering = False
+        self.enable_compressed_transfer = False
         self.log_performance = True
         self._buffered_data_size = 0
         self.program_byte_count = 0
@@ -211,6 +228,8 @@ class FlashBuilder(MemoryBuilder):
         self.sector_erase_count = 0 # Number of pages to program using sector erase method.
         self.sector_erase_weight = 0 # Erase/program weight using sector erase method.
         self.algo_inited_for_read = False
+        self._use_compression = False
+        self._transferred_byte_count = 0
 
     @property
     def region(self) -> MemoryRegion:
@@ -219,6 +238,14 @@ class FlashBuilder(MemoryBuilder):
     def enable_double_buffer(self, enable):
         self.enable_double_buffering = enable
 
+    def enable_compression(self, enable):
+        """@brief Control whether page data is compressed before being transferred to the target.
+
+        Compression requires a flash algo with at least two page buffers. When it is used, pages
+        are programmed single buffered.
+        """
+        self.enable_compressed_transfer = enable
+
     def add_data(self, addr, data):
         """@brief Add a block of data to be programmed.
 
@@ -522,14 +549,21 @@ class FlashBuilder(MemoryBuilder):
             LOG.debug("Chip erase weight %f, sector erase weight %f" % (chip_erase_program_time, page_program_time))
             chip_erase = chip_erase_program_time < page_program_time
 
+        self._transferred_byte_count = 0
+        self._use_compression = self.enable_compressed_transfer and self.flash.is_compression_supported
+        if self.enable_compressed_transfer and not self._use_compression:
+            LOG.debug("Flash algo does not support compressed programming")
+        use_double_buffer = self.flash.is_double_buffering_supported and self.enable_double_buffering \
+                and not self._use_compression
+
         if chip_erase:
-            if self.flash.is_double_buffering_supported and self.enable_double_buffering:
+            if use_double_buffer:
                 LOG.debug("Using double buffer chip erase program")
                 flash_operation = self._chip_erase_program_double_buffer(progress_cb)
             else:
                 flash_operation = self._chip_erase_program(progress_cb)
         else:
-            if self.flash.is_double_buffering_supported and self.enable_double_buffering:
+            if use_double_buffer:
                 LOG.debug("Using double buffer sector erase program")
                 flash_operation = self._sector_erase_program_double_buffer(progress_cb)
             else:
@@ -570,6 +604,8 @@ class FlashBuilder(MemoryBuilder):
         self.perf.erase_sector_count = erase_sector_count
         self.perf.skipped_byte_count = skipped_byte_count
         self.perf.skipped_page_count = skipped_page_count
+        self.perf.transferred_byte_count = self._transferred_byte_count
+        self.perf.compressed = self._use_compression
 
         if self.log_performance:
             if chip_erase:
@@ -583,6 +619,10 @@ class FlashBuilder(MemoryBuilder):
                     actual_program_byte_count, get_page_count(actual_program_page_count),
                     skipped_byte_count, get_page_count(skipped_page_count),
                     ((self.program_byte_count/1024) / self.perf.program_time))
+            if self._use_compression:
+                LOG.info("Transferred %d bytes compressed (ratio %.02f), effective %.02f kB/s",
+                    self.perf.transferred_byte_count, self.perf.compression_ratio,
+                    self.perf.throughput / 1024)
 
         # Send notification that we're done programming flash.
         self.flash.target.session.notify(Target.Event.POST_FLASH_PROGRAM, self)
@@ -633,13 +673,13 @@ class FlashBuilder(MemoryBuilder):
             # Analyze pages that haven't been analyzed yet
             if page.same is None:
                 size = min(PAGE_ESTIMATE_SIZE, len(page.data))
-                data = self.flash.target.read_memory_block8(page.addr, size)
+                data = self.flash.target.read_memory_bytes(page.addr, size)
                 page_same = same(data, page.data[0:size])
                 if page_same is False:
                     page.same = False
                 else:
                     # Save the data read for estimation so we don't need to read it again.
-                    page.cached_estimate_data = data
+                    page.cached_estimate_data = bytearray(data)
 
     def _analyze_pages_with_crc32(self, assume_estimate_correct=False):
         """@brief Estimate how many pages are the same using a CRC32 analyzer.
@@ -744,13 +784,21 @@ class FlashBuilder(MemoryBuilder):
         self.flash.init(self.flash.Operation.PROGRAM)
         for page in self.page_list:
             if not page.erased:
-                self.flash.program_page(page.addr, page.data)
+                self._program_page(page)
                 progress += page.get_program_weight()
                 progress_cb(float(progress) / float(self.chip_erase_weight))
         self.flash.uninit()
         progress_cb(1.0)
         return FlashBuilder.FLASH_CHIP_ERASE
 
+    def _program_page(self, page):
+        """@brief Program a single page, compressing the data if enabled."""
+        if self._use_compression:
+            self._transferred_byte_count += self.flash.program_page_compressed(page.addr, page.data)
+        else:
+            self.flash.program_page(page.addr, page.data)
+            self._transferred_byte_count += len(page.data)
+
     def _next_unerased_page(self, i):
         if i >= len(self.page_list):
             return None, i
@@ -785,6 +833,7 @@ class FlashBuilder(MemoryBuilder):
 
         # Load first page buffer
         self.flash.load_page_buffer(current_buf, page.addr, page.data)
+        self._transferred_byte_count += len(page.data)
 
         self.flash.init(self.flash.Operation.PROGRAM)
         while page is not None:
@@ -797,6 +846,7 @@ class FlashBuilder(MemoryBuilder):
             page, i = self._next_unerased_page(i)
             if page is not None:
                 self.flash.load_page_buffer(next_buf, page.addr, page.data)
+                self._transferred_byte_count += len(page.data)
 
             # Wait for the program to complete.
             result = self.flash.wait_for_completion(timeout=program_timeout)
@@ -850,7 +900,7 @@ class FlashBuilder(MemoryBuilder):
                     progress += page.get_program_weight()
 
                     self.flash.init(self.flash.Operation.PROGRAM)
-                    self.flash.program_page(page.addr, page.data)
+                    self._program_page(page)
                     self.flash.uninit()
 
                     actual_sector_erase_count += 1
@@ -886,10 +936,10 @@ class FlashBuilder(MemoryBuilder):
                     data = page.cached_estimate_data
                     offset = len(data)
                 else:
-                    data = []
+                    data = bytearray()
                     offset = 0
                 assert len(page.data) == page.size, "page data size (%d) != page size (%d)" % (len(page.data), page.size)
-                data.extend(self.flash.target.read_memory_block8(page.addr + offset,
+                data.extend(self.flash.target.read_memory_bytes(page.addr + offset,
                                                                     page.size - offset))
                 page.same = same(page.data, data)
                 page.cached_estimate_data = None # This data isn't needed anymore.
@@ -958,6 +1008,7 @@ class FlashBuilder(MemoryBuilder):
 
             # Load first page buffer
             self.flash.load_page_buffer(current_buf, page.addr, page.data)
+            self._transferred_byte_count += len(page.data)
 
             while page is not None:
                 assert page.same is not None
@@ -975,6 +1026,7 @@ class FlashBuilder(MemoryBuilder):
                 page, i = self._next_nonsame_page(i)
                 if page is not None:
                     self.flash.load_page_buffer(next_buf, page.addr, page.data)
+                    self._transferred_byte_count += len(page.data)
 
                 # Wait for the program to complete.
                 result = self.flash.wait_for_completion(timeout=program_timeout)
@@ -0,0 +1,131 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Compression of flash pages for the on-target decompressor.
+
+The format is a simple byte oriented LZ77 variant that can be expanded by a few dozen Thumb
+instructions, without any tables or working memory on the target. The stream is a sequence of
+tokens:
+
+- `0x00-0x7f`: literal run. (token + 1) bytes of data follow.
+- `0x80-0xff`: match. (token - 0x80 + 3) bytes are copied from an earlier position in the output,
+    given by the following 16-bit little-endian distance back from the current position.
+
+Matches may overlap the bytes they produce, which encodes runs such as erased flash compactly.
+"""
+
+from typing import (Dict, Sequence)
+
+## @brief Thumb code that decompresses one page into a page buffer and calls ProgramPage().
+#
+# Built from src/decompressor/decompressor.S. The code is position independent and must be
+# word aligned.
+#
+# Arguments are r0 = flash address, r1 = compressed block (a 32-bit length followed by the
+# stream), r2 = page buffer, r3 = ProgramPage() entry point. It tail calls ProgramPage() with
+# r0 = flash address, r1 = decompressed size, and r2 = page buffer, so it returns to the caller's
+# LR with ProgramPage()'s result in r0.
+DECOMPRESSOR_CODE = (
+    0x680cb4fd, 0x18643104, 0xd21942a1, 0x3101780d, 0xd2072d80, 0x780e3501, 0x70163101, 0x3d013201,
+    0xe7f1d1f9, 0x780e3d7d, 0x3102784f, 0x433e023f, 0x78371b96, 0x70173601, 0x3d013201, 0xe7e3d1f9,
+    0x1a52bc0b, 0x404a4051, 0xbcf04051, 0x00004718,
+    )
+
+MIN_MATCH = 3
+MAX_MATCH = 0x7f + MIN_MATCH
+MAX_LITERAL_RUN = 0x80
+MAX_DISTANCE = 0xffff
+
+def compress(data: Sequence[int]) -> bytes:
+    """@brief Compress data using a greedy match search.
+    @param data Bytes or a list of byte values.
+    @return The compressed stream.
+    """
+    data = bytes(data)
+    length = len(data)
+    output = bytearray()
+    # Last position at which each 3-byte sequence was seen.
+    last_seen: Dict[bytes, int] = {}
+    literal_start = 0
+    pos = 0
+
+    def flush_literals(end: int) -> None:
+        for start in range(literal_start, end, MAX_LITERAL_RUN):
+            run = data[start:min(start + MAX_LITERAL_RUN, end)]
+            output.append(len(run) - 1)
+            output.extend(run)
+
+    while pos + MIN_MATCH <= length:
+        key = data[pos:pos + MIN_MATCH]
+        candidate = last_seen.get(key)
+        last_seen[key] = pos
+
+        # A match one byte back covers runs of a repeated value that may not have been indexed.
+        if (candidate is None or pos - candidate > MAX_DISTANCE) and pos > 0 \
+                and data[pos - 1] == data[pos] == data[pos + 1] == data[pos + 2]:
+            candidate = pos - 1
+        if candidate is None or pos - candidate > MAX_DISTANCE:
+            pos += 1
+            continue
+
+        match_length = MIN_MATCH
+        limit = min(MAX_MATCH, length - pos)
+        while match_length < limit and data[candidate + match_length] == data[pos + match_length]:
+            match_length += 1
+
+        flush_literals(pos)
+        distance = pos - candidate
+        output.append(0x80 | (match_length - MIN_MATCH))
+        output.append(distance & 0xff)
+        output.append(distance >> 8)
+
+        # Index the positions covered by the match, so later data can refer to them.
+        for skipped in range(pos + 1, min(pos + match_length, length - MIN_MATCH + 1)):
+            last_seen[data[skipped:skipped + MIN_MATCH]] = skipped
+        pos += match_length
+        literal_start = pos
+
+    flush_literals(length)
+    return bytes(output)
+
+def decompress(stream: Sequence[int]) -> bytes:
+    """@brief Reference decompressor, matching the behaviour of @ref DECOMPRESSOR_CODE.
+    @exception ValueError The stream is truncated or a match refers to data before the start.
+    """
+    stream = bytes(stream)
+    output = bytearray()
+    pos = 0
+    while pos < len(stream):
+        token = stream[pos]
+        pos += 1
+        if token < 0x80:
+            run = stream[pos:pos + token + 1]
+            if len(run) != token + 1:
+                raise ValueError("truncated literal run at offset %d" % (pos - 1))
+            output.extend(run)
+            pos += len(run)
+        else:
+            if pos + 2 > len(stream):
+                raise ValueError("truncated match at offset %d" % (pos - 1))
+            distance = stream[pos] | (stream[pos + 1] << 8)
+            pos += 2
+            source = len(output) - distance
+            if distance == 0 or source < 0:
+                raise ValueError("invalid match distance %d at offset %d" % (distance, pos - 3))
+            # Copy byte by byte, since the match may overlap the data it produces.
+            for i in range((token & 0x7f) + MIN_MATCH):
+                output.append(output[source + i])
+    return bytes(output)
@@ -27,6 +27,7 @@ from ..core.exceptions import (FlashFailure, FlashEraseFailure, FlashProgramFail
 from ..utility.mask import (align_down, msb)
 from ..utility.timeout import Timeout
 from .builder import FlashBuilder
+from .compressor import (compress, DECOMPRESSOR_CODE)
 
 LOG = logging.getLogger(__name__)
 TRACE = LOG.getChild("trace")
@@ -100,7 +101,8 @@ class Flash:
     - `begin_data`: Base address of the page buffer. Used if `page_buffers` is not provided.
     - `page_buffers`: An optional list of base addresses for page buffers. The buffers must be at
         least as large as the region's page_size attribute. If at least 2 buffers are included in
-        the list, then double buffered programming will be enabled.
+        the list, then double buffered programming will be enabled. Compressed programming also
+        requires at least 2 buffers, as the second one holds the decompressor and compressed data.
     - `begin_stack`: Initial value of the stack pointer when calling any flash algo API.
     - `static_base`: Initial value of the R9 register for calling flash algo entry points, which
         determines where the position-independant data resides.
@@ -135,6 +137,7 @@ class Flash:
         self._region = None
         self._did_prepare_target = False
         self._active_operation = None
+        self._is_decompressor_loaded = False
         if flash_algo is not None:
             self.is_valid = True
             self.use_analyzer = flash_algo['analyzer_supported']
@@ -190,6 +193,10 @@ class Flash:
     def is_double_buffering_supported(self):
         return self.double_buffer_supported
 
+    @property
+    def is_compression_supported(self):
+        return self.double_buffer_supported
+
     @property
     def region(self):
         return self._region
@@ -241,6 +248,7 @@ class Flash:
 
             # Load flash algo code into target RAM.
             self.target.write_memory_block32(self.flash_algo['load_address'], self.flash_algo['instructions'])
+            self._is_decompressor_loaded = False
 
             # Write stack canary if we know the expected end of stack address.
             if self.end_stack is not None:
@@ -274,6 +282,7 @@ class Flash:
         self.uninit()
         self.restore_target()
         self._did_prepare_target = False
+        self._is_decompressor_loaded = False
 
     def uninit(self):
         """@brief Uninitialize the flash algo.
@@ -433,6 +442,58 @@ class Flash:
 
         # transfer the buffer to device RAM
         self.target.write_memory_block8(self.page_buffers[buffer_number], bytes)
+        if buffer_number == 1:
+            self._is_decompressor_loaded = False
+
+    def program_page_compressed(self, address, bytes):
+        """@brief Flash one or more pages, transferring the data compressed.
+
+        The data is compressed on the host and written to the second page buffer following the
+        decompressor code. The decompressor expands it into the first page buffer and calls the
+        algo's ProgramPage() function. If the data does not compress to a smaller size that fits
+        in the buffer, the page is programmed with program_page() instead.
+
+        @return The number of bytes written to target RAM, including the decompressor code if it
+            had to be loaded.
+        @exception FlashProgramFailure
+        """
+        assert self._active_operation == self.Operation.PROGRAM
+        assert self.is_compression_supported
+
+        # prevent security settings from locking the device
+        bytes = self.override_security_bits(address, bytes)
+
+        stream = compress(bytes)
+        code_size = len(DECOMPRESSOR_CODE) * 4
+        block_address = self.page_buffers[1] + code_size
+        block = len(stream).to_bytes(4, 'little') + stream
+        page_info = self.get_page_info(address)
+        assert page_info
+        if (len(block) >= len(bytes)) or (len(block) > page_info.size - code_size):
+            self.program_page(address, bytes)
+            return len(bytes)
+
+        transfer_count = len(block)
+        if not self._is_decompressor_loaded:
+            self.target.write_memory_block32(self.page_buffers[1], DECOMPRESSOR_CODE)
+            self._is_decompressor_loaded = True
+            transfer_count += code_size
+        self.target.write_memory_block8(block_address, block)
+
+        # update core register to execute the decompressor, which calls the program_page subroutine
+        TRACE.debug("call program_page_compressed(addr=%x, len=%x, compressed=%x, data=%x)",
+                address, len(bytes), len(stream), self.page_buffers[0])
+        result = self._call_function_and_wait(self.page_buffers[1] | 1, address, block_address,
+                self.page_buffers[0], self.flash_algo['pc_program_page'],
+                timeout=self.target.session.options.get('flash.timeout.program'))
+
+        # check the return code
+        TRACE.debug("program_page_compressed result = %d", result)
+        if result == self.TIMEOUT_ERROR:
+            raise FlashProgramFailure('flash program page timed out')
+        elif result != 0:
+            raise FlashProgramFailure('flash program page failure', address=address, result_code=result)
+        return transfer_count
 
     def program_phrase(self, address, bytes):
         """@brief Flash a portion of a page.
@@ -18,9 +18,11 @@
 from __future__ import annotations
 
 import logging
-from dataclasses import dataclass
+import queue
+import threading
+from dataclasses import (dataclass, field)
 from time import time
-from typing import (TYPE_CHECKING, Any, Callable, Dict, List, Optional, Union, cast)
+from typing import (TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union, cast)
 
 from ..core import exceptions
 from ..core.memory_map import RamRegion
@@ -243,6 +245,7 @@ class MemoryLoader:
                         raise exceptions.TargetSupportError(f"flash memory region at address {address:#010x} has no flash instance")
                     region_builder = region.flash.get_flash_builder()
                     region_builder.log_performance = False
+                    region_builder.enable_compression(self._session.options.get('flash.compress'))
                 elif region.is_writable:
                     # Casting to a RamRegion is technically not quite right, since we're only checking
                     # that the region is writable
@@ -281,6 +284,18 @@ class MemoryLoader:
 
         After calling this method, the loader instance can be reused to program more data.
         """
+        perfList = self._program_builders(self._chip_erase)
+
+        # Report programming statistics.
+        self._log_performance(perfList)
+
+        # Clear state to allow reuse.
+        self._reset_state()
+
+    def _program_builders(self, chip_erase: Optional[str]) -> List[ProgrammingInfo]:
+        """@brief Program the data collected by each builder.
+        @return List of ProgrammingInfo objects, one per builder.
+        """
         didChipErase = False
         perfList = []
 
@@ -290,7 +305,7 @@ class MemoryLoader:
             self._current_progress_fraction = builder.buffered_data_size / self._total_data_size
 
             # Program the data.
-            chipErase = self._chip_erase if not didChipErase else "sector"
+            chipErase = chip_erase if not didChipErase else "sector"
             perf = builder.program(chip_erase=chipErase,
                                     progress_cb=self._progress_cb,
                                     smart_flash=self._smart_flash,
@@ -302,11 +317,7 @@ class MemoryLoader:
 
             self._progress_offset += self._current_progress_fraction
 
-        # Report programming statistics.
-        self._log_performance(perfList)
-
-        # Clear state to allow reuse.
-        self._reset_state()
+        return perfList
 
     def _log_performance(self, perf_list):
         """@brief Log a report of programming performance numbers."""
@@ -339,6 +350,14 @@ class MemoryLoader:
                 skipped_byte_count, get_page_count(skipped_page_count),
                 kbps)
 
+        compressed_perf_list = [perf for perf in perf_list if perf.compressed]
+        if compressed_perf_list:
+            compressed_byte_count = sum(perf.program_byte_count for perf in compressed_perf_list)
+            transferred_byte_count = sum(perf.transferred_byte_count for perf in compressed_perf_list)
+            LOG.info("Transferred %d bytes compressed from %d bytes (ratio %.02f)",
+                transferred_byte_count, compressed_byte_count,
+                (compressed_byte_count / transferred_byte_count) if transferred_byte_count else 1.0)
+
     def _progress_cb(self, amount):
         if self._progress is not None:
             self._progress((amount * self._current_progress_fraction) + self._progress_offset)
@@ -360,3 +379,208 @@ class MemoryLoader:
 
 # Define deprecated class name.
 FlashLoader = MemoryLoader
+
+@dataclass
+class _StreamingSector:
+    """@brief Data received for one flash sector by StreamingMemoryLoader."""
+    start: int
+    end: int
+    chunks: List[DataChunk] = field(default_factory=list)
+
+    @property
+    def data_size(self) -> int:
+        return sum(len(chunk.data) for chunk in self.chunks)
+
+class StreamingMemoryLoader(MemoryLoader):
+    """@brief Memory loader that programs flash while data is still being added.
+
+    This loader is meant for data that arrives over time in increasing address order, such as the
+    vFlashWrite packets gdb sends for a load. Data is grouped by flash sector. Once data is added
+    beyond a sector, the sector is complete and is passed to a worker thread that programs it,
+    so erasing and programming overlap with receiving the rest of the data. Sectors that complete
+    while the worker is busy are programmed together in the next batch. Each batch is programmed
+    by a MemoryLoader with the usual FlashBuilder analysis, including smart flash page comparison.
+
+    If data is added to a sector that has already been passed to the worker, the sector is
+    programmed again with all of its data, so out of order data is still programmed correctly.
+
+    The worker uses the probe while add_data() returns to the caller, so the caller must not
+    access the target until commit() returns.
+    """
+
+    def __init__(self, session: "Session", progress: Optional[ProgressCallback] = None, **kwargs: Any):
+        """@brief Constructor.
+
+        The parameters are the same as for MemoryLoader.
+        """
+        super().__init__(session, progress, **kwargs)
+        self._open_sectors: Dict[int, _StreamingSector] = {}
+        self._queued_sectors: Dict[int, _StreamingSector] = {}
+        self._queue: "queue.Queue[Optional[List[_StreamingSector]]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._error: Optional[Exception] = None
+        self._perf_list: List[ProgrammingInfo] = []
+        self._erase_size = 0
+        self._programmed_size = 0
+        self._did_chip_erase = False
+
+    def add_erase_range(self, address: int, length: int) -> None:
+        """@brief Record a range that will be written.
+
+        The total size of the ranges is only used to report progress before all data is added.
+        """
+        self._erase_size += length
+
+    def add_data(self, address, data):
+        """@brief Add a chunk of data to be programmed.
+
+        Sectors completed by this data are passed to the worker thread.
+
+        @exception Exception An error raised by the worker while programming earlier data is
+            raised here. The worker is stopped and the loader can't be used further.
+        """
+        self._check_error()
+
+        first_sector_start = self._get_sector_range(address)[0]
+        data = bytes(data)
+        while len(data):
+            start, end = self._get_sector_range(address)
+            length = min(len(data), end - address)
+            sector = self._open_sectors.get(start)
+            if sector is None:
+                # Reopen the sector if it was already queued, so it's programmed again with all of
+                # its data.
+                sector = self._queued_sectors.pop(start, None) or _StreamingSector(start, end)
+                self._open_sectors[start] = sector
+            sector.chunks.append(DataChunk(address, data[:length]))
+            self._total_data_size += length
+            data = data[length:]
+            address += length
+
+        # With data arriving in increasing address order, sectors before this data are complete.
+        self._queue_sectors([sector for sector in self._open_sectors.values()
+                if sector.end <= first_sector_start])
+        return self
+
+    def commit(self):
+        """@brief Program the remaining data and wait for the worker to finish.
+
+        After calling this method, the loader instance can be reused to program more data.
+        """
+        try:
+            self._queue_sectors(list(self._open_sectors.values()))
+            self._stop_worker()
+            if self._error is not None:
+                raise self._error
+
+            if self._perf_list:
+                if self._progress is not None:
+                    self._progress(1.0)
+                if not self._no_reset:
+                    self._session.target.reset_and_halt()
+                self._log_performance(self._perf_list)
+        finally:
+            self._reset_streaming_state()
+
+    def _reset_streaming_state(self) -> None:
+        self._reset_state()
+        self._open_sectors = {}
+        self._queued_sectors = {}
+        self._queue = queue.Queue()
+        self._error = None
+        self._perf_list = []
+        self._erase_size = 0
+        self._programmed_size = 0
+        self._did_chip_erase = False
+
+    def _get_sector_range(self, address: int) -> Tuple[int, int]:
+        """@brief Return the start and end of the flash sector containing an address.
+
+        For memory other than flash with known sectors, the whole region is returned.
+        """
+        region = self._map.get_region_for_address(address, self._session.target.selected_core.node_name)
+        if region is None:
+            raise ValueError("no memory region defined for address 0x%08x" % address)
+        if region.is_flash and (region.flash is not None):
+            info = region.flash.get_sector_info(address)
+            if info is not None:
+                return info.base_addr, info.base_addr + info.size
+        return region.start, region.end + 1
+
+    def _queue_sectors(self, sectors: List[_StreamingSector]) -> None:
+        if not sectors:
+            return
+        for sector in sectors:
+            del self._open_sectors[sector.start]
+            self._queued_sectors[sector.start] = sector
+        if self._worker is None:
+            if self._progress is not None:
+                self._progress(0.0)
+            self._worker = threading.Thread(target=self._worker_main, name="streaming-flash-loader")
+            self._worker.daemon = True
+            self._worker.start()
+        # Chunk lists are copied, since a reopened sector's list is extended by later data.
+        self._queue.put([_StreamingSector(s.start, s.end, list(s.chunks)) for s in sectors])
+
+    def _stop_worker(self) -> None:
+        if self._worker is not None:
+            self._queue.put(None)
+            self._worker.join()
+            self._worker = None
+
+    def _check_error(self) -> None:
+        if self._error is not None:
+            self._stop_worker()
+            raise self._error
+
+    def _worker_main(self) -> None:
+        done = False
+        while not done:
+            batch = self._queue.get()
+            if batch is None:
+                break
+            # Program every sector that has completed since the last batch together.
+            while True:
+                try:
+                    more = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    done = True
+                    break
+                batch.extend(more)
+
+            if self._error is not None:
+                continue
+            try:
+                self._program_batch(batch)
+            except Exception as err: # pylint: disable=broad-except
+                LOG.debug("streaming flash programming failed: %s", err)
+                self._error = err
+
+    def _program_batch(self, batch: List[_StreamingSector]) -> None:
+        # A sector that was reopened and queued again is only programmed with its latest data.
+        sectors = {sector.start: sector for sector in batch}
+        batch_size = sum(sector.data_size for sector in sectors.values())
+        LOG.debug("streaming flash programming %d bytes in %d sectors", batch_size, len(sectors))
+
+        def batch_progress(amount: Union[int, float]) -> None:
+            assert self._progress is not None
+            total = max(self._erase_size, self._total_data_size, 1)
+            self._progress((self._programmed_size + amount * batch_size) / total)
+
+        # Programming is split across batches, so reset is deferred to commit(). Chip erase can
+        # only be used for the first batch.
+        loader = MemoryLoader(self._session,
+                progress=batch_progress if (self._progress is not None) else (lambda amount: None),
+                chip_erase=(self._chip_erase if not self._did_chip_erase else "sector"),
+                smart_flash=self._smart_flash,
+                trust_crc=self._trust_crc,
+                keep_unwritten=self._keep_unwritten,
+                no_reset=True)
+        for sector in sorted(sectors.values(), key=lambda s: s.start):
+            for chunk in sector.chunks:
+                loader.add_data(chunk.addr, chunk.data)
+        self._perf_list += loader._program_builders(loader._chip_erase)
+        self._did_chip_erase = True
+        self._programmed_size += batch_size
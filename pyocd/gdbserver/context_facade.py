@@ -82,6 +82,28 @@ class GDBDebugContextFacade(object):
         ## String of XML target description for gdb.
         self._target_xml = self._build_target_xml()
 
+        options = self._context.session.options
+
+        ## Names of the registers whose values are included in T stop replies.
+        self._expedited_registers = self._get_expedited_registers(options.get('gdbserver.expedited_registers'))
+
+        ## Number of bytes from the SP, and around the PC, to read into the cache on a stop.
+        self._prefetch_stack_size = options.get('gdbserver.prefetch_stack_size')
+        self._prefetch_code_size = options.get('gdbserver.prefetch_code_size')
+
+    def _get_expedited_registers(self, names):
+        """@brief Validate the comma separated list of expedited register names."""
+        result = []
+        for name in (n.strip().lower() for n in names.split(',')):
+            if not name:
+                continue
+            reg = self._context.core.core_registers.by_name.get(name)
+            if (reg is None) or (reg.gdb_regnum is None):
+                LOG.warning("Ignoring unknown expedited register '%s'", name)
+                continue
+            result.append(name)
+        return result
+
     @property
     def context(self):
         return self._context
@@ -179,18 +201,40 @@ class GDBDebugContextFacade(object):
 
         This includes:
         - The signal encountered.
-        - The current value of the important registers (sp, lr, pc).
+        - The current value of the expedited registers, by default fp (r7), sp, lr, and pc.
+
+        The memory that gdb usually reads next, at the top of the stack and around the pc, is also
+        prefetched into the cache.
         """
         if force_signal is not None:
             response = ('T' + conversion.byte_to_hex2(force_signal)).encode()
         else:
             response = ('T' + conversion.byte_to_hex2(self.get_signal_value())).encode()
 
-        # Append fp(r7), sp(r13), lr(r14), pc(r15)
-        response += self._get_reg_index_value_pairs(['r7', 'sp', 'lr', 'pc'])
+        response += self._get_reg_index_value_pairs(self._expedited_registers)
+
+        self._prefetch_stop_memory()
 
         return response
 
+    def _prefetch_stop_memory(self):
+        """@brief Read the stack and code that gdb will probably ask for after a stop into the cache.
+
+        Both ranges are requested together, so they can be read with shared probe round trips.
+        """
+        if not (self._prefetch_stack_size or self._prefetch_code_size):
+            return
+        try:
+            sp, pc = self._context.read_core_registers_raw(['sp', 'pc'])
+            ranges = []
+            if self._prefetch_stack_size:
+                ranges.append((sp & ~3, self._prefetch_stack_size))
+            if self._prefetch_code_size:
+                ranges.append((max(0, pc - self._prefetch_code_size // 2) & ~3, self._prefetch_code_size))
+            self._context.prefetch_memory(ranges)
+        except exceptions.Error as error:
+            LOG.debug("GDB stop prefetch failed: %s", error)
+
     def get_signal_value(self):
         if self._context.core.is_debug_trap():
             return signals.SIGTRAP
@@ -217,6 +261,8 @@ class GDBDebugContextFacade(object):
         register to follow MMMMMMMM is the value of the register.
         """
         result = b''
+        if not reg_list:
+            return result
         try:
             reg_values = self._context.read_core_registers_raw(reg_list)
         except exceptions.CoreRegisterAccessError:
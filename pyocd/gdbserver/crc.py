@@ -0,0 +1,141 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief CRC computation for gdb's qCRC packet.
+
+gdb uses a CRC-32 with polynomial 0x04c11db7, processed most significant bit first, with an
+initial value of 0xffffffff and no final inversion. Large ranges are checked by running a small
+routine on the target, so only the result has to be transferred.
+"""
+
+import binascii
+import logging
+from typing import (Optional, Sequence, TYPE_CHECKING)
+
+from ..core import exceptions
+from ..core.memory_map import MemoryType
+from ..coresight.cortex_m import CortexM
+
+if TYPE_CHECKING:
+    from ..core.core_target import CoreTarget
+    from ..debug.context import DebugContext
+
+LOG = logging.getLogger(__name__)
+
+## @brief Thumb code that computes gdb's CRC of a memory range.
+#
+# Built from src/gdb_crc/gdb_crc.S. The code is position independent and must be word aligned.
+#
+# Arguments are r0 = start address, r1 = length, r2 = initial CRC, and r3 = a 1 kB word aligned
+# buffer for the CRC table. It stops on a BKPT instruction with the CRC in r0, without using the
+# stack.
+GDB_CRC_CODE = (
+    0x24004f0d, 0x26080625, 0xd300006d, 0x3e01407d, 0x00a6d1fa, 0x3401519d, 0xd9f32cff, 0x42881841,
+    0x7804d208, 0x0e153001, 0x00a4406c, 0x0212591c, 0xe7f44062, 0xbe000010, 0x04c11db7,
+    )
+
+## Size in bytes of the CRC table built by the target routine.
+_TABLE_SIZE = 0x400
+
+## Size in bytes of the RAM used by the target routine, for the code followed by the table.
+_SCRATCH_SIZE = len(GDB_CRC_CODE) * 4 + _TABLE_SIZE
+
+## Ranges shorter than this are read and checked on the host, since loading the routine and
+# saving the RAM it uses costs more than reading the data.
+_MIN_TARGET_CRC_LENGTH = 0x1000
+
+## Timeout in seconds for the target routine.
+_TARGET_CRC_TIMEOUT = 10.0
+
+## Size of the reads made when computing the CRC on the host.
+_HOST_READ_SIZE = 0x8000
+
+## Byte values with their bit order reversed.
+_REVERSED_BITS = bytes(int('{:08b}'.format(i)[::-1], 2) for i in range(256))
+
+def _reverse32(value: int) -> int:
+    return int('{:032b}'.format(value)[::-1], 2)
+
+def gdb_crc32(data: Sequence[int], crc: int = 0xffffffff) -> int:
+    """@brief Compute gdb's CRC-32 of data on the host.
+
+    gdb's CRC is the bit reversed form of the one computed by zlib without its final inversion,
+    so binascii.crc32() is used on data with the bit order of each byte reversed.
+
+    @param data Bytes or a list of byte values.
+    @param crc Initial CRC value, or the result for the preceding data.
+    @return The CRC as an integer.
+    """
+    result = binascii.crc32(bytes(data).translate(_REVERSED_BITS), _reverse32(crc) ^ 0xffffffff)
+    return _reverse32(result ^ 0xffffffff)
+
+def _get_scratch_address(core: "CoreTarget", address: int, length: int) -> Optional[int]:
+    """@brief Choose the RAM used by the target routine.
+    @return The base address, or None if there is no RAM that doesn't overlap the range.
+    """
+    ram = core.memory_map.get_default_region_of_type(MemoryType.RAM)
+    if (ram is None) or (ram.length < _SCRATCH_SIZE):
+        return None
+    scratch = ram.start
+    if (address < scratch + _SCRATCH_SIZE) and (scratch < address + length):
+        return None
+    return scratch
+
+def _compute_crc_on_target(core: CortexM, scratch: int, address: int, length: int) -> int:
+    """@brief Run the CRC routine on the core, restoring the RAM it uses afterwards."""
+    saved_ram = core.read_memory_block32(scratch, _SCRATCH_SIZE // 4)
+    try:
+        core.write_memory_block32(scratch, GDB_CRC_CODE)
+        return core.call_routine(scratch,
+                [address, length, 0xffffffff, scratch + len(GDB_CRC_CODE) * 4],
+                routine_timeout=_TARGET_CRC_TIMEOUT)
+    finally:
+        core.write_memory_block32(scratch, saved_ram)
+        core.flush()
+
+def _compute_crc_on_host(context: "DebugContext", address: int, length: int) -> int:
+    crc = 0xffffffff
+    for offset in range(0, length, _HOST_READ_SIZE):
+        chunk_length = min(_HOST_READ_SIZE, length - offset)
+        crc = gdb_crc32(context.read_memory_block8(address + offset, chunk_length), crc)
+    return crc
+
+def compute_gdb_crc(core: "CoreTarget", context: "DebugContext", address: int, length: int) -> int:
+    """@brief Compute gdb's CRC-32 of a range of target memory.
+
+    If the core is a halted Cortex-M, and the range is large enough and within one memory region,
+    the CRC is computed by a routine loaded into the start of the default RAM region. The RAM
+    contents and core registers are restored afterwards. Otherwise, or if the routine fails, the
+    memory is read through _context_ and the CRC is computed on the host.
+
+    @param core The core used to run the routine.
+    @param context Debug context used to read memory for the host computation.
+    @param address Start address of the range.
+    @param length Length of the range in bytes.
+    @return The CRC as an integer.
+
+    @exception TransferError Memory in the range could not be read.
+    """
+    region = core.memory_map.get_region_for_address(address)
+    if isinstance(core, CortexM) and (length >= _MIN_TARGET_CRC_LENGTH) \
+            and (region is not None) and region.contains_range(address, length=length):
+        scratch = _get_scratch_address(core, address, length)
+        if scratch is not None:
+            try:
+                return _compute_crc_on_target(core, scratch, address, length)
+            except exceptions.Error as err:
+                LOG.debug("CRC routine failed, computing CRC on host: %s", err)
+    return _compute_crc_on_host(context, address, length)
@@ -16,9 +16,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import logging
+import re
 import threading
-from time import sleep
+from time import (monotonic, perf_counter, sleep)
 import sys
 import io
 from xml.etree.ElementTree import (Element, SubElement, tostring)
@@ -26,24 +28,29 @@ from typing import (Dict, List, Optional, Tuple)
 
 from ..core import exceptions
 from ..core.target import Target
-from ..flash.loader import FlashLoader
+from ..flash.loader import (FlashLoader, StreamingMemoryLoader)
 from ..utility.cmdline import convert_vector_catch
 from ..utility.conversion import (hex_to_byte_list, hex_encode, hex_decode, hex8_to_u32le)
 from ..utility.compatibility import (to_bytes_safe, to_str_safe)
+from ..utility.event_loop import EventLoop
 from ..utility.server import StreamServer
-from ..utility.timeout import Timeout
+from ..utility.timeout import (PollInterval, Timeout)
 from ..trace.swv import SWVReader
 from ..utility.rtt_server import RTTServer
 from ..utility.sockets import ListenerSocket
 from .syscall import GDBSyscallIOHandler
 from ..debug import semihost
 from .context_facade import GDBDebugContextFacade
+from .crc import compute_gdb_crc
+from .packet_stats import PacketStats
+from .state_poller import CoreStatePoller
 from .symbols import GDBSymbolProvider
 from ..rtos import RTOS
 from . import signals
 from .packet_io import (
     checksum,
     ConnectionClosedException,
+    GDBServerPacketIO,
     GDBServerPacketIOThread,
     )
 from ..commands.execution_context import CommandExecutionContext
@@ -57,25 +64,16 @@ LOG = logging.getLogger(__name__)
 TRACE_MEM = LOG.getChild("trace.mem")
 TRACE_MEM.setLevel(logging.CRITICAL)
 
+## Regular expression matching an escape sequence in binary data from Gdb.
+_GDB_ESCAPE_SEQUENCE = re.compile(rb'}(.)', re.DOTALL)
+
 def unescape(data: bytes) -> List[int]:
     """@brief De-escapes binary data from Gdb.
 
     @param data Bytes-like object with possibly escaped values.
     @return List of integers in the range 0-255, with all escaped bytes de-escaped.
     """
-    data_idx = 0
-
-    # unpack the data into binary array
-    result = list(data)
-
-    # check for escaped characters
-    while data_idx < len(result):
-        if result[data_idx] == 0x7d:
-            result.pop(data_idx)
-            result[data_idx] = result[data_idx] ^ 0x20
-        data_idx += 1
-
-    return result
+    return list(_GDB_ESCAPE_SEQUENCE.sub(lambda m: bytes((m.group(1)[0] ^ 0x20,)), bytes(data)))
 
 ## Tuple of int values of characters that must be escaped.
 _GDB_ESCAPED_CHARS = tuple(b'#$}*')
@@ -83,17 +81,16 @@ _GDB_ESCAPED_CHARS = tuple(b'#$}*')
 def escape(data):
     """@brief Escape binary data to be sent to Gdb.
 
+    Each character is escaped by prefixing with '}' and xor'ing the char with 0x20. The '}'
+    character is escaped first so the prefixes inserted for the other characters are left alone.
+
     @param data Bytes-like object containing raw binary.
     @return Bytes object with the characters in '#$}*' escaped as required by Gdb.
     """
-    result: List[int] = []
-    for c in data:
-        if c in _GDB_ESCAPED_CHARS:
-            # Escape by prefixing with '}' and xor'ing the char with 0x20.
-            result += [0x7d, c ^ 0x20]
-        else:
-            result.append(c)
-    return bytes(result)
+    result = bytes(data).replace(b'}', b'}]')
+    for c in b'#$*':
+        result = result.replace(bytes((c,)), bytes((0x7d, c ^ 0x20)))
+    return result
 
 class GDBServer(threading.Thread):
     """@brief GDB remote server thread.
@@ -152,12 +149,20 @@ class GDBServer(threading.Thread):
                 'soft_bkpt_as_hard',
                 ])
 
-        self.packet_size = 2048
-        self.packet_io = None
+        self.packet_size = session.options.get('gdbserver.packet_size')
+        self.stream_flash = session.options.get('gdbserver.stream_flash')
+        self.packet_io: Optional[GDBServerPacketIO] = None
         self.gdb_features = []
         self.non_stop = False
         self._is_extended_remote = False
         self.is_target_running = (self.target.get_state() == Target.State.RUNNING)
+        # Target state checks while the target runs back off from the minimum to the maximum
+        # interval. The state of this core is read together with other cores of the session.
+        self._poll_interval = PollInterval(session.options.get('gdbserver.poll_interval_min'),
+                session.options.get('gdbserver.poll_interval_max'))
+        self._state_poller = CoreStatePoller.get_poller(session)
+        self._next_poll_time = 0.0
+        self._non_stop_timeout = Timeout(session.options.get('debug.status_fault_retry_timeout'))
         self.flash_loader = None
         self.shutdown_event = threading.Event()
         self.detach_event = threading.Event()
@@ -170,6 +175,22 @@ class GDBServer(threading.Thread):
         self.did_init_thread_providers = False
         self.current_thread_id = 0
         self.first_run_after_reset_or_flash = True
+        # Key and contents of the last threads XML, so every qXfer chunk is served from one snapshot.
+        self._threads_xml_cache: Optional[Tuple[Tuple, bytes]] = None
+        # Statistics of the packets handled for the current connection.
+        self.packet_stats = PacketStats()
+        self._stats_file = session.options.get('gdbserver.stats_file')
+
+        # When the event loop is used, the loop thread accepts connections and reads packets, and
+        # the session's dispatcher thread handles them. This thread only waits to be shut down.
+        self._event_loop: Optional[EventLoop] = None
+        self._dispatcher = None
+        self._resume_timeout: Optional[Timeout] = None
+        self._poll_timer = None
+        if session.options.get('gdbserver.event_loop'):
+            self._event_loop = EventLoop.acquire()
+            self._dispatcher = self._event_loop.acquire_dispatcher(session,
+                    "gdb-dispatcher-%s" % session.probe.unique_id)
 
         self.abstract_socket = ListenerSocket(self.port, self.packet_size)
         if not self.serve_local_only:
@@ -193,7 +214,7 @@ class GDBServer(threading.Thread):
 
         if self.semihost_console_type == 'telnet':
             self.telnet_server = StreamServer(self.telnet_port, self.serve_local_only, "Semihost",
-                False, extra_info=("core %d" % self.core))
+                False, extra_info=("core %d" % self.core), event_loop=self._event_loop)
             console_file = self.telnet_server
             semihost_console = semihost.ConsoleIOHandler(self.telnet_server)
         else:
@@ -260,6 +281,7 @@ class GDBServer(threading.Thread):
                 b'S' : (self.step,               1   ), # Step with signal.
                 b'T' : (self.is_thread_alive,    1   ), # Thread liveness query.
                 b'v' : (self.v_command,          2   ), # v command.
+                b'x' : (self.get_memory_binary,  2   ), # Read memory (binary).
                 b'X' : (self.write_memory,       2   ), # Write memory (binary).
                 b'z' : (self.breakpoint,         1   ), # Insert breakpoint/watchpoint.
                 b'Z' : (self.breakpoint,         1   ), # Remove breakpoint/watchpoint.
@@ -282,6 +304,11 @@ class GDBServer(threading.Thread):
         # Add the gdbserver command group.
         self._command_context.command_set.add_command_group('gdbserver')
 
+    @property
+    def event_loop(self) -> Optional[EventLoop]:
+        """@brief The EventLoop serving this gdbserver's sockets, or None if it uses threads."""
+        return self._event_loop
+
     def stop(self, wait=True):
         if self.is_alive():
             self.shutdown_event.set()
@@ -310,9 +337,16 @@ class GDBServer(threading.Thread):
             self.rtt_server.stop()
             self.rtt_server = None
         self.abstract_socket.cleanup()
+        if self._event_loop:
+            self._event_loop.release_dispatcher(self.session)
+            self._dispatcher = None
+            EventLoop.release()
+            self._event_loop = None
 
     def _cleanup_for_next_connection(self):
         self.non_stop = False
+        self.packet_stats.reset()
+        self._threads_xml_cache = None
         self.thread_provider = None
         self.did_init_thread_providers = False
         self.current_thread_id = 0
@@ -320,6 +354,15 @@ class GDBServer(threading.Thread):
     def run(self):
         LOG.info('GDB server started on port %d (core %d)', self.port, self.core)
 
+        if self._event_loop is not None:
+            self._run_with_event_loop()
+        else:
+            self._run_with_threads()
+
+        LOG.debug("gdbserver thread exiting")
+        self._cleanup()
+
+    def _run_with_threads(self):
         while not self.shutdown_event.is_set():
             try:
                 # Notify listeners that the server is running after a short delay.
@@ -349,8 +392,46 @@ class GDBServer(threading.Thread):
             except Exception as e:
                 LOG.error("Unexpected exception: %s", e, exc_info=self.session.log_tracebacks)
 
-        LOG.debug("gdbserver thread exiting")
-        self._cleanup()
+    def _check_interrupt_and_state(self, poll_state=True):
+        """@brief Handle a Ctrl-C outside of a resume, and report a halt in non-stop mode.
+
+        @param self
+        @param poll_state Whether to check the state of a running target in non-stop mode. Callers
+            pass False if the next check isn't due yet.
+        """
+        if self.packet_io.interrupt_event.is_set():
+            if self.non_stop:
+                self.target.halt()
+                self.is_target_running = False
+                self.send_stop_notification()
+            else:
+                LOG.warning("Got unexpected ctrl-c, ignoring")
+            self.packet_io.interrupt_event.clear()
+
+        if poll_state and self.non_stop and self.is_target_running:
+            try:
+                self._poll_non_stop_target()
+            except Exception as e:
+                LOG.error("Unexpected exception: %s", e, exc_info=self.session.log_tracebacks)
+
+    def _poll_non_stop_target(self):
+        """@brief Send a stop notification if the running target has halted in non-stop mode.
+
+        Semihosting and RTT are serviced as while waiting for a stop in all-stop mode.
+        """
+        fault_retry_timeout = self._non_stop_timeout
+        val = None
+        with self.lock:
+            if fault_retry_timeout.check():
+                val = self._check_resumed_target(fault_retry_timeout, False)
+            # Check if the target couldn't be reached again after a fault.
+            if fault_retry_timeout.did_time_out:
+                LOG.error("Timed out while attempting to reestablish control over target.")
+                val = ('S%02x' % signals.SIGSEGV).encode()
+        if val is not None:
+            LOG.debug("state halted")
+            self.is_target_running = False
+            self.send_stop_notification(data=val)
 
     def _run_connection(self):
         assert self.packet_io
@@ -359,27 +440,21 @@ class GDBServer(threading.Thread):
 
         while not (self.detach_event.is_set() or self.shutdown_event.is_set()):
             try:
-                if self.packet_io.interrupt_event.is_set():
-                    if self.non_stop:
-                        self.target.halt()
-                        self.is_target_running = False
-                        self.send_stop_notification()
-                    else:
-                        LOG.warning("Got unexpected ctrl-c, ignoring")
-                    self.packet_io.interrupt_event.clear()
-
-                if self.non_stop and self.is_target_running:
-                    try:
-                        if self.target.get_state() == Target.State.HALTED:
-                            LOG.debug("state halted")
-                            self.is_target_running = False
-                            self.send_stop_notification()
-                    except Exception as e:
-                        LOG.error("Unexpected exception: %s", e, exc_info=self.session.log_tracebacks)
+                poll_state = monotonic() >= self._next_poll_time
+                self._check_interrupt_and_state(poll_state)
 
                 # read command
                 try:
-                    packet = self.packet_io.receive(block=not self.non_stop)
+                    if not self.non_stop:
+                        packet = self.packet_io.receive()
+                    elif self.is_target_running:
+                        # Wait for a packet only until the target state is due to be checked.
+                        if poll_state:
+                            self._next_poll_time = monotonic() + self._poll_interval.next()
+                        packet = self.packet_io.receive(
+                                timeout=max(0.0, self._next_poll_time - monotonic()))
+                    else:
+                        packet = self.packet_io.receive(timeout=self._poll_interval.maximum)
                 except ConnectionClosedException:
                     LOG.debug("gdbserver connection loop exiting; client closed connection")
                     break
@@ -387,17 +462,8 @@ class GDBServer(threading.Thread):
                 if self.shutdown_event.is_set():
                     break
 
-                if self.non_stop and packet is None:
-                    sleep(0.1)
-                    continue
-
                 if packet is not None and len(packet) != 0:
-                    # decode and prepare resp
-                    resp = self.handle_message(packet)
-
-                    if resp is not None:
-                        # send resp
-                        self.packet_io.send(resp)
+                    self._handle_packet(packet)
 
             except Exception as e:
                 LOG.error("Unexpected exception: %s", e, exc_info=self.session.log_tracebacks)
@@ -405,6 +471,7 @@ class GDBServer(threading.Thread):
         LOG.debug("gdbserver exiting connection loop")
 
         # Clean up the connection.
+        self._write_packet_stats()
         self.abstract_socket.close()
         self.packet_io.stop()
         self.packet_io = None
@@ -416,6 +483,193 @@ class GDBServer(threading.Thread):
         else:
             self.shutdown_event.set()
 
+    def _run_with_event_loop(self):
+        assert self._event_loop and self._dispatcher
+        self._event_loop.register(self.abstract_socket.listener, self._accept_connection)
+        # Registration is done in order on the loop thread, so the server is listening when the
+        # notification is sent.
+        self._event_loop.call_soon(self.session.notify, self.GDBSERVER_START_LISTENING_EVENT, self)
+
+        self.shutdown_event.wait()
+
+        self._event_loop.unregister(self.abstract_socket.listener).result()
+        self._dispatcher.call(self._shut_down_connection)
+
+    def _accept_connection(self):
+        """@brief Accept a gdb connection. Called on the event loop thread."""
+        if self.abstract_socket.accept() is None:
+            return
+        # Only one client is served at a time, as with threads.
+        self._event_loop.unregister(self.abstract_socket.listener)
+        self.abstract_socket.set_timeout(None)
+        self.packet_io = GDBServerPacketIO(self.abstract_socket, self._connection_notify)
+        self._event_loop.register(self.abstract_socket.conn, self._connection_readable)
+        self._dispatcher.submit(self._open_connection)
+
+    def _connection_readable(self):
+        """@brief Read incoming data. Called on the event loop thread."""
+        packet_io = self.packet_io
+        if packet_io is None:
+            return
+        packet_io.receive_data()
+        if packet_io.is_closed:
+            self._event_loop.unregister(self.abstract_socket.conn)
+            self._connection_notify()
+
+    def _connection_notify(self):
+        self._dispatcher.submit(self._service_connection)
+
+    def _poll_timer_fired(self):
+        self._dispatcher.submit(self._service_connection, True)
+
+    def _open_connection(self):
+        self.detach_event.clear()
+        try:
+            # Make sure the target is halted. Otherwise gdb gets easily confused.
+            self.target.halt()
+        except Exception as e:
+            LOG.error("Unexpected exception: %s", e, exc_info=self.session.log_tracebacks)
+        LOG.info("Client connected to port %d!", self.port)
+
+    def _service_connection(self, poll_state=False):
+        """@brief Handle all pending input for the connection. Called on the dispatcher thread.
+
+        This does the same work as one pass through the loop in _run_connection(), except that it
+        never waits for a packet. It's run when a packet or Ctrl-C arrives, and from a timer while
+        the target is running.
+
+        @param self
+        @param poll_state Whether the poll timer fired, so the state of a target running in non-stop
+            mode should be checked.
+        """
+        packet_io = self.packet_io
+        if packet_io is None:
+            return
+
+        try:
+            if packet_io.is_closed:
+                raise ConnectionClosedException()
+
+            if self._resume_timeout is not None:
+                self._poll_resumed_target()
+            else:
+                self._check_interrupt_and_state(poll_state)
+
+            # Packets aren't handled while waiting for the target to halt after a resume.
+            while not self.detach_event.is_set() and (self._resume_timeout is None):
+                packet = packet_io.receive(block=False)
+                if packet is None:
+                    break
+                if len(packet) != 0:
+                    self._handle_packet(packet)
+        except ConnectionClosedException:
+            LOG.debug("gdbserver connection closed by client")
+            self.detach_event.set()
+        except Exception as e:
+            LOG.error("Unexpected exception: %s", e, exc_info=self.session.log_tracebacks)
+
+        waiting = (self._resume_timeout is not None) or (self.non_stop and self.is_target_running)
+        if (self._poll_timer is not None) and (poll_state or not waiting or self.detach_event.is_set()):
+            self._poll_timer.cancel()
+            self._poll_timer = None
+
+        if self.detach_event.is_set():
+            self._close_connection()
+        elif waiting and (self._poll_timer is None):
+            self._poll_timer = self._event_loop.call_later(self._poll_interval.next(),
+                    self._poll_timer_fired)
+
+    def _poll_resumed_target(self):
+        """@brief Send the stop reply once the target halts after a resume in all-stop mode."""
+        assert self._resume_timeout is not None
+        fault_retry_timeout = self._resume_timeout
+        val = None
+        with self.lock:
+            if fault_retry_timeout.check():
+                val = self._check_resumed_target(fault_retry_timeout,
+                        self.packet_io.interrupt_event.is_set())
+            # Check if the target couldn't be reached again after a fault.
+            if fault_retry_timeout.did_time_out:
+                LOG.error("Timed out while attempting to reestablish control over target.")
+                val = ('S%02x' % signals.SIGSEGV).encode()
+        if val is not None:
+            self._resume_timeout = None
+            self.packet_io.send(self.create_rsp_packet(val))
+
+    def _shut_down_connection(self):
+        if self._poll_timer is not None:
+            self._poll_timer.cancel()
+            self._poll_timer = None
+        if self.packet_io is not None:
+            self._close_connection()
+
+    def _close_connection(self):
+        LOG.debug("gdbserver closing connection")
+        self._resume_timeout = None
+        self._event_loop.unregister(self.abstract_socket.conn).result()
+        self._write_packet_stats()
+        self.abstract_socket.close()
+        self.packet_io.stop()
+        self.packet_io = None
+        LOG.info("Client disconnected from port %d!", self.port)
+
+        # If persisting is not enabled, we exit on detach. Otherwise prepare for a new connection.
+        if self.persist and not self.shutdown_event.is_set():
+            LOG.debug("preparing for next connection")
+            self._cleanup_for_next_connection()
+            self._event_loop.register(self.abstract_socket.listener, self._accept_connection)
+        else:
+            self.shutdown_event.set()
+
+    def _handle_packet(self, packet):
+        """@brief Handle a packet from gdb, send the reply, and record the packet's statistics."""
+        packet_io = self.packet_io
+        assert packet_io
+        probe_stats = self.session.probe.transfer_statistics
+        start = perf_counter()
+        wait = max(0.0, start - packet_io.received_time)
+        bytes_sent = packet_io.bytes_sent
+        if probe_stats is not None:
+            round_trips = probe_stats.round_trips
+            transfer_time = probe_stats.transfer_time
+
+        resp = self.handle_message(packet)
+        handled = perf_counter()
+        if resp is not None:
+            packet_io.send(resp)
+        end = perf_counter()
+
+        if probe_stats is not None:
+            round_trips = probe_stats.round_trips - round_trips
+            transfer_time = probe_stats.transfer_time - transfer_time
+        else:
+            round_trips = 0
+            transfer_time = 0.0
+        self.packet_stats.add(packet, packet_io.bytes_sent - bytes_sent, round_trips, {
+                'wait': wait,
+                'host': max(0.0, handled - start - transfer_time),
+                'probe': transfer_time,
+                'send': end - handled,
+                })
+
+    def _write_packet_stats(self):
+        """@brief Write the connection's packet statistics to the gdbserver.stats_file file."""
+        if not self._stats_file or self.packet_io is None:
+            return
+        path = self._stats_file.replace("{core}", str(self.core))
+        stats = {
+            'core': self.core,
+            'bytes_received': self.packet_io.bytes_received,
+            'bytes_sent': self.packet_io.bytes_sent,
+            'retransmits': self.packet_io.retransmits,
+            }
+        stats.update(self.packet_stats.to_dict())
+        try:
+            with open(path, 'w') as f:
+                json.dump(stats, f, indent=4, sort_keys=True)
+        except OSError as err:
+            LOG.warning("Error writing gdbserver statistics %s: %s", path, err)
+
     def handle_message(self, msg):
         try:
             assert msg[0:1] == b'$', "invalid first char of message != $"
@@ -585,8 +839,12 @@ class GDBServer(threading.Thread):
             raise exceptions.DebugError("invalid step address received from gdb")
         return addr
 
-    def resume(self, data):
-#         addr = self._get_resume_step_addr(data)
+    def _resume_target(self):
+        """@brief Resume the target and prepare to poll its state.
+
+        @return A Timeout used only if the target starts returning faults. The is_running property
+            of this timeout also serves as a flag that a fault occurred and we're attempting to retry.
+        """
         self.target.resume()
         LOG.debug("target resumed")
 
@@ -595,11 +853,20 @@ class GDBServer(threading.Thread):
             if self.thread_provider is not None:
                 self.thread_provider.read_from_target = True
 
-        val = b''
+        self._state_poller.discard(self.target_context.core)
+        self._poll_interval.reset()
+        return Timeout(self.session.options.get('debug.status_fault_retry_timeout'))
 
-        # Timeout used only if the target starts returning faults. The is_running property of this timeout
-        # also serves as a flag that a fault occurred and we're attempting to retry.
-        fault_retry_timeout = Timeout(self.session.options.get('debug.status_fault_retry_timeout'))
+    def resume(self, data):
+#         addr = self._get_resume_step_addr(data)
+        fault_retry_timeout = self._resume_target()
+
+        # With the event loop, the stop reply is sent by _poll_resumed_target() once the target halts.
+        if self._event_loop is not None:
+            self._resume_timeout = fault_retry_timeout
+            return None
+
+        val = b''
 
         while fault_retry_timeout.check():
             if self.shutdown_event.is_set():
@@ -609,75 +876,91 @@ class GDBServer(threading.Thread):
             self.lock.release()
 
             # Wait for a ctrl-c to be received.
-            if self.packet_io.interrupt_event.wait(0.01):
-                self.lock.acquire()
-                LOG.debug("receive CTRL-C")
-                self.packet_io.interrupt_event.clear()
-
-                # Be careful about reading the target state. If we previously got a fault (the timeout
-                # is running) then ignore the error. In all cases we still return SIGINT.
-                try:
-                    self.target.halt()
-                    val = self.get_t_response(forceSignal=signals.SIGINT)
-                except exceptions.TransferError as e:
-                    # Note: if the target is not actually halted, gdb can get confused from this point on.
-                    # But there's not much we can do if we're getting faults attempting to control it.
-                    if not fault_retry_timeout.is_running:
-                        LOG.error('Error reading target status: %s', e, exc_info=self.session.log_tracebacks)
-                    val = ('S%02x' % signals.SIGINT).encode()
-                break
+            interrupted = self.packet_io.interrupt_event.wait(self._poll_interval.next())
 
             self.lock.acquire()
 
-            try:
-                state = self.target.get_state()
+            stop_reply = self._check_resumed_target(fault_retry_timeout, interrupted)
+            if stop_reply is not None:
+                val = stop_reply
+                break
+
+        # Check if we exited the above loop due to a timeout after a fault.
+        if fault_retry_timeout.did_time_out:
+            LOG.error("Timed out while attempting to reestablish control over target.")
+            val = ('S%02x' % signals.SIGSEGV).encode()
 
-                if self.rtt_server:
-                    self.rtt_server.poll()
+        return self.create_rsp_packet(val)
 
-                # If we were able to successfully read the target state after previously receiving a fault,
-                # then clear the timeout.
-                if fault_retry_timeout.is_running:
-                    LOG.info("Target control reestablished.")
-                    fault_retry_timeout.clear()
+    def _check_resumed_target(self, fault_retry_timeout: Timeout, interrupted: bool) -> Optional[bytes]:
+        """@brief Check whether the resumed target has halted.
 
-                if state == Target.State.HALTED:
-                    # Handle semihosting
-                    if self.enable_semihosting:
-                        was_semihost = self.semihost.check_and_handle_semihost_request()
+        Handles a Ctrl-C from gdb, semihosting requests, and RTT polling.
 
-                        if was_semihost:
-                            self.target.resume()
-                            continue
+        @param fault_retry_timeout Timeout that is started when checking the target state faults.
+        @param interrupted Whether a Ctrl-C was received.
+        @return The stop reply data, or None if the target is still running.
+        """
+        if interrupted:
+            LOG.debug("receive CTRL-C")
+            self.packet_io.interrupt_event.clear()
 
-                    pc = self.target_context.read_core_register('pc')
-                    LOG.debug("state halted; pc=0x%08x", pc)
-                    val = self.get_t_response()
-                    break
+            # Be careful about reading the target state. If we previously got a fault (the timeout
+            # is running) then ignore the error. In all cases we still return SIGINT.
+            try:
+                self.target.halt()
+                return self.get_t_response(forceSignal=signals.SIGINT)
             except exceptions.TransferError as e:
-                # If we get any sort of transfer error or fault while checking target status, then start
-                # a timeout running. Upon a later successful status check, the timeout is cleared. In the event
-                # that the timeout expires, this loop is exited and an error raised to gdb.
+                # Note: if the target is not actually halted, gdb can get confused from this point on.
+                # But there's not much we can do if we're getting faults attempting to control it.
                 if not fault_retry_timeout.is_running:
-                    LOG.warning("Transfer error while checking target status; retrying: %s", e,
-                            exc_info=self.session.log_tracebacks)
-                fault_retry_timeout.start()
-            except exceptions.Error as e:
-                try:
-                    self.target.halt()
-                except exceptions.Error:
-                    pass
-                LOG.warning('Error while target was running: %s', e, exc_info=self.session.log_tracebacks)
-                # This exception was not a transfer error, so reading the target state should be ok.
-                val = ('S%02x' % self.target_facade.get_signal_value()).encode()
-                break
+                    LOG.error('Error reading target status: %s', e, exc_info=self.session.log_tracebacks)
+                return ('S%02x' % signals.SIGINT).encode()
 
-        # Check if we exited the above loop due to a timeout after a fault.
-        if fault_retry_timeout.did_time_out:
-            LOG.error("Timed out while attempting to reestablish control over target.")
-            val = ('S%02x' % signals.SIGSEGV).encode()
+        try:
+            state = self._state_poller.get_state(self.target_context.core, self._poll_interval.current)
+
+            # Poll quickly again while RTT data is flowing.
+            if self.rtt_server and self.rtt_server.poll():
+                self._poll_interval.reset()
+
+            # If we were able to successfully read the target state after previously receiving a fault,
+            # then clear the timeout.
+            if fault_retry_timeout.is_running:
+                LOG.info("Target control reestablished.")
+                fault_retry_timeout.clear()
+
+            if state == Target.State.HALTED:
+                # Handle semihosting
+                if self.enable_semihosting:
+                    was_semihost = self.semihost.check_and_handle_semihost_request()
+
+                    if was_semihost:
+                        self.target.resume()
+                        self._poll_interval.reset()
+                        return None
+
+                pc = self.target_context.read_core_register('pc')
+                LOG.debug("state halted; pc=0x%08x", pc)
+                return self.get_t_response()
+        except exceptions.TransferError as e:
+            # If we get any sort of transfer error or fault while checking target status, then start
+            # a timeout running. Upon a later successful status check, the timeout is cleared. In the event
+            # that the timeout expires, the caller stops waiting and an error is raised to gdb.
+            if not fault_retry_timeout.is_running:
+                LOG.warning("Transfer error while checking target status; retrying: %s", e,
+                        exc_info=self.session.log_tracebacks)
+            fault_retry_timeout.start()
+        except exceptions.Error as e:
+            try:
+                self.target.halt()
+            except exceptions.Error:
+                pass
+            LOG.warning('Error while target was running: %s', e, exc_info=self.session.log_tracebacks)
+            # This exception was not a transfer error, so reading the target state should be ok.
+            return ('S%02x' % self.target_facade.get_signal_value()).encode()
 
-        return self.create_rsp_packet(val)
+        return None
 
     def step(self, data, start=0, end=0):
         #addr = self._get_resume_step_addr(data)
@@ -703,8 +986,9 @@ class GDBServer(threading.Thread):
         self.target.halt()
         return self.create_rsp_packet(self.get_t_response())
 
-    def send_stop_notification(self, forceSignal=None):
-        data = self.get_t_response(forceSignal=forceSignal)
+    def send_stop_notification(self, forceSignal=None, data=None):
+        if data is None:
+            data = self.get_t_response(forceSignal=forceSignal)
         packet = b'%Stop:' + data + b'#' + checksum(data)
         self.packet_io.send(packet)
 
@@ -770,8 +1054,9 @@ class GDBServer(threading.Thread):
 
         if thread_actions[currentThread][0:1] in (b'c', b'C'):
             if self.non_stop:
-                self.target.resume()
+                self._non_stop_timeout = self._resume_target()
                 self.is_target_running = True
+                self._next_poll_time = monotonic() + self._poll_interval.next()
                 return self.create_rsp_packet(b"OK")
             else:
                 return self.resume(None)
@@ -808,6 +1093,10 @@ class GDBServer(threading.Thread):
             self.board.target.selected_core = self.core
 
         if ops == b'FlashErase':
+            # vFlashErase:<addr>,<length>
+            if self.stream_flash:
+                addr, length = data.split(b':')[1].split(b'#')[0].split(b',')
+                self._get_flash_loader().add_erase_range(int(addr, 16), int(length, 16))
             return self.create_rsp_packet(b"OK")
 
         elif ops == b'FlashWrite':
@@ -821,12 +1110,13 @@ class GDBServer(threading.Thread):
                     second_colon += 1
                 idx_begin += 1
 
-            # Get flash loader if there isn't one already
-            if self.flash_loader is None:
-                self.flash_loader = FlashLoader(self.session)
-
-            # Add data to flash loader
-            self.flash_loader.add_data(write_addr, unescape(data[idx_begin:len(data) - 3]))
+            # Add data to flash loader. With streaming, an error from programming earlier data may be
+            # raised here, in which case the loader is discarded.
+            try:
+                self._get_flash_loader().add_data(write_addr, unescape(data[idx_begin:len(data) - 3]))
+            except Exception:
+                self.flash_loader = None
+                raise
 
             return self.create_rsp_packet(b"OK")
 
@@ -850,7 +1140,19 @@ class GDBServer(threading.Thread):
 
         return None
 
-    def get_memory(self, data):
+    def _get_flash_loader(self):
+        """@brief Return the flash loader for the current load, creating it if needed."""
+        if self.flash_loader is None:
+            if self.stream_flash:
+                self.flash_loader = StreamingMemoryLoader(self.session)
+            else:
+                self.flash_loader = FlashLoader(self.session)
+        return self.flash_loader
+
+    def _read_memory_for_gdb(self, data: bytes) -> Optional[bytes]:
+        """@brief Read memory for an 'm' or 'x' packet.
+        @return The memory contents, or None if the read failed.
+        """
         split = data.split(b',')
         addr = int(split[0], 16)
         length = split[1].split(b'#')[0]
@@ -859,14 +1161,39 @@ class GDBServer(threading.Thread):
         TRACE_MEM.debug("GDB getMem: addr=%x len=%x", addr, length)
 
         try:
-            mem = self.target_context.read_memory_block8(addr, length)
+            mem = self.target_context.read_memory_bytes(addr, length)
             # Flush so an exception is thrown now if invalid memory was accesses
             self.target_context.flush()
-            val = hex_encode(bytearray(mem))
+            return bytes(mem)
         except exceptions.TransferError as e:
             LOG.debug("get_memory failed at 0x%x: %s", addr, str(e))
-            val = b'E01' #EPERM
-        return self.create_rsp_packet(val)
+            return None
+
+    def get_memory(self, data):
+        mem = self._read_memory_for_gdb(data)
+        if mem is None:
+            return self.create_rsp_packet(b'E01') #EPERM
+        return self.create_rsp_packet(hex_encode(mem))
+
+    def get_memory_binary(self, data):
+        mem = self._read_memory_for_gdb(data)
+        if mem is None:
+            return self.create_rsp_packet(b'E01') #EPERM
+        return self.create_rsp_packet(b'b' + escape(mem))
+
+    def get_crc(self, data):
+        split = data.split(b',')
+        addr = int(split[0], 16)
+        length = int(split[1], 16)
+
+        TRACE_MEM.debug("GDB CRC: addr=%x len=%x", addr, length)
+
+        try:
+            crc = compute_gdb_crc(self.target, self.target_context, addr, length)
+        except exceptions.TransferError as e:
+            LOG.debug("get_crc failed at 0x%x: %s", addr, str(e))
+            return self.create_rsp_packet(b'E01') #EPERM
+        return self.create_rsp_packet(b'C%08x' % crc)
 
     def write_memory_hex(self, data):
         split = data.split(b',')
@@ -944,7 +1271,8 @@ class GDBServer(threading.Thread):
             self.gdb_features = query[1].split(b';')
 
             # Build our list of features.
-            features = [b'qXfer:features:read+', b'QStartNoAckMode+', b'qXfer:threads:read+', b'QNonStop+']
+            features = [b'qXfer:features:read+', b'QStartNoAckMode+', b'qXfer:threads:read+', b'QNonStop+',
+                    b'binary-upload+']
             features.append(b'PacketSize=' + (hex(self.packet_size).encode())[2:])
             if self.target_facade.get_memory_map_xml() is not None:
                 features.append(b'qXfer:memory-map:read+')
@@ -962,6 +1290,10 @@ class GDBServer(threading.Thread):
                 # Must return an empty packet for an unrecognized qXfer.
                 return self.create_rsp_packet(b"")
 
+        elif query[0] == b'CRC':
+            # qCRC:<addr>,<length>
+            return self.get_crc(query[1].split(b'#')[0])
+
         elif query[0] == b'C':
             if not self.is_threading_enabled():
                 return self.create_rsp_packet(b"QC1")
@@ -1084,6 +1416,11 @@ class GDBServer(threading.Thread):
             LOG.error("Error while executing remote command '%s': %s", cmd, err,
                     exc_info=self.session.log_tracebacks)
 
+        # Commands access memory and registers through the cores and APs, bypassing the cores'
+        # caching contexts, so whatever those contexts hold may now be stale.
+        for core in self.board.target.cores.values():
+            core.get_target_context().invalidate()
+
         # Convert back to bytes, hex encode, then return the response packet.
         output = stream.getvalue()
         if not output:
@@ -1129,7 +1466,7 @@ class GDBServer(threading.Thread):
         elif query == b'threads':
             if annex != b'':
                 return self.create_rsp_packet(b"E00")
-            xml = self.get_threads_xml()
+            xml = self._get_cached_threads_xml()
         else:
             # Unrecognised query object, so return empty packet.
             LOG.debug("Unsupported XML query (%s), annex (%s)", query, annex)
@@ -1217,6 +1554,21 @@ class GDBServer(threading.Thread):
         LOG.debug("Tresponse=%s", response)
         return response
 
+    def _get_cached_threads_xml(self):
+        """@brief Return the threads XML, generating it only once per halt.
+
+        The XML is reused until the core runs again, as indicated by its run token, or the thread
+        provider changes. It isn't cached while the target is running in non-stop mode.
+        """
+        if self.is_target_running:
+            return self.get_threads_xml()
+        provider = self.thread_provider
+        key = (self.target_context.core.run_token, provider,
+                provider.read_from_target if (provider is not None) else None)
+        if (self._threads_xml_cache is None) or (self._threads_xml_cache[0] != key):
+            self._threads_xml_cache = (key, self.get_threads_xml())
+        return self._threads_xml_cache[1]
+
     def get_threads_xml(self):
         root = Element('threads')
 
@@ -127,6 +127,40 @@ class GdbserverMonitorExitCommand(CommandBase):
         for server in self.context.session.gdbservers.values():
             server.stop(wait=False)
 
+class StatsCommand(CommandBase):
+    INFO = {
+            'names': ['stats'],
+            'group': 'gdbserver',
+            'category': 'gdbserver',
+            'nargs': [0, 1],
+            'usage': "[reset]",
+            'help': "Show statistics of the gdb packets handled for this connection.",
+            'extra_help': "For each command, shows the number of packets, bytes received and sent, probe round "
+                            "trips, the milliseconds spent waiting, on the host, in probe transfers, and sending "
+                            "the reply, and a histogram of the packet times. 'reset' clears the statistics.",
+            }
+
+    def parse(self, args):
+        self.reset = False
+        if len(args) == 1:
+            if args[0] != 'reset':
+                raise exceptions.CommandError("invalid action")
+            self.reset = True
+
+    def execute(self):
+        # Get the gdbserver for the selected core.
+        core_number = self.context.selected_core.core_number
+        try:
+            gdbserver = self.context.session.gdbservers[core_number]
+        except KeyError:
+            raise exceptions.CommandError("no gdbserver for core #%i" % core_number)
+
+        if self.reset:
+            gdbserver.packet_stats.reset()
+            self.context.write("Statistics reset")
+        else:
+            self.context.write(gdbserver.packet_stats.format())
+
 class RTTCommand(CommandBase):
     INFO = {
             'names': ['rtt'],
@@ -206,7 +240,8 @@ class RTTCommand(CommandBase):
             try:
                 gdbserver.rtt_server = RTTServer(gdbserver.target, address = self.addr,
                                                  size = self.size,
-                                                 control_block_id = self.id)
+                                                 control_block_id = self.id,
+                                                 event_loop = gdbserver.event_loop)
             except exceptions.RTTError as e:
                 raise exceptions.CommandError(str(e)) from e
         elif self.action == "start":
@@ -229,9 +264,12 @@ class RTTCommand(CommandBase):
             self.context.write("Up-channels:")
             for i, chan in enumerate(control_block.up_channels):
                 name = chan.name if chan.name is not None else ""
-                self.context.write(f"{i}: {name} {chan.size}")
+                stats = chan.stats
+                self.context.write(f"{i}: {name} {chan.size} read={stats.bytes} "
+                                   f"rate={stats.throughput / 1000:.1f}kB/s "
+                                   f"max_fill={stats.max_fill:.0%} overflows={stats.overflows}")
             self.context.write("Down-channels:")
-            for i, chan in enumerate(control_block.up_channels):
+            for i, chan in enumerate(control_block.down_channels):
                 name = chan.name if chan.name is not None else ""
                 self.context.write(f"{i}: {name} {chan.size}")
         elif self.action == "server":
@@ -19,6 +19,7 @@ import logging
 import threading
 import queue
 import socket
+from time import (monotonic, perf_counter)
 
 CTRL_C = b'\x03'
 
@@ -37,22 +38,24 @@ class ConnectionClosedException(Exception):
     """@brief Exception used to signal the GDB server connection closed."""
     pass
 
-class GDBServerPacketIOThread(threading.Thread):
-    """@brief Packet I/O thread.
+class GDBServerPacketIO:
+    """@brief RSP packet I/O for a gdb connection.
 
-    This class is a thread used by the GDBServer class to perform all RSP packet I/O. It
-    handles verifying checksums, acking, and receiving Ctrl-C interrupts. There is a queue
+    Handles verifying checksums, acking, and receiving Ctrl-C interrupts. There is a queue
     for received packets. The interface to this queue is the receive() method. The send()
     method writes outgoing packets to the socket immediately.
+
+    This class doesn't read the socket itself. Either GDBServerPacketIOThread reads it, or the
+    owner calls receive_data() when an EventLoop reports the socket is readable. In the latter
+    case the _notify_cb callback is called on the loop thread after a packet or Ctrl-C arrives.
     """
 
     ## 100 ms timeout for socket and receive queue reads.
     RECEIVE_TIMEOUT = 0.1
 
-    def __init__(self, abstract_socket):
-        super().__init__()
-        self.name = "gdb-packet-thread-port%d" % abstract_socket.port
+    def __init__(self, abstract_socket, notify_cb=None):
         self._abstract_socket = abstract_socket
+        self._notify_cb = notify_cb
         self._receive_queue = queue.Queue()
         self._shutdown_event = threading.Event()
         self.interrupt_event = threading.Event()
@@ -63,8 +66,17 @@ class GDBServerPacketIOThread(threading.Thread):
         self.drop_reply = False
         self._last_packet = b''
         self._closed = False
-        self.setDaemon(True)
-        self.start()
+        ## perf_counter() time at which the packet last returned by receive() arrived.
+        self.received_time = 0.0
+        ## Counters of bytes read from and written to the socket, and of packets sent again after
+        # a nack.
+        self.bytes_received = 0
+        self.bytes_sent = 0
+        self.retransmits = 0
+
+    @property
+    def is_closed(self):
+        return self._closed
 
     def set_send_acks(self, ack):
         if ack:
@@ -85,59 +97,71 @@ class GDBServerPacketIOThread(threading.Thread):
             self.drop_reply = False
             LOG.debug("GDB dropped reply %s", packet)
 
-    def receive(self, block=True):
+    def receive(self, block=True, timeout=None):
+        """@brief Get the next received packet.
+
+        @param self
+        @param block Whether to wait for a packet. If False, None is returned immediately if no
+            packet has been received.
+        @param timeout Optional time in seconds after which a blocking call gives up and returns
+            None. By default it waits until a packet arrives or the connection is closed.
+        """
         if self._closed:
             raise ConnectionClosedException()
+        deadline = None if (timeout is None) else (monotonic() + timeout)
         while True:
+            wait = self.RECEIVE_TIMEOUT
+            if deadline is not None:
+                wait = max(0, min(wait, deadline - monotonic()))
             try:
                 # If block is false, we'll get an Empty exception immediately if there
                 # are no packets in the queue. Same if block is true and it times out
                 # waiting on an empty queue.
-                return self._receive_queue.get(block, self.RECEIVE_TIMEOUT)
+                packet, self.received_time = self._receive_queue.get(block, wait)
+                return packet
             except queue.Empty:
-                # Only exit the loop if block is false or connection closed.
-                if not block:
+                # Only exit the loop if block is false, the timeout expired, or connection closed.
+                if not block or ((deadline is not None) and (monotonic() >= deadline)):
                     return None
                 if self._closed:
                     raise ConnectionClosedException()
 
-    def run(self):
-        LOG.debug("Starting GDB server packet I/O thread")
-
-        self._abstract_socket.set_timeout(self.RECEIVE_TIMEOUT)
-
-        while not self._shutdown_event.is_set():
-            try:
-                data = self._abstract_socket.read()
+    def receive_data(self):
+        """@brief Read data from the socket and process any complete packets.
 
-                # Handle closed connection
-                if len(data) == 0:
-                    LOG.debug("GDB packet thread: other side closed connection")
-                    self._closed = True
-                    break
-
-                TRACE_PACKETS.debug('-->>>> GDB read %d bytes: %s', len(data), data)
+        Sets the closed state if the other side closed the connection.
+        """
+        try:
+            data = self._abstract_socket.read()
 
-                self._buffer += data
-            except (ConnectionAbortedError, ConnectionResetError) as err:
-                LOG.warning("GDB packet thread: connection unexpectedly closed during receive (%s)", err)
+            # Handle closed connection
+            if len(data) == 0:
+                LOG.debug("GDB packet I/O: other side closed connection")
                 self._closed = True
-                break
-            except socket.timeout:
-                # Ignore timeouts.
-                pass
-            except OSError as err:
-                LOG.debug("Error in packet IO thread: %s", err)
+                return
 
-            if self._shutdown_event.is_set():
-                break
+            TRACE_PACKETS.debug('-->>>> GDB read %d bytes: %s', len(data), data)
+
+            self.bytes_received += len(data)
+            self._buffer += data
+        except (ConnectionAbortedError, ConnectionResetError) as err:
+            LOG.warning("GDB packet I/O: connection unexpectedly closed during receive (%s)", err)
+            self._closed = True
+            return
+        except socket.timeout:
+            # Ignore timeouts.
+            pass
+        except OSError as err:
+            LOG.debug("Error in packet IO thread: %s", err)
 
-            self._process_data()
+        if self._shutdown_event.is_set():
+            return
 
-        LOG.debug("GDB packet thread stopping")
+        self._process_data()
 
     def _write_packet(self, packet):
         TRACE_PACKETS.debug('--<<<< GDB send %d bytes: %s', len(packet), packet)
+        self.bytes_sent += len(packet)
 
         # Make sure the entire packet is sent.
         try:
@@ -148,7 +172,7 @@ class GDBServerPacketIOThread(threading.Thread):
                 if remaining:
                     packet = packet[written:]
         except (ConnectionAbortedError, ConnectionResetError) as err:
-            LOG.warning("GDB packet thread: connection unexpectedly closed during send (%s)", err)
+            LOG.warning("GDB packet I/O: connection unexpectedly closed during send (%s)", err)
             self._closed = True
 
         if self.send_acks:
@@ -162,6 +186,7 @@ class GDBServerPacketIOThread(threading.Thread):
             TRACE_ACK.debug('got ack: %s', c)
             if c == b'-':
                 # Handle nack from gdb
+                self.retransmits += 1
                 self._write_packet(self._last_packet)
                 return
 
@@ -183,6 +208,8 @@ class GDBServerPacketIOThread(threading.Thread):
             if len(self._buffer) and self._buffer[0:1] == CTRL_C:
                 self.interrupt_event.set()
                 self._buffer = self._buffer[1:]
+                if self._notify_cb is not None:
+                    self._notify_cb()
 
             try:
                 # Look for complete packet and extract from buffer.
@@ -210,5 +237,31 @@ class GDBServerPacketIOThread(threading.Thread):
             TRACE_ACK.debug(ack)
 
         if goodPacket:
-            self._receive_queue.put(packet)
+            self._receive_queue.put((packet, perf_counter()))
+            if self._notify_cb is not None:
+                self._notify_cb()
+
+class GDBServerPacketIOThread(GDBServerPacketIO, threading.Thread):
+    """@brief Packet I/O thread.
+
+    This class is a thread used by the GDBServer class to read the connection's socket and
+    process the incoming data.
+    """
+
+    def __init__(self, abstract_socket):
+        GDBServerPacketIO.__init__(self, abstract_socket)
+        threading.Thread.__init__(self)
+        self.name = "gdb-packet-thread-port%d" % abstract_socket.port
+        self.daemon = True
+        self.start()
+
+    def run(self):
+        LOG.debug("Starting GDB server packet I/O thread")
+
+        self._abstract_socket.set_timeout(self.RECEIVE_TIMEOUT)
+
+        while not (self._shutdown_event.is_set() or self._closed):
+            self.receive_data()
+
+        LOG.debug("GDB packet thread stopping")
 
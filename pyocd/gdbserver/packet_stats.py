@@ -0,0 +1,176 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import re
+import threading
+from typing import (Any, Dict, List)
+
+## Regular expression matching the name of a q, Q, or v packet, and the object of a qXfer packet.
+_COMMAND_NAME_RE = re.compile(rb'([qQv][A-Za-z]*\??)(?::([A-Za-z-]+))?')
+
+def command_name(packet: bytes) -> str:
+    """@brief Return the name under which statistics for an RSP packet are kept.
+
+    Most commands are named by their first character. For q, Q, and v packets the full command
+    name is used, for instance "qSupported" or "vCont", and for qXfer packets the object as well,
+    for instance "qXfer:threads".
+
+    @param packet The packet, including the leading '$' and the checksum.
+    """
+    match = _COMMAND_NAME_RE.match(packet, 1)
+    if match is None:
+        return packet[1:2].decode('latin-1')
+    name = match.group(1).decode('latin-1')
+    if name == 'qXfer' and match.group(2):
+        name += ':' + match.group(2).decode('latin-1')
+    return name
+
+class CommandStats:
+    """@brief Counters for one RSP command."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.round_trips = 0
+        ## Total seconds spent in each of PacketStats.PHASES.
+        self.times = {phase: 0.0 for phase in PacketStats.PHASES}
+        ## Counts of packets in each bucket of PacketStats.HISTOGRAM_BOUNDS, for each phase and for
+        # the total time.
+        self.histograms = {phase: [0] * (len(PacketStats.HISTOGRAM_BOUNDS) + 1)
+                for phase in PacketStats.PHASES + ('total',)}
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.times.values())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'count': self.count,
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'round_trips': self.round_trips,
+            'times': dict(self.times),
+            'histograms': {phase: list(counts) for phase, counts in self.histograms.items()},
+            }
+
+class PacketStats:
+    """@brief Aggregate latency and probe traffic of the RSP packets handled by a gdbserver.
+
+    The time taken to serve each packet is split into phases:
+    - wait: from the packet being received until its handling starts.
+    - host: handling the packet, less the probe time. This is parsing the packet, building the
+        reply, and any other work done by the host, such as computing checksums.
+    - probe: probe transfers made while handling the packet.
+    - send: writing the reply to the socket.
+
+    The time of each phase, and the total time, are also counted in histograms with logarithmic
+    buckets.
+    """
+
+    ## Phases of handling a packet for which times are kept.
+    PHASES = ('wait', 'host', 'probe', 'send')
+
+    ## Upper bounds in seconds of the histogram buckets. The last bucket has no upper bound.
+    HISTOGRAM_BOUNDS = (0.0001, 0.001, 0.01, 0.1, 1.0)
+
+    ## Labels of the histogram buckets.
+    HISTOGRAM_LABELS = ('<100us', '<1ms', '<10ms', '<100ms', '<1s', '>=1s')
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._commands: Dict[str, CommandStats] = {}
+
+    @property
+    def commands(self) -> Dict[str, CommandStats]:
+        """@brief Dict of statistics for each command name that has been seen."""
+        return self._commands
+
+    def reset(self) -> None:
+        with self._lock:
+            self._commands = {}
+
+    def add(self, packet: bytes, bytes_out: int, round_trips: int, times: Dict[str, float]) -> None:
+        """@brief Record a handled packet.
+
+        @param self
+        @param packet The received packet.
+        @param bytes_out Number of bytes sent to gdb while handling the packet.
+        @param round_trips Number of probe round trips made while handling the packet.
+        @param times Dict of seconds spent in each of the phases.
+        """
+        name = command_name(packet)
+        with self._lock:
+            stats = self._commands.get(name)
+            if stats is None:
+                stats = self._commands[name] = CommandStats()
+            stats.count += 1
+            stats.bytes_in += len(packet)
+            stats.bytes_out += bytes_out
+            stats.round_trips += round_trips
+            for phase, seconds in times.items():
+                stats.times[phase] += seconds
+                stats.histograms[phase][self._bucket(seconds)] += 1
+            stats.histograms['total'][self._bucket(sum(times.values()))] += 1
+
+    @classmethod
+    def _bucket(cls, seconds: float) -> int:
+        for i, bound in enumerate(cls.HISTOGRAM_BOUNDS):
+            if seconds < bound:
+                return i
+        return len(cls.HISTOGRAM_BOUNDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """@brief Return the statistics in a form that can be written as JSON."""
+        with self._lock:
+            return {
+                'histogram_bounds': list(self.HISTOGRAM_BOUNDS),
+                'commands': {name: stats.to_dict() for name, stats in self._commands.items()},
+                }
+
+    def format(self) -> str:
+        """@brief Return the statistics as text tables, sorted by probe round trips.
+
+        The first table has the counters and the milliseconds spent in each phase. The second has
+        the histogram of the total time of the packets.
+        """
+        with self._lock:
+            commands = sorted(self._commands.items(),
+                    key=lambda item: (item[1].round_trips, item[1].total_time), reverse=True)
+            if not commands:
+                return "No packets handled\n"
+
+            rows: List[List[str]] = [["Command", "Count", "In", "Out", "Round trips"]
+                    + ["%s ms" % phase.capitalize() for phase in self.PHASES]]
+            for name, stats in commands:
+                rows.append([name, str(stats.count), str(stats.bytes_in), str(stats.bytes_out),
+                        str(stats.round_trips)]
+                        + ["%.1f" % (stats.times[phase] * 1000) for phase in self.PHASES])
+            text = self._format_table(rows)
+
+            rows = [["Command"] + list(self.HISTOGRAM_LABELS)]
+            for name, stats in commands:
+                rows.append([name] + [str(n) for n in stats.histograms['total']])
+            return text + "\nPacket times:\n" + self._format_table(rows)
+
+    @staticmethod
+    def _format_table(rows: List[List[str]]) -> str:
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]))]
+        lines = []
+        for row in rows:
+            lines.append("  ".join(cell.ljust(width) if i == 0 else cell.rjust(width)
+                    for i, (cell, width) in enumerate(zip(row, widths))))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,112 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import threading
+from time import monotonic
+from typing import (Callable, Dict, List, Tuple, TYPE_CHECKING, Union)
+import weakref
+
+from ..core import exceptions
+from ..core.core_target import CoreTarget
+from ..core.target import Target
+
+if TYPE_CHECKING:
+    from ..core.session import Session
+
+LOG = logging.getLogger(__name__)
+
+class CoreStatePoller:
+    """@brief Samples the state of all cores being polled for a session together.
+
+    Each gdbserver polls the state of its own core while waiting for it to halt. When one of them
+    needs a new sample, the DHCSR reads for every core polled recently are queued together, so one
+    probe round trip serves all of them. The other cores' states are kept and returned to their
+    gdbservers' next polls, as long as the sample isn't older than the poll interval.
+    """
+
+    _pollers: "weakref.WeakKeyDictionary[Session, CoreStatePoller]" = weakref.WeakKeyDictionary()
+    _pollers_lock = threading.Lock()
+
+    @classmethod
+    def get_poller(cls, session: "Session") -> "CoreStatePoller":
+        """@brief Get the poller shared by all gdbservers of a session."""
+        with cls._pollers_lock:
+            poller = cls._pollers.get(session)
+            if poller is None:
+                poller = cls._pollers[session] = cls()
+            return poller
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # Maps each core to the time until which it is included in samples.
+        self._active: Dict[Target, float] = {}
+        # Unused samples: the time each was taken, and the state or the error from reading it.
+        self._samples: Dict[Target, Tuple[float, Union[Target.State, Exception]]] = {}
+
+    def get_state(self, core: Target, max_age: float) -> Target.State:
+        """@brief Get the state of a core.
+
+        @param self
+        @param core The core whose state is needed.
+        @param max_age How old in seconds a sample made for another core's poll may be to be used.
+            This is normally the caller's poll interval.
+        """
+        with self._lock:
+            now = monotonic()
+            # Keep sampling this core while polls are at most twice the interval apart.
+            self._active[core] = now + 2 * max_age
+            sample = self._samples.pop(core, None)
+            if (sample is not None) and (now - sample[0] <= max_age):
+                result = sample[1]
+            else:
+                result = self._sample(core, now)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    def discard(self, core: Target) -> None:
+        """@brief Drop any unused sample of a core, for instance because it was just resumed."""
+        with self._lock:
+            self._samples.pop(core, None)
+
+    def _sample(self, core: Target, now: float) -> Union[Target.State, Exception]:
+        """@brief Read the state of all active cores, with all the DHCSR reads queued together."""
+        cores = [c for c, expiry in self._active.items() if (c is core) or (expiry >= now)]
+        self._active = {c: self._active[c] for c in cores}
+
+        pending: List[Tuple[Target, Union[Callable[[], Target.State], Target.State, Exception]]] = []
+        for c in cores:
+            try:
+                if isinstance(c, CoreTarget):
+                    pending.append((c, c.get_state_later()))
+                else:
+                    pending.append((c, c.get_state()))
+            except exceptions.Error as err:
+                pending.append((c, err))
+
+        # Every callback must be called, even after an error, to release the DP lock each one holds.
+        results: Dict[Target, Union[Target.State, Exception]] = {}
+        for c, result in pending:
+            if callable(result):
+                try:
+                    result = result()
+                except exceptions.Error as err:
+                    result = err
+            results[c] = result
+
+        self._samples = {c: (now, result) for c, result in results.items() if c is not core}
+        return results[core]
@@ -0,0 +1,236 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+from time import perf_counter
+from typing import (Dict, List, NamedTuple, Optional, TYPE_CHECKING)
+
+from ..core import exceptions
+from ..core.memory_map import MemoryType
+from ..core.target import Target
+
+if TYPE_CHECKING:
+    from ..core.session import Session
+
+LOG = logging.getLogger(__name__)
+
+## @brief Default name of the autotune cache file, placed in the user's home directory.
+DEFAULT_CACHE_FILE = ".pyocd_autotune.json"
+
+class ProbeSettings(NamedTuple):
+    """@brief Wire clock frequency and queue depth chosen for a probe and target type."""
+    frequency: int
+    queue_depth: int
+    throughput: float = 0.0
+
+class ProbeAutotuner:
+    """@brief Calibrates the wire clock frequency and probe queue depth for a session.
+
+    Calibration writes, reads back and verifies a test pattern in target RAM for each combination
+    of candidate clock frequency and queue depth, and picks the fastest one that completed without
+    errors. The RAM contents are restored afterwards. Because RAM is modified, calibration is only
+    performed when the target is halted.
+
+    Results are cached in a JSON file keyed by probe unique ID and target type, so later sessions
+    with the same probe and target apply the saved settings without calibrating. Delete the
+    file, or the probe's entry in it, to calibrate again.
+    """
+
+    ## Clock frequencies tried above the `frequency` session option, in Hertz.
+    FREQUENCIES = (1000000, 2000000, 4000000, 8000000, 12000000, 16000000, 24000000)
+
+    ## Settings with a throughput within this fraction of the fastest are treated as equal, and
+    # the lowest frequency and queue depth among them is chosen for margin.
+    TOLERANCE = 0.05
+
+    def __init__(self, session: Session, burst_size: int = 4096, burst_count: int = 2) -> None:
+        """@brief Constructor.
+        @param self
+        @param session The session, with an open probe.
+        @param burst_size Size in bytes of the test pattern written and read for each burst.
+        @param burst_count Number of bursts run for each setting.
+        """
+        self._session = session
+        self._probe = session.probe
+        self._burst_size = burst_size
+        self._burst_count = burst_count
+        self._cache_path = session.options.get('probe.autotune.cache_file') \
+                or os.path.join(os.path.expanduser("~"), DEFAULT_CACHE_FILE)
+
+    @property
+    def cache_key(self) -> str:
+        """@brief Key for this session's probe and target in the cache file."""
+        assert self._probe and self._session.board
+        return "%s:%s" % (self._probe.unique_id, self._session.board.target_type)
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        try:
+            with open(self._cache_path) as f:
+                cache = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as err:
+            LOG.warning("Error reading autotune cache %s: %s", self._cache_path, err)
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _save_cache(self, settings: ProbeSettings) -> None:
+        cache = self._load_cache()
+        cache[self.cache_key] = settings._asdict()
+        try:
+            with open(self._cache_path, 'w') as f:
+                json.dump(cache, f, indent=4, sort_keys=True)
+        except OSError as err:
+            LOG.warning("Error writing autotune cache %s: %s", self._cache_path, err)
+
+    def get_cached_settings(self) -> Optional[ProbeSettings]:
+        """@brief Return the settings saved for this probe and target, or None."""
+        entry = self._load_cache().get(self.cache_key)
+        if entry is None:
+            return None
+        try:
+            return ProbeSettings(int(entry['frequency']), int(entry['queue_depth']),
+                    float(entry.get('throughput', 0.0)))
+        except (KeyError, TypeError, ValueError):
+            LOG.warning("Ignoring invalid autotune cache entry for %s", self.cache_key)
+            return None
+
+    def apply(self, settings: ProbeSettings) -> None:
+        """@brief Set the probe's clock frequency and queue depth."""
+        assert self._probe
+        self._probe.set_clock(settings.frequency)
+        self._probe.set_queue_depth(settings.queue_depth)
+
+    def apply_cached(self) -> bool:
+        """@brief Apply the cached settings for this probe and target, if present.
+        @return Boolean indicating whether cached settings were applied.
+        """
+        settings = self.get_cached_settings()
+        if settings is None:
+            return False
+        LOG.info("Using autotuned settings for %s: %d Hz, queue depth %d",
+                self.cache_key, settings.frequency, settings.queue_depth)
+        self.apply(settings)
+        return True
+
+    def _candidate_frequencies(self, base_frequency: int) -> List[int]:
+        return [base_frequency] + [f for f in self.FREQUENCIES if f > base_frequency]
+
+    def _candidate_queue_depths(self) -> List[int]:
+        assert self._probe
+        max_depth = self._probe.max_queue_depth
+        depths = []
+        depth = 1
+        while depth < max_depth:
+            depths.append(depth)
+            depth *= 2
+        depths.append(max_depth)
+        return depths
+
+    def _measure(self, address: int, patterns: List[bytes]) -> Optional[float]:
+        """@brief Run the bursts with the current settings.
+
+        The throughput of the fastest burst is used. Delays on the host, such as from other
+        processes, only ever slow a burst down, so the fastest is the best estimate of what the
+        probe and target can do.
+
+        @return Throughput in bytes per second, or None if any transfer failed or data did not verify.
+        """
+        target = self._session.target
+        assert target
+        throughput = 0.0
+        try:
+            for pattern in patterns:
+                start = perf_counter()
+                target.write_memory_block8(address, pattern)
+                if bytes(target.read_memory_block8(address, len(pattern))) != pattern:
+                    return None
+                throughput = max(throughput, 2 * len(pattern) / (perf_counter() - start))
+        except exceptions.TransferError:
+            return None
+        return throughput
+
+    def _recover(self, settings: ProbeSettings) -> None:
+        """@brief Restore known good settings and reconnect the DP after a failed burst."""
+        self.apply(settings)
+        dp = getattr(self._session.target, 'dp', None)
+        try:
+            self._probe.flush()
+        except exceptions.TransferError:
+            pass
+        if dp is not None:
+            dp.connect()
+
+    def calibrate(self) -> Optional[ProbeSettings]:
+        """@brief Measure all candidate settings, apply the best, and save it to the cache.
+        @return The chosen settings, or None if calibration was not possible.
+        """
+        target = self._session.target
+        assert target and self._probe
+        if target.get_state() != Target.State.HALTED:
+            LOG.info("Skipping probe autotune because the target is not halted")
+            return None
+        region = target.memory_map.get_default_region_of_type(MemoryType.RAM)
+        if region is None:
+            LOG.info("Skipping probe autotune because the target has no RAM region")
+            return None
+        address = region.start
+        size = min(self._burst_size, region.length) & ~3
+
+        base = ProbeSettings(int(self._session.options.get('frequency')), self._probe.max_queue_depth)
+        rng = random.Random(0)
+        patterns = [bytes(rng.getrandbits(8) for _ in range(size)) for _ in range(self._burst_count)]
+        saved_ram = bytes(target.read_memory_block8(address, size))
+
+        results: List[ProbeSettings] = []
+        try:
+            for frequency in self._candidate_frequencies(base.frequency):
+                stable = False
+                for depth in self._candidate_queue_depths():
+                    self.apply(ProbeSettings(frequency, depth))
+                    throughput = self._measure(address, patterns)
+                    LOG.debug("Autotune %d Hz, queue depth %d: %s", frequency, depth,
+                            "failed" if throughput is None else ("%.1f kB/s" % (throughput / 1000)))
+                    if throughput is None:
+                        self._recover(base)
+                    else:
+                        stable = True
+                        results.append(ProbeSettings(frequency, depth, throughput))
+                # A higher clock will not work if none of the queue depths did at this one.
+                if not stable:
+                    break
+        finally:
+            self.apply(base)
+            target.write_memory_block8(address, saved_ram)
+            target.flush()
+
+        if not results:
+            LOG.warning("Probe autotune found no working settings")
+            return None
+
+        best = max(r.throughput for r in results)
+        chosen = min((r for r in results if r.throughput >= best * (1.0 - self.TOLERANCE)),
+                key=lambda r: (r.frequency, r.queue_depth))
+        LOG.info("Autotuned %s: %d Hz, queue depth %d (%.1f kB/s)", self.cache_key,
+                chosen.frequency, chosen.queue_depth, chosen.throughput / 1000)
+        self.apply(chosen)
+        self._save_cache(chosen)
+        return chosen
@@ -22,8 +22,9 @@ import logging
 from typing import (Callable, Collection, Dict, List, Optional, overload, Sequence, Set, TYPE_CHECKING, Tuple, Union)
 from typing_extensions import (Literal, Protocol)
 
-from .debug_probe import DebugProbe
+from .debug_probe import (DebugProbe, TransferStatistics)
 from ..core import exceptions
+from ..core.memory_interface import BytesLike
 from ..core.plugin import Plugin
 from ..core.options import OptionInfo
 from .pydapaccess import DAPAccess
@@ -392,6 +393,22 @@ class CMSISDAPProbe(DebugProbe):
         except DAPAccess.Error as exc:
             raise self._convert_exception(exc) from exc
 
+    @property
+    def max_queue_depth(self) -> int:
+        return self._link.max_packet_count
+
+    @property
+    def transfer_statistics(self) -> Optional[TransferStatistics]:
+        return self._link.transfer_statistics
+
+    def set_queue_depth(self, depth: int) -> None:
+        TRACE.debug("trace: set_queue_depth(depth=%i)", depth)
+
+        try:
+            self._link.set_packet_count(depth)
+        except DAPAccess.Error as exc:
+            raise self._convert_exception(exc) from exc
+
     def reset(self) -> None:
         assert self.session
         TRACE.debug("trace: reset")
@@ -683,6 +700,42 @@ class CMSISDAPProbe(DebugProbe):
                     ", ".join(["%#010x" % v for v in values]), exc)
             raise self._convert_exception(exc) from exc
 
+    def read_ap_multiple_bytes(self, addr: int, count: int = 1, now: bool = True) \
+             -> Union[BytesLike, Callable[[], BytesLike]]:
+        assert isinstance(addr, int)
+        ap_reg = self.REG_ADDR_TO_ID_MAP[self.AP, (addr & self.A32)]
+
+        try:
+            TRACE.debug("trace: read_ap_multi_bytes(addr=%#010x, count=%i)%s", addr, count, "" if now else " -> ...")
+            result = self._link.reg_read_repeat_bytes(count, ap_reg, dap_index=0, now=now)
+        except DAPAccess.Error as exc:
+            raise self._convert_exception(exc) from exc
+
+        # Need to wrap the deferred callback to convert exceptions.
+        def read_ap_repeat_bytes_callback():
+            try:
+                return result()
+            except DAPAccess.Error as exc:
+                TRACE.debug("trace: ... read_ap_multi_bytes(addr=%#010x, count=%i) -> error(%s)",
+                    addr, count, exc)
+                raise self._convert_exception(exc) from exc
+
+        if now:
+            return result
+        else:
+            return read_ap_repeat_bytes_callback
+
+    def write_ap_multiple_bytes(self, addr: int, data: BytesLike) -> None:
+        assert isinstance(addr, int)
+        ap_reg = self.REG_ADDR_TO_ID_MAP[self.AP, (addr & self.A32)]
+
+        try:
+            self._link.reg_write_repeat_bytes(ap_reg, data, dap_index=0)
+            TRACE.debug("trace: write_ap_multi_bytes(addr=%#010x, %i bytes)", addr, len(data))
+        except DAPAccess.Error as exc:
+            TRACE.debug("trace: write_ap_multi_bytes(addr=%#010x, %i bytes) -> error(%s)", addr, len(data), exc)
+            raise self._convert_exception(exc) from exc
+
     # ------------------------------------------- #
     #          SWO functions
     # ------------------------------------------- #
@@ -747,6 +800,9 @@ class CMSISDAPProbePlugin(Plugin):
     def options(self):
         """@brief Returns CMSIS-DAP probe options."""
         return [
+            OptionInfo('cmsis_dap.batch_commands', bool, True,
+                "Whether to pack CMSIS-DAP commands together with transfers using DAP_ExecuteCommands, when the "
+                "probe supports it and deferred transfers are enabled."),
             OptionInfo('cmsis_dap.deferred_transfers', bool, True,
                 "Whether the CMSIS-DAP probe backend will use deferred transfers for improved performance."),
             OptionInfo('cmsis_dap.limit_packets', bool, False,
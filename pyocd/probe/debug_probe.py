@@ -19,9 +19,12 @@ from __future__ import annotations
 
 from enum import (Enum, IntFlag)
 import threading
-from typing import (Callable, Collection, Optional, overload, Sequence, Set, TYPE_CHECKING, Tuple, Union)
+from typing import (Callable, Collection, Optional, cast, overload, Sequence, Set, TYPE_CHECKING, Tuple, Union)
 from typing_extensions import Literal
 
+from ..core.memory_interface import BytesLike
+from ..utility import conversion
+
 if TYPE_CHECKING:
     from ..core.session import Session
     from ..core.memory_interface import MemoryInterface
@@ -29,6 +32,19 @@ if TYPE_CHECKING:
     from ..board.board_ids import BoardInfo
     from ..coresight.ap import APAddressBase
 
+class TransferStatistics:
+    """@brief Counters of a debug probe's command round trips.
+
+    A round trip starts when a command is sent with no other commands outstanding, and ends when
+    the responses to all outstanding commands have been read.
+    """
+
+    def __init__(self) -> None:
+        ## Number of round trips.
+        self.round_trips = 0
+        ## Total seconds with at least one command outstanding.
+        self.transfer_time = 0.0
+
 class DebugProbe:
     """@brief Abstract debug probe class.
 
@@ -357,6 +373,29 @@ class DebugProbe:
         """
         raise NotImplementedError()
 
+    @property
+    def max_queue_depth(self) -> int:
+        """@brief Maximum number of commands the probe can have in flight at once.
+
+        Probes that do not pipeline commands return 1.
+        """
+        return 1
+
+    @property
+    def transfer_statistics(self) -> Optional[TransferStatistics]:
+        """@brief Round trip counters for the probe, or None if the probe doesn't keep them."""
+        return None
+
+    def set_queue_depth(self, depth: int) -> None:
+        """@brief Limit the number of commands the probe will have in flight at once.
+
+        This API may be a no-op for certain debug probe types.
+
+        @param self
+        @param depth Number of commands, from 1 to max_queue_depth.
+        """
+        pass
+
     def reset(self) -> None:
         """@brief Perform a hardware reset of the target."""
         raise NotImplementedError()
@@ -505,6 +544,30 @@ class DebugProbe:
         """@brief Write one AP register multiple times."""
         raise NotImplementedError()
 
+    def read_ap_multiple_bytes(self, addr: int, count: int = 1, now: bool = True) \
+             -> Union[BytesLike, Callable[[], BytesLike]]:
+        """@brief Read one AP register multiple times, returning the words as bytes.
+
+        The result is a bytes-like object containing _count_ little-endian words. Probes that can
+        produce the data natively as bytes should override this method. The default implementation
+        packs the values returned by read_ap_multiple().
+        """
+        result = self.read_ap_multiple(addr, count, now=now)
+
+        if now:
+            return conversion.u32le_list_to_bytes(cast(Sequence[int], result))
+        else:
+            def read_ap_multiple_bytes_cb() -> BytesLike:
+                return conversion.u32le_list_to_bytes(cast(Callable[[], Sequence[int]], result)())
+            return read_ap_multiple_bytes_cb
+
+    def write_ap_multiple_bytes(self, addr: int, data: BytesLike) -> None:
+        """@brief Write one AP register multiple times with little-endian words from a bytes-like object.
+
+        The default implementation unpacks the data and calls write_ap_multiple().
+        """
+        self.write_ap_multiple(addr, conversion.bytes_to_u32le_list(data))
+
     def get_memory_interface_for_ap(self, ap_address: APAddressBase) -> Optional[MemoryInterface]:
         """@brief Returns a @ref pyocd.core.memory_interface.MemoryInterface "MemoryInterface" for
             the specified AP.
@@ -16,7 +16,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import (Set, Tuple)
+from typing import (Callable, Optional, Set, Tuple)
 
 from .dap_access_api import DAPAccessIntf
 
@@ -156,11 +156,53 @@ class DAPTransferResponse:
     ACK_FAULT = 4
     ACK_NO_ACK = 7
 
+## @brief Signature of a command queue callback.
+#
+# The parameters are the encoded command, the response decoder, and the length of the response.
+CommandQueueCallback = Callable[[bytearray, Callable, int], None]
+
+def _status_response(command: int, name: str) -> Callable:
+    """@brief Create a decoder for commands whose response is only a status byte."""
+    def decode(resp):
+        if resp[0] != command:
+            # Response is to a different command
+            raise DAPAccessIntf.DeviceError("expected %s" % name)
+
+        if resp[1] != DAP_OK:
+            raise DAPAccessIntf.CommandError("%s failed" % name)
+
+        return resp[1]
+    return decode
+
 class CMSISDAPProtocol(object):
-    """@brief This class implements the CMSIS-DAP wire protocol."""
+    """@brief This class implements the CMSIS-DAP wire protocol.
+
+    Commands whose response has a fixed length can be redirected to a queue with
+    set_command_queue(), so they can be packed into DAP_ExecuteCommands packets by the caller.
+    While a queue is set, these commands return None and their response is checked by the
+    decoder passed to the queue.
+    """
 
     def __init__(self, interface):
         self.interface = interface
+        self._command_queue: Optional[CommandQueueCallback] = None
+
+    def set_command_queue(self, queue: Optional[CommandQueueCallback]) -> None:
+        """@brief Redirect queueable commands to a callback instead of executing them.
+
+        @param self
+        @param queue Callable accepting the encoded command, a response decoder, and the response
+            length. Pass None to resume executing commands immediately.
+        """
+        self._command_queue = queue
+
+    def _execute(self, cmd, decode, response_length=2):
+        """@brief Execute a queueable command, or pass it to the command queue if one is set."""
+        if self._command_queue is not None:
+            self._command_queue(bytearray(cmd), decode, response_length)
+            return None
+        self.interface.write(cmd)
+        return decode(self.interface.read())
 
     def dap_info(self, id_):
         """@brief Sends the DAP_Info command to read info from the CMSIS-DAP probe.
@@ -211,51 +253,29 @@ class CMSISDAPProtocol(object):
         cmd.append(Command.DAP_LED)
         cmd.append(type)
         cmd.append(int(enabled))
-        self.interface.write(cmd)
-
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_LED:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_LED")
-
-        if resp[1] != 0:
-            # Second response byte must be 0
-            raise DAPAccessIntf.CommandError("DAP_LED failed")
-
-        return resp[1]
+        return self._execute(cmd, _status_response(Command.DAP_LED, "DAP_LED"))
 
     def connect(self, mode=DAP_DEFAULT_PORT):
         cmd = []
         cmd.append(Command.DAP_CONNECT)
         cmd.append(mode)
-        self.interface.write(cmd)
 
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_CONNECT:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_CONNECT")
+        def decode(resp):
+            if resp[0] != Command.DAP_CONNECT:
+                # Response is to a different command
+                raise DAPAccessIntf.DeviceError("expected DAP_CONNECT")
 
-        if resp[1] == 0:
-            # DAP connect failed
-            raise DAPAccessIntf.CommandError("DAP_CONNECT failed")
+            if resp[1] == 0:
+                # DAP connect failed
+                raise DAPAccessIntf.CommandError("DAP_CONNECT failed")
 
-        return resp[1]
+            return resp[1]
+        return self._execute(cmd, decode)
 
     def disconnect(self):
         cmd = []
         cmd.append(Command.DAP_DISCONNECT)
-        self.interface.write(cmd)
-
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_DISCONNECT:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_DISCONNECT")
-
-        if resp[1] != DAP_OK:
-            # DAP Disconnect failed
-            raise DAPAccessIntf.CommandError("DAP_DISCONNECT failed")
-
-        return resp[1]
+        return self._execute(cmd, _status_response(Command.DAP_DISCONNECT, "DAP_DISCONNECT"))
 
     def write_abort(self, data, dap_index=0):
         cmd = []
@@ -265,34 +285,16 @@ class CMSISDAPProtocol(object):
         cmd.append((data >> 8) & 0xff)
         cmd.append((data >> 16) & 0xff)
         cmd.append((data >> 24) & 0xff)
-        self.interface.write(cmd)
-
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_WRITE_ABORT:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_WRITE_ABORT")
-
-        if resp[1] != DAP_OK:
-            # DAP Write Abort failed
-            raise DAPAccessIntf.CommandError("DAP_WRITE_ABORT failed")
-
-        return True
+        result = self._execute(cmd, _status_response(Command.DAP_WRITE_ABORT, "DAP_WRITE_ABORT"))
+        return None if (result is None) else True
 
     def reset_target(self):
         cmd = []
         cmd.append(Command.DAP_RESET_TARGET)
-        self.interface.write(cmd)
-
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_RESET_TARGET:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_RESET_TARGET")
-
-        if resp[1] != DAP_OK:
-            # DAP Reset target failed
-            raise DAPAccessIntf.CommandError("DAP_RESET_TARGET failed")
-
-        return resp[1]
+        # The response has an additional byte indicating whether a device specific reset sequence
+        # was executed.
+        return self._execute(cmd, _status_response(Command.DAP_RESET_TARGET, "DAP_RESET_TARGET"),
+                response_length=3)
 
     def transfer_configure(self, idle_cycles=0x02, wait_retry=0x0050, match_retry=0x0000):
         cmd = []
@@ -302,18 +304,7 @@ class CMSISDAPProtocol(object):
         cmd.append(wait_retry >> 8)
         cmd.append(match_retry & 0xff)
         cmd.append(match_retry >> 8)
-        self.interface.write(cmd)
-
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_TRANSFER_CONFIGURE:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_TRANSFER_CONFIGURE")
-
-        if resp[1] != DAP_OK:
-            # DAP Transfer Configure failed
-            raise DAPAccessIntf.CommandError("DAP_TRANSFER_CONFIGURE failed")
-
-        return resp[1]
+        return self._execute(cmd, _status_response(Command.DAP_TRANSFER_CONFIGURE, "DAP_TRANSFER_CONFIGURE"))
 
 
     def set_swj_clock(self, clock=1000000):
@@ -323,18 +314,7 @@ class CMSISDAPProtocol(object):
         cmd.append((clock >> 8) & 0xff)
         cmd.append((clock >> 16) & 0xff)
         cmd.append((clock >> 24) & 0xff)
-        self.interface.write(cmd)
-
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_SWJ_CLOCK:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_SWJ_CLOCK")
-
-        if resp[1] != DAP_OK:
-            # DAP SWJ Clock failed
-            raise DAPAccessIntf.CommandError("DAP_SWJ_CLOCK failed")
-
-        return resp[1]
+        return self._execute(cmd, _status_response(Command.DAP_SWJ_CLOCK, "DAP_SWJ_CLOCK"))
 
     def set_swj_pins(self, output, pins, wait=0):
         cmd = []
@@ -345,14 +325,14 @@ class CMSISDAPProtocol(object):
         cmd.append((wait >> 8) & 0xff)
         cmd.append((wait >> 16) & 0xff)
         cmd.append((wait >> 24) & 0xff)
-        self.interface.write(cmd)
 
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_SWJ_PINS:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_SWJ_PINS")
+        def decode(resp):
+            if resp[0] != Command.DAP_SWJ_PINS:
+                # Response is to a different command
+                raise DAPAccessIntf.DeviceError("expected DAP_SWJ_PINS")
 
-        return resp[1]
+            return resp[1]
+        return self._execute(cmd, decode)
 
     def swd_configure(self, turnaround=1, always_send_data_phase=False):
         assert 1 <= turnaround <= 4
@@ -361,18 +341,7 @@ class CMSISDAPProtocol(object):
         cmd = []
         cmd.append(Command.DAP_SWD_CONFIGURE)
         cmd.append(conf)
-        self.interface.write(cmd)
-
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_SWD_CONFIGURE:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_SWD_CONFIGURE")
-
-        if resp[1] != DAP_OK:
-            # DAP SWD Configure failed
-            raise DAPAccessIntf.CommandError("DAP_SWD_CONFIGURE failed")
-
-        return resp[1]
+        return self._execute(cmd, _status_response(Command.DAP_SWD_CONFIGURE, "DAP_SWD_CONFIGURE"))
 
     def swd_sequence(self, sequences):
         """@brief Send the DAP_SWD_Sequence command.
@@ -447,18 +416,7 @@ class CMSISDAPProtocol(object):
         for i in range((length + 7) // 8):
             cmd.append(bits & 0xff)
             bits >>= 8
-        self.interface.write(cmd)
-
-        resp = self.interface.read()
-        if resp[0] != Command.DAP_SWJ_SEQUENCE:
-            # Response is to a different command
-            raise DAPAccessIntf.DeviceError("expected DAP_SWJ_SEQUENCE")
-
-        if resp[1] != DAP_OK:
-            # DAP SWJ Sequence failed
-            raise DAPAccessIntf.CommandError("DAP_SWJ_SEQUENCE failed")
-
-        return resp[1]
+        return self._execute(cmd, _status_response(Command.DAP_SWJ_SEQUENCE, "DAP_SWJ_SEQUENCE"))
 
     def jtag_sequence(self, cycles, tms, read_tdo, tdi):
         assert 0 <= cycles <= 64
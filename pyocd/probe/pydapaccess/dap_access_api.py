@@ -17,7 +17,10 @@
 
 
 from enum import Enum
-from typing import (Optional, Tuple, Sequence)
+from typing import (Optional, Tuple, Sequence, TYPE_CHECKING)
+
+if TYPE_CHECKING:
+    from ..debug_probe import TransferStatistics
 
 class DAPAccessIntf(object):
 
@@ -275,6 +278,20 @@ class DAPAccessIntf(object):
         """@brief Return the current port type - SWD or JTAG"""
         raise NotImplementedError()
 
+    @property
+    def max_packet_count(self) -> int:
+        """@brief Number of command packets the probe can buffer"""
+        raise NotImplementedError()
+
+    def set_packet_count(self, count):
+        """@brief Limit the number of command packets in flight"""
+        raise NotImplementedError()
+
+    @property
+    def transfer_statistics(self) -> Optional["TransferStatistics"]:
+        """@brief Round trip counters for command packets, or None if not kept"""
+        return None
+
     def reset(self):
         """@brief Reset the target"""
         raise NotImplementedError()
@@ -349,3 +366,15 @@ class DAPAccessIntf(object):
     def reg_read_repeat(self, num_repeats, reg_id, dap_index=0, now=True):
         """@brief Read one or more words from the same DP or AP register"""
         raise NotImplementedError()
+
+    def reg_write_repeat_bytes(self, reg_id, data, dap_index=0):
+        """@brief Write little-endian words from a bytes-like object to the same DP or AP register"""
+        raise NotImplementedError()
+
+    def reg_read_repeat_bytes(self, num_repeats, reg_id, dap_index=0, now=True):
+        """@brief Read one or more words from the same DP or AP register into a bytes-like object
+
+        The result holds the words read in little-endian order. It may be a memoryview that
+        references the probe's response packet.
+        """
+        raise NotImplementedError()
@@ -19,13 +19,15 @@
 import re
 import logging
 import collections
+import struct
 import threading
+from time import perf_counter
 from typing import (Any, Dict, Optional, Tuple, Union)
 
 from .dap_settings import DAPSettings
 from .dap_access_api import DAPAccessIntf
 from .cmsis_dap_core import CMSISDAPProtocol
-from .interface import (INTERFACE, USB_BACKEND, USB_BACKEND_V2)
+from .interface import (INTERFACE, USB_BACKEND, USB_BACKEND_V2, USB_BACKEND_SIMULATED)
 from .interface.common import ARM_DAPLINK_ID
 from .cmsis_dap_core import (
     Command,
@@ -37,6 +39,7 @@ from .cmsis_dap_core import (
     DAPTransferResponse,
     CMSISDAPVersion,
     )
+from ..debug_probe import TransferStatistics
 from ...core import session
 from ...utility.concurrency import locked
 
@@ -53,6 +56,41 @@ WRITE = 0 << 1
 VALUE_MATCH = 1 << 4
 MATCH_MASK = 1 << 5
 
+# Precompiled packet layouts for transfer commands.
+_TRANSFER_HEADER = struct.Struct('<BBB')            # command, DAP index, transfer count
+_TRANSFER_BLOCK_HEADER = struct.Struct('<BBHB')     # command, DAP index, transfer count, request
+_TRANSFER_WRITE = struct.Struct('<BI')              # request, data word
+_TRANSFER_BLOCK_COUNT = struct.Struct('<H')
+_EXECUTE_COMMANDS_HEADER = struct.Struct('<BB')    # command, number of commands
+
+_WORD_STRUCTS: Dict[int, struct.Struct] = {}
+
+def _word_struct(count: int) -> struct.Struct:
+    """@brief Return a cached Struct for packing or unpacking count little-endian 32-bit words."""
+    try:
+        return _WORD_STRUCTS[count]
+    except KeyError:
+        fmt = _WORD_STRUCTS[count] = struct.Struct(f'<{count}I')
+        return fmt
+
+def _unpack_words(data, count: int) -> Tuple[int, ...]:
+    """@brief Unpack count little-endian 32-bit words from the bytes-like object data."""
+    return _word_struct(count).unpack_from(data)
+
+def _as_memoryview(data) -> memoryview:
+    """@brief Return a byte-format memoryview of data, which is a packet returned by an interface.
+
+    Backends normally return bytes or bytearray, in which case no copy is made. Other sequences of
+    ints are converted.
+    """
+    try:
+        view = memoryview(data)
+    except TypeError:
+        return memoryview(bytes(data))
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    return view
+
 # SWO statuses.
 class SWOStatus:
     DISABLED = 1
@@ -74,6 +112,10 @@ def _get_interfaces():
     # Get CMSIS-DAPv1 interfaces.
     v1_interfaces = INTERFACE[USB_BACKEND].get_all_connected_interfaces()
 
+    # The simulated backend stands in for all USB devices.
+    if USB_BACKEND == USB_BACKEND_SIMULATED:
+        return v1_interfaces
+
     # Get CMSIS-DAPv2 interfaces.
     v2_interfaces = INTERFACE[USB_BACKEND_V2].get_all_connected_interfaces()
 
@@ -104,6 +146,10 @@ class _Transfer(object):
 
     The transfer class contains a logical register read or a block
     of reads to the same register.
+
+    Response data is attached to the transfer as memoryview slices of the packets read from the
+    probe. A transfer that is satisfied by a single packet keeps a reference to that slice, so no
+    copy of the data is made until the result is unpacked.
     """
 
     def __init__(self, daplink, dap_index, transfer_count,
@@ -122,6 +168,9 @@ class _Transfer(object):
         self._size_bytes = 0
         if transfer_request & READ:
             self._size_bytes = transfer_count * 4
+        self._pending_bytes = self._size_bytes
+        self._chunks = []
+        self._data = None
         self._result = None
         self._error = None
 
@@ -130,19 +179,31 @@ class _Transfer(object):
         """
         return self._size_bytes
 
+    def get_pending_size(self):
+        """@brief Get the number of response bytes that have not yet been added to this transfer.
+        """
+        return self._pending_bytes
+
     def add_response(self, data):
         """@brief Add data read from the remote device to this object.
 
-        The size of data added must match exactly the size
-        that get_data_size returns.
+        The data may be added in several consecutive pieces if the transfer spanned more than
+        one packet. The total size of data added must match exactly the size that get_data_size
+        returns.
+
+        @param self
+        @param data A bytes-like object, normally a memoryview slice of a response packet.
         """
-        assert len(data) == self._size_bytes
-        result = []
-        for i in range(0, self._size_bytes, 4):
-            word = ((data[0 + i] << 0) | (data[1 + i] << 8) |
-                    (data[2 + i] << 16) | (data[3 + i] << 24))
-            result.append(word)
-        self._result = result
+        size = len(data)
+        assert size <= self._pending_bytes
+        self._pending_bytes -= size
+        self._chunks.append(data)
+        if self._pending_bytes == 0:
+            if len(self._chunks) == 1:
+                self._data = self._chunks[0]
+            else:
+                self._data = b''.join(self._chunks)
+            self._chunks = []
 
     def add_error(self, error):
         """@brief Attach an exception to this transfer rather than data.
@@ -150,10 +211,9 @@ class _Transfer(object):
         assert isinstance(error, Exception)
         self._error = error
 
-    def get_result(self):
-        """@brief Get the result of this transfer.
-        """
-        while self._result is None:
+    def _wait_for_data(self):
+        """@brief Process packets until this transfer has either data or an error attached."""
+        while self._data is None and self._error is None:
             if len(self.daplink._commands_to_read) > 0:
                 self.daplink._read_packet()
             else:
@@ -167,7 +227,23 @@ class _Transfer(object):
             # pylint: disable=raising-bad-type
             raise self._error
 
-        assert self._result is not None
+    def get_result_bytes(self):
+        """@brief Get the result of this transfer as a bytes-like object.
+
+        The returned object is usually a memoryview slice of the response packet. It holds
+        _transfer_count_ little-endian words.
+        """
+        self._wait_for_data()
+        assert self._data is not None
+        return self._data
+
+    def get_result(self):
+        """@brief Get the result of this transfer as a list of 32-bit words.
+        """
+        if self._result is None:
+            self._wait_for_data()
+            assert self._data is not None
+            self._result = list(_unpack_words(self._data, self.transfer_count))
         return self._result
 
 class _Command(object):
@@ -180,6 +256,11 @@ class _Command(object):
     decides if it is more efficient to use DAP_Transfer or DAP_TransferBlock.
     The payload to send over the layer below is constructed with
     encode_data.  The response to the command is decoded with decode_data.
+
+    Other commands with fixed size responses may be placed ahead of the
+    transfers with add_command. The packet is then sent as DAP_ExecuteCommands
+    (or DAP_QueueCommands), and the responses of those commands are checked
+    by decode_data before the transfer response is decoded.
     """
 
     _command_counter = 0
@@ -190,6 +271,9 @@ class _Command(object):
         self._id = _Command._command_counter
         _Command._command_counter += 1
         self._size = size
+        self._send_size = size
+        self._recv_size = size
+        self._commands = []
         self._read_count = 0
         self._write_count = 0
         self._block_allowed = True
@@ -211,13 +295,13 @@ class _Command(object):
             #   BYTE | BYTE *****| SHORT**********| BYTE *************| WORD *********|
             # > 0x06 | DAP Index | Transfer Count | Transfer Request  | Transfer Data |
             #  ******|***********|****************|*******************|+++++++++++++++|
-            send = self._size - 5 - 4 * self._write_count
+            send = self._send_size - 5 - 4 * self._write_count
 
             # DAP_TransferBlock response packet:
             #   BYTE | SHORT *********| BYTE *************| WORD *********|
             # < 0x06 | Transfer Count | Transfer Response | Transfer Data |
             #  ******|****************|*******************|+++++++++++++++|
-            recv = self._size - 4 - 4 * self._read_count
+            recv = self._recv_size - 4 - 4 * self._read_count
 
             if isRead:
                 return recv // 4
@@ -228,13 +312,13 @@ class _Command(object):
             #   BYTE | BYTE *****| BYTE **********| BYTE *************| WORD *********|
             # > 0x05 | DAP Index | Transfer Count | Transfer Request  | Transfer Data |
             #  ******|***********|****************|+++++++++++++++++++++++++++++++++++|
-            send = self._size - 3 - 1 * self._read_count - 5 * self._write_count
+            send = self._send_size - 3 - 1 * self._read_count - 5 * self._write_count
 
             # DAP_Transfer response packet:
             #   BYTE | BYTE **********| BYTE *************| WORD *********|
             # < 0x05 | Transfer Count | Transfer Response | Transfer Data |
             #  ******|****************|*******************|+++++++++++++++|
-            recv = self._size - 3 - 4 * self._read_count
+            recv = self._recv_size - 3 - 4 * self._read_count
 
             if isRead:
                 # 1 request byte in request packet, 4 data bytes in response packet
@@ -283,13 +367,51 @@ class _Command(object):
             (self._get_free_transfers(self._block_allowed, False) == 0)
 
     def get_empty(self):
-        """@brief Return True if no transfers have been added to this packet
+        """@brief Return True if no transfers or commands have been added to this packet
         """
-        return len(self._data) == 0
+        return len(self._data) == 0 and len(self._commands) == 0
+
+    def has_transfers(self):
+        """@brief Return True if any transfers have been added to this packet."""
+        return len(self._data) != 0
+
+    def add_command(self, request, decode, response_length):
+        """@brief Add a non-transfer command to this packet.
+
+        Commands must be added before any transfers, so they are executed in the order they were
+        issued.
+
+        @param self
+        @param request Encoded command.
+        @param decode Callable that checks the command's response, raising an exception on error.
+        @param response_length Length of the command's response.
+        @return Boolean indicating whether the command fit in the packet.
+        """
+        assert self._data_encoded is False
+        if self._data:
+            return False
+
+        # The first command adds the DAP_ExecuteCommands header.
+        header = 0 if self._commands else _EXECUTE_COMMANDS_HEADER.size
+        send_size = self._send_size - header - len(request)
+        recv_size = self._recv_size - header - response_length
+        # Leave room for the command count to include a transfer command.
+        if send_size < 0 or recv_size < 0 or len(self._commands) >= 254:
+            return False
+
+        self._send_size = send_size
+        self._recv_size = recv_size
+        self._commands.append((request, decode, response_length))
+        TRACE.debug("[cmd:%d] add_command(%02x) -> [commands=%d]", self.uid, request[0], len(self._commands))
+        return True
 
     def add(self, count, request, data, dap_index):
         """@brief Add a single or block register transfer operation to this command
+
+        For writes, _data_ is either a sequence of _count_ word values or a byte-format memoryview
+        holding _count_ little-endian words.
         """
+        assert data is None or len(data) == (count * 4 if isinstance(data, memoryview) else count)
         assert self._data_encoded is False
         if self._dap_index == self._UNSET_DAP_INDEX:
             self._dap_index = dap_index
@@ -318,32 +440,23 @@ class _Command(object):
         the format that of a DAP_Transfer CMSIS-DAP command.
         """
         assert self.get_empty() is False
-        buf = bytearray(self._size)
         transfer_count = self._read_count + self._write_count
-        pos = 0
-        buf[pos] = Command.DAP_TRANSFER
-        pos += 1
-        buf[pos] = self._dap_index
-        pos += 1
-        buf[pos] = transfer_count
-        pos += 1
+        buf = bytearray(_TRANSFER_HEADER.size + self._read_count + _TRANSFER_WRITE.size * self._write_count)
+        _TRANSFER_HEADER.pack_into(buf, 0, Command.DAP_TRANSFER, self._dap_index, transfer_count)
+        pos = _TRANSFER_HEADER.size
+        pack_write = _TRANSFER_WRITE.pack_into
         for count, request, write_list in self._data:
-            assert write_list is None or len(write_list) <= count
-            write_pos = 0
-            for _ in range(count):
-                buf[pos] = request
-                pos += 1
-                if not request & READ:
-                    buf[pos] = (write_list[write_pos] >> (8 * 0)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 1)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 2)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 3)) & 0xff
-                    pos += 1
-                    write_pos += 1
-        return buf[:pos]
+            if request & READ:
+                buf[pos:pos + count] = bytes((request,)) * count
+                pos += count
+            else:
+                if isinstance(write_list, memoryview):
+                    write_list = _unpack_words(write_list, count)
+                for value in write_list:
+                    pack_write(buf, pos, request, value)
+                    pos += _TRANSFER_WRITE.size
+        assert pos == len(buf)
+        return buf
 
     def _check_response(self, response):
         """@brief Check the response status byte from CMSIS-DAP transfer commands.
@@ -379,7 +492,7 @@ class _Command(object):
         """@brief Take a byte array and extract the data from it
 
         Decode the response returned by a DAP_Transfer CMSIS-DAP command
-        and return it as an array of bytes.
+        and return the read data as a memoryview slice of the response.
         """
         assert self.get_empty() is False
         if data[0] != Command.DAP_TRANSFER:
@@ -404,43 +517,30 @@ class _Command(object):
         the format that of a DAP_TransferBlock CMSIS-DAP command.
         """
         assert self.get_empty() is False
-        buf = bytearray(self._size)
         transfer_count = self._read_count + self._write_count
         assert not (self._read_count != 0 and self._write_count != 0)
         assert self._block_request is not None
-        pos = 0
-        buf[pos] = Command.DAP_TRANSFER_BLOCK
-        pos += 1
-        buf[pos] = self._dap_index
-        pos += 1
-        buf[pos] = transfer_count & 0xff
-        pos += 1
-        buf[pos] = (transfer_count >> 8) & 0xff
-        pos += 1
-        buf[pos] = self._block_request
-        pos += 1
+        buf = bytearray(_TRANSFER_BLOCK_HEADER.size + 4 * self._write_count)
+        _TRANSFER_BLOCK_HEADER.pack_into(buf, 0, Command.DAP_TRANSFER_BLOCK, self._dap_index,
+                transfer_count, self._block_request)
+        pos = _TRANSFER_BLOCK_HEADER.size
         for count, request, write_list in self._data:
-            assert write_list is None or len(write_list) <= count
             assert request == self._block_request
-            write_pos = 0
             if not request & READ:
-                for _ in range(count):
-                    buf[pos] = (write_list[write_pos] >> (8 * 0)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 1)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 2)) & 0xff
-                    pos += 1
-                    buf[pos] = (write_list[write_pos] >> (8 * 3)) & 0xff
-                    pos += 1
-                    write_pos += 1
-        return buf[:pos]
+                if isinstance(write_list, memoryview):
+                    # Byte data is copied directly into the packet.
+                    buf[pos:pos + 4 * count] = write_list
+                else:
+                    _word_struct(count).pack_into(buf, pos, *write_list)
+                pos += 4 * count
+        assert pos == len(buf)
+        return buf
 
     def _decode_transfer_block_data(self, data):
         """@brief Take a byte array and extract the data from it
 
         Decode the response returned by a DAP_TransferBlock CMSIS-DAP command
-        and return it as an array of bytes.
+        and return the read data as a memoryview slice of the response.
         """
         assert self.get_empty() is False
         if data[0] != Command.DAP_TRANSFER_BLOCK:
@@ -453,31 +553,82 @@ class _Command(object):
         # Check for count mismatch after checking for DAP_TRANSFER_FAULT
         # This allows TransferFaultError or TransferTimeoutError to get
         # thrown instead of TransferFaultError
-        transfer_count = data[1] | (data[2] << 8)
+        transfer_count, = _TRANSFER_BLOCK_COUNT.unpack_from(data, 1)
         if transfer_count != self._read_count + self._write_count:
             raise DAPAccessIntf.TransferError()
 
         return data[4:4 + 4 * self._read_count]
 
-    def encode_data(self):
+    def _encode_commands(self, data, queue):
+        """@brief Prefix the encoded transfer with the added commands
+
+        The packet is a DAP_ExecuteCommands command, or DAP_QueueCommands if
+        _queue_ is True.
+        """
+        command_id = Command.DAP_QUEUE_COMMANDS if queue else Command.DAP_EXECUTE_COMMANDS
+        count = len(self._commands) + (1 if data else 0)
+        buf = bytearray(_EXECUTE_COMMANDS_HEADER.pack(command_id, count))
+        for request, _, _ in self._commands:
+            buf += request
+        buf += data
+        return buf
+
+    def _decode_commands(self, data):
+        """@brief Check the responses to the added commands
+
+        Returns a memoryview slice of the remaining response data, which holds
+        the transfer response if transfers were added.
+        """
+        # Responses to queued commands are returned as if they had been executed by DAP_ExecuteCommands.
+        if data[0] not in (Command.DAP_EXECUTE_COMMANDS, Command.DAP_QUEUE_COMMANDS):
+            TRACE.debug("[cmd:%d] response not DAP_EXECUTE_COMMANDS", self.uid)
+            raise DAPAccessIntf.DeviceError(f'DAP_EXECUTE_COMMANDS response error: response is for command {data[0]:02x}')
+        count = len(self._commands) + (1 if self._data else 0)
+        if data[1] != count:
+            raise DAPAccessIntf.DeviceError("DAP_EXECUTE_COMMANDS executed %d of %d commands" % (data[1], count))
+
+        pos = _EXECUTE_COMMANDS_HEADER.size
+        for _, decode, response_length in self._commands:
+            decode(data[pos:pos + response_length])
+            pos += response_length
+        return data[pos:]
+
+    def encode_data(self, queue=False):
         """@brief Encode this command into a byte array that can be sent
 
         The actual command this is encoded into depends on the data
         that was added.
+
+        @param self
+        @param queue Whether to send added commands with DAP_QueueCommands, so the probe holds
+            them until the next packet that is not queued.
         """
         assert self.get_empty() is False
+        assert not queue or self._commands
         self._data_encoded = True
-        if self._block_allowed:
+        if not self._data:
+            data = bytearray()
+        elif self._block_allowed:
             data = self._encode_transfer_block_data()
         else:
             data = self._encode_transfer_data()
+        if self._commands:
+            data = self._encode_commands(data, queue)
         return data
 
     def decode_data(self, data):
         """@brief Decode the response data
+
+        @param self
+        @param data Byte-format memoryview of the response packet.
+        @return Memoryview slice of _data_ containing only the read data words.
         """
         assert self.get_empty() is False
         assert self._data_encoded is True
+        if self._commands:
+            data = self._decode_commands(data)
+            if not self._data:
+                return data[0:0]
         if self._block_allowed:
             data = self._decode_transfer_block_data(data)
         else:
@@ -590,13 +741,17 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         self._crnt_cmd = _Command(0)
         self._packet_size = None
         self._commands_to_read = collections.deque()
-        self._command_response_buf = bytearray()
+        self._commands_queued = False
+        self._batch_commands = False
         self._swo_status = None
         self._cmsis_dap_version: VersionTuple = CMSISDAPVersion.V1_0_0
         self._fw_version: Optional[str] = None
         self._has_opened_once = False
         self._is_open: bool = False
         self._cached_info: Dict[DAPAccessIntf.ID, Any] = {}
+        self._transfer_statistics = TransferStatistics()
+        # Time the current round trip started, or None if no packets are outstanding.
+        self._round_trip_start: Optional[float] = None
 
     @property
     def protocol_version(self) -> VersionTuple:
@@ -661,6 +816,14 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
     def has_swd_sequence(self):
         return self._cmsis_dap_version >= CMSISDAPVersion.V1_2_0
 
+    @property
+    def has_command_batching(self) -> bool:
+        """@brief Whether the probe supports the DAP_ExecuteCommands and DAP_QueueCommands commands."""
+        return (((self._capabilities & Capabilities.ATOMIC_COMMANDS) != 0)
+                and ((self._cmsis_dap_version >= CMSISDAPVersion.V2_1_0)
+                    or ((self._cmsis_dap_version >= CMSISDAPVersion.V1_1_0)
+                        and (self._cmsis_dap_version < CMSISDAPVersion.V2_0_0))))
+
     @property
     def supports_board_and_target_names(self) -> bool:
         """@brief Boolean of whether board_names and target_names are supported."""
@@ -806,6 +969,11 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
             self._swo_buffer_size = 0
         self._swo_status = SWOStatus.DISABLED
 
+        self._batch_commands = (self.has_command_batching
+                and session.Session.get_current().options['cmsis_dap.batch_commands'])
+        if self._batch_commands:
+            LOG.debug("Batching CMSIS-DAP commands")
+
         self._init_deferred_buffers()
 
         self._has_opened_once = True
@@ -831,11 +999,12 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
 
     @locked
     def assert_reset(self, asserted):
-        self.flush()
         if asserted:
-            self._protocol.set_swj_pins(0, Pin.nRESET)
+            self._batched(self._protocol.set_swj_pins, 0, Pin.nRESET)
         else:
-            self._protocol.set_swj_pins(Pin.nRESET, Pin.nRESET)
+            self._batched(self._protocol.set_swj_pins, Pin.nRESET, Pin.nRESET)
+        # The caller times the reset pulse, so the pin must change before returning.
+        self.flush()
 
     @locked
     def is_reset_asserted(self):
@@ -845,13 +1014,31 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
 
     @locked
     def set_clock(self, frequency):
-        self.flush()
-        self._protocol.set_swj_clock(int(frequency))
+        self._batched(self._protocol.set_swj_clock, int(frequency))
         self._frequency = frequency
 
     def get_swj_mode(self):
         return self._dap_port
 
+    @property
+    def max_packet_count(self) -> int:
+        """@brief Number of packets the probe can buffer, as reported by the probe."""
+        return self._packet_count
+
+    @property
+    def transfer_statistics(self) -> TransferStatistics:
+        """@brief Round trips made by command packets since the probe was created."""
+        return self._transfer_statistics
+
+    @locked
+    def set_packet_count(self, count):
+        """@brief Limit the number of packets in flight.
+
+        The count is clamped to the range from 1 to the number of packets reported by the probe.
+        """
+        self.flush()
+        self._interface.set_packet_count(max(1, min(count, self._packet_count)))
+
     def set_deferred_transfer(self, enable):
         """@brief Allow transfers to be delayed and buffered
 
@@ -913,12 +1100,13 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
     @locked
     def connect(self, port=DAPAccessIntf.PORT.DEFAULT):
         assert isinstance(port, DAPAccessIntf.PORT)
+        self.flush()
         actual_port = self._protocol.connect(port.value)
         self._dap_port = DAPAccessIntf.PORT(actual_port)
         # set clock frequency
-        self._protocol.set_swj_clock(self._frequency)
+        self._batched(self._protocol.set_swj_clock, self._frequency)
         # configure transfer
-        self._protocol.transfer_configure()
+        self._batched(self._protocol.transfer_configure)
 
         # configure the selected protocol with defaults.
         if self._dap_port == DAPAccessIntf.PORT.SWD:
@@ -926,13 +1114,12 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         elif self._dap_port == DAPAccessIntf.PORT.JTAG:
             self.configure_jtag()
 
-        self._protocol.set_led(DAP_LED.DAP_DEBUGGER_CONNECTED, 1)
-        self._protocol.set_led(DAP_LED.DAP_TARGET_RUNNING, 0)
+        self._batched(self._protocol.set_led, DAP_LED.DAP_DEBUGGER_CONNECTED, 1)
+        self._batched(self._protocol.set_led, DAP_LED.DAP_TARGET_RUNNING, 0)
 
     @locked
     def configure_swd(self, turnaround=1, always_send_data_phase=False):
-        self.flush()
-        self._protocol.swd_configure(turnaround, always_send_data_phase)
+        self._batched(self._protocol.swd_configure, turnaround, always_send_data_phase)
 
     @locked
     def configure_jtag(self, devices_irlen=None):
@@ -941,8 +1128,7 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
 
     @locked
     def swj_sequence(self, length, bits):
-        self.flush()
-        self._protocol.swj_sequence(length, bits)
+        self._batched(self._protocol.swj_sequence, length, bits)
 
     @locked
     def swd_sequence(self, sequences):
@@ -956,10 +1142,10 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
 
     @locked
     def disconnect(self):
+        self._batched(self._protocol.set_led, DAP_LED.DAP_DEBUGGER_CONNECTED, 0)
+        self._batched(self._protocol.set_led, DAP_LED.DAP_TARGET_RUNNING, 0)
+        self._batched(self._protocol.disconnect)
         self.flush()
-        self._protocol.set_led(DAP_LED.DAP_DEBUGGER_CONNECTED, 0)
-        self._protocol.set_led(DAP_LED.DAP_TARGET_RUNNING, 0)
-        self._protocol.disconnect()
 
     def has_swo(self):
         return self._has_swo_uart
@@ -1101,6 +1287,25 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         request |= (reg_id.value % 4) * 4
         self._write(dap_index, num_repeats, request, data_array)
 
+    def reg_write_repeat_bytes(self, reg_id, data, dap_index=0):
+        assert (len(data) % 4) == 0
+        assert reg_id in self.REG
+        assert isinstance(dap_index, int)
+
+        request = WRITE
+        if reg_id.value < 4:
+            request |= DP_ACC
+        else:
+            request |= AP_ACC
+        request |= (reg_id.value % 4) * 4
+
+        # The data may not be encoded into a packet until a later flush, so take a snapshot of
+        # mutable buffers. This is a single memory copy.
+        view = _as_memoryview(data)
+        if not view.readonly:
+            view = memoryview(bytes(view))
+        self._write(dap_index, len(view) // 4, request, view)
+
     def reg_read_repeat(self, num_repeats, reg_id, dap_index=0,
                         now=True):
         assert isinstance(num_repeats, int)
@@ -1126,6 +1331,33 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
             return reg_read_repeat_cb()
         else:
             return reg_read_repeat_cb
+
+    def reg_read_repeat_bytes(self, num_repeats, reg_id, dap_index=0,
+                        now=True):
+        assert isinstance(num_repeats, int)
+        assert reg_id in self.REG
+        assert isinstance(dap_index, int)
+        assert isinstance(now, bool)
+
+        request = READ
+        if reg_id.value < 4:
+            request |= DP_ACC
+        else:
+            request |= AP_ACC
+        request |= (reg_id.value % 4) * 4
+        transfer = self._write(dap_index, num_repeats, request, None)
+        assert transfer is not None
+
+        def reg_read_repeat_bytes_cb():
+            res = transfer.get_result_bytes()
+            assert len(res) == num_repeats * 4
+            return res
+
+        if now:
+            return reg_read_repeat_bytes_cb()
+        else:
+            return reg_read_repeat_bytes_cb
+
     # ------------------------------------------- #
     #          Private functions
     # ------------------------------------------- #
@@ -1145,9 +1377,41 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         self._crnt_cmd = _Command(self._packet_size)
         # Packets that have been sent but not read
         self._commands_to_read.clear()
-        # Buffer for data returned for completed commands.
-        # This data will be added to transfers
-        self._command_response_buf = bytearray()
+        # Whether the last packet sent was DAP_QueueCommands
+        self._commands_queued = False
+
+    @locked
+    def _batched(self, method, *args):
+        """@brief Call a CMSISDAPProtocol method whose command may be batched
+
+        If the probe supports command batching and deferred transfers are
+        enabled, the command is added to the current packet instead of being
+        sent on its own, and its response is checked when that packet is read.
+        Otherwise pending transfers are flushed and the command is executed
+        immediately.
+        """
+        if not (self._batch_commands and self._deferred_transfer):
+            self.flush()
+            method(*args)
+            return
+        self._protocol.set_command_queue(self._queue_command)
+        try:
+            method(*args)
+        finally:
+            self._protocol.set_command_queue(None)
+
+    @locked
+    def _queue_command(self, request, decode, response_length):
+        """@brief Add a command to the current packet
+
+        A full packet is sent first. If it contains only commands, it is sent with
+        DAP_QueueCommands so the probe executes it together with the packet that follows.
+        """
+        if self._crnt_cmd.add_command(request, decode, response_length):
+            return
+        self._send_packet(queue=not self._crnt_cmd.has_transfers())
+        if not self._crnt_cmd.add_command(request, decode, response_length):
+            raise DAPAccessIntf.DeviceError("command does not fit in a packet")
 
     @locked
     def _read_packet(self):
@@ -1157,51 +1421,49 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
         stores the data from it in the current Command
         object
         """
+        # The probe only responds to queued packets once a packet that is not queued is received.
+        if self._commands_queued:
+            self._send_packet()
+
         # Grab command, send it and decode response
         cmd = self._commands_to_read.popleft()
         TRACE.debug("[cmd:%d] _read_packet: reading", cmd.uid)
         try:
             raw_data = self._interface.read()
-            raw_data = bytearray(raw_data)
-            decoded_data = cmd.decode_data(raw_data)
+            decoded_data = cmd.decode_data(_as_memoryview(raw_data))
         except Exception as exception:
             TRACE.debug("[cmd:%d] _read_packet: got exception %r; aborting all transfers!", cmd.uid, exception)
             self._abort_all_transfers(exception)
             raise
+        if not self._commands_to_read:
+            self._end_round_trip()
 
-        decoded_data = bytearray(decoded_data)
-        self._command_response_buf.extend(decoded_data)
-
-        # Attach data to transfers
+        # Attach data to transfers. Each transfer receives a slice of the response packet. A
+        # transfer that spans packets is given one slice from each, and the remainder of the
+        # packet goes on to the following transfers.
         pos = 0
-        while True:
-            size_left = len(self._command_response_buf) - pos
-            if size_left == 0:
-                # If size left is 0 then the transfer list might
-                # be empty, so don't try to access element 0
-                break
+        size_left = len(decoded_data)
+        while size_left:
             transfer = self._transfer_list[0]
-            size = transfer.get_data_size()
-            if size > size_left:
-                break
-
-            self._transfer_list.popleft()
-            data = self._command_response_buf[pos:pos + size]
+            size = min(transfer.get_pending_size(), size_left)
+            transfer.add_response(decoded_data[pos:pos + size])
             pos += size
-            transfer.add_response(data)
-
-        # Remove used data from _command_response_buf
-        if pos > 0:
-            self._command_response_buf = self._command_response_buf[pos:]
+            size_left -= size
+            if transfer.get_pending_size() == 0:
+                self._transfer_list.popleft()
 
     @locked
-    def _send_packet(self):
+    def _send_packet(self, queue=False):
         """@brief Send a single packet to the interface
 
         This function guarantees that the number of packets
         that are stored in daplink's buffer (the number of
         packets written but not read) does not exceed the
         number supported by the given device.
+
+        If _queue_ is True and the packet holds only commands, it is sent
+        as DAP_QueueCommands as long as there is room in the probe for the
+        packet that must follow it.
         """
         cmd = self._crnt_cmd
         if cmd.get_empty():
@@ -1212,14 +1474,19 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
             TRACE.debug("[cmd:%d] _send_packet: reading packet; outstanding=%d >= max=%d",
                     cmd.uid, len(self._commands_to_read), max_packets)
             self._read_packet()
-        TRACE.debug("[cmd:%d] _send_packet: sending", cmd.uid)
-        data = cmd.encode_data()
+        queue = queue and (len(self._commands_to_read) + 1 < max_packets)
+        TRACE.debug("[cmd:%d] _send_packet: sending%s", cmd.uid, " (queued)" if queue else "")
+        data = cmd.encode_data(queue)
         try:
-            self._interface.write(list(data))
+            self._interface.write(data)
         except Exception as exception:
             self._abort_all_transfers(exception)
             raise
+        if self._round_trip_start is None:
+            self._transfer_statistics.round_trips += 1
+            self._round_trip_start = perf_counter()
         self._commands_to_read.append(cmd)
+        self._commands_queued = queue
         self._crnt_cmd = _Command(self._packet_size)
 
     @locked
@@ -1239,6 +1506,9 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
                                  transfer_request, transfer_data)
             self._transfer_list.append(transfer)
 
+        # Write data given as bytes is sliced in units of words.
+        data_stride = 4 if isinstance(transfer_data, memoryview) else 1
+
         # Build physical packet by adding it to command
         cmd = self._crnt_cmd
         size_to_transfer = transfer_count
@@ -1258,10 +1528,10 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
             if transfer_data is None:
                 data = None
             else:
-                data = transfer_data[trans_data_pos:trans_data_pos + size]
+                data = transfer_data[trans_data_pos:trans_data_pos + size * data_stride]
             cmd.add(size, transfer_request, data, dap_index)
             size_to_transfer -= size
-            trans_data_pos += size
+            trans_data_pos += size * data_stride
 
             # Packet has been filled so send it
             if cmd.get_full():
@@ -1274,12 +1544,20 @@ class DAPAccessCMSISDAP(DAPAccessIntf):
 
         return transfer
 
+    # Doesn't need @locked because it is only called from _read_packet() and _abort_all_transfers().
+    def _end_round_trip(self):
+        """@brief Add the time since the first outstanding packet was sent to the statistics."""
+        if self._round_trip_start is not None:
+            self._transfer_statistics.transfer_time += perf_counter() - self._round_trip_start
+            self._round_trip_start = None
+
     @locked
     def _abort_all_transfers(self, exception):
         """@brief Abort any ongoing transfers and clear all buffers
         """
         pending_reads = len(self._commands_to_read)
         TRACE.debug("aborting %d pending reads after exception %r", pending_reads, exception)
+        self._end_round_trip()
         # invalidate _transfer_list
         for transfer in self._transfer_list:
             transfer.add_error(exception)
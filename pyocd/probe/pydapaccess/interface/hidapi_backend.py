@@ -212,7 +212,7 @@ class HidApiUSB(Interface):
         data.extend([0] * (self.report_out_size - len(data)))
         if not _IS_WINDOWS:
             self.read_sem.release()
-        self.device.write([0] + data)
+        self.device.write([0] + list(data))
 
     def read(self):
         """@brief Read data on the IN endpoint associated to the HID interface"""
@@ -148,7 +148,7 @@ class PyWinUSB(Interface):
             TRACE.debug("  USB OUT> (%d) %s", len(data), ' '.join([f'{i:02x}' for i in data]))
 
         data.extend([0] * (self.packet_size - len(data)))
-        self.report.send([0] + data)
+        self.report.send([0] + list(data))
 
     def read(self):
         """@brief Read data on the IN endpoint associated to the HID interface"""
@@ -0,0 +1,674 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import logging
+import struct
+import time
+from typing import (Callable, Deque, Dict, List, Optional, Tuple)
+
+from .interface import Interface
+from .simulated_target import (
+    AP_IDR,
+    DPIDR,
+    ROM_TABLE_ADDR,
+    BusFault,
+    SimulatedDevice,
+    )
+from ..cmsis_dap_core import (
+    Capabilities,
+    Command,
+    DAPTransferResponse,
+    Pin,
+    )
+from ..dap_access_api import DAPAccessIntf
+
+LOG = logging.getLogger(__name__)
+
+# Transfer request bits.
+_REQ_APnDP = 1 << 0
+_REQ_RnW = 1 << 1
+_REQ_A32 = 0x0c
+_REQ_VALUE_MATCH = 1 << 4
+_REQ_MATCH_MASK = 1 << 5
+_REQ_TIMESTAMP = 1 << 7
+
+# DP registers and fields.
+_DP_ABORT = 0x0
+_DP_CTRL_STAT = 0x4
+_DP_SELECT = 0x8
+_ABORT_STKCMPCLR = 1 << 1
+_ABORT_STKERRCLR = 1 << 2
+_ABORT_WDERRCLR = 1 << 3
+_ABORT_ORUNERRCLR = 1 << 4
+_CTRLSTAT_STICKYORUN = 1 << 1
+_CTRLSTAT_STICKYCMP = 1 << 4
+_CTRLSTAT_STICKYERR = 1 << 5
+_CTRLSTAT_WDATAERR = 1 << 7
+_CTRLSTAT_CDBGPWRUPREQ = 1 << 28
+_CTRLSTAT_CDBGPWRUPACK = 1 << 29
+_CTRLSTAT_CSYSPWRUPREQ = 1 << 30
+_CTRLSTAT_CSYSPWRUPACK = 1 << 31
+_CTRLSTAT_RW_MASK = 0x50000f0d # power requests, TRNMODE, MASKLANE, ORUNDETECT
+
+# MEM-AP registers and fields.
+_AP_CSW = 0x00
+_AP_TAR = 0x04
+_AP_DRW = 0x0c
+_AP_BD0 = 0x10
+_AP_BD3 = 0x1c
+_AP_CFG = 0xf4
+_AP_BASE = 0xf8
+_AP_IDR = 0xfc
+_CSW_SIZE_MASK = 0x7
+_CSW_ADDRINC_MASK = 0x30
+_CSW_ADDRINC_SINGLE = 0x10
+_CSW_DEVICEEN = 0x40
+_CSW_RW_MASK = 0x3f000037
+_CSW_RESET = 0x03000040 | 0x2
+_TAR_WRAP = 0x1000 # The Cortex-M4 AHB-AP auto-increments within 4 kB.
+
+_U16 = struct.Struct('<H')
+_U32 = struct.Struct('<I')
+_TRANSFER_BLOCK_RESPONSE = struct.Struct('<BHB')
+
+_RESPONSE_VALUE_MISMATCH = 1 << 4
+
+_DAP_OK = 0
+_DAP_INVALID = 0xff
+
+# Approximate number of SWCLK cycles for one SWD transfer: request, turnaround, ack, data,
+# parity, and idle cycles.
+_SWD_TRANSFER_CYCLES = 46
+
+class _TransferFault(Exception):
+    """@brief Internal exception for transfers that complete with a FAULT ack."""
+    pass
+
+class SimulatedDebugPort:
+    """@brief SW-DP and AHB-AP in front of a @ref SimulatedDevice.
+
+    Only APSEL 0 is implemented. Other APs read as zero, which ends AP discovery.
+    """
+
+    def __init__(self, device: SimulatedDevice) -> None:
+        self.device = device
+        self.ctrl_stat = 0
+        self.select = 0
+        self.rdbuff = 0
+        self.csw = _CSW_RESET
+        self.tar = 0
+
+    def read_dp(self, addr: int) -> int:
+        if addr == 0:
+            return DPIDR
+        elif addr == _DP_CTRL_STAT:
+            if self.select & 0xf:
+                return 0
+            value = self.ctrl_stat
+            if value & _CTRLSTAT_CDBGPWRUPREQ:
+                value |= _CTRLSTAT_CDBGPWRUPACK
+            if value & _CTRLSTAT_CSYSPWRUPREQ:
+                value |= _CTRLSTAT_CSYSPWRUPACK
+            return value
+        elif addr == _DP_SELECT:
+            # RESEND
+            return self.rdbuff
+        else:
+            return self.rdbuff
+
+    def write_dp(self, addr: int, value: int) -> None:
+        if addr == _DP_ABORT:
+            self.write_abort(value)
+        elif addr == _DP_CTRL_STAT:
+            if (self.select & 0xf) == 0:
+                self.ctrl_stat = (self.ctrl_stat & ~_CTRLSTAT_RW_MASK) | (value & _CTRLSTAT_RW_MASK)
+        elif addr == _DP_SELECT:
+            self.select = value
+
+    def write_abort(self, value: int) -> None:
+        if value & _ABORT_STKCMPCLR:
+            self.ctrl_stat &= ~_CTRLSTAT_STICKYCMP
+        if value & _ABORT_STKERRCLR:
+            self.ctrl_stat &= ~_CTRLSTAT_STICKYERR
+        if value & _ABORT_WDERRCLR:
+            self.ctrl_stat &= ~_CTRLSTAT_WDATAERR
+        if value & _ABORT_ORUNERRCLR:
+            self.ctrl_stat &= ~_CTRLSTAT_STICKYORUN
+
+    def _check_ap(self) -> bool:
+        """@brief Returns whether the selected AP is the MEM-AP. Faults if a sticky error is set."""
+        if self.ctrl_stat & _CTRLSTAT_STICKYERR:
+            raise _TransferFault()
+        return (self.select >> 24) == 0
+
+    def _bus_fault(self) -> None:
+        self.ctrl_stat |= _CTRLSTAT_STICKYERR
+        raise _TransferFault()
+
+    @property
+    def transfer_size(self) -> int:
+        return 1 << (self.csw & _CSW_SIZE_MASK)
+
+    def _increment_tar(self, size: int) -> None:
+        if (self.csw & _CSW_ADDRINC_MASK) == _CSW_ADDRINC_SINGLE:
+            self.tar = (self.tar & ~(_TAR_WRAP - 1)) | ((self.tar + size) & (_TAR_WRAP - 1))
+
+    def read_ap(self, addr: int) -> int:
+        if not self._check_ap():
+            self.rdbuff = 0
+            return 0
+        reg = (self.select & 0xf0) | addr
+        if reg == _AP_DRW:
+            size = self.transfer_size
+            try:
+                value = self.device.read(self.tar & ~(size - 1), size) << ((self.tar & 0x3) * 8)
+            except BusFault:
+                self._bus_fault()
+            self._increment_tar(size)
+        elif _AP_BD0 <= reg <= _AP_BD3:
+            try:
+                value = self.device.read32((self.tar & ~0xf) | (reg - _AP_BD0))
+            except BusFault:
+                self._bus_fault()
+        elif reg == _AP_CSW:
+            value = self.csw
+        elif reg == _AP_TAR:
+            value = self.tar
+        elif reg == _AP_CFG:
+            value = 0
+        elif reg == _AP_BASE:
+            value = ROM_TABLE_ADDR | 0x3
+        elif reg == _AP_IDR:
+            value = AP_IDR
+        else:
+            value = 0
+        self.rdbuff = value
+        return value
+
+    def write_ap(self, addr: int, value: int) -> None:
+        if not self._check_ap():
+            return
+        reg = (self.select & 0xf0) | addr
+        if reg == _AP_DRW:
+            size = self.transfer_size
+            shift = (self.tar & 0x3) * 8
+            try:
+                self.device.write(self.tar & ~(size - 1), size, (value >> shift) & ((1 << (size * 8)) - 1))
+            except BusFault:
+                self._bus_fault()
+            self._increment_tar(size)
+        elif _AP_BD0 <= reg <= _AP_BD3:
+            try:
+                self.device.write32((self.tar & ~0xf) | (reg - _AP_BD0), value)
+            except BusFault:
+                self._bus_fault()
+        elif reg == _AP_CSW:
+            csw = (value & _CSW_RW_MASK) | _CSW_DEVICEEN
+            # Only 8-, 16-, and 32-bit transfers are supported.
+            if (csw & _CSW_SIZE_MASK) > 2:
+                csw = (csw & ~_CSW_SIZE_MASK) | 2
+            self.csw = csw
+        elif reg == _AP_TAR:
+            self.tar = value
+
+    def read_drw_block(self, count: int) -> bytes:
+        """@brief Read _count_ words from DRW, using bulk copies for memory regions.
+
+        If a fault occurs, _TransferFault is raised with the words read before the fault as its
+        argument.
+        """
+        result = bytearray()
+        if self._bulk_possible():
+            while count:
+                n = min(count, (_TAR_WRAP - (self.tar & (_TAR_WRAP - 1))) // 4)
+                region = self.device.find_bulk_region(self.tar, n * 4)
+                if region is None:
+                    break
+                result += region.read(self.tar, n * 4)
+                self._increment_tar(n * 4)
+                count -= n
+        try:
+            for _ in range(count):
+                result += _U32.pack(self.read_ap(_AP_DRW))
+        except _TransferFault:
+            raise _TransferFault(bytes(result))
+        return bytes(result)
+
+    def write_drw_block(self, data: memoryview) -> int:
+        """@brief Write words to DRW, using bulk copies for memory regions.
+        @return Number of words written. Less than the number of words provided if a fault occurred.
+        """
+        count = len(data) // 4
+        done = 0
+        if self._bulk_possible():
+            while done < count:
+                n = min(count - done, (_TAR_WRAP - (self.tar & (_TAR_WRAP - 1))) // 4)
+                region = self.device.find_bulk_region(self.tar, n * 4)
+                if region is None:
+                    break
+                region.write(self.tar, bytes(data[done * 4:(done + n) * 4]))
+                self._increment_tar(n * 4)
+                done += n
+        for offset in range(done * 4, count * 4, 4):
+            try:
+                self.write_ap(_AP_DRW, _U32.unpack_from(data, offset)[0])
+            except _TransferFault:
+                return offset // 4
+        return count
+
+    def _bulk_possible(self) -> bool:
+        return ((self.select & 0xff0000f0) == 0
+                and not (self.ctrl_stat & _CTRLSTAT_STICKYERR)
+                and (self.csw & _CSW_SIZE_MASK) == 2
+                and (self.csw & _CSW_ADDRINC_MASK) == _CSW_ADDRINC_SINGLE
+                and (self.tar & 0x3) == 0)
+
+class SimulatedInterfaceStats:
+    """@brief Counters of the traffic seen by a @ref SimulatedInterface."""
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        ## Number of command packets sent by the host.
+        self.packets = 0
+        ## Number of times the host sent a packet with no other packets outstanding.
+        self.round_trips = 0
+        ## Number of DP and AP register transfers.
+        self.transfers = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        ## Count of each command ID.
+        self.commands: Dict[int, int] = collections.Counter()
+
+    def __repr__(self) -> str:
+        return (f"<{type(self).__name__} packets={self.packets} round_trips={self.round_trips} "
+                f"transfers={self.transfers} bytes_out={self.bytes_out} bytes_in={self.bytes_in}>")
+
+class SimulatedInterface(Interface):
+    """@brief CMSIS-DAP interface backed by a simulated probe and target.
+
+    The simulated probe implements the CMSIS-DAP commands used by pyOCD for SWD, and connects to
+    a @ref pyocd.probe.pydapaccess.interface.simulated_target.SimulatedDevice "SimulatedDevice"
+    through a model of a SW-DP and AHB-AP. Packet size and count limits are enforced like a real
+    probe would, and a fixed latency can be applied to each packet's response to model USB round
+    trip time. Counters of packets, round trips and register transfers are kept in `stats`.
+
+    Optionally, the time taken to clock each SWD transfer at the current SWJ clock frequency can be
+    added to the response time, and transfers can fail with no ACK when the SWJ clock is set above
+    a maximum frequency, to model a target or cable that cannot run any faster.
+
+    This backend is selected by setting the `PYOCD_USB_BACKEND` environment variable to
+    "simulated", or by creating an instance and passing it to
+    @ref pyocd.probe.pydapaccess.dap_access_cmsis_dap.DAPAccessCMSISDAP "DAPAccessCMSISDAP".
+    """
+
+    isAvailable = True
+
+    PROTOCOL_VERSION = "2.1.1"
+
+    def __init__(self,
+            device: Optional[SimulatedDevice] = None,
+            packet_size: int = 512,
+            packet_count: int = 8,
+            latency: float = 0.0,
+            serial_number: str = "sim00000001",
+            model_swd_timing: bool = False,
+            max_swj_clock: Optional[int] = None,
+            ) -> None:
+        """@brief Constructor.
+        @param self
+        @param device The simulated device to connect to. A new device is created if not provided.
+        @param packet_size Maximum packet size reported by DAP_Info.
+        @param packet_count Maximum number of outstanding packets reported by DAP_Info.
+        @param latency Time in seconds from sending a packet until its response can be read.
+        @param serial_number Probe serial number.
+        @param model_swd_timing Whether to add the time of clocking out each transfer to the response time.
+        @param max_swj_clock Highest SWJ clock frequency at which transfers succeed, or None for no limit.
+        """
+        super().__init__()
+        self.vid = 0x0d28
+        self.pid = 0x0000
+        self.vendor_name = "pyOCD"
+        self.product_name = "Simulated CMSIS-DAP"
+        self.serial_number = serial_number
+        self.device = device if (device is not None) else SimulatedDevice()
+        self.dp = SimulatedDebugPort(self.device)
+        self.max_packet_size = packet_size
+        self.max_packet_count = packet_count
+        self.packet_size = packet_size
+        self.packet_count = packet_count
+        self.latency = latency
+        self.model_swd_timing = model_swd_timing
+        self.max_swj_clock = max_swj_clock
+        self.stats = SimulatedInterfaceStats()
+        self.swj_clock = 1000000
+        self.is_open = False
+        self._responses: Deque[Tuple[float, bytes]] = collections.deque()
+        self._queued_packets: List[bytes] = []
+        self._last_ready_time = 0.0
+        self._match_retry = 0
+        self._match_mask = 0xffffffff
+        self._port = 0
+
+        self._handlers: Dict[int, Callable[[memoryview], Tuple[Optional[bytes], int]]] = {
+            Command.DAP_INFO: self._dap_info,
+            Command.DAP_LED: self._fixed_response(3),
+            Command.DAP_CONNECT: self._dap_connect,
+            Command.DAP_DISCONNECT: self._fixed_response(1),
+            Command.DAP_TRANSFER_CONFIGURE: self._dap_transfer_configure,
+            Command.DAP_TRANSFER: self._dap_transfer,
+            Command.DAP_TRANSFER_BLOCK: self._dap_transfer_block,
+            Command.DAP_TRANSFER_ABORT: lambda data: (None, 1),
+            Command.DAP_WRITE_ABORT: self._dap_write_abort,
+            Command.DAP_DELAY: self._fixed_response(3),
+            Command.DAP_RESET_TARGET: self._dap_reset_target,
+            Command.DAP_SWJ_PINS: self._dap_swj_pins,
+            Command.DAP_SWJ_CLOCK: self._dap_swj_clock,
+            Command.DAP_SWJ_SEQUENCE: self._dap_swj_sequence,
+            Command.DAP_SWD_CONFIGURE: self._fixed_response(2),
+            Command.DAP_SWD_SEQUENCE: self._dap_swd_sequence,
+            Command.DAP_QUEUE_COMMANDS: self._dap_execute_commands,
+            Command.DAP_EXECUTE_COMMANDS: self._dap_execute_commands,
+            }
+
+    @staticmethod
+    def get_all_connected_interfaces() -> List["SimulatedInterface"]:
+        return [SimulatedInterface()]
+
+    @property
+    def is_bulk(self) -> bool:
+        return True
+
+    def open(self) -> None:
+        self.is_open = True
+
+    def close(self) -> None:
+        self._responses.clear()
+        self._queued_packets.clear()
+        self.is_open = False
+
+    def write(self, data) -> None:
+        if len(data) > self.packet_size:
+            raise DAPAccessIntf.DeviceError("packet of %d bytes exceeds the %d byte packet size"
+                    % (len(data), self.packet_size))
+        outstanding = len(self._responses) + len(self._queued_packets)
+        if outstanding >= self.packet_count:
+            raise DAPAccessIntf.DeviceError("more than %d packets outstanding" % self.packet_count)
+
+        now = time.perf_counter()
+        stats = self.stats
+        stats.packets += 1
+        stats.bytes_out += len(data)
+        if not outstanding:
+            stats.round_trips += 1
+
+        # Queued packets are held until a packet that is not queued is received, then all are
+        # executed in order.
+        if data[0] == Command.DAP_QUEUE_COMMANDS:
+            self._queued_packets.append(bytes(data))
+            return
+        packets = self._queued_packets + [bytes(data)]
+        self._queued_packets = []
+
+        for packet in packets:
+            transfers = stats.transfers
+            response, _ = self._process_command(memoryview(packet))
+            if response is None:
+                continue
+            response = response[:self.packet_size]
+            stats.bytes_in += len(response)
+
+            # Responses are produced in order, each no sooner than the latency after its command.
+            ready_time = max(now + self.latency, self._last_ready_time)
+            if self.model_swd_timing:
+                ready_time += (stats.transfers - transfers) * _SWD_TRANSFER_CYCLES / self.swj_clock
+            self._last_ready_time = ready_time
+            self._responses.append((ready_time, response))
+
+    def read(self) -> bytes:
+        if not self._responses:
+            if self._queued_packets:
+                raise DAPAccessIntf.DeviceError("read while waiting for the end of queued commands")
+            raise DAPAccessIntf.DeviceError("read with no outstanding command")
+        ready_time, response = self._responses.popleft()
+        if self.latency:
+            delay = ready_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        return response
+
+    # ------------------------------------------- #
+    #          Command handlers
+    # ------------------------------------------- #
+    #
+    # Each handler receives the remainder of the packet starting with the command ID, and returns
+    # the response (None for no response) and the length of the command it consumed.
+
+    def _process_command(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        self.stats.commands[data[0]] += 1
+        handler = self._handlers.get(data[0])
+        if handler is None:
+            LOG.debug("simulated probe: unsupported command 0x%02x", data[0])
+            return bytes([_DAP_INVALID]), len(data)
+        return handler(data)
+
+    @staticmethod
+    def _fixed_response(length: int) -> Callable[[memoryview], Tuple[Optional[bytes], int]]:
+        return lambda data: (bytes([data[0], _DAP_OK]), length)
+
+    def _dap_info(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        info_id = data[1]
+        value: bytes
+        if info_id == DAPAccessIntf.ID.CAPABILITIES.value:
+            value = bytes([Capabilities.SWD | Capabilities.ATOMIC_COMMANDS | Capabilities.DAP_SWD_SEQUENCE])
+        elif info_id == DAPAccessIntf.ID.MAX_PACKET_COUNT.value:
+            value = bytes([self.max_packet_count])
+        elif info_id == DAPAccessIntf.ID.MAX_PACKET_SIZE.value:
+            value = _U16.pack(self.max_packet_size)
+        else:
+            strings = {
+                DAPAccessIntf.ID.VENDOR.value: self.vendor_name,
+                DAPAccessIntf.ID.PRODUCT.value: self.product_name,
+                DAPAccessIntf.ID.SER_NUM.value: self.serial_number,
+                DAPAccessIntf.ID.CMSIS_DAP_PROTOCOL_VERSION.value: self.PROTOCOL_VERSION,
+                DAPAccessIntf.ID.PRODUCT_FW_VERSION.value: "1.0.0",
+                }
+            value = (strings[info_id].encode() + b'\x00') if (info_id in strings) else b''
+        return bytes([Command.DAP_INFO, len(value)]) + value, 2
+
+    def _dap_connect(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        # Only SWD is supported.
+        self._port = 1 if data[1] in (0, 1) else 0
+        return bytes([Command.DAP_CONNECT, self._port]), 2
+
+    def _dap_transfer_configure(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        self._match_retry = _U16.unpack_from(data, 4)[0]
+        return bytes([Command.DAP_TRANSFER_CONFIGURE, _DAP_OK]), 6
+
+    def _dap_write_abort(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        self.dp.write_abort(_U32.unpack_from(data, 2)[0])
+        return bytes([Command.DAP_WRITE_ABORT, _DAP_OK]), 6
+
+    def _dap_reset_target(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        self.device.system_reset()
+        return bytes([Command.DAP_RESET_TARGET, _DAP_OK, 1]), 1
+
+    def _dap_swj_pins(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        output, select = data[1], data[2]
+        if select & Pin.nRESET:
+            self.device.set_reset_pin(not (output & Pin.nRESET))
+        pins = Pin.SWCLK_TCK | Pin.SWDIO_TMS | Pin.nTRST
+        if not self.device.is_reset_asserted:
+            pins |= Pin.nRESET
+        return bytes([Command.DAP_SWJ_PINS, pins]), 7
+
+    def _dap_swj_clock(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        self.swj_clock = _U32.unpack_from(data, 1)[0]
+        return bytes([Command.DAP_SWJ_CLOCK, _DAP_OK]), 5
+
+    def _dap_swj_sequence(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        bit_count = data[1] or 256
+        return bytes([Command.DAP_SWJ_SEQUENCE, _DAP_OK]), 2 + (bit_count + 7) // 8
+
+    def _dap_swd_sequence(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        pos = 2
+        response = bytearray([Command.DAP_SWD_SEQUENCE, _DAP_OK])
+        for _ in range(data[1]):
+            info = data[pos]
+            pos += 1
+            byte_count = (((info & 0x3f) or 64) + 7) // 8
+            if info & 0x80:
+                response += bytes(byte_count)
+            else:
+                pos += byte_count
+        return bytes(response), pos
+
+    def _dap_execute_commands(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        count = data[1]
+        pos = 2
+        response = bytearray([Command.DAP_EXECUTE_COMMANDS, count])
+        for _ in range(count):
+            cmd_response, length = self._process_command(data[pos:])
+            pos += length
+            if cmd_response is not None:
+                response += cmd_response
+        return bytes(response), pos
+
+    def _transfer_one(self, request: int, value: int) -> int:
+        """@brief Perform one DP or AP register transfer.
+        @return The read data, or 0 for writes.
+        """
+        self.stats.transfers += 1
+        addr = request & _REQ_A32
+        if request & _REQ_RnW:
+            if request & _REQ_APnDP:
+                return self.dp.read_ap(addr)
+            else:
+                return self.dp.read_dp(addr)
+        elif request & _REQ_APnDP:
+            self.dp.write_ap(addr, value)
+        else:
+            self.dp.write_dp(addr, value)
+        return 0
+
+    @property
+    def _is_clock_too_fast(self) -> bool:
+        return (self.max_swj_clock is not None) and (self.swj_clock > self.max_swj_clock)
+
+    def _dap_transfer(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        count = data[2]
+        pos = 3
+        if self._is_clock_too_fast:
+            for _ in range(count):
+                request = data[pos]
+                pos += 1
+                if (not (request & _REQ_RnW)) or (request & _REQ_VALUE_MATCH):
+                    pos += 4
+            return bytes([Command.DAP_TRANSFER, 0, DAPTransferResponse.ACK_NO_ACK]), pos
+        done = 0
+        ack = DAPTransferResponse.ACK_OK
+        read_data = bytearray()
+        for _ in range(count):
+            request = data[pos]
+            pos += 1
+            if request & _REQ_RnW:
+                if request & _REQ_VALUE_MATCH:
+                    match_value = _U32.unpack_from(data, pos)[0]
+                    pos += 4
+                    for _ in range(self._match_retry + 1):
+                        try:
+                            value = self._transfer_one(request & ~_REQ_VALUE_MATCH, 0)
+                        except _TransferFault:
+                            ack = DAPTransferResponse.ACK_FAULT
+                            break
+                        if (value & self._match_mask) == match_value:
+                            break
+                    else:
+                        ack |= _RESPONSE_VALUE_MISMATCH
+                else:
+                    try:
+                        value = self._transfer_one(request, 0)
+                    except _TransferFault:
+                        ack = DAPTransferResponse.ACK_FAULT
+                    else:
+                        if request & _REQ_TIMESTAMP:
+                            read_data += _U32.pack(int(time.perf_counter() * 1e6) & 0xffffffff)
+                        read_data += _U32.pack(value)
+            else:
+                value = _U32.unpack_from(data, pos)[0]
+                pos += 4
+                if request & _REQ_MATCH_MASK:
+                    self._match_mask = value
+                else:
+                    try:
+                        self._transfer_one(request, value)
+                    except _TransferFault:
+                        ack = DAPTransferResponse.ACK_FAULT
+            if ack != DAPTransferResponse.ACK_OK:
+                # Skip the remaining requests to find the command length.
+                for _ in range(count - done - 1):
+                    request = data[pos]
+                    pos += 1
+                    if (not (request & _REQ_RnW)) or (request & _REQ_VALUE_MATCH):
+                        pos += 4
+                break
+            done += 1
+        return bytes([Command.DAP_TRANSFER, done, ack]) + read_data, pos
+
+    def _dap_transfer_block(self, data: memoryview) -> Tuple[Optional[bytes], int]:
+        count = _U16.unpack_from(data, 2)[0]
+        request = data[4]
+        addr = request & _REQ_A32
+        is_drw = (request & _REQ_APnDP) and (addr == _AP_DRW)
+        ack = DAPTransferResponse.ACK_OK
+        if self._is_clock_too_fast:
+            length = 5 if (request & _REQ_RnW) else (5 + count * 4)
+            return _TRANSFER_BLOCK_RESPONSE.pack(Command.DAP_TRANSFER_BLOCK, 0, DAPTransferResponse.ACK_NO_ACK), length
+        self.stats.transfers += count
+        if request & _REQ_RnW:
+            if is_drw:
+                try:
+                    read_data = self.dp.read_drw_block(count)
+                except _TransferFault as fault:
+                    read_data = fault.args[0] if fault.args else b''
+                    ack = DAPTransferResponse.ACK_FAULT
+            else:
+                values = bytearray()
+                try:
+                    for _ in range(count):
+                        values += _U32.pack(self._transfer_one(request, 0))
+                except _TransferFault:
+                    ack = DAPTransferResponse.ACK_FAULT
+                read_data = bytes(values)
+            done = len(read_data) // 4
+            return _TRANSFER_BLOCK_RESPONSE.pack(Command.DAP_TRANSFER_BLOCK, done, ack) + read_data, 5
+        else:
+            write_data = data[5:5 + count * 4]
+            if is_drw:
+                done = self.dp.write_drw_block(write_data)
+            else:
+                done = 0
+                try:
+                    for offset in range(0, count * 4, 4):
+                        self._transfer_one(request, _U32.unpack_from(write_data, offset)[0])
+                        done += 1
+                except _TransferFault:
+                    pass
+            if done < count:
+                ack = DAPTransferResponse.ACK_FAULT
+            return _TRANSFER_BLOCK_RESPONSE.pack(Command.DAP_TRANSFER_BLOCK, done, ack), 5 + count * 4
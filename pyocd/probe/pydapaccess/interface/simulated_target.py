@@ -0,0 +1,561 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Model of a simple Cortex-M4 device used by the simulated CMSIS-DAP backend.
+
+The device has a flash region, a RAM region, and a Private Peripheral Bus populated with the
+debug registers pyOCD needs to connect: a ROM table, the SCS with the core debug registers, the
+DWT, and the FPB. The flash algorithm entry points described by @ref SIM_FLASH_ALGO are
+implemented natively as hooks that run when the core is resumed at one of their addresses while
+the algorithm's code is loaded there, and then halt on the algorithm's breakpoint like real code. Other code is only executed when it is
+called as a function that returns to a breakpoint, such as the stubs pyOCD loads into RAM, when
+it is in RAM or an FPB breakpoint is set, and when single stepping; see
+@ref pyocd.probe.pydapaccess.interface.simulated_thumb.
+"""
+
+import logging
+from binascii import crc32
+from typing import (Callable, Dict, List, Optional, Set)
+
+from ....flash.flash import _ANALYZER_CODE
+from .simulated_thumb import (Breakpoint, ThumbInterpreter, UndefinedInstruction)
+
+LOG = logging.getLogger(__name__)
+
+FLASH_START = 0x00000000
+FLASH_SIZE = 0x40000
+FLASH_SECTOR_SIZE = 0x1000
+FLASH_PAGE_SIZE = 0x400
+FLASH_ERASED_VALUE = 0xff
+
+RAM_START = 0x20000000
+RAM_SIZE = 0x10000
+
+PPB_START = 0xe0000000
+PPB_END = 0xe00fffff
+
+ROM_TABLE_ADDR = 0xe00ff000
+AP_IDR = 0x24770011 # AHB-AP as found in Cortex-M3/M4.
+DPIDR = 0x2ba01477 # SW-DP v1.
+CPUID = 0x410fc241 # Cortex-M4 r0p1.
+
+_ALGO_LOAD_ADDRESS = RAM_START
+
+## Flash algorithm matching the hooks installed by @ref SimulatedDevice.
+#
+# The instructions are never executed, so the code is just a breakpoint followed by padding
+# that covers the entry points. Entry points have the Thumb bit set, as required.
+SIM_FLASH_ALGO = {
+    'load_address' : _ALGO_LOAD_ADDRESS,
+    'instructions' : [0xe7fdbe00] + [0xbf00bf00] * 15,
+    'pc_init' : _ALGO_LOAD_ADDRESS + 0x05,
+    'pc_unInit' : _ALGO_LOAD_ADDRESS + 0x09,
+    'pc_program_page' : _ALGO_LOAD_ADDRESS + 0x0d,
+    'pc_erase_sector' : _ALGO_LOAD_ADDRESS + 0x11,
+    'pc_eraseAll' : _ALGO_LOAD_ADDRESS + 0x15,
+    'static_base' : _ALGO_LOAD_ADDRESS + 0x40,
+    'begin_stack' : _ALGO_LOAD_ADDRESS + 0x800,
+    'end_stack' : _ALGO_LOAD_ADDRESS + 0x400,
+    'begin_data' : _ALGO_LOAD_ADDRESS + 0x1000,
+    'page_buffers' : [_ALGO_LOAD_ADDRESS + 0x1000, _ALGO_LOAD_ADDRESS + 0x1000 + FLASH_PAGE_SIZE],
+    'min_program_length' : 4,
+    'analyzer_supported' : True,
+    'analyzer_address' : _ALGO_LOAD_ADDRESS + 0x2000,
+    }
+
+# Core debug register addresses.
+ICTR = 0xe000e004
+CPUID_ADDR = 0xe000ed00
+VTOR = 0xe000ed08
+AIRCR = 0xe000ed0c
+DFSR = 0xe000ed30
+CPACR = 0xe000ed88
+DHCSR = 0xe000edf0
+DCRSR = 0xe000edf4
+DCRDR = 0xe000edf8
+DEMCR = 0xe000edfc
+DWT_CTRL = 0xe0001000
+DWT_CYCCNT = 0xe0001004
+DWT_PCSR = 0xe000101c
+FP_CTRL = 0xe0002000
+FP_COMP0 = 0xe0002008
+
+DBGKEY = 0xa05f0000
+C_DEBUGEN = 1 << 0
+C_HALT = 1 << 1
+C_STEP = 1 << 2
+C_MASKINTS = 1 << 3
+C_SNAPSTALL = 1 << 5
+S_REGRDY = 1 << 16
+S_HALT = 1 << 17
+S_RETIRE_ST = 1 << 24
+S_RESET_ST = 1 << 25
+DCRSR_REGWnR = 1 << 16
+DFSR_HALTED = 1 << 0
+DFSR_BKPT = 1 << 1
+DFSR_VCATCH = 1 << 3
+DEMCR_VC_CORERESET = 1 << 0
+AIRCR_VECTKEY = 0x05fa
+AIRCR_VECTRESET = 1 << 0
+AIRCR_SYSRESETREQ = 1 << 2
+XPSR_THUMB = 1 << 24
+
+## Maximum number of instructions interpreted for one resume before the core is left running.
+RUN_INSTRUCTION_LIMIT = 1000000
+
+# Core register numbers used by the hooks.
+REG_R0 = 0
+REG_SP = 13
+REG_LR = 14
+REG_PC = 15
+REG_XPSR = 16
+
+FP_CTRL_NUM_CODE = 6
+FP_CTRL_NUM_LIT = 2
+FP_CTRL_KEY = 1 << 1
+FP_CTRL_ENABLE = 1 << 0
+
+ARM_JEP106_ID = 0x3b
+ARM_JEP106_CONT = 0x4
+
+## Component ID classes.
+CIDR_CLASS_ROM_TABLE = 0x1
+CIDR_CLASS_GENERIC = 0xe
+
+class BusFault(Exception):
+    """@brief Raised for an access to an address with no memory or peripheral."""
+    pass
+
+class MemoryRegionModel:
+    """@brief A contiguous memory backed by a bytearray."""
+
+    def __init__(self, name: str, start: int, length: int, fill: int = 0, is_writable: bool = True) -> None:
+        self.name = name
+        self.start = start
+        self.length = length
+        self.end = start + length - 1
+        self.is_writable = is_writable
+        self.data = bytearray([fill]) * length
+
+    def contains_range(self, addr: int, length: int) -> bool:
+        return (addr >= self.start) and (addr + length - 1 <= self.end)
+
+    def read(self, addr: int, length: int) -> bytes:
+        offset = addr - self.start
+        return bytes(self.data[offset:offset + length])
+
+    def write(self, addr: int, data: bytes) -> None:
+        # Writes to flash over the bus are ignored, as on most devices.
+        if self.is_writable:
+            offset = addr - self.start
+            self.data[offset:offset + len(data)] = data
+
+class SimulatedDevice:
+    """@brief Memory system and core debug logic of a Cortex-M4 based device.
+
+    All bus accesses are made through read_bytes() and write_bytes(), or the word-sized helpers.
+    Accesses to the PPB are routed to the debug register model, everything else must fall within
+    one of the memory regions or a BusFault is raised.
+    """
+
+    def __init__(self, flash_size: int = FLASH_SIZE, ram_size: int = RAM_SIZE) -> None:
+        self.flash = MemoryRegionModel("flash", FLASH_START, flash_size,
+                fill=FLASH_ERASED_VALUE, is_writable=False)
+        self.ram = MemoryRegionModel("ram", RAM_START, ram_size)
+        self.regions: List[MemoryRegionModel] = [self.flash, self.ram]
+
+        ## Core registers by DCRSR register number.
+        self.core_registers: Dict[int, int] = {}
+
+        self._ppb: Dict[int, int] = {}
+        self._ppb_read_handlers: Dict[int, Callable[[], int]] = {
+            CPUID_ADDR: lambda: CPUID,
+            AIRCR: lambda: (0xfa05 << 16),
+            CPACR: lambda: 0,
+            DHCSR: self._read_dhcsr,
+            FP_CTRL: self._read_fp_ctrl,
+            DWT_PCSR: lambda: self.core_registers.get(REG_PC, 0) if not self.is_halted else 0xffffffff,
+            }
+        self._ppb_write_handlers: Dict[int, Callable[[int], None]] = {
+            CPUID_ADDR: lambda value: None,
+            AIRCR: self._write_aircr,
+            CPACR: lambda value: None,
+            DFSR: self._write_dfsr,
+            DHCSR: self._write_dhcsr,
+            DCRSR: self._write_dcrsr,
+            FP_CTRL: self._write_fp_ctrl,
+            DWT_PCSR: lambda value: None,
+            }
+        self._init_ppb()
+
+        ## Native implementations of code at particular addresses. The hook's return value is
+        # placed in R0 when the hook returns to the address in LR.
+        self.hooks: Dict[int, Callable[[], int]] = {}
+        # First halfword of the code each hook stands in for.
+        self._hook_opcodes: Dict[int, int] = {}
+        self._init_flash_algo_hooks()
+        self._thumb = ThumbInterpreter(self)
+
+        self._dhcsr_ctrl = 0
+        self.is_halted = False
+        self._reset_st = False
+        self._retire_st = False
+        self.is_reset_asserted = False
+        self.reset_count = 0
+        self.power_on_reset()
+
+    def _init_ppb(self) -> None:
+        self._add_component_ids(ROM_TABLE_ADDR, 0x4c4, CIDR_CLASS_ROM_TABLE)
+        self._add_component_ids(0xe000e000, 0x00c, CIDR_CLASS_GENERIC) # SCS
+        self._add_component_ids(0xe0001000, 0x002, CIDR_CLASS_GENERIC) # DWT
+        self._add_component_ids(0xe0002000, 0x003, CIDR_CLASS_GENERIC) # FPB
+
+        # ROM table entries: SCS, DWT, FPB, then the end marker.
+        for i, cmp_addr in enumerate((0xe000e000, 0xe0001000, 0xe0002000)):
+            self._ppb[ROM_TABLE_ADDR + i * 4] = ((cmp_addr - ROM_TABLE_ADDR) & 0xfffff000) | 0x3
+        self._ppb[ROM_TABLE_ADDR + 0xfcc] = 0x1 # MEMTYPE: system memory present
+
+        # Four DWT comparators.
+        self._ppb[DWT_CTRL] = 0x40000000
+
+    def _add_component_ids(self, base: int, part: int, cidr_class: int) -> None:
+        pidr = (part
+                | ((ARM_JEP106_ID & 0x7f) << 12)
+                | (1 << 19) # JEDEC assigned ID
+                | (ARM_JEP106_CONT << 32))
+        cidr = 0xb105000d | (cidr_class << 12)
+        for i in range(4):
+            self._ppb[base + 0xfe0 + i * 4] = (pidr >> (i * 8)) & 0xff
+            self._ppb[base + 0xfd0 + i * 4] = (pidr >> (32 + i * 8)) & 0xff
+            self._ppb[base + 0xff0 + i * 4] = (cidr >> (i * 8)) & 0xff
+
+    def _init_flash_algo_hooks(self) -> None:
+        algo = SIM_FLASH_ALGO
+        self._add_hook(algo['pc_init'], lambda: 0, 0xbf00)
+        self._add_hook(algo['pc_unInit'], lambda: 0, 0xbf00)
+        self._add_hook(algo['pc_program_page'], self._algo_program_page, 0xbf00)
+        self._add_hook(algo['pc_erase_sector'], self._algo_erase_sector, 0xbf00)
+        self._add_hook(algo['pc_eraseAll'], self._algo_erase_all, 0xbf00)
+        self._add_hook(algo['analyzer_address'], self._analyzer, _ANALYZER_CODE[0] & 0xffff)
+
+    def _add_hook(self, address: int, hook: Callable[[], int], opcode: int) -> None:
+        self.hooks[address & ~1] = hook
+        self._hook_opcodes[address & ~1] = opcode
+
+    def _get_hook(self, pc: int) -> Optional[Callable[[], int]]:
+        """@brief Return the hook for an address if the code it stands in for is loaded there."""
+        hook = self.hooks.get(pc)
+        if hook is None:
+            return None
+        try:
+            if self.read(pc, 2) != self._hook_opcodes[pc]:
+                return None
+        except BusFault:
+            return None
+        return hook
+
+    # ------------------------------------------- #
+    #          Flash algorithm hooks
+    # ------------------------------------------- #
+    def _reg(self, reg: int) -> int:
+        return self.core_registers.get(reg, 0)
+
+    def _algo_erase_sector(self) -> int:
+        addr = self._reg(REG_R0)
+        if not self.flash.contains_range(addr, FLASH_SECTOR_SIZE):
+            return 1
+        offset = (addr - self.flash.start) & ~(FLASH_SECTOR_SIZE - 1)
+        self.flash.data[offset:offset + FLASH_SECTOR_SIZE] = bytes([FLASH_ERASED_VALUE]) * FLASH_SECTOR_SIZE
+        return 0
+
+    def _algo_erase_all(self) -> int:
+        self.flash.data[:] = bytes([FLASH_ERASED_VALUE]) * self.flash.length
+        return 0
+
+    def _algo_program_page(self) -> int:
+        addr = self._reg(0)
+        size = self._reg(1)
+        buf = self._reg(2)
+        if not self.flash.contains_range(addr, size):
+            return 1
+        try:
+            data = self.read_bytes(buf, size)
+        except BusFault:
+            return 1
+        # Programming can only clear bits.
+        offset = addr - self.flash.start
+        current = self.flash.data[offset:offset + size]
+        programmed = (int.from_bytes(current, 'little') & int.from_bytes(data, 'little')).to_bytes(size, 'little')
+        self.flash.data[offset:offset + size] = programmed
+        return 0
+
+    def _analyzer(self) -> int:
+        """@brief Native version of the flash CRC analyzer.
+
+        R0 points to an array of R1 words, each encoding a power of two sized address range. The
+        words are replaced with the CRC32 of the range.
+        """
+        table = self._reg(0)
+        count = self._reg(1)
+        for i in range(count):
+            entry = self.read32(table + i * 4)
+            size = 1 << (entry & 0xffff)
+            addr = (entry >> 16) * size
+            self.write32(table + i * 4, crc32(self.read_bytes(addr, size)) & 0xffffffff)
+        return 0
+
+    # ------------------------------------------- #
+    #          Reset and execution control
+    # ------------------------------------------- #
+    def power_on_reset(self) -> None:
+        self._ppb[DEMCR] = 0
+        self._ppb[DFSR] = 0
+        self._dhcsr_ctrl = 0
+        self.system_reset()
+
+    def system_reset(self) -> None:
+        """@brief Reset the core as for a SYSRESETREQ or hardware reset.
+
+        Debug registers are not affected. The core either halts on the reset vector, if reset
+        vector catch is enabled, or starts running.
+        """
+        self.reset_count += 1
+        self.core_registers = {}
+        self._ppb[VTOR] = 0
+        try:
+            self.core_registers[REG_SP] = self.read32(FLASH_START) & ~0x3
+            reset_vector = self.read32(FLASH_START + 4)
+        except BusFault:
+            reset_vector = 0
+        self.core_registers[REG_PC] = reset_vector & ~1
+        self.core_registers[REG_XPSR] = XPSR_THUMB if (reset_vector & 1) else 0
+        self.core_registers[REG_LR] = 0xffffffff
+        self._reset_st = True
+        self._retire_st = False
+        if (self._dhcsr_ctrl & C_DEBUGEN) and (self._ppb.get(DEMCR, 0) & DEMCR_VC_CORERESET):
+            self._halt(DFSR_VCATCH)
+        else:
+            self.is_halted = False
+
+    def set_reset_pin(self, asserted: bool) -> None:
+        """@brief Model the nRESET pin; the system reset occurs on deassertion."""
+        if asserted:
+            self.is_reset_asserted = True
+            self._reset_st = True
+        elif self.is_reset_asserted:
+            self.is_reset_asserted = False
+            self.system_reset()
+
+    def _halt(self, reason: int) -> None:
+        # The core sets C_HALT when it enters debug state for any reason.
+        self.is_halted = True
+        self._dhcsr_ctrl |= C_HALT
+        self._ppb[DFSR] = self._ppb.get(DFSR, 0) | reason
+
+    def _resume(self, step: bool) -> None:
+        self._retire_st = True
+        pc = self._reg(REG_PC) & ~1
+        hook = self._get_hook(pc)
+        if hook is not None:
+            # Run the hook, then return to LR. The return address holds a breakpoint.
+            self._call_hook(hook)
+            self._halt(DFSR_BKPT)
+        elif step:
+            try:
+                self._thumb.step()
+            except Breakpoint:
+                self._halt(DFSR_BKPT)
+                return
+            except (UndefinedInstruction, BusFault):
+                self.core_registers[REG_PC] = (pc + 2) & 0xffffffff
+            self._halt(DFSR_HALTED)
+        elif self._is_function_call() or self.ram.contains_range(pc, 2) or self._fpb_breakpoints():
+            self._run()
+        else:
+            self.is_halted = False
+
+    def _call_hook(self, hook: Callable[[], int]) -> None:
+        self.core_registers[REG_R0] = hook() & 0xffffffff
+        self.core_registers[REG_PC] = self._reg(REG_LR) & ~1
+
+    def _is_function_call(self) -> bool:
+        """@brief Whether LR holds a return address with a breakpoint, as set up by pyOCD's stub calls."""
+        try:
+            return (self.read(self._reg(REG_LR) & ~1, 2) & 0xff00) == 0xbe00
+        except BusFault:
+            return False
+
+    def _run(self) -> None:
+        """@brief Interpret code until a breakpoint is reached.
+
+        The core is left running if an unsupported instruction, a fault, or a branch to itself is
+        encountered, or the instruction limit is reached.
+        """
+        breakpoints = self._fpb_breakpoints()
+        for _ in range(RUN_INSTRUCTION_LIMIT):
+            pc = self._reg(REG_PC) & ~1
+            if pc in breakpoints:
+                self._halt(DFSR_BKPT)
+                return
+            hook = self._get_hook(pc)
+            try:
+                if hook is not None:
+                    self._call_hook(hook)
+                else:
+                    self._thumb.step()
+                    # A branch to itself would spin until the instruction limit.
+                    if self._reg(REG_PC) == pc:
+                        break
+            except Breakpoint:
+                self._halt(DFSR_BKPT)
+                return
+            except (UndefinedInstruction, BusFault) as err:
+                LOG.debug("simulated core stopped interpreting at %#010x: %s", self._reg(REG_PC), err)
+                break
+        self.is_halted = False
+
+    # ------------------------------------------- #
+    #          PPB register handlers
+    # ------------------------------------------- #
+    def _read_dhcsr(self) -> int:
+        value = self._dhcsr_ctrl | S_REGRDY
+        if self.is_halted:
+            value |= S_HALT
+        if self._reset_st:
+            value |= S_RESET_ST
+            if not self.is_reset_asserted:
+                self._reset_st = False
+        if self._retire_st or not self.is_halted:
+            value |= S_RETIRE_ST
+            self._retire_st = False
+        return value
+
+    def _write_dhcsr(self, value: int) -> None:
+        if (value & 0xffff0000) != DBGKEY:
+            return
+        ctrl = value & (C_DEBUGEN | C_HALT | C_STEP | C_MASKINTS | C_SNAPSTALL)
+        self._dhcsr_ctrl = ctrl
+        if not (ctrl & C_DEBUGEN):
+            self.is_halted = False
+        elif ctrl & C_HALT:
+            if not self.is_halted:
+                self._halt(DFSR_HALTED)
+        elif self.is_halted:
+            self._resume(step=bool(ctrl & C_STEP))
+
+    def _write_dcrsr(self, value: int) -> None:
+        reg = value & 0x7f
+        if value & DCRSR_REGWnR:
+            self.core_registers[reg] = self._ppb.get(DCRDR, 0)
+        else:
+            self._ppb[DCRDR] = self.core_registers.get(reg, 0)
+
+    def _write_dfsr(self, value: int) -> None:
+        self._ppb[DFSR] = self._ppb.get(DFSR, 0) & ~value
+
+    def _write_aircr(self, value: int) -> None:
+        if (value >> 16) != AIRCR_VECTKEY:
+            return
+        if value & (AIRCR_SYSRESETREQ | AIRCR_VECTRESET):
+            self.system_reset()
+
+    def _read_fp_ctrl(self) -> int:
+        return ((self._ppb.get(FP_CTRL, 0) & FP_CTRL_ENABLE)
+                | ((FP_CTRL_NUM_CODE & 0xf) << 4)
+                | (FP_CTRL_NUM_LIT << 8)
+                | ((FP_CTRL_NUM_CODE >> 4) << 12))
+
+    def _write_fp_ctrl(self, value: int) -> None:
+        if value & FP_CTRL_KEY:
+            self._ppb[FP_CTRL] = value & FP_CTRL_ENABLE
+
+    def _fpb_breakpoints(self) -> Set[int]:
+        """@brief Return the addresses of the enabled FPBv1 breakpoints."""
+        breakpoints: Set[int] = set()
+        if not (self._ppb.get(FP_CTRL, 0) & FP_CTRL_ENABLE):
+            return breakpoints
+        for i in range(FP_CTRL_NUM_CODE):
+            comp = self._ppb.get(FP_COMP0 + i * 4, 0)
+            if not (comp & 1):
+                continue
+            replace = comp >> 30
+            if replace & 1:
+                breakpoints.add(comp & 0x1ffffffc)
+            if replace & 2:
+                breakpoints.add((comp & 0x1ffffffc) + 2)
+        return breakpoints
+
+    def _read_ppb(self, addr: int) -> int:
+        handler = self._ppb_read_handlers.get(addr)
+        if handler is not None:
+            return handler()
+        return self._ppb.get(addr, 0)
+
+    def _write_ppb(self, addr: int, value: int) -> None:
+        handler = self._ppb_write_handlers.get(addr)
+        if handler is not None:
+            handler(value)
+        else:
+            self._ppb[addr] = value
+
+    # ------------------------------------------- #
+    #          Bus access
+    # ------------------------------------------- #
+    def _find_region(self, addr: int, length: int) -> MemoryRegionModel:
+        for region in self.regions:
+            if region.contains_range(addr, length):
+                return region
+        raise BusFault(addr)
+
+    def read_bytes(self, addr: int, length: int) -> bytes:
+        """@brief Read a range of bytes that lies within one memory region."""
+        return self._find_region(addr, length).read(addr, length)
+
+    def write_bytes(self, addr: int, data: bytes) -> None:
+        """@brief Write a range of bytes that lies within one memory region."""
+        self._find_region(addr, len(data)).write(addr, data)
+
+    def read32(self, addr: int) -> int:
+        return self.read(addr, 4)
+
+    def write32(self, addr: int, value: int) -> None:
+        self.write(addr, 4, value)
+
+    def read(self, addr: int, size: int) -> int:
+        """@brief Read a naturally aligned 1, 2, or 4 byte value."""
+        if PPB_START <= addr <= PPB_END:
+            word = self._read_ppb(addr & ~0x3)
+            return (word >> ((addr & 0x3) * 8)) & ((1 << (size * 8)) - 1)
+        return int.from_bytes(self.read_bytes(addr, size), 'little')
+
+    def write(self, addr: int, size: int, value: int) -> None:
+        """@brief Write a naturally aligned 1, 2, or 4 byte value."""
+        if PPB_START <= addr <= PPB_END:
+            if size != 4:
+                shift = (addr & 0x3) * 8
+                mask = ((1 << (size * 8)) - 1) << shift
+                word = self._ppb.get(addr & ~0x3, 0)
+                value = (word & ~mask) | ((value << shift) & mask)
+            self._write_ppb(addr & ~0x3, value)
+        else:
+            self.write_bytes(addr, value.to_bytes(size, 'little'))
+
+    def find_bulk_region(self, addr: int, length: int) -> Optional[MemoryRegionModel]:
+        """@brief Return the memory region containing the range, or None for PPB or unmapped addresses."""
+        for region in self.regions:
+            if region.contains_range(addr, length):
+                return region
+        return None
@@ -0,0 +1,417 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Interpreter for the ARMv6-M Thumb instruction set used by the simulated device.
+
+Only the user level instructions needed to run small position independent routines, such as the
+stubs pyOCD loads into target RAM, are implemented. Exceptions, the system instructions, and
+memory ordering are not modelled.
+"""
+
+from typing import (Callable, Dict, Optional, TYPE_CHECKING)
+
+if TYPE_CHECKING:
+    from .simulated_target import SimulatedDevice
+
+REG_SP = 13
+REG_LR = 14
+REG_PC = 15
+REG_XPSR = 16
+
+APSR_N = 1 << 31
+APSR_Z = 1 << 30
+APSR_C = 1 << 29
+APSR_V = 1 << 28
+
+MASK32 = 0xffffffff
+
+class UndefinedInstruction(Exception):
+    """@brief Raised for an instruction the interpreter does not implement."""
+    pass
+
+class Breakpoint(Exception):
+    """@brief Raised when a BKPT instruction is executed. The PC is left at the instruction."""
+    pass
+
+def _sign_extend(value: int, bits: int) -> int:
+    sign = 1 << (bits - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+class ThumbInterpreter:
+    """@brief Executes Thumb instructions using a simulated device's core registers and memory."""
+
+    def __init__(self, device: "SimulatedDevice") -> None:
+        self._device = device
+        self._conditions: Dict[int, Callable[[int], bool]] = {
+            0x0: lambda f: bool(f & APSR_Z),
+            0x1: lambda f: not (f & APSR_Z),
+            0x2: lambda f: bool(f & APSR_C),
+            0x3: lambda f: not (f & APSR_C),
+            0x4: lambda f: bool(f & APSR_N),
+            0x5: lambda f: not (f & APSR_N),
+            0x6: lambda f: bool(f & APSR_V),
+            0x7: lambda f: not (f & APSR_V),
+            0x8: lambda f: bool(f & APSR_C) and not (f & APSR_Z),
+            0x9: lambda f: not (f & APSR_C) or bool(f & APSR_Z),
+            0xa: lambda f: bool(f & APSR_N) == bool(f & APSR_V),
+            0xb: lambda f: bool(f & APSR_N) != bool(f & APSR_V),
+            0xc: lambda f: not (f & APSR_Z) and (bool(f & APSR_N) == bool(f & APSR_V)),
+            0xd: lambda f: bool(f & APSR_Z) or (bool(f & APSR_N) != bool(f & APSR_V)),
+            }
+
+    @property
+    def _regs(self) -> Dict[int, int]:
+        # The device replaces its register dict on reset.
+        return self._device.core_registers
+
+    def _get(self, reg: int) -> int:
+        if reg == REG_PC:
+            # Reads of the PC return the address of the current instruction plus 4.
+            return (self._regs.get(REG_PC, 0) + 4) & MASK32
+        return self._regs.get(reg, 0)
+
+    def _set(self, reg: int, value: int) -> None:
+        if reg == REG_PC:
+            value &= ~1
+        self._regs[reg] = value & MASK32
+
+    @property
+    def _flags(self) -> int:
+        return self._regs.get(REG_XPSR, 0)
+
+    def _set_flags(self, result: int, carry: Optional[bool] = None, overflow: Optional[bool] = None) -> None:
+        xpsr = self._flags & ~(APSR_N | APSR_Z)
+        if result & (1 << 31):
+            xpsr |= APSR_N
+        if (result & MASK32) == 0:
+            xpsr |= APSR_Z
+        if carry is not None:
+            xpsr = (xpsr | APSR_C) if carry else (xpsr & ~APSR_C)
+        if overflow is not None:
+            xpsr = (xpsr | APSR_V) if overflow else (xpsr & ~APSR_V)
+        self._regs[REG_XPSR] = xpsr
+
+    def _add_with_carry(self, a: int, b: int, carry_in: int) -> int:
+        unsigned_sum = a + b + carry_in
+        result = unsigned_sum & MASK32
+        signed_sum = _sign_extend(a, 32) + _sign_extend(b, 32) + carry_in
+        self._set_flags(result, carry=unsigned_sum > MASK32,
+                overflow=_sign_extend(result, 32) != signed_sum)
+        return result
+
+    def _read(self, address: int, size: int) -> int:
+        if address % size:
+            raise UndefinedInstruction("unaligned access to %#010x" % address)
+        return self._device.read(address, size)
+
+    def _write(self, address: int, size: int, value: int) -> None:
+        if address % size:
+            raise UndefinedInstruction("unaligned access to %#010x" % address)
+        self._device.write(address, size, value & ((1 << (size * 8)) - 1))
+
+    def step(self) -> None:
+        """@brief Execute the instruction at the PC.
+        @exception Breakpoint The instruction is a BKPT.
+        @exception UndefinedInstruction The instruction is not implemented.
+        @exception BusFault An instruction fetch or data access faulted.
+        """
+        pc = self._regs.get(REG_PC, 0) & ~1
+        self._regs[REG_PC] = pc
+        instr = self._device.read(pc, 2)
+        next_pc = pc + 2
+        op = instr >> 11
+
+        if op == 0b11110 or op == 0b11111 or op == 0b11101:
+            # 32-bit instructions. Only BL is supported.
+            instr2 = self._device.read(pc + 2, 2)
+            if op != 0b11110 or (instr2 & 0xd000) != 0xd000:
+                raise UndefinedInstruction("unsupported instruction %04x %04x" % (instr, instr2))
+            s = (instr >> 10) & 1
+            j1 = (instr2 >> 13) & 1
+            j2 = (instr2 >> 11) & 1
+            imm = (s << 24) | ((1 - (j1 ^ s)) << 23) | ((1 - (j2 ^ s)) << 22) \
+                    | ((instr & 0x3ff) << 12) | ((instr2 & 0x7ff) << 1)
+            self._set(REG_LR, (pc + 4) | 1)
+            next_pc = pc + 4 + _sign_extend(imm, 25)
+        elif op <= 0b00010:
+            # LSL, LSR, ASR (immediate).
+            rd = instr & 7
+            value = self._get((instr >> 3) & 7)
+            shift = (instr >> 6) & 0x1f
+            carry = None
+            if op == 0b00000:
+                if shift:
+                    carry = bool((value >> (32 - shift)) & 1)
+                result = value << shift
+            else:
+                shift = shift or 32
+                carry = bool((value >> (shift - 1)) & 1)
+                if op == 0b00001:
+                    result = value >> shift
+                else:
+                    result = _sign_extend(value, 32) >> shift
+            result &= MASK32
+            self._set(rd, result)
+            self._set_flags(result, carry=carry)
+        elif op == 0b00011:
+            # ADD, SUB (register or 3-bit immediate).
+            rd = instr & 7
+            a = self._get((instr >> 3) & 7)
+            b = ((instr >> 6) & 7) if (instr & (1 << 10)) else self._get((instr >> 6) & 7)
+            if instr & (1 << 9):
+                self._set(rd, self._add_with_carry(a, ~b & MASK32, 1))
+            else:
+                self._set(rd, self._add_with_carry(a, b, 0))
+        elif (instr >> 13) == 0b001:
+            # MOV, CMP, ADD, SUB (8-bit immediate).
+            rd = (instr >> 8) & 7
+            imm = instr & 0xff
+            opc = (instr >> 11) & 3
+            if opc == 0:
+                self._set(rd, imm)
+                self._set_flags(imm)
+            elif opc == 1:
+                self._add_with_carry(self._get(rd), ~imm & MASK32, 1)
+            elif opc == 2:
+                self._set(rd, self._add_with_carry(self._get(rd), imm, 0))
+            else:
+                self._set(rd, self._add_with_carry(self._get(rd), ~imm & MASK32, 1))
+        elif (instr >> 10) == 0b010000:
+            self._data_processing(instr)
+        elif (instr >> 10) == 0b010001:
+            next_pc = self._special_data(instr, next_pc)
+        elif op == 0b01001:
+            # LDR (literal).
+            address = (self._get(REG_PC) & ~3) + ((instr & 0xff) << 2)
+            self._set((instr >> 8) & 7, self._read(address, 4))
+        elif (instr >> 12) == 0b0101:
+            self._load_store_register(instr)
+        elif (instr >> 13) == 0b011 or (instr >> 12) == 0b1000:
+            # STR, LDR, STRB, LDRB, STRH, LDRH (immediate).
+            if (instr >> 12) == 0b1000:
+                size = 2
+            else:
+                size = 1 if (instr & (1 << 12)) else 4
+            address = (self._get((instr >> 3) & 7) + ((instr >> 6) & 0x1f) * size) & MASK32
+            rt = instr & 7
+            if instr & (1 << 11):
+                self._set(rt, self._read(address, size))
+            else:
+                self._write(address, size, self._get(rt))
+        elif (instr >> 12) == 0b1001:
+            # STR, LDR (SP relative).
+            address = (self._get(REG_SP) + ((instr & 0xff) << 2)) & MASK32
+            rt = (instr >> 8) & 7
+            if instr & (1 << 11):
+                self._set(rt, self._read(address, 4))
+            else:
+                self._write(address, 4, self._get(rt))
+        elif (instr >> 12) == 0b1010:
+            # ADR, ADD (SP plus immediate).
+            base = self._get(REG_SP) if (instr & (1 << 11)) else (self._get(REG_PC) & ~3)
+            self._set((instr >> 8) & 7, base + ((instr & 0xff) << 2))
+        elif (instr >> 12) == 0b1011:
+            next_pc = self._miscellaneous(instr, next_pc)
+        elif (instr >> 12) == 0b1100:
+            # STM, LDM.
+            rn = (instr >> 8) & 7
+            address = self._get(rn)
+            registers = [r for r in range(8) if instr & (1 << r)]
+            for reg in registers:
+                if instr & (1 << 11):
+                    self._set(reg, self._read(address, 4))
+                else:
+                    self._write(address, 4, self._get(reg))
+                address += 4
+            if not (instr & (1 << 11)) or rn not in registers:
+                self._set(rn, address)
+        elif (instr >> 12) == 0b1101:
+            # B<cond>.
+            cond = (instr >> 8) & 0xf
+            if cond >= 0xe:
+                raise UndefinedInstruction("unsupported instruction %04x" % instr)
+            if self._conditions[cond](self._flags):
+                next_pc = pc + 4 + _sign_extend(instr & 0xff, 8) * 2
+        elif op == 0b11100:
+            # B.
+            next_pc = pc + 4 + _sign_extend(instr & 0x7ff, 11) * 2
+        else:
+            raise UndefinedInstruction("unsupported instruction %04x" % instr)
+
+        self._regs[REG_PC] = next_pc & MASK32 & ~1
+
+    def _data_processing(self, instr: int) -> None:
+        opc = (instr >> 6) & 0xf
+        rd = instr & 7
+        a = self._get(rd)
+        b = self._get((instr >> 3) & 7)
+        if opc == 0x0: # AND
+            result = a & b
+        elif opc == 0x1: # EOR
+            result = a ^ b
+        elif opc in (0x2, 0x3, 0x4, 0x7): # LSL, LSR, ASR, ROR (register)
+            shift = b & 0xff
+            carry = None
+            if shift == 0:
+                result = a
+            elif opc == 0x2:
+                result = (a << shift) & MASK32
+                carry = shift <= 32 and bool((a >> (32 - shift)) & 1)
+            elif opc == 0x3:
+                result = a >> shift if shift < 32 else 0
+                carry = shift <= 32 and bool((a >> (shift - 1)) & 1)
+            elif opc == 0x4:
+                result = (_sign_extend(a, 32) >> min(shift, 32)) & MASK32
+                carry = bool((_sign_extend(a, 32) >> (min(shift, 32) - 1)) & 1)
+            else:
+                rotate = shift % 32
+                result = ((a >> rotate) | (a << (32 - rotate))) & MASK32
+                carry = bool(result & (1 << 31))
+            self._set(rd, result)
+            self._set_flags(result, carry=carry)
+            return
+        elif opc == 0x5: # ADC
+            self._set(rd, self._add_with_carry(a, b, int(bool(self._flags & APSR_C))))
+            return
+        elif opc == 0x6: # SBC
+            self._set(rd, self._add_with_carry(a, ~b & MASK32, int(bool(self._flags & APSR_C))))
+            return
+        elif opc == 0x8: # TST
+            self._set_flags(a & b)
+            return
+        elif opc == 0x9: # RSB (NEG)
+            self._set(rd, self._add_with_carry(~b & MASK32, 0, 1))
+            return
+        elif opc == 0xa: # CMP
+            self._add_with_carry(a, ~b & MASK32, 1)
+            return
+        elif opc == 0xb: # CMN
+            self._add_with_carry(a, b, 0)
+            return
+        elif opc == 0xc: # ORR
+            result = a | b
+        elif opc == 0xd: # MUL
+            result = (a * b) & MASK32
+        elif opc == 0xe: # BIC
+            result = a & ~b & MASK32
+        else: # MVN
+            result = ~b & MASK32
+        self._set(rd, result)
+        self._set_flags(result)
+
+    def _special_data(self, instr: int, next_pc: int) -> int:
+        opc = (instr >> 8) & 3
+        rm = (instr >> 3) & 0xf
+        rd = (instr & 7) | ((instr >> 4) & 8)
+        if opc == 0: # ADD (register)
+            result = (self._get(rd) + self._get(rm)) & MASK32
+            if rd == REG_PC:
+                return result & ~1
+            self._set(rd, result)
+        elif opc == 1: # CMP (register)
+            self._add_with_carry(self._get(rd), ~self._get(rm) & MASK32, 1)
+        elif opc == 2: # MOV (register)
+            if rd == REG_PC:
+                return self._get(rm) & ~1
+            self._set(rd, self._get(rm))
+        else: # BX, BLX
+            target = self._get(rm)
+            if instr & (1 << 7):
+                self._set(REG_LR, next_pc | 1)
+            if not (target & 1):
+                raise UndefinedInstruction("interworking branch to ARM state")
+            return target & ~1
+        return next_pc
+
+    def _load_store_register(self, instr: int) -> None:
+        opc = (instr >> 9) & 7
+        rt = instr & 7
+        address = (self._get((instr >> 3) & 7) + self._get((instr >> 6) & 7)) & MASK32
+        if opc == 0: # STR
+            self._write(address, 4, self._get(rt))
+        elif opc == 1: # STRH
+            self._write(address, 2, self._get(rt))
+        elif opc == 2: # STRB
+            self._write(address, 1, self._get(rt))
+        elif opc == 3: # LDRSB
+            self._set(rt, _sign_extend(self._read(address, 1), 8))
+        elif opc == 4: # LDR
+            self._set(rt, self._read(address, 4))
+        elif opc == 5: # LDRH
+            self._set(rt, self._read(address, 2))
+        elif opc == 6: # LDRB
+            self._set(rt, self._read(address, 1))
+        else: # LDRSH
+            self._set(rt, _sign_extend(self._read(address, 2), 16))
+
+    def _miscellaneous(self, instr: int, next_pc: int) -> int:
+        if (instr & 0xff00) == 0xb000:
+            # ADD, SUB (SP plus immediate).
+            offset = (instr & 0x7f) << 2
+            self._set(REG_SP, self._get(REG_SP) + (-offset if (instr & 0x80) else offset))
+        elif (instr & 0xff00) == 0xb200:
+            # SXTH, SXTB, UXTH, UXTB.
+            value = self._get((instr >> 3) & 7)
+            opc = (instr >> 6) & 3
+            if opc == 0:
+                value = _sign_extend(value & 0xffff, 16)
+            elif opc == 1:
+                value = _sign_extend(value & 0xff, 8)
+            elif opc == 2:
+                value &= 0xffff
+            else:
+                value &= 0xff
+            self._set(instr & 7, value)
+        elif (instr & 0xfe00) == 0xb400:
+            # PUSH.
+            registers = [r for r in range(8) if instr & (1 << r)]
+            if instr & (1 << 8):
+                registers.append(REG_LR)
+            address = self._get(REG_SP) - 4 * len(registers)
+            self._set(REG_SP, address)
+            for reg in registers:
+                self._write(address, 4, self._get(reg))
+                address += 4
+        elif (instr & 0xfe00) == 0xbc00:
+            # POP.
+            address = self._get(REG_SP)
+            for reg in range(8):
+                if instr & (1 << reg):
+                    self._set(reg, self._read(address, 4))
+                    address += 4
+            if instr & (1 << 8):
+                next_pc = self._read(address, 4) & ~1
+                address += 4
+            self._set(REG_SP, address)
+        elif (instr & 0xff00) == 0xba00 and ((instr >> 6) & 3) != 2:
+            # REV, REV16, REVSH.
+            value = self._get((instr >> 3) & 7)
+            opc = (instr >> 6) & 3
+            if opc == 0:
+                value = int.from_bytes(value.to_bytes(4, 'little'), 'big')
+            elif opc == 1:
+                value = ((value & 0x00ff00ff) << 8) | ((value >> 8) & 0x00ff00ff)
+            else:
+                value = _sign_extend(((value & 0xff) << 8) | ((value >> 8) & 0xff), 16)
+            self._set(instr & 7, value)
+        elif (instr & 0xff00) == 0xbe00:
+            raise Breakpoint()
+        elif (instr & 0xff0f) == 0xbf00:
+            # NOP and the other hints.
+            pass
+        else:
+            raise UndefinedInstruction("unsupported instruction %04x" % instr)
+        return next_pc
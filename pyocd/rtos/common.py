@@ -26,38 +26,44 @@ LOG = logging.getLogger(__name__)
 # on the frame. The bit is 0 if the frame is extended.
 EXC_RETURN_EXT_FRAME_MASK = (1 << 4)
 
+def decode_c_string(data):
+    """@brief Decodes a null-terminated C string from bytes read from the target.
+
+    Non-ASCII characters are replaced with '?'. If there is a run of more than 4 of them, the string
+    is terminated early.
+
+    @return Tuple of the string and whether the end of the string was found within _data_.
+    """
+    s = ""
+    badCount = 0
+    for c in data:
+        if c == 0:
+            return s, True
+        elif c > 127:
+            badCount += 1
+            if badCount > 4:
+                return s, True
+            s += '?'
+        else:
+            s += chr(c)
+            badCount = 0
+    return s, False
+
 def read_c_string(context, ptr):
     """@brief Reads a null-terminated C string from the target."""
     if ptr == 0:
         return ""
 
+    data = bytearray()
     s = ""
-    done = False
-    count = 0
-    badCount = 0
     try:
-        while not done and count < 256:
-            data = context.read_memory_block8(ptr, 16)
-            ptr += 16
-            count += 16
-
-            for c in data:
-                if c == 0:
-                    done = True
-                    break
-                elif c > 127:
-                    # Replace non-ASCII characters. If there is a run of invalid characters longer
-                    # than 4, then terminate the string early.
-                    badCount += 1
-                    if badCount > 4:
-                        done = True
-                        break
-                    s += '?'
-                else:
-                    s += chr(c)
-                    badCount = 0
+        while len(data) < 256:
+            data += context.read_memory_block8(ptr + len(data), 16)
+            s, done = decode_c_string(data)
+            if done:
+                break
     except exceptions.TransferError:
-        LOG.debug("TransferError while trying to read 16 bytes at 0x%08x", ptr)
+        LOG.debug("TransferError while trying to read 16 bytes at 0x%08x", ptr + len(data))
 
     return s
 
@@ -19,22 +19,26 @@
 import logging
 
 from .provider import (TargetThread, ThreadProvider)
-from .common import (read_c_string, HandlerModeThread)
+from .common import (decode_c_string, read_c_string, HandlerModeThread)
 from ..core import exceptions
 from ..core.target import Target
 from ..core.plugin import Plugin
 from ..debug.context import DebugContext
 from ..coresight.cortex_m_core_registers import index_for_reg
+from ..utility.conversion import byte_list_to_u32le_list
 from ..utility.mask import twos_complement
 
 # Create a logger for this module.
 LOG = logging.getLogger(__name__)
 
 class TargetList(object):
-    def __init__(self, context, ptr, next_offset):
+    def __init__(self, context, ptr, next_offset, read_next=None):
+        """@param read_next Optional callable that returns a node's next pointer, or None to
+            read it from the target."""
         self._context = context
         self._list = ptr
         self._list_node_next_offset = next_offset
+        self._read_next = read_next
 
     def __iter__(self):
         node = self._context.read32(self._list)
@@ -44,7 +48,10 @@ class TargetList(object):
                 yield node
 
                 # Read next list node pointer.
-                node = self._context.read32(node + self._list_node_next_offset)
+                next_node = self._read_next(node) if (self._read_next is not None) else None
+                if next_node is None:
+                    next_node = self._context.read32(node + self._list_node_next_offset)
+                node = next_node
             except exceptions.TransferError:
                 LOG.warning("TransferError while reading list elements (list=0x%08x, node=0x%08x), terminating list", self._list, node)
                 node = 0
@@ -165,7 +172,7 @@ class ZephyrThread(TargetThread):
             RUNNING : "Running",
         }
 
-    def __init__(self, targetContext, provider, base, offsets):
+    def __init__(self, targetContext, provider, base, offsets, info=None):
         super(ZephyrThread, self).__init__()
         self._target_context = targetContext
         self._provider = provider
@@ -175,9 +182,10 @@ class ZephyrThread(TargetThread):
         self._state = ZephyrThread.READY
         self._priority = 0
         self._name = "Unnamed"
+        self._name_data = None
 
         try:
-            self.update_info()
+            self.update_info(info)
         except exceptions.TransferError:
             LOG.debug("Transfer error while reading thread info")
 
@@ -190,14 +198,28 @@ class ZephyrThread(TargetThread):
             LOG.debug("Transfer error while reading thread's stack pointer @ 0x%08x", addr)
             return 0
 
-    def update_info(self):
+    def update_info(self, info=None):
+        """@brief Update the thread's priority, state, and name.
+
+        @param self
+        @param info Optional thread info block already read by the provider with
+            ZephyrThreadProvider.read_thread_infos(). If not provided, the block is read.
+        """
         try:
-            self._priority = twos_complement(self._target_context.read8(self._base + self._offsets["t_prio"]), width=8)
-            self._state = self._target_context.read8(self._base + self._offsets["t_state"])
+            if info is None:
+                info = self._provider.read_thread_info(self._base)
+            self._priority = twos_complement(self._provider.get_info_field(info, "t_prio", 1)[0], width=8)
+            self._state = self._provider.get_info_field(info, "t_state", 1)[0]
 
             if self._provider.version > 0:
-                addr = self._base + self._offsets["t_name"]
-                self._name = read_c_string(self._target_context, addr)
+                # The name is only decoded again if its bytes changed.
+                name_data = self._provider.get_info_field(info, "t_name", ZephyrThreadProvider.NAME_READ_SIZE)
+                if name_data != self._name_data:
+                    self._name_data = name_data
+                    self._name, done = decode_c_string(name_data)
+                    if not done:
+                        addr = self._base + self._offsets["t_name"]
+                        self._name = read_c_string(self._target_context, addr)
 
         except exceptions.TransferError:
             LOG.debug("Transfer error while reading thread info")
@@ -250,6 +272,10 @@ class ZephyrThreadProvider(ThreadProvider):
         "_kernel_thread_info_size_t_size",
         ]
 
+    ## Number of bytes of the thread name read with the other thread info. A longer name is read
+    # separately.
+    NAME_READ_SIZE = 32
+
     ZEPHYR_OFFSETS = [
         'version',
         'k_curr_thread',
@@ -271,6 +297,8 @@ class ZephyrThreadProvider(ThreadProvider):
         self._all_threads = None
         self._curr_thread = None
         self._threads = {}
+        self._info_start = 0
+        self._info_size = 0
 
     def init(self, symbolProvider):
         # Lookup required symbols.
@@ -318,6 +346,38 @@ class ZephyrThreadProvider(ThreadProvider):
             self._curr_thread = self._symbols["_kernel"] + self._offsets["k_curr_thread"]
             LOG.debug("version = %d, _all_threads = 0x%08x, _curr_thread = 0x%08x", self._version, self._all_threads, self._curr_thread)
 
+            # Word aligned span of the thread structure holding the members that are read.
+            fields = [("t_next_thread", 4), ("t_state", 1), ("t_prio", 1)]
+            if self._version > 0:
+                fields.append(("t_name", self.NAME_READ_SIZE))
+            start = min(self._offsets[name] for name, _ in fields) & ~3
+            end = max(self._offsets[name] + size for name, size in fields)
+            self._info_start = start
+            self._info_size = (end - start + 3) & ~3
+
+    def read_thread_info(self, base):
+        """@brief Read the block of a thread structure holding the members used by pyOCD."""
+        return bytes(self._target_context.read_memory_block8(base + self._info_start, self._info_size))
+
+    def read_thread_infos(self, bases):
+        """@brief Read the info blocks of several threads, with all reads queued together.
+
+        @return Dict mapping thread base address to info block. Empty if the reads failed.
+        """
+        bases = list(bases)
+        try:
+            results = self._target_context.read_memory_ranges(
+                    [(base + self._info_start, self._info_size) for base in bases])
+        except exceptions.TransferError:
+            LOG.debug("TransferError while reading thread infos")
+            return {}
+        return {base: bytes(data) for base, data in zip(bases, results)}
+
+    def get_info_field(self, info, name, size):
+        """@brief Extract a member of a thread structure from its info block."""
+        offset = self._offsets[name] - self._info_start
+        return info[offset:offset + size]
+
     def invalidate(self):
         self._threads = {}
 
@@ -330,7 +390,19 @@ class ZephyrThreadProvider(ThreadProvider):
             self._update()
 
     def _build_thread_list(self):
-        allThreads = TargetList(self._target_context, self._all_threads, self._offsets["t_next_thread"])
+        # Read the info of all threads known from the last update at once. The list is walked with
+        # the next pointers from these blocks, so only new threads are read one by one.
+        infos = self.read_thread_infos(base for base in self._threads
+                if base != HandlerModeThread.UNIQUE_ID)
+
+        def read_next(node):
+            info = infos.get(node)
+            if info is None:
+                return None
+            return byte_list_to_u32le_list(self.get_info_field(info, "t_next_thread", 4))[0]
+
+        allThreads = TargetList(self._target_context, self._all_threads, self._offsets["t_next_thread"],
+                read_next)
         newThreads = {}
 
         currentThread = self._target_context.read32(self._curr_thread)
@@ -343,9 +415,10 @@ class ZephyrThreadProvider(ThreadProvider):
                     t = self._threads[threadBase]
 
                     # Ask the thread object to update its state and priority.
-                    t.update_info()
+                    t.update_info(infos.get(threadBase))
                 else:
-                    t = ZephyrThread(self._target_context, self, threadBase, self._offsets)
+                    t = ZephyrThread(self._target_context, self, threadBase, self._offsets,
+                            infos.get(threadBase))
 
                 # Set thread state.
                 if threadBase == currentThread:
@@ -0,0 +1,235 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import logging
+import os
+import sys
+import threading
+from time import perf_counter
+from typing import (Any, Dict, List)
+
+from elftools.common.exceptions import ELFError
+
+from pyocd.core.helpers import ConnectHelper
+from pyocd.core import exceptions
+from pyocd.coresight.dwt import DWT
+from pyocd.coresight.itm import ITM
+from pyocd.coresight.tpiu import TPIU
+from pyocd.debug.elf.elf import ELFBinaryFile
+from pyocd.probe.debug_probe import DebugProbe
+from pyocd.subcommands.base import SubcommandBase
+from pyocd.trace.profiler import (PCSampleProfile, ProfileSymbolizer, write_collapsed, write_pprof,
+        write_report)
+from pyocd.trace.swv import SWVReader
+from pyocd.utility.cmdline import (convert_session_options, int_base_0)
+from pyocd.utility.timeout import Timeout
+
+LOG = logging.getLogger(__name__)
+
+class ProfileSubcommand(SubcommandBase):
+    """@brief `pyocd profile` subcommand."""
+
+    NAMES = ["profile"]
+    HELP = "Profile the running program by sampling its PC."
+
+    ## Number of DWT_PCSR reads queued in each probe transaction when polling.
+    PCSR_BATCH_SIZE = 64
+
+    ## Time in seconds between checks for the end of the profile while sampling over SWO.
+    SWO_WAIT_INTERVAL = 0.1
+
+    @classmethod
+    def get_args(cls) -> List[argparse.ArgumentParser]:
+        """@brief Add this subcommand to the subparsers object."""
+        profile_parser = argparse.ArgumentParser(description=cls.HELP, add_help=False)
+
+        profile_options = profile_parser.add_argument_group("profile options")
+        profile_options.add_argument("--elf", metavar="PATH",
+            help="ELF file of the running program, used to resolve PCs to functions and source lines.")
+        profile_options.add_argument("-d", "--duration", type=float, default=10.0, metavar="SECONDS",
+            help="Duration of the profile in seconds. Press Ctrl-C to stop early. Default is 10 seconds.")
+        profile_options.add_argument("-c", "--core", type=int, default=0,
+            help="Number of the core to profile. Default is core 0.")
+        profile_options.add_argument("--interval", type=int_base_0, default=16384, metavar="CYCLES",
+            help="Processor cycles between PC samples sent over SWO. Rounded to a multiple of 64 "
+                 "cycles, up to 16384. Default is 16384.")
+        profile_options.add_argument("--system-clock", type=int_base_0, default=None, metavar="HZ",
+            help="Frequency of the target's system clock, from which the SWO baud rate is derived. "
+                 "Defaults to the swv_system_clock session option.")
+        profile_options.add_argument("--swo-clock", type=int_base_0, default=None, metavar="HZ",
+            help="SWO baud rate. Defaults to the swv_clock session option.")
+        profile_options.add_argument("--pcsr", action="store_true",
+            help="Sample the PC by polling DWT_PCSR over the debug port instead of using SWO.")
+        profile_options.add_argument("--format", choices=("report", "collapsed", "pprof"), default="report",
+            help="Output format. 'report' is a table of the functions and lines with the most samples, "
+                 "'collapsed' is the collapsed stack format of flame graph tools, and 'pprof' is a "
+                 "gzipped pprof protobuf. Default is report.")
+        profile_options.add_argument("-o", "--output", metavar="PATH",
+            help="Output file. Defaults to stdout.")
+
+        return [cls.CommonOptions.COMMON, cls.CommonOptions.CONNECT, profile_parser]
+
+    def invoke(self) -> int:
+        """@brief Handle 'profile' subcommand."""
+        elf = None
+        if self._args.elf is not None:
+            try:
+                elf = ELFBinaryFile(os.path.expanduser(self._args.elf))
+            except (OSError, ELFError) as err:
+                LOG.error("Failed to open ELF file: %s", err)
+                return 1
+
+        session = ConnectHelper.session_with_chosen_probe(
+                            project_dir=self._args.project_dir,
+                            config_file=self._args.config,
+                            user_script=self._args.script,
+                            no_config=self._args.no_config,
+                            pack=self._args.pack,
+                            unique_id=self._args.unique_id,
+                            target_override=self._args.target_override,
+                            frequency=self._args.frequency,
+                            blocking=(not self._args.no_wait),
+                            connect_mode=self._args.connect_mode,
+                            options=convert_session_options(self._args.options),
+                            option_defaults=self._modified_option_defaults(),
+                            )
+        if session is None:
+            LOG.error("No target device available")
+            return 1
+
+        profile = PCSampleProfile()
+        with session:
+            assert session.board
+            target = session.board.target
+            core = target.cores.get(self._args.core)
+            if core is None:
+                LOG.error("Invalid core number %d", self._args.core)
+                return 1
+            dwt = getattr(core, 'dwt', None)
+            if dwt is None:
+                LOG.error("Core %d has no DWT, so its PC can't be sampled", self._args.core)
+                return 1
+
+            target.resume()
+
+            start = perf_counter()
+            period = 0
+            if self._can_use_swo(session, target):
+                period = self._sample_swo(session, core, dwt, profile)
+            if period == 0:
+                if not self._sample_pcsr(dwt, profile):
+                    return 1
+            duration = perf_counter() - start
+
+        LOG.info("Collected %d samples in %.1f seconds", profile.total, duration)
+        self._write_output(profile, ProfileSymbolizer(elf), period, duration)
+        return 0
+
+    def _modified_option_defaults(self) -> Dict[str, Any]:
+        defaults = super()._modified_option_defaults()
+        # The raw SWV server isn't useful while profiling.
+        defaults['swv_raw_enable'] = False
+        return defaults
+
+    def _get_swo_clocks(self, session):
+        system_clock = self._args.system_clock
+        if system_clock is None:
+            system_clock = session.options.get('swv_system_clock')
+        swo_clock = self._args.swo_clock
+        if swo_clock is None:
+            swo_clock = session.options.get('swv_clock')
+        return system_clock, swo_clock
+
+    def _can_use_swo(self, session, target) -> bool:
+        """@brief Decide whether PC samples can be received over SWO, and log why not."""
+        if self._args.pcsr:
+            return False
+        reason = None
+        if DebugProbe.Capability.SWO not in session.probe.capabilities:
+            reason = "the probe does not support SWO"
+        elif (target.get_first_child_of_type(ITM) is None) or (target.get_first_child_of_type(TPIU) is None):
+            reason = "the target does not have an ITM and TPIU"
+        elif self._get_swo_clocks(session)[0] is None:
+            reason = "the system clock is not known; set it with --system-clock"
+        if reason is not None:
+            LOG.info("Not using SWO because %s", reason)
+            return False
+        return True
+
+    def _sample_swo(self, session, core, dwt, profile: PCSampleProfile) -> int:
+        """@brief Receive PC samples as DWT packets over SWO for the duration of the profile.
+        @return The number of cycles between samples, or 0 if SWV could not be started.
+        """
+        system_clock, swo_clock = self._get_swo_clocks(session)
+        lock = threading.Lock()
+        reader = SWVReader(session, core.core_number, lock)
+        if not reader.init(int(system_clock), int(swo_clock), None, [("profile", profile)]):
+            LOG.info("Not using SWO because SWV could not be started")
+            return 0
+        try:
+            with lock:
+                period = dwt.enable_pc_sampling(self._args.interval)
+            LOG.info("Sampling the PC every %d cycles over SWO", period)
+            try:
+                with Timeout(self._args.duration, self.SWO_WAIT_INTERVAL) as t_o:
+                    while t_o.check():
+                        pass
+            except KeyboardInterrupt:
+                pass
+            with lock:
+                dwt.disable_pc_sampling()
+        finally:
+            reader.stop()
+        return period
+
+    def _sample_pcsr(self, dwt, profile: PCSampleProfile) -> bool:
+        """@brief Poll DWT_PCSR for the duration of the profile.
+        @return Whether the PC could be sampled.
+        """
+        no_sample_count = 0
+        LOG.info("Sampling the PC by polling DWT_PCSR")
+        try:
+            with Timeout(self._args.duration) as t_o:
+                while t_o.check():
+                    samples = dwt.read_pc_samples(self.PCSR_BATCH_SIZE)
+                    pcs = [pc for pc in samples if pc != DWT.DWT_PCSR_NO_SAMPLE]
+                    no_sample_count += len(samples) - len(pcs)
+                    profile.add_samples(pcs)
+        except KeyboardInterrupt:
+            pass
+        except exceptions.TransferError as err:
+            LOG.error("Failed to read DWT_PCSR, which may not be implemented: %s", err)
+            return False
+        if no_sample_count:
+            LOG.info("%d samples were taken while the core was halted", no_sample_count)
+        return True
+
+    def _write_output(self, profile: PCSampleProfile, symbolizer: ProfileSymbolizer, period: int,
+            duration: float) -> None:
+        if self._args.format == "pprof":
+            if self._args.output is None:
+                write_pprof(profile, symbolizer, sys.stdout.buffer, period, duration)
+            else:
+                with open(self._args.output, 'wb') as output:
+                    write_pprof(profile, symbolizer, output, period, duration)
+        else:
+            write = write_collapsed if (self._args.format == "collapsed") else write_report
+            if self._args.output is None:
+                write(profile, symbolizer, sys.stdout)
+            else:
+                with open(self._args.output, 'w', encoding="utf-8") as output:
+                    write(profile, symbolizer, output)
@@ -29,10 +29,13 @@ from typing import List
 
 from pyocd.core.helpers import ConnectHelper
 from pyocd.core.soc_target import SoCTarget
-from pyocd.debug.rtt import RTTControlBlock, RTTUpChannel, RTTDownChannel
+from pyocd.core import exceptions
+from pyocd.debug.rtt import RTTControlBlock, RTTPollInterval, RTTUpChannel, RTTDownChannel
 from pyocd.subcommands.base import SubcommandBase
 from pyocd.utility.cmdline import convert_session_options, int_base_0
 from pyocd.utility.kbhit import KBHit
+from pyocd.utility.rtt_capture import (RTTCapture, RTTCaptureReader, write_pcap, write_text)
+from pyocd.utility.rtt_server import RTTChanFileWorker
 
 
 LOG = logging.getLogger(__name__)
@@ -61,11 +64,25 @@ class RTTSubcommand(SubcommandBase):
                                  help="Down channel ID.")
         rtt_options.add_argument("-d", "--log-file", type=str, default=None,
                                  help="Log file name. When specified, logging mode is enabled.")
+        rtt_options.add_argument("--capture", type=str, default=None, metavar="FILE",
+                                 help="Capture up channels to a binary file, with a timestamp for each chunk of data. "
+                                      "Use --convert to read the capture.")
+        rtt_options.add_argument("--channels", type=int, nargs="+", default=None,
+                                 help="Up channels to capture or convert. Defaults to all channels.")
+        rtt_options.add_argument("--convert", type=str, default=None, metavar="CAPTURE",
+                                 help="Convert a capture file and exit, without connecting to a target.")
+        rtt_options.add_argument("--format", choices=("text", "pcap"), default="text",
+                                 help="Output format of --convert. Defaults to text.")
+        rtt_options.add_argument("-o", "--output", type=str, default=None,
+                                 help="Output file of --convert. Defaults to stdout.")
 
         return [cls.CommonOptions.COMMON, cls.CommonOptions.CONNECT, rtt_parser]
 
     def invoke(self) -> int:
 
+        if self._args.convert is not None:
+            return self.convert_capture()
+
         session = None
         kb = None
 
@@ -105,6 +122,19 @@ class RTTSubcommand(SubcommandBase):
                 LOG.info(f"{len(control_block.up_channels)} up channels and "
                          f"{len(control_block.down_channels)} down channels found")
 
+                if self._args.capture is not None:
+                    channels = self._args.channels
+                    if channels is None:
+                        channels = list(range(len(control_block.up_channels)))
+                    elif not all(0 <= i < len(control_block.up_channels) for i in channels):
+                        LOG.error("Invalid up channel.")
+                        return 1
+
+                    target.resume()
+                    kb = KBHit()
+                    self.capture_loop(control_block, channels, kb)
+                    return 0
+
                 up_chan: RTTUpChannel = control_block.up_channels[self._args.up_channel_id]
                 up_name = up_chan.name if up_chan.name is not None else ""
                 LOG.info(f"Reading from up channel {self._args.up_channel_id} (\"{up_name}\")")
@@ -148,12 +178,11 @@ class RTTSubcommand(SubcommandBase):
         block_size = 0
         last_time = time.time()
 
+        poll_interval = RTTPollInterval()
+
         with open(self._args.log_file, 'wb') as log_file:
 
             while True:
-                # poll at most 1000 times per second to limit CPU use
-                sleep(0.001)
-
                 # read data from up buffer
                 data = up_chan.read()
                 log_file.write(data)
@@ -163,7 +192,8 @@ class RTTSubcommand(SubcommandBase):
                 total_size += s
                 diff = time.time() - last_time
                 if diff > 1.0:
-                    print(f"Transfer rate: {block_size / 1000:.1f} KByte/s; Bytes written: {total_size / 1000:.0f} KByte", end="\r")
+                    print(f"Transfer rate: {block_size / 1000:.1f} KByte/s; Bytes written: {total_size / 1000:.0f} KByte; "
+                          f"Overflows: {up_chan.stats.overflows}", end="\r")
                     block_size = 0
                     last_time = time.time()
 
@@ -171,22 +201,31 @@ class RTTSubcommand(SubcommandBase):
                 if kb.kbhit():
                     break
 
+                # poll again sooner while data is flowing, to keep the buffer from filling up
+                sleep(poll_interval.update(s, up_chan.stats.last_fill))
+
+        self._log_stats(self._args.up_channel_id, up_chan)
+
     def viewer_loop(self, up_chan, down_chan, kb):
         # byte array to send via RTT
         cmd = bytes()
+        up_data: bytes = bytes()
+
+        poll_interval = RTTPollInterval()
 
         while True:
-            # poll at most 1000 times per second to limit CPU use
-            sleep(0.001)
+            # poll again sooner while data is flowing, to keep the buffer from filling up
+            sleep(poll_interval.update(len(up_data), up_chan.stats.last_fill))
 
             # read data from up buffer 0 (target -> host) and write to
             # stdout
-            up_data: bytes = up_chan.read()
+            up_data = up_chan.read()
             sys.stdout.buffer.write(up_data)
             sys.stdout.buffer.flush()
 
             # try to fetch character
             if kb.kbhit():
+                poll_interval.reset()
                 c: str = kb.getch()
 
                 if ord(c) == 27: # process ESC
@@ -208,3 +247,70 @@ class RTTSubcommand(SubcommandBase):
             # write cmd buffer to down buffer 0 (host -> target)
             bytes_out = down_chan.write(cmd)
             cmd = cmd[bytes_out:]
+
+        self._log_stats(self._args.up_channel_id, up_chan)
+
+    def capture_loop(self, control_block, channels, kb):
+        capture = RTTCapture(self._args.capture)
+        workers = {i: RTTChanFileWorker(capture, i) for i in channels}
+        up_chans = [control_block.up_channels[i] for i in channels]
+        poll_interval = RTTPollInterval()
+
+        LOG.info(f"Capturing up channels {', '.join(str(i) for i in channels)} to {self._args.capture} ... "
+                 "Press any key to stop")
+        block_size = 0
+        last_time = time.time()
+
+        try:
+            while True:
+                # read all channels in one transaction
+                s = 0
+                for i, data in control_block.read_up_channels(channels).items():
+                    workers[i].write_up_data(data)
+                    s += len(data)
+
+                block_size += s
+                diff = time.time() - last_time
+                if diff > 1.0:
+                    print(f"Transfer rate: {block_size / 1000:.1f} KByte/s; "
+                          f"Bytes captured: {capture.bytes_captured / 1000:.0f} KByte; "
+                          f"Dropped: {capture.dropped_bytes / 1000:.0f} KByte", end="\r")
+                    block_size = 0
+                    last_time = time.time()
+
+                # try to fetch character
+                if kb.kbhit():
+                    break
+
+                sleep(poll_interval.update(s, max(chan.stats.last_fill for chan in up_chans)))
+        finally:
+            capture.close()
+
+        for i, up_chan in zip(channels, up_chans):
+            self._log_stats(i, up_chan)
+
+    def convert_capture(self) -> int:
+        try:
+            with open(self._args.convert, 'rb', buffering=1024 * 1024) as capture_file:
+                reader = RTTCaptureReader(capture_file)
+                if self._args.format == "pcap":
+                    if self._args.output is None:
+                        write_pcap(reader.frames(), sys.stdout.buffer, reader.start_time, self._args.channels)
+                    else:
+                        with open(self._args.output, 'wb') as output:
+                            write_pcap(reader.frames(), output, reader.start_time, self._args.channels)
+                else:
+                    if self._args.output is None:
+                        write_text(reader.frames(), sys.stdout, self._args.channels)
+                    else:
+                        with open(self._args.output, 'w', encoding="utf-8") as output:
+                            write_text(reader.frames(), output, self._args.channels)
+        except (OSError, exceptions.RTTError) as err:
+            LOG.error(f"Failed to convert {self._args.convert}: {err}")
+            return 1
+        return 0
+
+    def _log_stats(self, channel, up_chan):
+        stats = up_chan.stats
+        LOG.info(f"Up channel {channel}: read {stats.bytes} bytes at {stats.throughput / 1000:.1f} KByte/s; "
+                 f"maximum buffer fill {stats.max_fill:.0%}; {stats.overflows} overflows")
@@ -145,6 +145,7 @@ from . import target_STM32H7B0xx
 from . import target_Air001
 from . import target_Air32F103xx
 from . import target_AMA3B1KK
+from . import target_simulated
 
 ## @brief Dictionary of all builtin targets.
 #
@@ -156,6 +157,7 @@ BUILTIN_TARGETS = {
           'mps3_an522': target_MPS3_AN522.AN522,
           'mps3_an540': target_MPS3_AN540.AN540,
           'cortex_m': CoreSightTarget,
+          'sim_cortex_m': target_simulated.SimulatedCortexM,
           'kinetis': target_kinetis.Kinetis,
           'ke15z7': target_MKE15Z256xxx7.KE15Z7,
           'ke17z7': target_MKE17Z256xxx7.KE17Z7,
@@ -108,7 +108,7 @@ class K22FA12(Kinetis):
         if (fcfg2 & SIM_FCFG2_PFLSH) == 0:
             LOG.debug("%s: device has FlexNVM", self.part_number)
             rgn = self.memory_map.get_region_for_address(0)
-            rgn._end = 0x7ffff
+            self.memory_map.resize_region(rgn, end=0x7ffff)
         else:
             LOG.debug("%s: device does not have FlexNVM", self.part_number)
 
@@ -262,6 +262,11 @@ class CortexM_S5JS100(CortexM):
             else:
                 raise exceptions.TimeoutError("Timeout waiting for target halt")
 
+    def get_state_later(self):
+        # Read the state immediately, so a failed read is retried as in get_state().
+        state = self.get_state()
+        return lambda: state
+
     def get_state(self):
         # LOG.info("s5js100.get_state")
         try:
@@ -0,0 +1,41 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from ...coresight.coresight_target import CoreSightTarget
+from ...core.memory_map import (FlashRegion, RamRegion, MemoryMap)
+from ...probe.pydapaccess.interface.simulated_target import (
+    FLASH_START,
+    FLASH_SIZE,
+    FLASH_SECTOR_SIZE,
+    FLASH_PAGE_SIZE,
+    RAM_START,
+    RAM_SIZE,
+    SIM_FLASH_ALGO,
+    )
+
+class SimulatedCortexM(CoreSightTarget):
+    """@brief Device model provided by the simulated CMSIS-DAP backend."""
+
+    VENDOR = "pyOCD"
+
+    MEMORY_MAP = MemoryMap(
+        FlashRegion(start=FLASH_START, length=FLASH_SIZE, sector_size=FLASH_SECTOR_SIZE,
+                    page_size=FLASH_PAGE_SIZE, is_boot_memory=True, algo=SIM_FLASH_ALGO),
+        RamRegion(start=RAM_START, length=RAM_SIZE)
+        )
+
+    def __init__(self, session):
+        super().__init__(session, self.MEMORY_MAP)
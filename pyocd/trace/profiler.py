@@ -0,0 +1,315 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Statistical profiling from sampled PC values.
+
+PC samples come either from DWT periodic PC sample packets received over SWO, or from reads of
+DWT_PCSR. The samples are counted per address in a PCSampleProfile, then resolved to functions and
+source lines with the symbols and DWARF debug info of an ELF file.
+
+The PC sampling hardware records only the PC, not a call stack. So the stacks written to the
+collapsed stack and pprof outputs have two frames: the function and the source line within it.
+"""
+
+import collections
+import gzip
+import logging
+from typing import (BinaryIO, Counter, Dict, Iterable, List, NamedTuple, Optional, Sequence,
+        TextIO, Tuple, TYPE_CHECKING)
+
+from elftools.common.exceptions import (DWARFError, ELFError)
+
+from .events import (TraceEvent, TracePeriodicPC)
+from .sink import TraceEventSink
+
+if TYPE_CHECKING:
+    from ..debug.elf.elf import ELFBinaryFile
+
+LOG = logging.getLogger(__name__)
+
+## Name under which samples taken while the core was sleeping are reported.
+SLEEP_NAME = "[sleep]"
+
+class SampleLocation(NamedTuple):
+    """@brief Function and source line to which a sampled PC belongs."""
+    function: str
+    filename: Optional[str]
+    line: Optional[int]
+
+    @property
+    def line_name(self) -> str:
+        """@brief The source line as 'file:line', or the function if the line is unknown."""
+        if self.filename is None:
+            return self.function
+        return f"{self.filename}:{self.line}"
+
+class PCSampleProfile(TraceEventSink):
+    """@brief Trace event sink that counts PC samples per address."""
+
+    def __init__(self) -> None:
+        self.pc_counts: Counter[int] = collections.Counter()
+        self.sleep_count = 0
+
+    @property
+    def total(self) -> int:
+        """@brief Total number of samples, including sleep samples."""
+        return sum(self.pc_counts.values()) + self.sleep_count
+
+    def receive(self, event: TraceEvent) -> None:
+        self.receive_batch((event,))
+
+    def receive_batch(self, events: Sequence[TraceEvent]) -> None:
+        for event in events:
+            if isinstance(event, TracePeriodicPC):
+                # A sleep packet is decoded as a PC of 0.
+                if event.pc == 0:
+                    self.sleep_count += 1
+                else:
+                    self.pc_counts[event.pc] += 1
+
+    def add_samples(self, pcs: Iterable[int]) -> None:
+        """@brief Count PC values sampled by other means, such as reading DWT_PCSR."""
+        self.pc_counts.update(pcs)
+
+class ProfileSymbolizer:
+    """@brief Resolves sampled PC values to functions and source lines.
+
+    Functions are looked up in the DWARF debug info, then in the ELF symbol table. PCs that can't
+    be resolved are reported by address. Results are cached, since a profile usually has many
+    samples of each address.
+    """
+
+    def __init__(self, elf: Optional["ELFBinaryFile"]) -> None:
+        """@brief Constructor.
+        @param self
+        @param elf The ELF file of the running program, or None to report addresses only.
+        """
+        self._symbol_decoder = None
+        self._address_decoder = None
+        if elf is not None:
+            # If either the symbol table or the debug info can't be read, PCs are resolved with the
+            # other. An ELF without a symbol table raises AttributeError.
+            try:
+                self._symbol_decoder = elf.symbol_decoder
+            except (AttributeError, ELFError) as err:
+                LOG.warning("Unable to read the ELF symbol table: %s", err)
+            try:
+                self._address_decoder = elf.address_decoder
+            except (DWARFError, ELFError) as err:
+                LOG.warning("Unable to read the ELF debug info: %s", err)
+        self._cache: Dict[int, SampleLocation] = {}
+
+    def locate(self, pc: int) -> SampleLocation:
+        """@brief Return the function and source line of a PC."""
+        try:
+            return self._cache[pc]
+        except KeyError:
+            pass
+        location = SampleLocation(self._get_function(pc), *self._get_line(pc))
+        self._cache[pc] = location
+        return location
+
+    @staticmethod
+    def _to_str(value) -> str:
+        return value.decode('utf-8', 'replace') if isinstance(value, bytes) else str(value)
+
+    def _get_function(self, pc: int) -> str:
+        if self._address_decoder is not None:
+            function = self._address_decoder.get_function_for_address(pc)
+            if function is not None:
+                return self._to_str(function.name)
+        if self._symbol_decoder is not None:
+            # Thumb function symbols have the low bit of their address set.
+            for addr in (pc, pc | 1):
+                symbol = self._symbol_decoder.get_symbol_for_address(addr)
+                if (symbol is not None) and (symbol.type == 'STT_FUNC'):
+                    return symbol.name
+        return f"{pc:#010x}"
+
+    def _get_line(self, pc: int) -> Tuple[Optional[str], Optional[int]]:
+        if self._address_decoder is not None:
+            line = self._address_decoder.get_line_for_address(pc)
+            if line is not None:
+                return self._to_str(line.filename), line.line
+        return None, None
+
+def aggregate(profile: PCSampleProfile, symbolizer: ProfileSymbolizer) -> Counter[SampleLocation]:
+    """@brief Count the samples of a profile per function and source line.
+
+    Sleep samples are counted under a location whose function is SLEEP_NAME.
+    """
+    counts: Counter[SampleLocation] = collections.Counter()
+    for pc, count in profile.pc_counts.items():
+        counts[symbolizer.locate(pc)] += count
+    if profile.sleep_count:
+        counts[SampleLocation(SLEEP_NAME, None, None)] += profile.sleep_count
+    return counts
+
+def write_report(profile: PCSampleProfile, symbolizer: ProfileSymbolizer, output: TextIO,
+        limit: int = 20) -> None:
+    """@brief Write tables of the functions and source lines with the most samples.
+
+    @param profile The samples.
+    @param symbolizer Resolves the sampled PCs.
+    @param output Text file to write to.
+    @param limit Maximum number of rows of each table.
+    """
+    total = profile.total
+    output.write(f"{total} samples\n")
+    if not total:
+        return
+    counts = aggregate(profile, symbolizer)
+    functions: Counter[str] = collections.Counter()
+    for location, count in counts.items():
+        functions[location.function] += count
+    lines: Counter[str] = collections.Counter()
+    for location, count in counts.items():
+        if location.filename is not None:
+            lines[f"{location.function} {location.line_name}"] += count
+
+    for title, table in (("Function", functions), ("Line", lines)):
+        if not table:
+            continue
+        output.write(f"\n{'Samples':>8} {'%':>6}  {title}\n")
+        for name, count in table.most_common(limit):
+            output.write(f"{count:>8} {count / total:>6.1%}  {name}\n")
+
+def write_collapsed(profile: PCSampleProfile, symbolizer: ProfileSymbolizer, output: TextIO) -> None:
+    """@brief Write the profile in the collapsed stack format used by flame graph tools.
+
+    Each line holds a stack of the function and source line, separated by a semicolon, then the
+    number of samples. The output can be passed to flamegraph.pl or loaded into speedscope.
+    """
+    counts = aggregate(profile, symbolizer)
+    for location, count in sorted(counts.items(), key=lambda item: (-item[1], item[0].function)):
+        if location.filename is None:
+            stack = location.function
+        else:
+            stack = f"{location.function};{location.line_name}"
+        output.write(f"{stack} {count}\n")
+
+class _ProtobufMessage:
+    """@brief Minimal encoder of the protobuf wire format, for the fields used by pprof."""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def _varint(self, value: int) -> None:
+        while value > 0x7f:
+            self.data.append((value & 0x7f) | 0x80)
+            value >>= 7
+        self.data.append(value)
+
+    def int_field(self, field: int, value: int) -> None:
+        # Zero is the default value, and is left out.
+        if value:
+            self._varint(field << 3)
+            self._varint(value)
+
+    def bytes_field(self, field: int, value: bytes) -> None:
+        self._varint((field << 3) | 2)
+        self._varint(len(value))
+        self.data += value
+
+    def packed_field(self, field: int, values: Iterable[int]) -> None:
+        packed = _ProtobufMessage()
+        for value in values:
+            packed._varint(value)
+        self.bytes_field(field, packed.data)
+
+def write_pprof(profile: PCSampleProfile, symbolizer: ProfileSymbolizer, output: BinaryIO,
+        period: int = 0, duration: float = 0.0) -> None:
+    """@brief Write the profile as a gzipped pprof protobuf, for 'go tool pprof' and similar tools.
+
+    There is a location for each sampled address, with a line for the source line of the address
+    and one sample holding its count.
+
+    @param profile The samples.
+    @param symbolizer Resolves the sampled PCs.
+    @param output Binary file to write to.
+    @param period Number of processor cycles between samples, if known.
+    @param duration Duration of the profile in seconds.
+    """
+    strings: Dict[str, int] = {"": 0}
+
+    def string_index(value: str) -> int:
+        return strings.setdefault(value, len(strings))
+
+    message = _ProtobufMessage()
+
+    def value_type(type_name: str, unit: str) -> bytes:
+        vt = _ProtobufMessage()
+        vt.int_field(1, string_index(type_name))
+        vt.int_field(2, string_index(unit))
+        return bytes(vt.data)
+
+    # Profile.sample_type
+    message.bytes_field(1, value_type("samples", "count"))
+
+    functions: Dict[Tuple[str, Optional[str]], int] = {}
+    locations: List[bytes] = []
+    samples: List[Tuple[int, int]] = []
+    pc_counts: List[Tuple[int, SampleLocation, int]] = [(pc, symbolizer.locate(pc), count)
+            for pc, count in sorted(profile.pc_counts.items())]
+    if profile.sleep_count:
+        pc_counts.append((0, SampleLocation(SLEEP_NAME, None, None), profile.sleep_count))
+
+    for pc, location, count in pc_counts:
+        key = (location.function, location.filename)
+        function_id = functions.get(key)
+        if function_id is None:
+            function_id = len(functions) + 1
+            functions[key] = function_id
+
+        line = _ProtobufMessage()
+        line.int_field(1, function_id)
+        line.int_field(2, location.line or 0)
+        loc = _ProtobufMessage()
+        location_id = len(locations) + 1
+        loc.int_field(1, location_id)
+        loc.int_field(3, pc)
+        loc.bytes_field(4, line.data)
+        locations.append(bytes(loc.data))
+        samples.append((location_id, count))
+
+    # Profile.sample
+    for location_id, count in samples:
+        sample = _ProtobufMessage()
+        sample.packed_field(1, [location_id])
+        sample.packed_field(2, [count])
+        message.bytes_field(2, sample.data)
+    # Profile.location
+    for loc_data in locations:
+        message.bytes_field(4, loc_data)
+    # Profile.function
+    for (name, filename), function_id in functions.items():
+        function = _ProtobufMessage()
+        function.int_field(1, function_id)
+        function.int_field(2, string_index(name))
+        function.int_field(3, string_index(name))
+        function.int_field(4, string_index(filename or ""))
+        message.bytes_field(5, function.data)
+    # Profile.duration_nanos, period_type, and period. The string table is filled in last,
+    # after all the strings have been indexed.
+    message.int_field(10, int(duration * 1e9))
+    if period:
+        message.bytes_field(11, value_type("cpu", "cycles"))
+        message.int_field(12, period)
+    # Profile.string_table
+    for string in strings:
+        message.bytes_field(6, string.encode('utf-8'))
+
+    output.write(gzip.compress(bytes(message.data)))
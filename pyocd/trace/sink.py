@@ -30,6 +30,18 @@ class TraceEventSink:
         """
         raise NotImplementedError()
 
+    def receive_batch(self, events: Sequence["TraceEvent"]) -> None:
+        """@brief Handle a batch of trace events, in order.
+
+        The default implementation passes each event to receive(). Sinks that can handle many
+        events more efficiently together should override this method.
+
+        @param self
+        @param events Sequence of TraceEvent objects.
+        """
+        for event in events:
+            self.receive(event)
+
 class TraceEventFilter(TraceEventSink):
     """@brief Abstract interface for a trace event filter."""
 
@@ -94,3 +106,12 @@ class TraceEventTee(TraceEventSink):
         for sink in self._sinks:
             sink.receive(event)
 
+    def receive_batch(self, events: Sequence["TraceEvent"]) -> None:
+        """@brief Replicate a batch of trace events to all connected downstream trace event sinks.
+
+        @param self
+        @param events Sequence of TraceEvent objects.
+        """
+        for sink in self._sinks:
+            sink.receive_batch(events)
+
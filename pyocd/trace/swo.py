@@ -15,7 +15,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-from typing import (TYPE_CHECKING, Generator, Iterable, List, Optional)
+import struct
+from typing import (TYPE_CHECKING, Iterable, List, Optional)
 
 from . import events
 
@@ -23,6 +24,13 @@ if TYPE_CHECKING:
     from ..core.core_target import CoreTarget
     from .sink import TraceEventSink
 
+## Structs that unpack an ITM stimulus packet header and payload, indexed by payload size.
+_ITM_PACKET_STRUCTS = {
+    1: struct.Struct('<BB'),
+    2: struct.Struct('<BH'),
+    4: struct.Struct('<BI'),
+    }
+
 class SWOParser:
     """@brief SWO data stream parser.
 
@@ -31,9 +39,19 @@ class SWOParser:
     event sink object that is a subclass of TraceEventSink. The event sink must either be provided
     when the SWOParser is constructed, or can be set using the connect() method.
 
+    Each buffer passed to parse() is decoded packet by packet with an index into the buffer, and
+    runs of ITM stimulus packets with the same header, such as the bytes of printf output to a
+    port, are decoded together by unpacking the whole run at once. A packet cut off at the end of
+    a buffer is kept and decoded when the next buffer arrives. The events flushed while parsing a
+    buffer are passed to the sink's receive_batch() method together.
+
     A SWOParser instance can be reused for multiple SWO sessions. If a break in SWO data streaming
     occurs, the reset() method should be called before passing further data to parse().
     """
+
+    ## Maximum number of packet headers compared at once when looking for the end of an ITM run.
+    ITM_RUN_WINDOW = 4096
+
     def __init__(self, core: "CoreTarget", sink: Optional["TraceEventSink"] = None) -> None:
         self.reset()
         self._core = core
@@ -45,10 +63,11 @@ class SWOParser:
         self._timestamp = 0
         self._pending_events: List[events.TraceEvent] = []
         self._pending_data_trace = None
-
-        # Get generator instance and prime it.
-        self._parser = self._parse()
-        next(self._parser)
+        self._flushed_events: List[events.TraceEvent] = []
+        # Start of a packet that was cut off at the end of the last buffer.
+        self._partial_packet = b''
+        # Whether the last buffer ended in the zeros of a sync packet.
+        self._in_sync = False
 
     def connect(self, sink: "TraceEventSink") -> None:
         """@brief Connect the downstream trace sink or filter."""
@@ -70,17 +89,22 @@ class SWOParser:
         @param self
         @param data A sequence of integer byte values, usually a bytearray.
         """
-        for value in data:
-            self._parser.send(value)
-            self._bytes_parsed += 1
+        data = bytes(data)
+        self._bytes_parsed += len(data)
+        if self._partial_packet:
+            data = self._partial_packet + data
+        offset = self._parse_buffer(data)
+        self._partial_packet = data[offset:]
+
+        if self._flushed_events:
+            if self._sink is not None:
+                self._sink.receive_batch(self._flushed_events)
+            self._flushed_events = []
 
     def _flush_events(self) -> None:
-        """@brief Send all pending events to event sink."""
-        if self._sink is not None:
-            for event in self._pending_events:
-                self._sink.receive(event)
+        """@brief Queue all pending events to be sent to the event sink."""
+        self._flushed_events.extend(self._pending_events)
         self._pending_events = []
-
     def _merge_data_trace_events(self, event: events.TraceEvent) -> bool:
         """@brief Look for pairs of data trace events and merge."""
         if isinstance(event, events.TraceDataTraceEvent):
@@ -138,57 +162,65 @@ class SWOParser:
         if flush:
             self._flush_events()
 
-    def _parse(self) -> Generator[None, int, None]:
-        """@brief SWO parser as generator function coroutine.
+    def _parse_buffer(self, buf: bytes) -> int:
+        """@brief Parse the packets in a buffer.
 
-        The generator yields every time it needs a byte of SWO data. The caller must use the
-        generator's send() method to provide the next byte.
+        @return Offset of the first byte not parsed, which is the start of a packet that is cut off
+            at the end of the buffer, or the buffer length.
         """
-        timestamp = 0
-        invalid = False
-        while True:
-            byte = yield
-            hdr = byte
+        i = 0
+        n = len(buf)
+        if self._in_sync:
+            i = self._parse_sync(buf, 0)
+        while i < n:
+            hdr = buf[i]
 
+            # Source packet.
+            if hdr & 0x3:
+                size = 1 << ((hdr & 0x3) - 1)
+                end = i + 1 + size
+                if end > n:
+                    break
+                # Instrumentation packet.
+                if (hdr & 0x4) == 0:
+                    # Decode a run of packets with the same header together.
+                    if (end + size < n) and (buf[end] == hdr):
+                        i = self._parse_itm_run(buf, i, hdr, size)
+                        continue
+                    port = (self._itm_page * 32) + (hdr >> 3)
+                    payload = int.from_bytes(buf[i + 1:end], 'little')
+                    self._send_event(events.TraceITMEvent(port, payload, size, self._timestamp))
+                # Hardware source packets...
+                else:
+                    self._parse_hardware_packet(hdr, int.from_bytes(buf[i + 1:end], 'little'), size)
+                i = end
             # Sync packet.
-            if hdr == 0:
-                packets = 0
-                while True:
-                    # Check for final 1 bit after at least 5 all-zero sync packets
-                    if (packets >= 5) and (byte == 0x80):
-                        break
-                    elif byte == 0:
-                        packets += 1
-                    else:
-                        # Get early non-zero packet, reset sync packet counter.
-                        #packets = 0
-                        invalid = True
-                        break
-                    byte = yield
-                self._itm_page = 0
+            elif hdr == 0:
+                i = self._parse_sync(buf, i)
             # Overflow packet.
             elif hdr == 0x70:
-                self._send_event(events.TraceOverflow(timestamp))
+                self._send_event(events.TraceOverflow(self._timestamp))
+                i += 1
             # Protocol packet.
-            elif (hdr & 0x3) == 0:
+            else:
                 c = (hdr >> 7) & 0x1
                 d = (hdr >> 4) & 0b111
+                end = i + 1
                 # Local timestamp.
                 if (hdr & 0xf) == 0 and d not in (0x0, 0x3):
-                    ts = 0
-                    tc = 0
                     # Local timestamp packet format 1.
                     if c == 1:
+                        end = self._find_packet_end(buf, i + 1)
+                        if end < 0:
+                            break
                         tc = (hdr >> 4) & 0x3
-                        while c == 1:
-                            byte = yield
-                            ts = (ts << 7) | (byte & 0x7f)
-                            c = (byte >> 7) & 0x1
+                        ts = self._fold_continuation_bytes(buf, i + 1, end)
                     # Local timestamp packet format 2.
                     else:
+                        tc = 0
                         ts = (hdr >> 4) & 0x7
-                    timestamp += ts
-                    self._send_event(events.TraceTimestamp(tc, timestamp))
+                    self._timestamp += ts
+                    self._send_event(events.TraceTimestamp(tc, self._timestamp))
                 # Global timestamp.
                 elif hdr in (0b10010100, 0b10110100):
                     # TODO handle global timestamp
@@ -200,85 +232,125 @@ class SWOParser:
                     if c == 0:
                         ex = (hdr >> 4) & 0x7
                     else:
-                        ex = 0
-                        while c == 1:
-                            byte = yield
-                            ex = (ex << 7) | (byte & 0x7f)
-                            c = (byte >> 7) & 0x1
+                        end = self._find_packet_end(buf, i + 1)
+                        if end < 0:
+                            break
+                        ex = self._fold_continuation_bytes(buf, i + 1, end)
                     if sh == 0:
                         # Extension packet with sh==0 sets ITM stimulus page.
                         self._itm_page = ex
-                    else:
-                        #self._send_event(events.TraceEvent("Extension: SH={:d} EX={:#x}\n".format(sh, ex), timestamp))
-                        invalid = True
                 # Reserved packet.
-                else:
-                    invalid = True
-            # Source packet.
-            else:
-                ss = hdr & 0x3
-                l = 1 << (ss - 1)
-                a = (hdr >> 3) & 0x1f
-                if l == 1:
-                    payload = yield
-                elif l == 2:
-                    byte1 = yield
-                    byte2 = yield
-                    payload = (byte1 |
-                                (byte2 << 8))
-                else:
-                    byte1 = yield
-                    byte2 = yield
-                    byte3 = yield
-                    byte4 = yield
-                    payload = (byte1 |
-                                (byte2 << 8) |
-                                (byte3 << 16) |
-                                (byte4 << 24))
+                i = end
+        return i
 
-                # Instrumentation packet.
-                if (hdr & 0x4) == 0:
-                    port = (self._itm_page * 32) + a
-                    self._send_event(events.TraceITMEvent(port, payload, l, timestamp))
-                # Hardware source packets...
-                # Event counter
-                elif a == 0:
-                    self._send_event(events.TraceEventCounter(payload, timestamp))
-                # Exception trace
-                elif a == 1:
-                    exception_number = payload & 0x1ff
-                    # TODO remove exception name and dependency on core
-                    exception_name = self._core.exception_number_to_name(exception_number)
-                    fn = (payload >> 12) & 0x3
-                    if 1 <= fn <= 3:
-                        self._send_event(events.TraceExceptionEvent(
-                                exception_number, exception_name, fn, timestamp))
-                    else:
-                        invalid = True
-                # Periodic PC
-                elif a == 2:
-                    # A payload of 0 indicates a period PC sleep event.
-                    self._send_event(events.TracePeriodicPC(payload, timestamp))
-                # Data trace
-                elif 8 <= a <= 23:
-                    type = (hdr >> 6) & 0x3
-                    cmpn = (hdr >> 4) & 0x3
-                    bit3 = (hdr >> 3) & 0x1
-                    # PC value
-                    if type == 0b01 and bit3 == 0:
-                        self._send_event(events.TraceDataTraceEvent(cmpn=cmpn, pc=payload, ts=timestamp))
-                    # Address
-                    elif type == 0b01 and bit3 == 1:
-                        self._send_event(events.TraceDataTraceEvent(cmpn=cmpn, addr=payload, ts=timestamp))
-                    # Data value
-                    elif type == 0b10:
-                        self._send_event(events.TraceDataTraceEvent(
-                                cmpn=cmpn, value=payload, rnw=(bit3 == 0), sz=l, ts=timestamp))
-                    else:
-                        invalid = True
-                # Invalid DWT 'a' value.
-                else:
-                    invalid = True
+    @staticmethod
+    def _find_packet_end(buf: bytes, start: int) -> int:
+        """@brief Find the end of the continuation bytes of a packet.
 
+        @return Offset following the first byte from _start_ with the continuation bit clear, or -1
+            if the packet is cut off at the end of the buffer.
+        """
+        n = len(buf)
+        while start < n:
+            if (buf[start] & 0x80) == 0:
+                return start + 1
+            start += 1
+        return -1
+
+    @staticmethod
+    def _fold_continuation_bytes(buf: bytes, start: int, end: int) -> int:
+        value = 0
+        for byte in buf[start:end]:
+            value = (value << 7) | (byte & 0x7f)
+        return value
+
+    def _parse_sync(self, buf: bytes, i: int) -> int:
+        """@brief Consume the bytes of a sync packet, which may continue from the last buffer.
 
+        A sync packet is at least five zero bytes followed by 0x80. Any other byte also ends the
+        packet and is consumed with it.
+
+        @return Offset following the sync packet, or the buffer length if it is cut off.
+        """
+        n = len(buf)
+        while i < n:
+            byte = buf[i]
+            i += 1
+            if byte != 0:
+                self._in_sync = False
+                self._itm_page = 0
+                return i
+        self._in_sync = True
+        return i
+
+    def _parse_itm_run(self, buf: bytes, i: int, hdr: int, size: int) -> int:
+        """@brief Decode a run of complete ITM stimulus packets with the same header.
+
+        The headers are compared in windows of up to ITM_RUN_WINDOW packets by slicing out every
+        header with a step of the packet length. The payloads of the run are then unpacked with a
+        single struct iteration.
+
+        @return Offset following the run.
+        """
+        stride = size + 1
+        header = bytes((hdr,))
+        n = len(buf)
+        end = i
+        while True:
+            count = min((n - end) // stride, self.ITM_RUN_WINDOW)
+            if count == 0:
+                break
+            headers = buf[end:end + count * stride:stride]
+            run = count - len(headers.lstrip(header))
+            end += run * stride
+            if run < count:
+                break
+
+        port = (self._itm_page * 32) + (hdr >> 3)
+        timestamp = self._timestamp
+        TraceITMEvent = events.TraceITMEvent
+        run_events = [TraceITMEvent(port, payload, size, timestamp)
+                for _, payload in _ITM_PACKET_STRUCTS[size].iter_unpack(buf[i:end])]
+
+        # Same as passing each event to _send_event().
+        if self._pending_data_trace is not None:
+            self._pending_events.append(self._pending_data_trace)
+            self._pending_data_trace = None
+        self._pending_events.extend(run_events)
+        return end
 
+    def _parse_hardware_packet(self, hdr: int, payload: int, size: int) -> None:
+        """@brief Decode a DWT hardware source packet."""
+        a = (hdr >> 3) & 0x1f
+        timestamp = self._timestamp
+        # Event counter
+        if a == 0:
+            self._send_event(events.TraceEventCounter(payload, timestamp))
+        # Exception trace
+        elif a == 1:
+            exception_number = payload & 0x1ff
+            # TODO remove exception name and dependency on core
+            exception_name = self._core.exception_number_to_name(exception_number)
+            fn = (payload >> 12) & 0x3
+            if 1 <= fn <= 3:
+                self._send_event(events.TraceExceptionEvent(
+                        exception_number, exception_name, fn, timestamp))
+        # Periodic PC
+        elif a == 2:
+            # A payload of 0 indicates a period PC sleep event.
+            self._send_event(events.TracePeriodicPC(payload, timestamp))
+        # Data trace
+        elif 8 <= a <= 23:
+            type = (hdr >> 6) & 0x3
+            cmpn = (hdr >> 4) & 0x3
+            bit3 = (hdr >> 3) & 0x1
+            # PC value
+            if type == 0b01 and bit3 == 0:
+                self._send_event(events.TraceDataTraceEvent(cmpn=cmpn, pc=payload, ts=timestamp))
+            # Address
+            elif type == 0b01 and bit3 == 1:
+                self._send_event(events.TraceDataTraceEvent(cmpn=cmpn, addr=payload, ts=timestamp))
+            # Data value
+            elif type == 0b10:
+                self._send_event(events.TraceDataTraceEvent(
+                        cmpn=cmpn, value=payload, rnw=(bit3 == 0), sz=size, ts=timestamp))
@@ -16,13 +16,16 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import collections
+import itertools
 import logging
 import threading
-from time import sleep
-from typing import (Optional, TextIO, TYPE_CHECKING)
+from contextlib import nullcontext
+from typing import (Any, BinaryIO, Callable, Counter, Deque, List, Optional, Sequence, TextIO,
+        Tuple, TYPE_CHECKING)
 
-from .sink import TraceEventSink
-from .events import (TraceEvent, TraceITMEvent)
+from .sink import (TraceEventSink, TraceEventTee)
+from .events import (TraceEvent, TraceITMEvent, TraceOverflow)
 from .swo import SWOParser
 from ..coresight.itm import ITM
 from ..coresight.tpiu import TPIU
@@ -30,8 +33,10 @@ from ..core.target import Target
 from ..core import exceptions
 from ..probe.debug_probe import DebugProbe
 from ..utility.server import StreamServer
+from ..utility.timeout import PollInterval
 
 if TYPE_CHECKING:
+    from ..core.core_target import CoreTarget
     from ..core.session import Session
     from ..utility.notification import Notification
 
@@ -72,14 +77,327 @@ class SWVEventSink(TraceEventSink):
 
         self._console.write(data)
 
+    def receive_batch(self, events: Sequence[TraceEvent]) -> None:
+        """@brief Handle a batch of SWV trace events.
+
+        The bytes of all the ITM events in the batch are gathered and written to the console with
+        a single write.
+        """
+        data = bytearray()
+        for event in events:
+            if isinstance(event, TraceITMEvent) and event.width in (1, 2, 4):
+                data += event.data.to_bytes(event.width, 'little')
+        if data:
+            self._console.write(data.decode('latin-1'))
+
+class SWVStatisticsSink(TraceEventSink):
+    """@brief Trace event sink that counts events by type, and ITM bytes by stimulus port."""
+
+    def __init__(self) -> None:
+        self.event_counts: Counter[str] = collections.Counter()
+        self.itm_bytes: Counter[int] = collections.Counter()
+
+    def receive(self, event: TraceEvent) -> None:
+        self.receive_batch((event,))
+
+    def receive_batch(self, events: Sequence[TraceEvent]) -> None:
+        for event in events:
+            self.event_counts[type(event).__name__] += 1
+            if isinstance(event, TraceITMEvent):
+                self.itm_bytes[event.port] += event.width
+
+    def summary(self) -> str:
+        """@brief Describe the counts in one line of text."""
+        counts = ", ".join(f"{name}={count}" for name, count in sorted(self.event_counts.items()))
+        ports = ", ".join(f"port {port}={count}" for port, count in sorted(self.itm_bytes.items()))
+        return f"events: {counts or 'none'}; ITM bytes: {ports or 'none'}"
+
+class BoundedQueue:
+    """@brief Queue between two threads that holds at most a given total length of items.
+
+    put() never blocks. An item that would take the queue over its limit is dropped and counted
+    instead, so a slow consumer can't hold up the producer. An item longer than the limit is
+    still queued if the queue is empty, so large batches aren't lost when the consumer is keeping
+    up. get() returns all the queued items at once, so the consumer can handle them as one batch.
+    """
+
+    def __init__(self, limit: int) -> None:
+        """@brief Constructor.
+        @param self
+        @param limit Maximum total length of the queued items.
+        """
+        self._limit = limit
+        self._items: Deque[Tuple[Any, bool]] = collections.deque()
+        self._length = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._gap = False
+        self.dropped_items = 0
+        self.dropped_length = 0
+
+    def put(self, item: Any) -> bool:
+        """@brief Queue an item, or drop it if it doesn't fit.
+        @param self
+        @param item An object that has a length, such as bytes or a list of events.
+        @return Whether the item was queued.
+        """
+        length = len(item)
+        with self._cond:
+            if self._items and (self._length + length > self._limit):
+                self.dropped_items += 1
+                self.dropped_length += length
+                self._gap = True
+                return False
+            self._items.append((item, self._gap))
+            self._gap = False
+            self._length += length
+            self._cond.notify()
+        return True
+
+    def get(self) -> Optional[List[Tuple[Any, bool]]]:
+        """@brief Wait for items and take all of them from the queue.
+
+        @return List of (item, gap) tuples in the order the items were queued. The gap flag is True
+            if items were dropped just before this one. None is returned once the queue has been
+            closed and is empty.
+        """
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            if not self._items:
+                return None
+            items = list(self._items)
+            self._items.clear()
+            self._length = 0
+            return items
+
+    def close(self) -> None:
+        """@brief Tell the consumer that no more items will be queued."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+class SWVOutput(TraceEventSink):
+    """@brief Delivers SWV data or events to one output from its own thread.
+
+    Items are queued in a BoundedQueue and passed to the deliver function in batches. An output
+    that can't keep up drops the items that don't fit in its queue, without affecting the other
+    outputs.
+    """
+
+    def __init__(self, name: str, deliver: Callable[[List[Any]], None], limit: int, unit: str) -> None:
+        """@brief Constructor.
+        @param self
+        @param name Name of the output used in log messages.
+        @param deliver Function called on the output's thread with a list of queued items.
+        @param limit Maximum total length of the queued items.
+        @param unit Description of what the length of the items counts, for log messages.
+        """
+        self._name = name
+        self._deliver = deliver
+        self._unit = unit
+        self._queue = BoundedQueue(limit)
+        self._thread = threading.Thread(target=self._output_main, name=f"SWV {name} output",
+                daemon=True)
+        self.errors = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    @property
+    def dropped(self) -> int:
+        """@brief Total length of the items dropped, counted in units."""
+        return self._queue.dropped_length
+
+    @property
+    def unit(self) -> str:
+        return self._unit
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def put(self, item: Any) -> None:
+        """@brief Queue an item for the output. Never blocks."""
+        if not self._queue.put(item) and (self._queue.dropped_items == 1):
+            LOG.warning("SWV %s output is falling behind; dropping %s", self._name, self._unit)
+
+    def receive(self, event: TraceEvent) -> None:
+        self.put([event])
+
+    def receive_batch(self, events: Sequence[TraceEvent]) -> None:
+        self.put(events)
+
+    def close(self) -> None:
+        """@brief Deliver the items still queued and stop the output's thread."""
+        self._queue.close()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def _output_main(self) -> None:
+        while True:
+            items = self._queue.get()
+            if items is None:
+                break
+            try:
+                self._deliver([item for item, _ in items])
+            except Exception as err:
+                # The output may fail, for instance if a client disconnects, then recover.
+                self.errors += 1
+                LOG.debug("SWV %s output failed: %s", self._name, err)
+
+class SWVPipeline:
+    """@brief Decodes SWO data and delivers it to several outputs, each on its own thread.
+
+    SWO data read from the probe is passed to put(), which adds it to a bounded buffer. A decoder
+    thread takes all the buffered data at once, copies it to the raw data outputs, and parses it
+    with a SWOParser. The events from each parse are fanned out as a batch to the event sinks.
+    Every output has its own thread and bounded queue, so a slow output, such as a TCP client that
+    doesn't keep up, only loses its own data.
+
+    No stage waits for a later one. Data or events that don't fit in a full buffer are dropped
+    and counted. Data dropped before decoding leaves a gap in the SWO stream, so the parser is
+    reset at the gap and the event sinks receive a TraceOverflow event in place of the lost data.
+    """
+
+    ## Default maximum number of bytes of SWO data waiting to be decoded.
+    DEFAULT_BUFFER_SIZE = 1024 * 1024
+
+    ## Default maximum number of events queued for each event sink.
+    DEFAULT_EVENT_LIMIT = 64 * 1024
+
+    ## Default maximum number of bytes queued for each raw data output.
+    DEFAULT_RAW_LIMIT = 1024 * 1024
+
+    def __init__(self, core: "CoreTarget", buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """@brief Constructor.
+        @param self
+        @param core The core whose exception names are used for exception trace events.
+        @param buffer_size Maximum number of bytes of SWO data waiting to be decoded.
+        """
+        self._buffer = BoundedQueue(buffer_size)
+        self._tee = TraceEventTee()
+        self._parser = SWOParser(core, self._tee)
+        self._outputs: List[SWVOutput] = []
+        self._raw_outputs: List[SWVOutput] = []
+        self._decoder = threading.Thread(target=self._decode_main, name="SWV decoder", daemon=True)
+        self.bytes_decoded = 0
+
+    @property
+    def dropped_bytes(self) -> int:
+        """@brief Number of bytes of SWO data dropped because decoding fell behind."""
+        return self._buffer.dropped_length
+
+    @property
+    def outputs(self) -> List[SWVOutput]:
+        return self._outputs
+
+    def add_sink(self, name: str, sink: TraceEventSink, limit: int = DEFAULT_EVENT_LIMIT) -> SWVOutput:
+        """@brief Add a trace event sink, which receives batches of events on its own thread.
+
+        Outputs must be added before start() is called.
+        """
+        def deliver(batches: List[Sequence[TraceEvent]]) -> None:
+            sink.receive_batch(batches[0] if len(batches) == 1
+                    else list(itertools.chain.from_iterable(batches)))
+        output = SWVOutput(name, deliver, limit, "events")
+        self._tee.connect(output)
+        self._outputs.append(output)
+        return output
+
+    def add_raw_output(self, name: str, file: BinaryIO, limit: int = DEFAULT_RAW_LIMIT) -> SWVOutput:
+        """@brief Add a file-like object to which the undecoded SWO data is written on its own thread.
+
+        Outputs must be added before start() is called.
+        """
+        def deliver(chunks: List[bytes]) -> None:
+            file.write(b''.join(chunks))
+        output = SWVOutput(name, deliver, limit, "bytes")
+        self._raw_outputs.append(output)
+        self._outputs.append(output)
+        return output
+
+    def start(self) -> None:
+        """@brief Start the threads of the decoder and outputs."""
+        for output in self._outputs:
+            output.start()
+        self._decoder.start()
+
+    def put(self, data: bytes) -> bool:
+        """@brief Add SWO data to be decoded. Never blocks.
+        @return Whether the data was added. False if the buffer was full and the data was dropped.
+        """
+        if not data:
+            return True
+        if self._buffer.put(data):
+            return True
+        if self._buffer.dropped_items == 1:
+            LOG.warning("SWV decoding is falling behind; dropping SWO data")
+        return False
+
+    def close(self) -> None:
+        """@brief Decode the remaining data, deliver it, and stop all threads."""
+        self._buffer.close()
+        if self._decoder.is_alive():
+            self._decoder.join()
+        for output in self._outputs:
+            output.close()
+
+    def log_drops(self) -> None:
+        """@brief Log a warning for each stage that dropped data."""
+        if self.dropped_bytes:
+            LOG.warning("SWV dropped %d bytes of SWO data in %d reads because decoding fell behind",
+                    self.dropped_bytes, self._buffer.dropped_items)
+        for output in self._outputs:
+            if output.dropped:
+                LOG.warning("SWV %s output dropped %d %s", output.name, output.dropped, output.unit)
+            if output.errors:
+                LOG.warning("SWV %s output failed %d times", output.name, output.errors)
+
+    def _decode_main(self) -> None:
+        while True:
+            chunks = self._buffer.get()
+            if chunks is None:
+                break
+            data = bytearray()
+            for chunk, gap in chunks:
+                if gap:
+                    self._decode(data)
+                    data = bytearray()
+                    self._parser.reset()
+                    self._tee.receive_batch([TraceOverflow()])
+                data += chunk
+            self._decode(data)
+
+    def _decode(self, data: bytearray) -> None:
+        if not data:
+            return
+        self.bytes_decoded += len(data)
+        if self._raw_outputs:
+            raw = bytes(data)
+            for output in self._raw_outputs:
+                output.put(raw)
+        self._parser.parse(data)
+
 class SWVReader(threading.Thread):
-    """@brief Sets up SWV and processes data in a background thread."""
+    """@brief Sets up SWV and reads SWO data from the probe in a background thread.
+
+    The reader thread only reads from the probe, and holds the lock for just the duration of each
+    read, so SWO trace can run alongside a debug session without stalling it. The data is handed
+    to an SWVPipeline, which decodes it and delivers it to the outputs on separate threads.
+    """
+
+    ## Shortest and longest time in seconds between reads of SWO data. The interval backs off
+    # towards the longest while the probe has no data.
+    POLL_INTERVAL_MIN = 0.001
+    POLL_INTERVAL_MAX = 0.01
 
     def __init__(self, session: "Session", core_number: int = 0, lock: Optional[threading.Lock] = None) -> None:
         """@brief Constructor.
         @param self
         @param session The Session instance.
         @param core_number The number of the core being traced. Default is core 0.
+        @param lock Optional lock held while accessing the probe.
         """
         super().__init__(name="SWVReader", daemon=True)
         self._session = session
@@ -87,6 +405,10 @@ class SWVReader(threading.Thread):
         self._shutdown_event = threading.Event()
         self._swo_clock = 0
         self._lock = lock
+        self._pipeline: Optional[SWVPipeline] = None
+        self._statistics = SWVStatisticsSink()
+        self._raw_server: Optional[StreamServer] = None
+        self._raw_file: Optional[BinaryIO] = None
 
         target = self._session.target
         assert target
@@ -95,13 +417,21 @@ class SWVReader(threading.Thread):
 
         self._session.subscribe(self._reset_handler, Target.Event.POST_RESET, self._core)
 
-    def init(self, sys_clock: int, swo_clock: int, console: TextIO) -> bool:
+    @property
+    def statistics(self) -> SWVStatisticsSink:
+        """@brief Counts of the trace events decoded so far."""
+        return self._statistics
+
+    def init(self, sys_clock: int, swo_clock: int, console: Optional[TextIO],
+            sinks: Sequence[Tuple[str, TraceEventSink]] = ()) -> bool:
         """@brief Configures trace graph and starts thread.
 
         This method performs all steps required to start up SWV. It first calls the target's
         trace_start() method, which allows for target-specific trace initialization. Then it
-        configures the TPIU and ITM modules. A simple trace data processing graph is created that
-        connects an SWVEventSink with a SWOParser. Finally, the reader thread is started.
+        configures the TPIU and ITM modules. An SWVPipeline is created that delivers ITM data to
+        an SWVEventSink writing to the console, delivers events to any other sinks, counts events,
+        and copies the raw SWO data to the raw SWV server and file if they are enabled. Finally,
+        the reader thread is started.
 
         If the debug probe or target do not support SWO, a warning is printed and False returns,
         but nothing else is done (no exception raised).
@@ -109,7 +439,8 @@ class SWVReader(threading.Thread):
         @param self
         @param sys_clock System clock frequency in Hertz, from which the SWO clock is derived.
         @param swo_clock Desired SWO output frequency in Hertz.
-        @param console File-like object to which SWV data will be written.
+        @param console File-like object to which SWV data will be written, or None.
+        @param sinks Sequence of (name, sink) pairs of additional trace event sinks.
 
         @return Boolean indicating whether the SWV reader was successfully started.
         """
@@ -141,10 +472,32 @@ class SWVReader(threading.Thread):
             LOG.warning("SWV not initalized: Failed to set SWO clock rate")
             return False
 
-        self._parser = SWOParser(self._core)
-        self._sink = SWVEventSink(console)
-        self._parser.connect(self._sink)
-
+        pipeline = SWVPipeline(self._core)
+        if console is not None:
+            pipeline.add_sink("console", SWVEventSink(console))
+        for name, sink in sinks:
+            pipeline.add_sink(name, sink)
+        pipeline.add_sink("statistics", self._statistics)
+
+        options = self._session.options
+        if options.get('swv_raw_enable'):
+            self._raw_server = StreamServer(
+                                options.get('swv_raw_port'),
+                                serve_local_only=options.get('serve_local_only'),
+                                name="SWV raw",
+                                is_read_only=True)
+            pipeline.add_raw_output("raw server", self._raw_server)
+
+        raw_file_path = options.get('swv_raw_file')
+        if raw_file_path:
+            try:
+                self._raw_file = open(raw_file_path, 'wb')
+                pipeline.add_raw_output("raw file", self._raw_file)
+            except OSError as err:
+                LOG.warning("Failed to open SWV raw file: %s", err)
+
+        self._pipeline = pipeline
+        pipeline.start()
         self.start()
 
         return True
@@ -152,17 +505,27 @@ class SWVReader(threading.Thread):
     def stop(self) -> None:
         """@brief Stops processing SWV data.
 
-        The reader thread is terminated first, then the ITM is disabled. The last step is to call
-        the target's trace_stop() method.
+        The reader thread is terminated first, then the data already read is decoded and
+        delivered, and anything dropped along the way is reported. Then the ITM is disabled. The
+        last step is to call the target's trace_stop() method.
 
         Does nothing if the init() method did not complete successfully.
         """
-        if not self.is_alive():
+        if self._pipeline is None:
             return
 
         self._shutdown_event.set()
         self.join()
 
+        self._pipeline.close()
+        if self._raw_server is not None:
+            self._raw_server.stop()
+        if self._raw_file is not None:
+            self._raw_file.close()
+        self._pipeline.log_drops()
+        LOG.info("SWV decoded %d bytes; %s", self._pipeline.bytes_decoded, self._statistics.summary())
+        self._pipeline = None
+
         # init() should never have started the SWV thread unless the target has ITM and TPIU.
         itm = self._target.get_first_child_of_type(ITM)
         assert itm
@@ -174,50 +537,33 @@ class SWVReader(threading.Thread):
         """@brief SWV reader thread routine.
 
         Starts the probe receiving SWO data by calling DebugProbe.swo_start(). For as long as the
-        thread runs, it reads SWO data from the probe and passes it to the SWO parser created in
-        init(). When the thread is signaled to stop, it calls DebugProbe.swo_stop() before exiting.
+        thread runs, it reads SWO data from the probe and passes it to the SWVPipeline created in
+        init(). The time between reads is short while data is arriving, and backs off while there
+        is none. When the thread is signaled to stop, it calls DebugProbe.swo_stop() before exiting.
         """
-        assert self._session.probe
-
-        if self._lock:
-            self._lock.acquire()
-
-        swv_raw_server = StreamServer(
-                            self._session.options.get('swv_raw_port'),
-                            serve_local_only=self._session.options.get('serve_local_only'),
-                            name="SWV raw",
-                            is_read_only=True) \
-                         if self._session.options.get('swv_raw_enable') else None
-
-        # Stop SWO first in case the probe already had it started. Ignore if this fails.
-        try:
-            self._session.probe.swo_stop()
-        except exceptions.ProbeError:
-            pass
-        self._session.probe.swo_start(self._swo_clock)
-
-        while not self._shutdown_event.is_set():
-            data = self._session.probe.swo_read()
+        probe = self._session.probe
+        assert probe
+        assert self._pipeline
+        lock = self._lock if (self._lock is not None) else nullcontext()
+        poll_interval = PollInterval(self.POLL_INTERVAL_MIN, self.POLL_INTERVAL_MAX)
+
+        with lock:
+            # Stop SWO first in case the probe already had it started. Ignore if this fails.
+            try:
+                probe.swo_stop()
+            except exceptions.ProbeError:
+                pass
+            probe.swo_start(self._swo_clock)
+
+        while not self._shutdown_event.wait(poll_interval.next()):
+            with lock:
+                data = probe.swo_read()
             if data:
-                if swv_raw_server:
-                    swv_raw_server.write(data)
-                self._parser.parse(data)
-
-            if self._lock:
-                self._lock.release()
+                self._pipeline.put(data)
+                poll_interval.reset()
 
-            sleep(0.001)
-
-            if self._lock:
-                self._lock.acquire()
-
-        self._session.probe.swo_stop()
-
-        if swv_raw_server:
-            swv_raw_server.stop()
-
-        if self._lock:
-            self._lock.release()
+        with lock:
+            probe.swo_stop()
 
     def _reset_handler(self, notification: "Notification") -> None:
         """@brief Reset notification handler.
@@ -227,4 +573,3 @@ class SWVReader(threading.Thread):
         """
         if self.is_alive():
             self._target.trace_start()
-
@@ -17,7 +17,7 @@
 
 import struct
 import binascii
-from typing import (Any, Iterator, List, Sequence, Tuple, cast)
+from typing import (Any, Iterator, List, Sequence, Tuple, Union, cast)
 
 from .mask import align_up
 
@@ -81,6 +81,21 @@ def u32le_list_to_byte_list(data: Sequence[int]) -> List[int]:
         res.append((x >> 24) & 0xff)
     return res
 
+def u32le_list_to_bytes(data: Sequence[int]) -> bytes:
+    """@brief Convert a word array into a bytes object.
+
+    This performs the same conversion as u32le_list_to_byte_list(), but produces a bytes object
+    in a single step.
+    """
+    return struct.pack(f'<{len(data)}I', *data)
+
+def bytes_to_u32le_list(data: Union[bytes, bytearray, memoryview]) -> List[int]:
+    """@brief Convert a bytes-like object into a word array.
+
+    The length of the data must be a multiple of 4.
+    """
+    return list(struct.unpack_from(f'<{len(data) // 4}I', data))
+
 def u16le_list_to_byte_list(data: Sequence[int]) -> List[int]:
     """@brief Convert a halfword array into a byte array"""
     byte_data = []
@@ -0,0 +1,296 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Shared socket event loop and probe operation dispatcher.
+
+Servers can register their sockets with a single EventLoop instead of each running a thread that
+polls its socket with a timeout. Callbacks run on the loop thread and only perform socket I/O.
+Anything that accesses a debug probe is submitted to a Dispatcher, which runs calls one at a time
+on its own thread.
+"""
+
+from concurrent.futures import Future
+import heapq
+import itertools
+import logging
+import queue
+import selectors
+import socket
+import threading
+from time import monotonic
+from typing import (Any, Callable, Dict, List, Optional, Tuple)
+
+LOG = logging.getLogger(__name__)
+
+class TimerHandle:
+    """@brief Handle for a call scheduled with EventLoop.call_later()."""
+
+    def __init__(self, callback: Callable, args: Tuple[Any, ...]) -> None:
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        """@brief Prevent the call from being made, if it hasn't been already."""
+        self.cancelled = True
+
+class Dispatcher(threading.Thread):
+    """@brief Thread that runs submitted calls one at a time, in the order submitted.
+
+    Using one dispatcher for all operations on a probe serializes them without the threads that
+    submit calls contending for a lock.
+    """
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name=name, daemon=True)
+        self._queue: "queue.Queue[Optional[Tuple[Future, Callable, Tuple[Any, ...]]]]" = queue.Queue()
+        self.start()
+
+    @property
+    def is_current_thread(self) -> bool:
+        return threading.current_thread() is self
+
+    def submit(self, fn: Callable, *args: Any) -> Future:
+        """@brief Queue a call.
+        @return A Future for the call's result.
+        """
+        future: Future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def call(self, fn: Callable, *args: Any) -> Any:
+        """@brief Make a call on the dispatcher thread and wait for its result.
+
+        If called from the dispatcher thread, the call is made immediately.
+        """
+        if self.is_current_thread:
+            return fn(*args)
+        return self.submit(fn, *args).result()
+
+    def stop(self) -> None:
+        """@brief Stop the thread after all queued calls have been made."""
+        self._queue.put(None)
+        if not self.is_current_thread:
+            self.join()
+
+    def run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            future, fn, args = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(*args))
+            except Exception as err:
+                LOG.debug("Exception in dispatched call to %s: %s", fn, err)
+                future.set_exception(err)
+
+class EventLoop(threading.Thread):
+    """@brief Thread that waits on all registered sockets with a single selector.
+
+    Read callbacks and timers are run on the loop thread, so they must not block. The register(),
+    unregister(), call_soon(), and call_later() methods may be called from any thread.
+
+    A process normally uses the shared instance returned by acquire(), which is stopped once every
+    user has called release(). The loop also holds one Dispatcher per key, usually a session, so
+    all servers for the same probe share a queue of probe operations.
+    """
+
+    _shared: Optional["EventLoop"] = None
+    _shared_users = 0
+    _shared_lock = threading.Lock()
+
+    @classmethod
+    def acquire(cls) -> "EventLoop":
+        """@brief Get the shared event loop, starting it if necessary."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            cls._shared_users += 1
+            return cls._shared
+
+    @classmethod
+    def release(cls) -> None:
+        """@brief Drop a reference to the shared event loop obtained from acquire()."""
+        with cls._shared_lock:
+            cls._shared_users -= 1
+            if (cls._shared_users == 0) and (cls._shared is not None):
+                cls._shared.stop()
+                cls._shared = None
+
+    def __init__(self) -> None:
+        super().__init__(name="event-loop", daemon=True)
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_receiver, self._wakeup_sender = socket.socketpair()
+        self._wakeup_receiver.setblocking(False)
+        self._wakeup_sender.setblocking(False)
+        self._selector.register(self._wakeup_receiver, selectors.EVENT_READ, self._drain_wakeup)
+        self._lock = threading.Lock()
+        self._ready: List[Tuple[Callable, Tuple[Any, ...]]] = []
+        self._timers: List[Tuple[float, int, TimerHandle]] = []
+        self._timer_sequence = itertools.count()
+        self._dispatchers: Dict[Any, List[Any]] = {}
+        self._shutdown = False
+        self.start()
+
+    @property
+    def is_current_thread(self) -> bool:
+        return threading.current_thread() is self
+
+    def call_soon(self, callback: Callable, *args: Any) -> None:
+        """@brief Run a callback on the loop thread as soon as possible."""
+        with self._lock:
+            self._ready.append((callback, args))
+        self._wakeup()
+
+    def call_later(self, delay: float, callback: Callable, *args: Any) -> TimerHandle:
+        """@brief Run a callback on the loop thread after a delay in seconds.
+        @return A TimerHandle that can be used to cancel the call.
+        """
+        handle = TimerHandle(callback, args)
+        with self._lock:
+            heapq.heappush(self._timers, (monotonic() + delay, next(self._timer_sequence), handle))
+        self._wakeup()
+        return handle
+
+    def run_in_loop(self, callback: Callable, *args: Any) -> Future:
+        """@brief Run a callback on the loop thread.
+
+        The callback is run immediately if this is the loop thread.
+
+        @return A Future for the callback's result.
+        """
+        future: Future = Future()
+        def run_callback() -> None:
+            try:
+                future.set_result(callback(*args))
+            except Exception as err:
+                future.set_exception(err)
+        if self.is_current_thread:
+            run_callback()
+        else:
+            self.call_soon(run_callback)
+        return future
+
+    def register(self, sock: socket.socket, callback: Callable[[], None]) -> Future:
+        """@brief Call _callback_ on the loop thread whenever _sock_ is readable."""
+        return self.run_in_loop(self._selector.register, sock, selectors.EVENT_READ, callback)
+
+    def unregister(self, sock: socket.socket) -> Future:
+        """@brief Stop watching a socket.
+
+        Wait for the returned Future before closing the socket. Unregistering a socket that isn't
+        registered is not an error.
+        """
+        return self.run_in_loop(self._unregister, sock)
+
+    def _unregister(self, sock: socket.socket) -> None:
+        try:
+            self._selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+
+    def acquire_dispatcher(self, key: Any, name: str) -> Dispatcher:
+        """@brief Get the dispatcher for _key_, creating it on first use.
+        @param key Object that the dispatcher serves, usually a session.
+        @param name Thread name for a new dispatcher.
+        """
+        with self._lock:
+            entry = self._dispatchers.get(key)
+            if entry is None:
+                entry = self._dispatchers[key] = [Dispatcher(name), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def release_dispatcher(self, key: Any) -> None:
+        """@brief Drop a reference obtained from acquire_dispatcher(), stopping the dispatcher
+            when the last one is released."""
+        with self._lock:
+            entry = self._dispatchers[key]
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del self._dispatchers[key]
+        entry[0].stop()
+
+    def stop(self) -> None:
+        """@brief Stop the loop thread and close the selector."""
+        self._shutdown = True
+        self._wakeup()
+        if not self.is_current_thread:
+            self.join()
+
+    def _wakeup(self) -> None:
+        try:
+            self._wakeup_sender.send(b'\0')
+        except (BlockingIOError, OSError):
+            # The socket buffer is full, so a wakeup is already pending.
+            pass
+
+    def _drain_wakeup(self) -> None:
+        try:
+            while self._wakeup_receiver.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+
+    def _run_callback(self, callback: Callable, args: Tuple[Any, ...]) -> None:
+        try:
+            callback(*args)
+        except Exception as err:
+            LOG.error("Unexpected exception in event loop callback: %s", err, exc_info=True)
+
+    def _run_pending(self) -> Optional[float]:
+        """@brief Run ready callbacks and expired timers.
+        @return Timeout for the next select, or None to wait until a socket is readable.
+        """
+        with self._lock:
+            ready, self._ready = self._ready, []
+        for callback, args in ready:
+            self._run_callback(callback, args)
+
+        now = monotonic()
+        while True:
+            with self._lock:
+                if not self._timers or self._timers[0][0] > now:
+                    break
+                _, _, handle = heapq.heappop(self._timers)
+            if not handle.cancelled:
+                self._run_callback(handle.callback, handle.args)
+
+        with self._lock:
+            if self._ready:
+                return 0
+            if self._timers:
+                return max(0.0, self._timers[0][0] - monotonic())
+            return None
+
+    def run(self) -> None:
+        LOG.debug("Event loop started")
+        try:
+            while not self._shutdown:
+                timeout = self._run_pending()
+                if self._shutdown:
+                    break
+                for key, _ in self._selector.select(timeout):
+                    self._run_callback(key.data, ())
+        finally:
+            self._selector.close()
+            self._wakeup_receiver.close()
+            self._wakeup_sender.close()
+        LOG.debug("Event loop stopped")
@@ -135,6 +135,12 @@ def same(d1: Sequence[Any], d2: Sequence[Any]) -> bool:
     """
     if len(d1) != len(d2):
         return False
+    # Compare in one step if either sequence is binary data and the other can be converted.
+    if isinstance(d1, (bytes, bytearray, memoryview)) or isinstance(d2, (bytes, bytearray, memoryview)):
+        try:
+            return bytes(d1) == bytes(d2)
+        except (TypeError, ValueError):
+            pass
     for i in range(len(d1)):
         if d1[i] != d2[i]:
             return False
@@ -0,0 +1,269 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""@brief Binary capture files of RTT up channel data.
+
+A capture file starts with a header holding a magic string, the format version, and the wall
+clock time at which the capture started. The header is followed by frames, each holding the
+chunk of data read from one up channel by one poll:
+
+- timestamp: u64, nanoseconds since the start of the capture, taken when the data was read.
+- channel: u8, the up channel index.
+- length: u16, the number of payload bytes.
+- payload.
+
+All values are little endian. Chunks longer than MAX_FRAME_PAYLOAD are split across frames.
+"""
+
+import io
+import logging
+import struct
+import threading
+from time import (perf_counter_ns, time)
+from typing import (BinaryIO, Dict, Iterable, Iterator, Optional, TextIO, Tuple)
+
+from ..core import exceptions
+
+LOG = logging.getLogger(__name__)
+
+## Magic string at the start of a capture file.
+CAPTURE_MAGIC = b'PYOCDRTT'
+
+## Version of the capture file format.
+CAPTURE_VERSION = 1
+
+## File header: magic, version, reserved, start time in seconds since the epoch.
+FILE_HEADER = struct.Struct('<8sHHd')
+
+## Frame header: timestamp in nanoseconds, channel, payload length.
+FRAME_HEADER = struct.Struct('<QBH')
+
+## Largest payload of a single frame.
+MAX_FRAME_PAYLOAD = 0xffff
+
+## pcap link type for private use, under which each packet is the channel byte then the payload.
+PCAP_LINKTYPE_USER0 = 147
+
+## Magic number of pcap files with nanosecond timestamps.
+PCAP_MAGIC_NS = 0xa1b23c4d
+
+class RTTCapture:
+    """@brief Writes RTT data to a capture file from a separate thread.
+
+    Frames are copied into a ring buffer that is allocated once, when the capture is created. A
+    writer thread writes the filled part of the ring to the file in large blocks, straight from
+    the buffer. So the polling thread never waits for the disk and makes no allocations per chunk.
+
+    If the ring is full because the disk can't keep up, frames are dropped rather than stalling
+    the polling, which would make the target drop data instead. Dropped data is counted.
+    """
+
+    ## Default size of the ring buffer in bytes.
+    DEFAULT_BUFFER_SIZE = 8 * 1024 * 1024
+
+    def __init__(self, path: str, buffer_size: int = DEFAULT_BUFFER_SIZE) -> None:
+        """
+        @param path Path of the capture file, which is replaced if it exists.
+        @param buffer_size Size of the ring buffer in bytes.
+        """
+        self._size = buffer_size
+        self._buffer = bytearray(buffer_size)
+        self._view = memoryview(self._buffer)
+        self._header = bytearray(FRAME_HEADER.size)
+        self._cond = threading.Condition()
+        # Total bytes put in and taken from the ring. The ring holds the difference.
+        self._write_pos = 0
+        self._read_pos = 0
+        self._closing = False
+        self._error: Optional[Exception] = None
+        self.bytes_captured = 0
+        self.frames = 0
+        self.dropped_bytes = 0
+        self.dropped_frames = 0
+
+        self._file = io.FileIO(path, 'w')
+        self._file.write(FILE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, 0, time()))
+        self._start_ns = perf_counter_ns()
+        self._thread = threading.Thread(target=self._writer_main, name="rtt-capture-writer")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def add(self, channel: int, data: bytes) -> None:
+        """@brief Add data read from an up channel to the capture.
+
+        @param self
+        @param channel The up channel index.
+        @param data The data read from the channel. May be any bytes-like object.
+        """
+        if not data:
+            return
+        timestamp = perf_counter_ns() - self._start_ns
+        view = memoryview(data).cast('B')
+        with self._cond:
+            for offset in range(0, len(view), MAX_FRAME_PAYLOAD):
+                chunk = view[offset:offset + MAX_FRAME_PAYLOAD]
+                frame_size = FRAME_HEADER.size + len(chunk)
+                if (self._error is not None) or (self._size - (self._write_pos - self._read_pos) < frame_size):
+                    if self.dropped_frames == 0:
+                        LOG.warning("RTT capture buffer full; dropping data")
+                    self.dropped_bytes += len(chunk)
+                    self.dropped_frames += 1
+                    continue
+                FRAME_HEADER.pack_into(self._header, 0, timestamp, channel, len(chunk))
+                self._put(self._header)
+                self._put(chunk)
+                self.bytes_captured += len(chunk)
+                self.frames += 1
+            self._cond.notify()
+
+    def _put(self, data: memoryview) -> None:
+        """@brief Copy data into the ring. The caller must hold the lock and check there is space."""
+        length = len(data)
+        start = self._write_pos % self._size
+        first = min(length, self._size - start)
+        self._view[start:start + first] = data[:first]
+        if first < length:
+            self._view[:length - first] = data[first:]
+        self._write_pos += length
+
+    def _writer_main(self) -> None:
+        while True:
+            with self._cond:
+                while (self._read_pos == self._write_pos) and not self._closing:
+                    self._cond.wait()
+                if self._read_pos == self._write_pos:
+                    break
+                # Write up to the end of the filled part, or the end of the ring if it wraps.
+                start = self._read_pos % self._size
+                end = min(start + (self._write_pos - self._read_pos), self._size)
+            try:
+                written = self._file.write(self._view[start:end])
+            except OSError as err:
+                LOG.error("RTT capture write failed: %s", err)
+                with self._cond:
+                    self._error = err
+                    self._read_pos = self._write_pos
+                break
+            with self._cond:
+                self._read_pos += written
+
+    def close(self) -> None:
+        """@brief Write the remaining data and close the file.
+
+        @exception OSError Writing the file failed.
+        """
+        with self._cond:
+            if self._closing:
+                return
+            self._closing = True
+            self._cond.notify()
+        self._thread.join()
+        self._file.close()
+        if self.dropped_frames:
+            LOG.warning("RTT capture dropped %d bytes in %d frames", self.dropped_bytes,
+                    self.dropped_frames)
+        if self._error is not None:
+            raise self._error
+
+class RTTCaptureReader:
+    """@brief Reads the frames of a capture file."""
+
+    def __init__(self, file: BinaryIO) -> None:
+        """
+        @param file Binary file object opened on the capture.
+        @exception RTTError The file is not a capture, or its version is not supported.
+        """
+        self._file = file
+        header = file.read(FILE_HEADER.size)
+        if len(header) < FILE_HEADER.size:
+            raise exceptions.RTTError("not an RTT capture file")
+        magic, version, _, self.start_time = FILE_HEADER.unpack(header)
+        if magic != CAPTURE_MAGIC:
+            raise exceptions.RTTError("not an RTT capture file")
+        if version != CAPTURE_VERSION:
+            raise exceptions.RTTError(f"unsupported RTT capture version {version}")
+
+    def frames(self) -> Iterator[Tuple[int, int, bytes]]:
+        """@brief Iterate over the frames as (timestamp in ns, channel, payload) tuples.
+
+        A frame cut short at the end of the file, as left by an interrupted capture, is ignored.
+        """
+        while True:
+            header = self._file.read(FRAME_HEADER.size)
+            if len(header) < FRAME_HEADER.size:
+                return
+            timestamp, channel, length = FRAME_HEADER.unpack(header)
+            payload = self._file.read(length)
+            if len(payload) < length:
+                return
+            yield timestamp, channel, payload
+
+def write_text(frames: Iterable[Tuple[int, int, bytes]], output: TextIO,
+        channels: Optional[Iterable[int]] = None) -> None:
+    """@brief Write captured data as lines of text, each prefixed with a timestamp and channel.
+
+    The data of each channel is split into lines, which are stamped with the time of the frame in
+    which they start.
+
+    @param frames Frames as returned by RTTCaptureReader.frames().
+    @param output Text file to write to.
+    @param channels Channels to include. All channels are included if None.
+    """
+    selected = set(channels) if channels is not None else None
+    # Partial last line of each channel, and the time it started.
+    pending: Dict[int, Tuple[int, bytes]] = {}
+
+    def write_line(timestamp: int, channel: int, line: bytes) -> None:
+        text = line.decode('utf-8', 'backslashreplace').rstrip('\r')
+        output.write(f"{timestamp / 1e9:14.6f} {channel}: {text}\n")
+
+    for timestamp, channel, payload in frames:
+        if (selected is not None) and (channel not in selected):
+            continue
+        start, data = pending.pop(channel, (timestamp, b''))
+        lines = (data + payload).split(b'\n')
+        for line in lines[:-1]:
+            write_line(start, channel, line)
+            start = timestamp
+        if lines[-1]:
+            pending[channel] = (start, lines[-1])
+
+    for channel, (start, data) in sorted(pending.items()):
+        write_line(start, channel, data)
+
+def write_pcap(frames: Iterable[Tuple[int, int, bytes]], output: BinaryIO, start_time: float,
+        channels: Optional[Iterable[int]] = None) -> None:
+    """@brief Write captured frames as a pcap file with nanosecond timestamps.
+
+    Each frame is a packet of link type USER0, holding the channel byte followed by the payload,
+    so the capture can be examined with tools such as Wireshark.
+
+    @param frames Frames as returned by RTTCaptureReader.frames().
+    @param output Binary file to write to.
+    @param start_time Start of the capture in seconds since the epoch.
+    @param channels Channels to include. All channels are included if None.
+    """
+    selected = set(channels) if channels is not None else None
+    output.write(struct.pack('<IHHiIII', PCAP_MAGIC_NS, 2, 4, 0, 0, MAX_FRAME_PAYLOAD + 1,
+            PCAP_LINKTYPE_USER0))
+    start_ns = int(start_time * 1e9)
+    for timestamp, channel, payload in frames:
+        if (selected is not None) and (channel not in selected):
+            continue
+        seconds, nanoseconds = divmod(start_ns + timestamp, 1000000000)
+        length = len(payload) + 1
+        output.write(struct.pack('<IIIIB', seconds, nanoseconds, length, length, channel))
+        output.write(payload)
@@ -17,11 +17,16 @@
 from abc import ABC, abstractmethod
 import selectors
 import socket
-from typing import Optional, Sequence
+import threading
+from typing import Optional, Sequence, TYPE_CHECKING
 
 from ..core.soc_target import SoCTarget
 from ..core import exceptions
-from ..debug.rtt import RTTControlBlock, RTTUpChannel, RTTDownChannel
+from ..debug.rtt import RTTControlBlock, RTTDownChannel
+
+if TYPE_CHECKING:
+    from .event_loop import EventLoop
+    from .rtt_capture import RTTCapture
 
 
 class RTTChanWorker(ABC):
@@ -58,13 +63,16 @@ class RTTChanTCPWorker(RTTChanWorker):
 
     port: int
 
-    def __init__(self, port: int, listen: bool = True):
+    def __init__(self, port: int, listen: bool = True, event_loop: Optional["EventLoop"] = None):
         """
         @param port The port to connect to or to listen for connects on.
         @param listen If true a server will be started to accept one connection
                       at a time on the given port. If false a connection will be
                       made as a TCP client to a server running on the given
                       port on localhost.
+        @param event_loop Optional EventLoop that accepts connections and reads
+                      incoming data, instead of the socket being checked each
+                      time the channel is polled.
         """
         if listen:
             self.server = socket.socket()
@@ -79,6 +87,40 @@ class RTTChanTCPWorker(RTTChanWorker):
             self.client.setblocking(False)
 
         self.port = port
+        self._event_loop = event_loop
+        self._down_data = bytearray()
+        self._down_data_lock = threading.Lock()
+        if event_loop is not None:
+            if self.client is not None:
+                event_loop.register(self.client, self._client_readable)
+            else:
+                event_loop.register(self.server, self._accept_client)
+
+    def _accept_client(self):
+        """@brief Accept a connection. Called on the event loop thread."""
+        self.client, _ = self.server.accept()
+        self.client.setblocking(False)
+        self._event_loop.unregister(self.server)
+        self._event_loop.register(self.client, self._client_readable)
+
+    def _client_readable(self):
+        """@brief Buffer incoming data. Called on the event loop thread."""
+        try:
+            data = self.client.recv(4096)
+        except BlockingIOError:
+            return
+        except OSError:
+            data = b''
+        if data:
+            with self._down_data_lock:
+                self._down_data += data
+            return
+        # client socket closed at other end
+        self._event_loop.unregister(self.client)
+        self.client.close()
+        self.client = None
+        if self.server is not None:
+            self._event_loop.register(self.server, self._accept_client)
 
     def _check_for_new_client(self):
         if self.server is None:
@@ -93,6 +135,15 @@ class RTTChanTCPWorker(RTTChanWorker):
                 self.client.setblocking(False)
 
     def write_up_data(self, data: bytes):
+        if self._event_loop is not None:
+            client = self.client
+            if client is None or not data:
+                return 0
+            try:
+                return client.send(data)
+            except BlockingIOError:
+                return 0
+
         if self.client is None:
             self._check_for_new_client()
             if self.client is None:
@@ -101,6 +152,12 @@ class RTTChanTCPWorker(RTTChanWorker):
         return self.client.send(data)
 
     def get_down_data(self):
+        if self._event_loop is not None:
+            with self._down_data_lock:
+                data = bytes(self._down_data)
+                self._down_data.clear()
+            return data
+
         if self.client is None:
             self._check_for_new_client()
             if self.client is None:
@@ -121,15 +178,45 @@ class RTTChanTCPWorker(RTTChanWorker):
         return bytes()
 
     def close(self):
+        if self._event_loop is not None:
+            self._event_loop.run_in_loop(self._unregister_sockets).result()
         if self.server is not None:
             self.server.close()
         if self.client is not None:
             self.client.close()
 
+    def _unregister_sockets(self):
+        for sock in (self.server, self.client):
+            if sock is not None:
+                self._event_loop.unregister(sock)
+
 class RTTChanFileWorker(RTTChanWorker):
-    """@brief Implementation of channel worker that write data from RTT channel
-              to a file and optionally reads data from a file into an RTT
-              channel. """
+    """@brief Implementation of channel worker that writes data from an RTT
+              channel to a capture file.
+
+    Several workers may share one capture. The capture is not closed by the
+    workers, since it may outlive them.
+    """
+
+    def __init__(self, capture: "RTTCapture", channel: int):
+        """
+        @param capture The capture to which up channel data is added.
+        @param channel The up channel index recorded with the data.
+        """
+        self.capture = capture
+        self.channel = channel
+
+    def write_up_data(self, data: bytes) -> int:
+        # Data that doesn't fit in the capture buffer is dropped and counted by the capture, so
+        # all of it is always consumed.
+        self.capture.add(self.channel, data)
+        return len(data)
+
+    def get_down_data(self) -> bytes:
+        return b''
+
+    def close(self):
+        pass
 
 
 class RTTServer:
@@ -141,7 +228,7 @@ class RTTServer:
     down_buffers: Optional[Sequence[bytes]]
 
     def __init__(self, target: SoCTarget, address: int, size: int,
-                 control_block_id: bytes):
+                 control_block_id: bytes, event_loop: Optional["EventLoop"] = None):
         """
         @param target The target with which RTT communication is desired.
         @param address Base address for control block search range.
@@ -150,6 +237,7 @@ class RTTServer:
         @param control_block_id The control block ID string to search for. Must
                                 be at most 16 bytes long.  Will be padded with
                                 zeroes if less than 16 bytes.
+        @param event_loop Optional EventLoop used to serve the channel TCP ports.
         """
         self.control_block = RTTControlBlock.from_target(target, address = address,
                                     size = size, control_block_id = control_block_id)
@@ -157,24 +245,31 @@ class RTTServer:
         self.workers = None
         self.up_buffers = None
         self.down_buffers = None
+        self._event_loop = event_loop
 
-    def poll(self):
-        """@brief Reads from and writes to active RTT channels. """
+    def poll(self) -> bool:
+        """@brief Reads from and writes to active RTT channels.
+
+        @return Whether any data was read from or written to the target.
+        """
         if not self.running:
             # not yet started
-            return
+            return False
+
+        # Read every up channel that has a worker in one transaction.
+        num_up_chans = len(self.control_block.up_channels)
+        up_data = self.control_block.read_up_channels(i for i, worker in enumerate(self.workers)
+                if (worker is not None) and (i < num_up_chans))
 
+        active = False
         for i, worker in enumerate(self.workers):
             if worker is None:
                 continue
 
-            # Read from up channel
-            try:
-                up_chan: RTTUpChannel = self.control_block.up_channels[i]
-            except IndexError:
-                pass
-            else:
-                self.up_buffers[i] += up_chan.read()
+            data = up_data.get(i)
+            if data:
+                self.up_buffers[i] += data
+                active = True
 
             # Write to worker
             bytes_written = worker.write_up_data(self.up_buffers[i])
@@ -191,6 +286,9 @@ class RTTServer:
             else:
                 bytes_out: int = down_chan.write(self.down_buffers[i])
                 self.down_buffers[i] = self.down_buffers[i][bytes_out:]
+                active = active or (bytes_out > 0)
+
+        return active
 
     def start(self):
         """@brief Find and parse RTT control block. """
@@ -233,7 +331,7 @@ class RTTServer:
         elif self.workers[channel] is not None:
             raise exceptions.RTTError(f"RTT is already started for channel {channel}")
 
-        self.workers[channel] = RTTChanTCPWorker(port, listen = True)
+        self.workers[channel] = RTTChanTCPWorker(port, listen = True, event_loop = self._event_loop)
 
     def stop_server(self, port: int):
         """@brief Stop a TCP server.
@@ -18,10 +18,14 @@
 import logging
 import threading
 import socket
+from typing import (Optional, TYPE_CHECKING)
 
 from .sockets import ListenerSocket
 from .compatibility import to_bytes_safe
 
+if TYPE_CHECKING:
+    from .event_loop import EventLoop
+
 LOG = logging.getLogger(__name__)
 
 class StreamServer(threading.Thread):
@@ -30,10 +34,12 @@ class StreamServer(threading.Thread):
     The user can connect to the socket with telnet or netcat.
 
     The server thread will automatically be started by the constructor. To shut down the
-    server and its thread, call the stop() method.
+    server and its thread, call the stop() method. If an EventLoop is provided, the thread isn't
+    started and the socket is served from the loop instead.
     """
 
-    def __init__(self, port, serve_local_only=True, name=None, is_read_only=True, extra_info=None):
+    def __init__(self, port, serve_local_only=True, name=None, is_read_only=True, extra_info=None,
+            event_loop: Optional["EventLoop"] = None):
         """@brief Constructor.
 
         Starts the server immediately.
@@ -48,6 +54,7 @@ class StreamServer(threading.Thread):
             then any incoming data sent by the client is discarded. Otherwise it is buffered so
             it can be read with the read() methods.
         @param extra_info Optional string with extra information about the server, e.g. "core 0".
+        @param event_loop Optional EventLoop used to serve the socket instead of a thread.
         """
         super(StreamServer, self).__init__()
         self.name = name
@@ -67,8 +74,14 @@ class StreamServer(threading.Thread):
         self.connected = None
         self._shutdown_event = threading.Event()
         self._is_running: bool = False
+        self._event_loop = event_loop
         self.daemon = True
-        self.start()
+        if event_loop is None:
+            self.start()
+        else:
+            self._is_running = True
+            self._log_started()
+            event_loop.register(self._abstract_socket.listener, self._accept_connection)
 
     @property
     def port(self):
@@ -80,11 +93,53 @@ class StreamServer(threading.Thread):
 
     def stop(self):
         self._shutdown_event.set()
-        self.join()
+        if self._event_loop is None:
+            self.join()
+        else:
+            self._event_loop.run_in_loop(self._stop_in_loop).result()
 
-    def run(self):
+    def _log_started(self):
         LOG.info("%sserver started on port %d%s", self._formatted_name, self._port,
             (" (%s)" % self._extra_info) if self._extra_info else "")
+
+    def _accept_connection(self):
+        """@brief Accept a client. Called on the event loop thread."""
+        self.connected = self._abstract_socket.accept()
+        if self.connected is None:
+            return
+        LOG.debug("%sclient connected", self._formatted_name)
+        # TODO support multiple client connections
+        self._event_loop.unregister(self._abstract_socket.listener)
+        self._abstract_socket.set_timeout(None)
+        self._event_loop.register(self.connected, self._connection_readable)
+
+    def _connection_readable(self):
+        """@brief Read data from the client. Called on the event loop thread."""
+        try:
+            data = self._abstract_socket.read()
+        except OSError:
+            data = b''
+        if len(data) == 0:
+            # Client disconnected.
+            self._event_loop.unregister(self.connected)
+            self._abstract_socket.close()
+            self.connected = None
+            self._event_loop.register(self._abstract_socket.listener, self._accept_connection)
+        elif not self._is_read_only:
+            with self._buffer_lock:
+                self._buffer += bytearray(data)
+
+    def _stop_in_loop(self):
+        self._event_loop.unregister(self._abstract_socket.listener)
+        if self.connected is not None:
+            self._event_loop.unregister(self.connected)
+            self.connected = None
+        self._is_running = False
+        self._abstract_socket.cleanup()
+        LOG.info("%sserver stopped", self._formatted_name)
+
+    def run(self):
+        self._log_started()
         self.connected = None
         try:
             self._is_running = True
@@ -49,6 +49,18 @@ class ListenerSocket(object):
 
         return self.conn
 
+    def accept(self):
+        """@brief Accept a pending connection without waiting.
+
+        For use when the listener socket has been reported readable, for instance by an EventLoop.
+        """
+        self.conn = None
+        try:
+            self.conn, _ = self.listener.accept()
+        except BlockingIOError:
+            pass
+        return self.conn
+
     def read(self, packet_size=None):
         if packet_size is None:
             packet_size = self.packet_size
@@ -146,3 +146,32 @@ class Timeout:
         self.check(autosleep=False)
         return self._timed_out
 
+class PollInterval:
+    """@brief Interval between target state checks that backs off while nothing happens.
+
+    The interval starts at the minimum when reset(), for instance after a resume, and grows by
+    BACKOFF_FACTOR on each call to next() until it reaches the maximum.
+    """
+
+    ## Factor by which the interval grows after each poll.
+    BACKOFF_FACTOR = 1.5
+
+    def __init__(self, minimum: float, maximum: float) -> None:
+        self.minimum = minimum
+        self.maximum = max(minimum, maximum)
+        self._interval = minimum
+
+    @property
+    def current(self) -> float:
+        """@brief The interval that next() will return."""
+        return self._interval
+
+    def reset(self) -> None:
+        """@brief Go back to polling at the minimum interval."""
+        self._interval = self.minimum
+
+    def next(self) -> float:
+        """@brief Return the interval to wait before the next poll, and back off."""
+        interval = self._interval
+        self._interval = min(interval * self.BACKOFF_FACTOR, self.maximum)
+        return interval
@@ -0,0 +1,289 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""@brief Hardware-free performance benchmark.
+
+Runs read, write, flash programming, core register, range step and gdbserver benchmarks against the
+simulated CMSIS-DAP probe and reports throughput together with the number of USB packets and
+round trips used. Round trip counts are deterministic, so any increase is reported as a
+regression. Throughput is compared against the baseline with a tolerance, since it depends on
+the host.
+
+Usage:
+    python sim_benchmark.py --save-baseline     # record data/sim_benchmark_baseline.json
+    python sim_benchmark.py                     # compare against the baseline
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import socket
+import sys
+from time import perf_counter
+
+from pyocd.core.session import Session
+from pyocd.flash.file_programmer import FileProgrammer
+from pyocd.gdbserver.gdbserver import GDBServer
+from pyocd.probe.cmsis_dap_probe import CMSISDAPProbe
+from pyocd.probe.pydapaccess.dap_access_cmsis_dap import DAPAccessCMSISDAP
+from pyocd.probe.pydapaccess.interface.simulated_backend import SimulatedInterface
+from pyocd.probe.pydapaccess.interface.simulated_target import (
+    FLASH_START,
+    RAM_START,
+    )
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data",
+        "sim_benchmark_baseline.json")
+
+RAM_TEST_SIZE = 32 * 1024
+FLASH_TEST_SIZE = 64 * 1024
+REGISTER_ITERATIONS = 200
+GDB_READ_SIZE = 16 * 1024
+GDB_READ_CHUNK = 1024
+## Checked range for gdb_crc, clear of the RAM the CRC routine is loaded into.
+GDB_CRC_ADDRESS = RAM_START + 0x8000
+
+## Loop of 1000 iterations: movs r0, #0; movs r1, #125; lsls r1, r1, #3; loop: adds r0, #3;
+# subs r1, #1; bne loop.
+RANGE_STEP_CODE = bytes.fromhex("00207d21c90003300139fcd1")
+RANGE_STEP_ADDRESS = RAM_START + 0x3000
+
+## Number of gdb single steps in gdb_step, each followed by reads of the stack and code like gdb's.
+GDB_STEP_ITERATIONS = 10
+GDB_STEP_STACK = RAM_START + 0x4000
+
+class BenchmarkResult(object):
+    def __init__(self, name, byte_count, elapsed, stats):
+        self.name = name
+        self.byte_count = byte_count
+        self.elapsed = elapsed
+        self.packets = stats.packets
+        self.round_trips = stats.round_trips
+
+    @property
+    def kbps(self):
+        """@brief Throughput in KB/s, or operations per second for benchmarks without data."""
+        if not self.byte_count:
+            return 1.0 / self.elapsed
+        return float(self.byte_count) / 1000.0 / self.elapsed
+
+    def to_dict(self):
+        return {
+            'kbps': round(self.kbps, 3),
+            'packets': self.packets,
+            'round_trips': self.round_trips,
+            }
+
+class Benchmark(object):
+    def __init__(self, latency, packet_size, packet_count):
+        self.sim = SimulatedInterface(packet_size=packet_size, packet_count=packet_count,
+                latency=latency)
+        probe = CMSISDAPProbe(DAPAccessCMSISDAP(None, interface=self.sim))
+        self.session = Session(probe, no_config=True, options={
+                'reset.post_delay': 0,
+                'target_override': 'sim_cortex_m',
+                })
+        self.results = []
+
+    def _measure(self, name, byte_count, fn, flush=True):
+        if flush:
+            self.session.target.flush()
+        self.sim.stats.reset()
+        start = perf_counter()
+        fn()
+        self.session.target.flush()
+        elapsed = perf_counter() - start
+        result = BenchmarkResult(name, byte_count, elapsed, self.sim.stats)
+        self.results.append(result)
+        return result
+
+    def run(self):
+        self._measure("connect", 0, self.session.open, flush=False)
+        with self.session:
+            target = self.session.target
+            self._measure("reset_and_halt", 0, target.reset_and_halt)
+            data = bytes((i * 31 + 7) & 0xff for i in range(FLASH_TEST_SIZE))
+
+            self._measure("ram_write", RAM_TEST_SIZE,
+                    lambda: target.write_memory_block8(RAM_START, data[:RAM_TEST_SIZE]))
+            self._measure("ram_read", RAM_TEST_SIZE,
+                    lambda: target.read_memory_block8(RAM_START, RAM_TEST_SIZE))
+
+            def program_flash():
+                FileProgrammer(self.session, smart_flash=False).program(io.BytesIO(data),
+                        file_format='bin', base_address=FLASH_START)
+            self._measure("flash_program", FLASH_TEST_SIZE, program_flash)
+
+            self.session.options['flash.compress'] = True
+            self._measure("flash_program_compressed", FLASH_TEST_SIZE, program_flash)
+            self.session.options['flash.compress'] = False
+
+            core = target.selected_core
+            reg_list = ['r%d' % i for i in range(13)] + ['sp', 'lr', 'pc', 'xpsr']
+            def read_registers():
+                for _ in range(REGISTER_ITERATIONS):
+                    core.read_core_registers_raw(reg_list)
+            self._measure("register_read", REGISTER_ITERATIONS * len(reg_list) * 4, read_registers)
+
+            # Range step over a loop of 3000 instructions.
+            target.write_memory_block8(RANGE_STEP_ADDRESS, list(RANGE_STEP_CODE))
+            def range_step():
+                target.write_core_register('pc', RANGE_STEP_ADDRESS)
+                target.step(start=RANGE_STEP_ADDRESS, end=RANGE_STEP_ADDRESS + len(RANGE_STEP_CODE))
+            self._measure("range_step", 0, range_step)
+
+            self._measure("gdb_memory_read", GDB_READ_SIZE,
+                    lambda: self._gdb_memory_read(b'm', GDB_READ_CHUNK))
+            self._measure("gdb_memory_read_binary", GDB_READ_SIZE,
+                    lambda: self._gdb_memory_read(b'x', GDB_READ_SIZE))
+            self._measure("gdb_crc", GDB_READ_SIZE, self._gdb_crc)
+
+            target.write_core_register('pc', RANGE_STEP_ADDRESS)
+            target.write_core_register('sp', GDB_STEP_STACK)
+            self._measure("gdb_step", 0, self._gdb_step)
+
+    def _gdb_memory_read(self, command, chunk):
+        server = GDBServer(self.session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=30) as sock:
+                _rsp_exchange(sock, b'qSupported:swbreak+')
+                for offset in range(0, GDB_READ_SIZE, chunk):
+                    _rsp_exchange(sock, command + b'%x,%x' % (RAM_START + offset, chunk))
+                _rsp_exchange(sock, b'D')
+        finally:
+            server.stop()
+
+    def _gdb_crc(self):
+        server = GDBServer(self.session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=30) as sock:
+                _rsp_exchange(sock, b'qSupported:swbreak+')
+                _rsp_exchange(sock, b'qCRC:%x,%x' % (GDB_CRC_ADDRESS, GDB_READ_SIZE))
+                _rsp_exchange(sock, b'D')
+        finally:
+            server.stop()
+
+    def _gdb_step(self):
+        server = GDBServer(self.session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=30) as sock:
+                _rsp_exchange(sock, b'qSupported:swbreak+')
+                for _ in range(GDB_STEP_ITERATIONS):
+                    stop = _rsp_exchange(sock, b's')
+                    regs = dict(pair.split(b':') for pair in stop[3:].split(b';') if pair)
+                    sp = int.from_bytes(bytes.fromhex(regs[b'0d'].decode()), 'little')
+                    pc = int.from_bytes(bytes.fromhex(regs[b'0f'].decode()), 'little')
+                    _rsp_exchange(sock, b'm%x,40' % sp)
+                    _rsp_exchange(sock, b'm%x,10' % (pc & ~3))
+                _rsp_exchange(sock, b'D')
+        finally:
+            server.stop()
+
+def _rsp_exchange(sock, data):
+    """@brief Send a gdb remote serial protocol packet and return the reply payload."""
+    sock.sendall(b'$' + data + b'#%02x' % (sum(data) & 0xff))
+    response = b''
+    while b'#' not in response or len(response) < response.index(b'#') + 3:
+        chunk = sock.recv(4096)
+        if not chunk:
+            raise IOError("gdbserver closed the connection")
+        response += chunk
+    sock.sendall(b'+')
+    response = response.lstrip(b'+')
+    return response[1:response.index(b'#')]
+
+def compare(results, baseline, threshold):
+    """@brief Compare results against a baseline and return a list of regression messages."""
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.name)
+        if expected is None:
+            continue
+        if result.round_trips > expected['round_trips']:
+            regressions.append("%s: round trips increased from %d to %d"
+                    % (result.name, expected['round_trips'], result.round_trips))
+        if result.kbps < expected['kbps'] * (1.0 - threshold):
+            regressions.append("%s: throughput dropped from %.1f KB/s to %.1f KB/s"
+                    % (result.name, expected['kbps'], result.kbps))
+    return regressions
+
+def print_results(results, baseline, output_file=None):
+    format_str = "{:<26}{:>14}{:>10}{:>13}{:>16}"
+    print("\n------ Simulated Probe Benchmark ------", file=output_file)
+    print(format_str.format("Benchmark", "Speed", "Packets", "Round trips", "Baseline RTs"),
+          file=output_file)
+    for result in results:
+        expected = baseline.get(result.name, {}).get('round_trips', "-")
+        speed = ("%.1f KB/s" % result.kbps) if result.byte_count else ("%.1f /s" % result.kbps)
+        print(format_str.format(result.name, speed, result.packets,
+                result.round_trips, expected), file=output_file)
+    print("", file=output_file)
+
+def main():
+    parser = argparse.ArgumentParser(description='pyOCD simulated probe benchmark')
+    parser.add_argument('-d', '--debug', action="store_true", help='Enable debug logging')
+    parser.add_argument('--latency', type=float, default=0.0005,
+            help='Simulated round trip latency in seconds (default 0.0005).')
+    parser.add_argument('--packet-size', type=int, default=64, help='CMSIS-DAP packet size.')
+    parser.add_argument('--packet-count', type=int, default=4, help='CMSIS-DAP packet count.')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON file.')
+    parser.add_argument('--save-baseline', action='store_true',
+            help='Write the results to the baseline file instead of comparing.')
+    parser.add_argument('--threshold', type=float, default=0.25,
+            help='Allowed fractional throughput drop before reporting a regression (default 0.25).')
+    args = parser.parse_args()
+    logging.basicConfig(level=(logging.DEBUG if args.debug else logging.WARNING))
+
+    config = {
+        'latency': args.latency,
+        'packet_size': args.packet_size,
+        'packet_count': args.packet_count,
+        }
+    bench = Benchmark(**config)
+    bench.run()
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            saved = json.load(f)
+        if saved.get('config') == config:
+            baseline = saved['results']
+        else:
+            print("Baseline was recorded with a different configuration; not comparing.")
+
+    print_results(bench.results, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump({
+                'config': config,
+                'results': {r.name: r.to_dict() for r in bench.results},
+                }, f, indent=4, sort_keys=True)
+            f.write("\n")
+        print("Saved baseline to %s" % args.baseline)
+        return 0
+
+    regressions = compare(bench.results, baseline, args.threshold)
+    for message in regressions:
+        print("REGRESSION: " + message)
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""@brief SWO decoder benchmark.
+
+Decodes SWO captures with SWOParser and reports the decoding rate, and the SWO baud rate it could
+keep up with. Captures are raw SWO byte streams, such as the data served by the SWV raw TCP port
+(the 'swv_raw_enable' option). Without capture files, synthetic streams are generated for
+typical kinds of trace: printf text on ITM port 0, 32-bit ITM writes, and DWT PC sampling with
+exception trace, all with local timestamps.
+
+Usage:
+    python swo_benchmark.py                         # benchmark the synthetic streams
+    python swo_benchmark.py capture1.bin ...        # benchmark recorded captures
+"""
+
+import argparse
+import os
+import random
+import struct
+import sys
+from time import perf_counter
+
+from pyocd.trace.sink import TraceEventSink
+from pyocd.trace.swo import SWOParser
+
+## Size of each synthetic stream in bytes.
+STREAM_SIZE = 4 * 1024 * 1024
+
+## Bits per byte of SWO in UART (NRZ) mode, with the start and stop bits.
+BITS_PER_BYTE = 10
+
+class CountingSink(TraceEventSink):
+    """@brief Sink that only counts events."""
+
+    def __init__(self):
+        self.count = 0
+
+    def receive(self, event):
+        self.count += 1
+
+    def receive_batch(self, events):
+        self.count += len(events)
+
+class Core(object):
+    """@brief Stand-in for the core, which the parser asks for exception names."""
+
+    def exception_number_to_name(self, exception_number):
+        return None
+
+def local_timestamp(delta):
+    """@brief Encode a local timestamp packet (format 1) for a time delta."""
+    data = bytearray([0xc0])
+    while True:
+        byte = delta & 0x7f
+        delta >>= 7
+        if delta:
+            data.append(byte | 0x80)
+        else:
+            data.append(byte)
+            return bytes(data)
+
+def printf_stream(rng, size):
+    """@brief Lines of text written a byte at a time to ITM port 0, with a timestamp per line."""
+    data = bytearray(b'\0\0\0\0\0\x80')
+    while len(data) < size:
+        line = b"sensor %d: value=%d status=ok\n" % (rng.randrange(16), rng.randrange(100000))
+        for byte in line:
+            data += bytes((0x01, byte))
+        data += local_timestamp(rng.randrange(1, 5000))
+    return bytes(data)
+
+def itm32_stream(rng, size):
+    """@brief 32-bit writes to ITM port 1, with a timestamp after every eight."""
+    data = bytearray(b'\0\0\0\0\0\x80')
+    while len(data) < size:
+        for _ in range(8):
+            data += struct.pack('<BI', 0x0b, rng.getrandbits(32))
+        data += local_timestamp(rng.randrange(1, 500))
+    return bytes(data)
+
+def pc_sampling_stream(rng, size):
+    """@brief DWT periodic PC samples with occasional exception entry and return."""
+    data = bytearray(b'\0\0\0\0\0\x80')
+    while len(data) < size:
+        if rng.random() < 0.05:
+            data += struct.pack('<BH', 0x0e, 15 | (1 << 12))
+            data += local_timestamp(rng.randrange(1, 200))
+            data += struct.pack('<BH', 0x0e, 15 | (3 << 12))
+        else:
+            data += struct.pack('<BI', 0x17, 0x08000000 + rng.randrange(0x10000) * 2)
+        data += local_timestamp(rng.randrange(1, 2000))
+    return bytes(data)
+
+SYNTHETIC_STREAMS = [
+    ("printf", printf_stream),
+    ("itm32", itm32_stream),
+    ("pc_sampling", pc_sampling_stream),
+    ]
+
+def run_benchmark(name, data, chunk_size):
+    sink = CountingSink()
+    parser = SWOParser(Core(), sink)
+    start = perf_counter()
+    for offset in range(0, len(data), chunk_size):
+        parser.parse(data[offset:offset + chunk_size])
+    elapsed = perf_counter() - start
+    rate = len(data) / elapsed
+    print("{:<16} {:>10} bytes {:>9} events {:>8.2f} MB/s  keeps up with {:>6.1f} Mbaud".format(
+            name, len(data), sink.count, rate / 1e6, rate * BITS_PER_BYTE / 1e6))
+
+def main():
+    parser = argparse.ArgumentParser(description='pyOCD SWO decoder benchmark')
+    parser.add_argument('captures', nargs='*', help='Raw SWO capture files.')
+    parser.add_argument('--chunk-size', type=int, default=4096,
+            help='Number of bytes passed to each parse() call, like one probe read (default 4096).')
+    parser.add_argument('--seed', type=int, default=1, help='Seed of the synthetic streams.')
+    args = parser.parse_args()
+
+    if args.captures:
+        for path in args.captures:
+            with open(path, 'rb') as f:
+                run_benchmark(os.path.basename(path), f.read(), args.chunk_size)
+    else:
+        rng = random.Random(args.seed)
+        for name, generate in SYNTHETIC_STREAMS:
+            run_benchmark(name, generate(rng, STREAM_SIZE), args.chunk_size)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
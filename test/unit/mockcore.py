@@ -28,6 +28,7 @@ from pyocd.coresight.cortex_m_core_registers import (
     index_for_reg,
 )
 from pyocd.core import memory_map
+from pyocd.core.target import Target
 from pyocd.utility import conversion
 from pyocd.utility import mask
 
@@ -37,6 +38,8 @@ XPSR_INDEX = index_for_reg('xpsr')
 class MockCore(CoreSightCoreComponent, MemoryInterface):
     def __init__(self, has_fpu=True):
         self.run_token = 1
+        self.state = Target.State.HALTED
+        self.state_reads = 0
         self.flash_region = memory_map.FlashRegion(start=0, length=1*1024, blocksize=1024, name='flash')
         self.ram_region = memory_map.RamRegion(start=0x20000000, length=1*1024, name='ram')
         self.ram2_region = memory_map.RamRegion(start=0x20000400, length=1*1024, name='ram2', is_cacheable=False)
@@ -64,8 +67,12 @@ class MockCore(CoreSightCoreComponent, MemoryInterface):
         self.regs = {i:0 for i in self.core_registers.by_index.keys()} # r0-15, xpsr, msp, psp
         self.regs[CFBP_INDEX] = 0
 
+    def get_state(self):
+        self.state_reads += 1
+        return self.state
+
     def is_running(self):
-        return False
+        return self.get_state() == Target.State.RUNNING
 
     def read_core_registers_raw(self, reg_list):
         reg_list = [CortexMCoreRegisterInfo.register_name_to_index(reg) for reg in reg_list]
@@ -0,0 +1,77 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import pytest
+
+from pyocd.core.session import Session
+from pyocd.probe.autotune import (ProbeAutotuner, ProbeSettings)
+from pyocd.probe.cmsis_dap_probe import CMSISDAPProbe
+from pyocd.probe.pydapaccess.dap_access_cmsis_dap import DAPAccessCMSISDAP
+from pyocd.probe.pydapaccess.interface.simulated_backend import SimulatedInterface
+from pyocd.probe.pydapaccess.interface.simulated_target import RAM_START
+
+@pytest.fixture(scope='function')
+def sim():
+    return SimulatedInterface(packet_size=64, packet_count=4, latency=0.0001,
+            model_swd_timing=True, max_swj_clock=4000000)
+
+@pytest.fixture(scope='function')
+def cache_file(tmp_path):
+    return str(tmp_path / "autotune.json")
+
+def make_session(sim, cache_file, autotune=False):
+    probe = CMSISDAPProbe(DAPAccessCMSISDAP(None, interface=sim))
+    return Session(probe, no_config=True, options={
+            'reset.post_delay': 0,
+            'target_override': 'sim_cortex_m',
+            'probe.autotune': autotune,
+            'probe.autotune.cache_file': cache_file,
+            })
+
+class TestProbeAutotuner:
+    def test_calibrate(self, sim, cache_file):
+        with make_session(sim, cache_file) as session:
+            sim.device.write_bytes(RAM_START, b'\x5a' * 256)
+            tuner = ProbeAutotuner(session, burst_size=256, burst_count=4)
+            settings = tuner.calibrate()
+
+            # Transfers fail above 4 MHz, and the clock is the limiting factor below that.
+            assert settings.frequency == 4000000
+            assert sim.swj_clock == 4000000
+            assert sim.packet_count == settings.queue_depth
+            # RAM is restored.
+            assert sim.device.read_bytes(RAM_START, 256) == b'\x5a' * 256
+            # Transfers work after recovering from the failed settings.
+            assert session.target.read32(RAM_START) == 0x5a5a5a5a
+
+        with open(cache_file) as f:
+            cache = json.load(f)
+        assert cache["sim00000001:sim_cortex_m"]['frequency'] == 4000000
+
+    def test_cached_settings(self, sim, cache_file):
+        with make_session(sim, cache_file) as session:
+            ProbeAutotuner(session)._save_cache(ProbeSettings(2000000, 2))
+
+        with make_session(sim, cache_file, autotune=True):
+            assert sim.swj_clock == 2000000
+            assert sim.packet_count == 2
+
+    def test_autotune_on_open(self, sim, cache_file):
+        with make_session(sim, cache_file, autotune=True):
+            assert sim.swj_clock == 4000000
+        with open(cache_file) as f:
+            assert "sim00000001:sim_cortex_m" in json.load(f)
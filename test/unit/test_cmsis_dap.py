@@ -0,0 +1,167 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import struct
+import pytest
+
+from pyocd.probe.pydapaccess.dap_access_api import DAPAccessIntf
+from pyocd.probe.pydapaccess.dap_access_cmsis_dap import (
+    DAPAccessCMSISDAP,
+    READ,
+    )
+from pyocd.probe.pydapaccess.cmsis_dap_core import Command
+from pyocd.probe.pydapaccess.interface.interface import Interface
+
+class LoopbackInterface(Interface):
+    """@brief Minimal CMSIS-DAP responder for DAP_Transfer and DAP_TransferBlock.
+
+    Reads of any register return an incrementing word counter. Written words are recorded.
+    """
+
+    def __init__(self, packet_size=64, packet_count=4):
+        super().__init__()
+        self.packet_size = packet_size
+        self.packet_count = packet_count
+        self.serial_number = "loopback"
+        self.written = []
+        self.packets = []
+        self.counter = 0
+        self._responses = collections.deque()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _next(self):
+        value = self.counter
+        self.counter += 1
+        return value
+
+    def write(self, data):
+        assert isinstance(data, bytearray)
+        assert len(data) <= self.packet_size
+        self.packets.append(bytes(data))
+        assert len(self._responses) < self.packet_count
+        if data[0] == Command.DAP_TRANSFER:
+            count = data[2]
+            pos = 3
+            resp = bytearray([Command.DAP_TRANSFER, count, 1])
+            for _ in range(count):
+                request = data[pos]
+                pos += 1
+                if request & READ:
+                    resp += struct.pack('<I', self._next())
+                else:
+                    self.written.append(struct.unpack_from('<I', data, pos)[0])
+                    pos += 4
+            assert pos == len(data)
+        elif data[0] == Command.DAP_TRANSFER_BLOCK:
+            count, request = struct.unpack_from('<HB', data, 2)
+            resp = bytearray([Command.DAP_TRANSFER_BLOCK]) + struct.pack('<HB', count, 1)
+            if request & READ:
+                assert len(data) == 5
+                for _ in range(count):
+                    resp += struct.pack('<I', self._next())
+            else:
+                assert len(data) == 5 + 4 * count
+                self.written += struct.unpack_from(f'<{count}I', data, 5)
+        else:
+            raise AssertionError("unexpected command")
+        assert len(resp) <= self.packet_size
+        self._responses.append(bytes(resp))
+
+    def read(self):
+        return self._responses.popleft()
+
+@pytest.fixture(scope='function')
+def loopback():
+    return LoopbackInterface()
+
+@pytest.fixture(scope='function')
+def dap(loopback):
+    dap = DAPAccessCMSISDAP(None, interface=loopback)
+    dap._packet_size = loopback.packet_size
+    dap._init_deferred_buffers()
+    dap.set_deferred_transfer(True)
+    return dap
+
+class TestTransferEncoding:
+    def test_single_reads(self, dap, loopback):
+        assert dap.read_reg(DAPAccessIntf.REG.AP_0xC) == 0
+        assert dap.read_reg(DAPAccessIntf.REG.DP_0x4) == 1
+
+    def test_block_read_spans_packets(self, dap, loopback):
+        # 64-byte packets hold 15 words of read data, so this read spans 7 packets.
+        result = dap.reg_read_repeat(100, DAPAccessIntf.REG.AP_0xC)
+        assert result == list(range(100))
+        assert all(p[0] == Command.DAP_TRANSFER_BLOCK for p in loopback.packets)
+        assert len(loopback.packets) == 7
+
+    def test_deferred_reads_share_packets(self, dap, loopback):
+        cb1 = dap.reg_read_repeat(3, DAPAccessIntf.REG.AP_0xC, now=False)
+        cb2 = dap.reg_read_repeat(20, DAPAccessIntf.REG.AP_0xC, now=False)
+        cb3 = dap.read_reg(DAPAccessIntf.REG.AP_0xC, now=False)
+        assert cb3() == 23
+        assert cb1() == [0, 1, 2]
+        assert cb2() == list(range(3, 23))
+
+    def test_block_write(self, dap, loopback):
+        data = [0x01020304 + i for i in range(40)]
+        dap.reg_write_repeat(len(data), DAPAccessIntf.REG.AP_0xC, data)
+        dap.flush()
+        assert loopback.written == data
+        assert loopback.packets[0][:5] == bytes([Command.DAP_TRANSFER_BLOCK, 0, 14, 0, 0x0d])
+        assert loopback.packets[0][5:9] == bytes([0x04, 0x03, 0x02, 0x01])
+
+    def test_block_read_bytes(self, dap, loopback):
+        result = dap.reg_read_repeat_bytes(20, DAPAccessIntf.REG.AP_0xC)
+        assert bytes(result) == struct.pack('<20I', *range(20))
+
+    def test_block_write_bytes(self, dap, loopback):
+        data = bytearray(struct.pack('<40I', *range(40)))
+        dap.reg_write_repeat_bytes(DAPAccessIntf.REG.AP_0xC, data)
+        # Modifying the buffer before the deferred write is sent must not change the written data.
+        data[0] = 0xff
+        dap.flush()
+        assert loopback.written == list(range(40))
+
+    def test_write_bytes_non_block(self, dap, loopback):
+        # A preceding read of another register forces DAP_Transfer encoding.
+        cb = dap.read_reg(DAPAccessIntf.REG.AP_0x4, now=False)
+        dap.reg_write_repeat_bytes(DAPAccessIntf.REG.AP_0xC, b'\x01\x00\x00\x00\x02\x00\x00\x00')
+        assert cb() == 0
+        assert loopback.packets[0][0] == Command.DAP_TRANSFER
+        assert loopback.written == [1, 2]
+
+    def test_mixed_transfer(self, dap, loopback):
+        dap.write_reg(DAPAccessIntf.REG.AP_0x4, 0x20000000)
+        value = dap.read_reg(DAPAccessIntf.REG.AP_0xC)
+        assert value == 0
+        assert loopback.written == [0x20000000]
+        assert loopback.packets[0] == bytes([Command.DAP_TRANSFER, 0, 2,
+                0x05, 0x00, 0x00, 0x00, 0x20,
+                0x0f])
+
+    def test_transfer_fault(self, dap, loopback):
+        def faulting_read():
+            return bytes([Command.DAP_TRANSFER_BLOCK, 0, 0, 4])
+        cb = dap.reg_read_repeat(4, DAPAccessIntf.REG.AP_0xC, now=False)
+        loopback.read = faulting_read
+        with pytest.raises(DAPAccessIntf.TransferFaultError):
+            cb()
@@ -0,0 +1,55 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import pytest
+
+from pyocd.flash.compressor import (compress, decompress, MAX_LITERAL_RUN)
+
+def random_bytes(seed, length):
+    rng = random.Random(seed)
+    return bytes(rng.getrandbits(8) for _ in range(length))
+
+class TestCompressor:
+    @pytest.mark.parametrize("data", [
+        b'',
+        b'a',
+        b'abc',
+        b'\xff' * 1024,
+        bytes(range(256)) * 8,
+        random_bytes(1, 1000),
+        ])
+    def test_round_trip(self, data):
+        assert decompress(compress(data)) == data
+
+    def test_mixed_round_trip(self):
+        rng = random.Random(2)
+        for _ in range(50):
+            data = bytes(rng.choice((0, 0xff, rng.getrandbits(8))) for _ in range(rng.randint(0, 2000)))
+            assert decompress(compress(data)) == data
+
+    def test_erased_page_is_small(self):
+        assert len(compress(b'\xff' * 1024)) < 32
+
+    def test_incompressible_overhead(self):
+        data = random_bytes(3, 1024)
+        assert len(compress(data)) == len(data) + len(data) // MAX_LITERAL_RUN
+
+    def test_invalid_stream(self):
+        with pytest.raises(ValueError):
+            decompress(b'\x05ab')
+        with pytest.raises(ValueError):
+            decompress(b'\x80\x01\x00')
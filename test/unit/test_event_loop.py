@@ -0,0 +1,94 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import queue
+import socket
+import threading
+import pytest
+
+from pyocd.utility.event_loop import (Dispatcher, EventLoop)
+
+@pytest.fixture(scope='function')
+def loop():
+    loop = EventLoop()
+    yield loop
+    loop.stop()
+
+class TestDispatcher:
+    def test_calls_in_order(self):
+        dispatcher = Dispatcher("test-dispatcher")
+        results = []
+        futures = [dispatcher.submit(results.append, i) for i in range(10)]
+        futures[-1].result(5)
+        assert results == list(range(10))
+        dispatcher.stop()
+        assert not dispatcher.is_alive()
+
+    def test_exception(self):
+        dispatcher = Dispatcher("test-dispatcher")
+        with pytest.raises(ValueError):
+            dispatcher.call(int, "x")
+        dispatcher.stop()
+
+    def test_call_from_dispatcher(self):
+        dispatcher = Dispatcher("test-dispatcher")
+        def nested():
+            return dispatcher.call(threading.current_thread)
+        assert dispatcher.call(nested) is dispatcher
+        dispatcher.stop()
+
+class TestEventLoop:
+    def test_readable_callback(self, loop):
+        received = queue.Queue()
+        reader, writer = socket.socketpair()
+        try:
+            loop.register(reader, lambda: received.put(reader.recv(16))).result(5)
+            writer.sendall(b'abc')
+            assert received.get(timeout=5) == b'abc'
+            loop.unregister(reader).result(5)
+            loop.unregister(reader).result(5)
+        finally:
+            reader.close()
+            writer.close()
+
+    def test_call_later(self, loop):
+        calls = queue.Queue()
+        loop.call_later(0.05, calls.put, 2)
+        cancelled = loop.call_later(0.01, calls.put, 0)
+        cancelled.cancel()
+        loop.call_soon(calls.put, 1)
+        assert calls.get(timeout=5) == 1
+        assert calls.get(timeout=5) == 2
+
+    def test_dispatchers(self, loop):
+        key = object()
+        dispatcher = loop.acquire_dispatcher(key, "test-dispatcher")
+        assert loop.acquire_dispatcher(key, "test-dispatcher") is dispatcher
+        other = object()
+        assert loop.acquire_dispatcher(other, "test-dispatcher") is not dispatcher
+        loop.release_dispatcher(other)
+        loop.release_dispatcher(key)
+        assert dispatcher.is_alive()
+        loop.release_dispatcher(key)
+        assert not dispatcher.is_alive()
+
+    def test_shared(self):
+        first = EventLoop.acquire()
+        assert EventLoop.acquire() is first
+        EventLoop.release()
+        assert first.is_alive()
+        EventLoop.release()
+        assert not first.is_alive()
@@ -14,6 +14,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from pyocd.gdbserver.crc import gdb_crc32
 from pyocd.gdbserver.gdbserver import (
     escape,
     unescape,
@@ -65,3 +66,33 @@ class TestGdbServerEscaping:
     def test_unescape_combined(self):
         assert unescape(b"}\x03}\x04}]}\x0a") == list(b"#$}*")
         assert unescape(b"}]}]}]") == list(b"}}}")
+
+    def test_escape_round_trip(self):
+        data = bytes(range(256)) * 4
+        escaped = escape(data)
+        assert b'#' not in escaped and b'$' not in escaped and b'*' not in escaped
+        assert unescape(escaped) == list(data)
+
+def _reference_gdb_crc32(data, crc=0xffffffff):
+    for byte in data:
+        crc ^= byte << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04c11db7) if (crc & 0x80000000) else (crc << 1)
+            crc &= 0xffffffff
+    return crc
+
+class TestGdbCrc:
+    def test_check_value(self):
+        assert gdb_crc32(b"123456789") == 0x0376e6e7
+
+    def test_empty(self):
+        assert gdb_crc32(b"") == 0xffffffff
+
+    def test_matches_reference(self):
+        data = bytes((i * 37 + 11) & 0xff for i in range(1000))
+        assert gdb_crc32(data) == _reference_gdb_crc32(data)
+        assert gdb_crc32(list(data)) == _reference_gdb_crc32(data)
+
+    def test_chained(self):
+        data = bytes(range(256)) * 3
+        assert gdb_crc32(data[100:], gdb_crc32(data[:100])) == gdb_crc32(data)
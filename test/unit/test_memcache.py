@@ -18,11 +18,15 @@ import pytest
 import logging
 
 from pyocd.cache.memory import MemoryCache
+from pyocd.debug.cache import CachingDebugContext
 from pyocd.debug.context import DebugContext
 from pyocd.core import memory_map
+from pyocd.core.target import Target
 from pyocd.utility import conversion
 from pyocd.utility import mask
 
+from .mockcore import MockCore
+
 @pytest.fixture(scope='function')
 def memcache(mockcore):
     return MemoryCache(DebugContext(mockcore), mockcore)
@@ -108,27 +112,28 @@ class TestMemoryCache:
     def test_16_no_mem_region(self, mockcore, memcache):
         assert memcache.read_memory_block8(0x30000000, 4) == [0x55] * 4
         # Make sure we didn't cache anything.
-        assert memcache._cache.overlap(0x30000000, 0x30000004) == set()
+        assert len(memcache._pages) == 0
 
     def test_17_noncacheable_region_read(self, mockcore, memcache):
         mockcore.write_memory_block8(0x20000410, [90, 91, 92, 93])
         assert memcache.read_memory_block8(0x20000410, 4) == [90, 91, 92, 93]
         # Make sure we didn't cache anything.
-        assert memcache._cache.overlap(0x20000410, 0x20000414) == set()
+        assert len(memcache._pages) == 0
 
     def test_18_noncacheable_region_write(self, mockcore, memcache):
         memcache.write_memory_block8(0x20000410, [1, 2, 3, 4])
         mockcore.write_memory_block8(0x20000410, [90, 91, 92, 93])
         assert memcache.read_memory_block8(0x20000410, 4) == [90, 91, 92, 93]
         # Make sure we didn't cache anything.
-        assert memcache._cache.overlap(0x20000410, 0x20000414) == set()
+        assert len(memcache._pages) == 0
 
     def test_19_write_into_cached(self, mockcore, memcache):
         mockcore.write_memory_block8(4, [1, 2, 3, 4, 5, 6, 7, 8])
         assert memcache.read_memory_block8(4, 8) == [1, 2, 3, 4, 5, 6, 7, 8]
         memcache.write_memory_block8(6, [128, 129, 130, 131])
         assert memcache.read_memory_block8(4, 8) == [1, 2, 128, 129, 130, 131, 7, 8]
-        assert len(list(memcache._cache.overlap(4, 12))[0].data) == 8
+        assert len(memcache._pages) == 1
+        assert memcache.metrics.fills == 1
 
     def test_20_empty_read(self, memcache):
         assert memcache.read_memory_block8(128, 0) == []
@@ -180,7 +185,111 @@ class TestMemoryCache:
         block = memcache.read_memory_block8(0x2000007e, 4)
         assert block == data[0x7e:0x82]
 
-
+    def test_27_bytes(self, mockcore, memcache):
+        memcache.write_memory_bytes(0x20000001, b'\x01\x02\x03\x04\x05')
+        block = memcache.read_memory_bytes(0x20000000, 8)
+        assert isinstance(block, bytearray)
+        assert block == b'\x00\x01\x02\x03\x04\x05\x00\x00'
+        assert mockcore.read_memory_block8(0x20000000, 8) == list(block)
+
+    def test_28_bytes_mixed_with_lists(self, memcache):
+        memcache.write_memory_block32(0x20000000, [0x04030201, 0x08070605])
+        assert memcache.read_memory_bytes(0x20000002, 4) == b'\x03\x04\x05\x06'
+        memcache.write_memory_bytes(0x20000004, memoryview(b'\xaa\xbb'))
+        assert memcache.read_memory_block32(0x20000004, 1) == [0x0807bbaa]
+
+
+class TestMemoryCachePages:
+    def test_fill_spans_pages(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, page_size=16)
+        mockcore.write_memory_block8(0x20000000, range(64))
+        memcache.write_memory_block8(0x20000008, [0xaa] * 4)
+        assert memcache.read_memory_block8(0x20000000, 64) == \
+                list(range(8)) + [0xaa] * 4 + list(range(12, 64))
+        # One fill before the written bytes, and one spanning the rest of the pages.
+        assert memcache.metrics.fills == 2
+        assert len(memcache._pages) == 4
+        assert memcache.read_memory_block8(0x2000000c, 40) == list(range(12, 52))
+        assert memcache.metrics.fills == 2
+        assert memcache.metrics.hits == 4 + 40
+        assert memcache.metrics.misses == 60
+
+    def test_lru_eviction(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, page_size=16, budget=32)
+        memcache.read_memory_block8(0x20000000, 4)
+        memcache.read_memory_block8(0x20000010, 4)
+        memcache.read_memory_block8(0x20000000, 4)
+        memcache.read_memory_block8(0x20000020, 4)
+        assert memcache.metrics.evictions == 1
+        assert list(memcache._pages) == [0x2000000, 0x2000002]
+        mockcore.write_memory_block8(0x20000010, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x20000010, 4) == [1, 2, 3, 4]
+
+    def test_read_ahead(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, page_size=16, read_ahead=True)
+        mockcore.write_memory_block8(0x20000000, range(32))
+        assert memcache.read_memory_block8(0x20000006, 12) == list(range(6, 18))
+        assert memcache.metrics.fills == 1
+        assert memcache.read_memory_block8(0x20000000, 32) == list(range(32))
+        assert memcache.metrics.fills == 1
+
+    def test_read_ahead_clipped_to_region(self, mockcore):
+        memcache = MemoryCache(DebugContext(mockcore), mockcore, page_size=4096, read_ahead=True)
+        mockcore.write_memory_block8(0x20000010, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x20000010, 4) == [1, 2, 3, 4]
+        assert memcache._pages[0x20000].valid is not None
+        assert memcache.metrics.misses == 4
+
+    def test_invalidate_on_run(self, mockcore, memcache):
+        memcache.read_memory_block8(0x20000000, 4)
+        mockcore.write_memory_block8(0x20000000, [1, 2, 3, 4])
+        mockcore.run_token += 1
+        assert memcache.read_memory_block8(0x20000000, 4) == [1, 2, 3, 4]
+        assert memcache.metrics.fills == 2
+
+    def test_state_read_once_per_halt(self, mockcore, memcache):
+        memcache.read_memory_block8(0x20000000, 4)
+        memcache.read_memory_block8(0x20000010, 4)
+        memcache.write_memory_block8(0x20000000, [1])
+        assert mockcore.state_reads == 1
+        mockcore.run_token += 1
+        memcache.read_memory_block8(0x20000000, 4)
+        assert mockcore.state_reads == 2
+
+    def test_not_cached_while_running(self, mockcore, memcache):
+        mockcore.state = Target.State.RUNNING
+        mockcore.run_token += 1
+        memcache.read_memory_block8(0x20000000, 4)
+        mockcore.write_memory_block8(0x20000000, [1, 2, 3, 4])
+        assert memcache.read_memory_block8(0x20000000, 4) == [1, 2, 3, 4]
+        assert mockcore.state_reads == 2
+
+    def test_read_memory_ranges(self, mockcore, memcache):
+        mockcore.write_memory_block8(0x20000000, range(16))
+        mockcore.write_memory_block8(0x20000400, [7, 8])
+        assert memcache.read_memory_block8(0x20000004, 4) == [4, 5, 6, 7]
+        ranges = [(0x20000000, 8), (0x20000400, 2), (0x20000006, 0), (0x2000000c, 4)]
+        results = memcache.read_memory_ranges(ranges)
+        assert [list(r) for r in results] == [list(range(8)), [7, 8], [], [12, 13, 14, 15]]
+        assert memcache.metrics.fills == 2
+        # The cacheable ranges are now cached, but the uncacheable one is read again.
+        mockcore.write_memory_block8(0x20000000, [0xaa] * 16)
+        mockcore.write_memory_block8(0x20000400, [9])
+        results = memcache.read_memory_ranges(ranges)
+        assert [list(r) for r in results] == [list(range(8)), [9, 8], [], [12, 13, 14, 15]]
+
+class TestCachingDebugContext:
+    def test_write_invalidates_peers(self):
+        core0 = MockCore()
+        core1 = MockCore()
+        peers = []
+        ctx0 = CachingDebugContext(core0, peers=peers)
+        ctx1 = CachingDebugContext(core1, peers=peers)
+        assert ctx1.read_memory_block8(0x20000000, 4) == [0] * 4
+        core1.write_memory_block8(0x20000000, [1, 2, 3, 4])
+        assert ctx1.read_memory_block8(0x20000000, 4) == [0] * 4
+        ctx0.write_memory_block8(0x20000000, [5])
+        assert ctx1.read_memory_block8(0x20000000, 4) == [1, 2, 3, 4]
 
 # TODO test read32/16/8 with and without callbacks
 
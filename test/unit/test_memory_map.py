@@ -540,3 +540,52 @@ class TestMemoryMap:
                 RamRegion(0x20000000, length=0x8000))
         assert len(map) == 2
 
+    def test_overlapping_lookups(self):
+        # Regions with subregions and aliases, checked against a linear search.
+        regions = [
+            RamRegion(start=0x20000000, length=0x10000, name='sram'),
+            RamRegion(start=0x20000000, length=0x4000, name='sram0'),
+            RamRegion(start=0x20004000, length=0x4000, name='sram1'),
+            RomRegion(start=0x10000000, length=0x1000, name='rom'),
+            FlashRegion(start=0, length=0x8000, blocksize=0x400, name='flash'),
+            FlashRegion(start=0x8000000, length=0x8000, blocksize=0x400, name='flash_alias', alias='flash'),
+            ]
+        memmap = MemoryMap(regions)
+        for addr in (0, 0x7fff, 0x8000, 0x8000000, 0x10000fff, 0x1fffffff, 0x20000000, 0x20003fff,
+                0x20004000, 0x20006000, 0x20008000, 0x2000ffff, 0x20010000):
+            expected = [r for r in memmap.regions if r.contains_address(addr)]
+            assert memmap.get_region_for_address(addr) is (expected[0] if expected else None)
+            for length in (1, 4, 0x2000, 0x10000):
+                end = addr + length - 1
+                assert memmap.get_intersecting_regions(addr, end) == \
+                        [r for r in memmap.regions if r.intersects_range(addr, end)]
+                assert memmap.get_contained_regions(addr, end) == \
+                        [r for r in memmap.regions if r.contained_by_range(addr, end)]
+
+    def test_lookup_after_change(self, memmap, ram2):
+        assert memmap.get_region_for_address(0x20000500) is ram2
+        memmap.remove_region(ram2)
+        assert memmap.get_region_for_address(0x20000500) is None
+        memmap.add_region(RamRegion(start=0x20000400, length=0x400, name='ram3'))
+        assert memmap.get_region_for_address(0x20000500).name == 'ram3'
+
+    def test_lookup_after_resize(self, memmap, flash):
+        assert memmap.get_region_for_address(0) is flash
+        assert memmap.get_region_for_address(0x800) is None
+        memmap.resize_region(flash, end=0xfff)
+        assert flash.end == 0xfff
+        assert memmap.get_region_for_address(0x800) is flash
+        memmap.resize_region(flash, start=0x100)
+        assert memmap.get_region_for_address(0) is None
+        assert memmap.get_region_for_address(0x100) is flash
+
+    def test_pname_lookup(self):
+        memmap = MemoryMap(
+            RamRegion(start=0x20000000, length=0x1000, name='ram_cm4', pname='cm4'),
+            RamRegion(start=0x20000000, length=0x1000, name='ram_cm0', pname='cm0'),
+            RamRegion(start=0x30000000, length=0x1000, name='shared'),
+            )
+        assert memmap.get_region_for_address(0x20000010).name == 'ram_cm4'
+        assert memmap.get_region_for_address(0x20000010, pname='cm0').name == 'ram_cm0'
+        assert memmap.get_region_for_address(0x20000010, pname='cm4').name == 'ram_cm4'
+        assert memmap.get_region_for_address(0x30000010, pname='cm0').name == 'shared'
@@ -0,0 +1,61 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from pyocd.gdbserver.packet_stats import (command_name, PacketStats)
+
+@pytest.mark.parametrize(("packet", "name"), [
+        (b'$m20000000,4#00', 'm'),
+        (b'$?#3f', '?'),
+        (b'$qSupported:swbreak+#00', 'qSupported'),
+        (b'$qXfer:threads:read::0,fff#00', 'qXfer:threads'),
+        (b'$qRcmd,7374617473#00', 'qRcmd'),
+        (b'$QStartNoAckMode#00', 'QStartNoAckMode'),
+        (b'$vCont?#49', 'vCont?'),
+        (b'$vCont;c#00', 'vCont'),
+        (b'$vFlashWrite:0:data#00', 'vFlashWrite'),
+        ])
+def test_command_name(packet, name):
+    assert command_name(packet) == name
+
+class TestPacketStats:
+    def test_add(self):
+        stats = PacketStats()
+        stats.add(b'$m0,4#00', 12, 1, {'wait': 0.0, 'host': 0.00005, 'probe': 0.002, 'send': 0.0})
+        stats.add(b'$m4,4#00', 12, 2, {'wait': 0.0, 'host': 0.00005, 'probe': 0.2, 'send': 0.0})
+        m_stats = stats.commands['m']
+        assert m_stats.count == 2
+        assert m_stats.bytes_in == 16
+        assert m_stats.bytes_out == 24
+        assert m_stats.round_trips == 3
+        assert m_stats.times['probe'] == pytest.approx(0.202)
+        assert m_stats.histograms['probe'] == [0, 0, 1, 0, 1, 0]
+        assert m_stats.histograms['host'] == [2, 0, 0, 0, 0, 0]
+        assert m_stats.histograms['total'] == [0, 0, 1, 0, 1, 0]
+        assert stats.to_dict()['commands']['m']['round_trips'] == 3
+
+    def test_format(self):
+        stats = PacketStats()
+        assert stats.format() == "No packets handled\n"
+        stats.add(b'$g#67', 100, 1, {'wait': 0.0, 'host': 0.0, 'probe': 0.001, 'send': 0.0})
+        stats.add(b'$m0,4#00', 12, 5, {'wait': 0.0, 'host': 0.0, 'probe': 0.001, 'send': 0.0})
+        lines = stats.format().splitlines()
+        # Sorted by round trips.
+        assert lines[1].split()[:5] == ['m', '1', '8', '12', '5']
+        assert lines[2].split()[0] == 'g'
+        stats.reset()
+        assert not stats.commands
@@ -0,0 +1,193 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import gzip
+import io
+
+from pyocd.debug.elf.decoder import (FunctionInfo, LineInfo, SymbolInfo)
+from pyocd.trace.events import (TracePeriodicPC, TraceITMEvent)
+from pyocd.trace.profiler import (
+    PCSampleProfile,
+    ProfileSymbolizer,
+    SampleLocation,
+    SLEEP_NAME,
+    aggregate,
+    write_collapsed,
+    write_pprof,
+    write_report,
+    )
+
+class FakeDecoders:
+    """@brief Stands in for an ELFBinaryFile's symbol and address decoders."""
+
+    # main() has debug info for two lines. helper() only has a Thumb function symbol.
+    FUNCTIONS = [(0x1000, 0x1010, b'main')]
+    LINES = [(0x1000, 0x1008, b'main.c', 10), (0x1008, 0x1010, b'main.c', 12)]
+    SYMBOLS = [(0x2001, 0x20, 'helper')]
+
+    def __init__(self):
+        self.symbol_decoder = self
+        self.address_decoder = self
+
+    def get_function_for_address(self, addr):
+        for start, end, name in self.FUNCTIONS:
+            if start <= addr < end:
+                return FunctionInfo(name=name, subprogram=None, low_pc=start, high_pc=end)
+        return None
+
+    def get_line_for_address(self, addr):
+        for start, end, filename, line in self.LINES:
+            if start <= addr < end:
+                return LineInfo(cu=None, filename=filename, dirname=b'', line=line)
+        return None
+
+    def get_symbol_for_address(self, addr):
+        for start, size, name in self.SYMBOLS:
+            if start <= addr < start + size:
+                return SymbolInfo(name=name, address=start, size=size, type='STT_FUNC')
+        return None
+
+class FakeDecodersWithoutSymtab(FakeDecoders):
+    """@brief Stands in for an ELFBinaryFile without a symbol table."""
+
+    def __init__(self):
+        self.address_decoder = self
+
+    @property
+    def symbol_decoder(self):
+        raise AttributeError("'NoneType' object has no attribute 'num_symbols'")
+
+def make_profile():
+    profile = PCSampleProfile()
+    profile.receive_batch([TracePeriodicPC(0x1000)] * 3 + [TracePeriodicPC(0x1004)] * 2
+            + [TracePeriodicPC(0x100a), TracePeriodicPC(0), TraceITMEvent(0, 1, 1)])
+    profile.add_samples([0x2000] * 4 + [0x3000])
+    return profile
+
+def read_varint(data, offset):
+    value = shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, offset
+
+def read_message(data):
+    """@brief Decode a protobuf message into a dict of lists of field values."""
+    fields = {}
+    offset = 0
+    while offset < len(data):
+        key, offset = read_varint(data, offset)
+        if key & 7 == 0:
+            value, offset = read_varint(data, offset)
+        else:
+            assert key & 7 == 2
+            length, offset = read_varint(data, offset)
+            value = bytes(data[offset:offset + length])
+            offset += length
+        fields.setdefault(key >> 3, []).append(value)
+    return fields
+
+class TestPCSampleProfile:
+    def test_counts(self):
+        profile = make_profile()
+        assert profile.pc_counts == {0x1000: 3, 0x1004: 2, 0x100a: 1, 0x2000: 4, 0x3000: 1}
+        assert profile.sleep_count == 1
+        assert profile.total == 12
+
+    def test_aggregate(self):
+        counts = aggregate(make_profile(), ProfileSymbolizer(FakeDecoders()))
+        assert counts == {
+            SampleLocation('main', 'main.c', 10): 5,
+            SampleLocation('main', 'main.c', 12): 1,
+            SampleLocation('helper', None, None): 4,
+            SampleLocation('0x00003000', None, None): 1,
+            SampleLocation(SLEEP_NAME, None, None): 1,
+            }
+
+    def test_no_symtab(self):
+        # Functions and lines still come from the debug info.
+        counts = aggregate(make_profile(), ProfileSymbolizer(FakeDecodersWithoutSymtab()))
+        assert counts[SampleLocation('main', 'main.c', 10)] == 5
+        assert counts[SampleLocation('0x00002000', None, None)] == 4
+
+    def test_no_elf(self):
+        counts = aggregate(make_profile(), ProfileSymbolizer(None))
+        assert counts[SampleLocation('0x00001000', None, None)] == 3
+
+class TestOutput:
+    def test_report(self):
+        output = io.StringIO()
+        write_report(make_profile(), ProfileSymbolizer(FakeDecoders()), output, limit=2)
+        assert output.getvalue().splitlines() == [
+            "12 samples",
+            "",
+            " Samples      %  Function",
+            "       6  50.0%  main",
+            "       4  33.3%  helper",
+            "",
+            " Samples      %  Line",
+            "       5  41.7%  main main.c:10",
+            "       1   8.3%  main main.c:12",
+            ]
+
+    def test_collapsed(self):
+        output = io.StringIO()
+        write_collapsed(make_profile(), ProfileSymbolizer(FakeDecoders()), output)
+        assert output.getvalue().splitlines() == [
+            "main;main.c:10 5",
+            "helper 4",
+            "0x00003000 1",
+            "[sleep] 1",
+            "main;main.c:12 1",
+            ]
+
+    def test_pprof(self):
+        output = io.BytesIO()
+        write_pprof(make_profile(), ProfileSymbolizer(FakeDecoders()), output, period=1024, duration=2.5)
+        profile = read_message(gzip.decompress(output.getvalue()))
+        strings = [s.decode() for s in profile[6]]
+        assert strings[0] == ""
+        assert profile[10] == [2500000000]
+        assert profile[12] == [1024]
+        sample_type = read_message(profile[1][0])
+        assert (strings[sample_type[1][0]], strings[sample_type[2][0]]) == ("samples", "count")
+
+        functions = {}
+        for data in profile[5]:
+            function = read_message(data)
+            functions[function[1][0]] = (strings[function[2][0]],
+                    strings[function[4][0]] if 4 in function else "")
+        locations = {}
+        for data in profile[4]:
+            location = read_message(data)
+            line = read_message(location[4][0])
+            locations[location[1][0]] = (location.get(3, [0])[0], functions[line[1][0]],
+                    line.get(2, [0])[0])
+        samples = []
+        for data in profile[2]:
+            sample = read_message(data)
+            samples.append((locations[sample[1][0][0]], sample[2][0][0]))
+        assert sorted(samples) == [
+            ((0, (SLEEP_NAME, ""), 0), 1),
+            ((0x1000, ("main", "main.c"), 10), 3),
+            ((0x1004, ("main", "main.c"), 10), 2),
+            ((0x100a, ("main", "main.c"), 12), 1),
+            ((0x2000, ("helper", ""), 0), 4),
+            ((0x3000, ("0x00003000", ""), 0), 1),
+            ]
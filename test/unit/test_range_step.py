@@ -0,0 +1,57 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pyocd.coresight.range_step import analyze_step_range
+
+#   0x00  beq.w far
+#   0x04  b.w far
+#   0x08  tbb [r0, r1]
+#   0x0c  ldr pc, [r0, #4]
+#   0x10  pop {r4, pc}
+#   0x12  pop.w {r4-r11, pc}
+#   0x16  cbz r0, 0x20
+#   0x18  mov pc, lr
+#   0x1a  mrs r0, primask
+#   0x1e  nop
+#  0x120  far:
+CODE = bytes.fromhex("00f08e8000f08cb8d0e801f0d0f804f010bdbde8f08f18b1f746eff3108000bf0000")
+
+# Loop with a conditional branch back to the start of the range.
+#   0x00  adds r0, #3
+#   0x02  subs r1, #1
+#   0x04  bne 0x0
+LOOP_CODE = bytes.fromhex("03300139fcd10000")
+
+class TestAnalyzeStepRange:
+    def test_branches(self):
+        exits, stops = analyze_step_range(0, 0x20, CODE)
+        assert exits == {0x20, 0x120}
+        assert stops == {0x08, 0x0c, 0x10, 0x12, 0x18}
+
+    def test_branch_within_range(self):
+        exits, stops = analyze_step_range(0x1000, 0x1006, LOOP_CODE)
+        assert exits == {0x1006}
+        assert stops == set()
+
+    def test_branch_leaving_range(self):
+        # Only the loop body is in the range, so the branch back is an exit.
+        exits, stops = analyze_step_range(0x1002, 0x1006, LOOP_CODE[2:])
+        assert exits == {0x1000, 0x1006}
+
+    def test_straddling_end(self):
+        # The range ends in the middle of the 32-bit mrs instruction.
+        exits, stops = analyze_step_range(0x1a, 0x1c, CODE[0x1a:])
+        assert exits == {0x1e}
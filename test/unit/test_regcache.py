@@ -209,3 +209,21 @@ class TestRegisterCache:
 
 
 
+
+    def test_halt_snapshot(self, mockcore, regcache):
+        self.set_core_regs(mockcore)
+        assert regcache.read_core_registers_raw(['r0']) == [get_expected_reg_value('r0')]
+        # All general and special registers were read with r0, but not the FPU registers.
+        self.set_core_regs(mockcore, True)
+        assert regcache.read_core_registers_raw(['pc', 'psp', 'primask']) == [
+            get_expected_reg_value('pc'), get_expected_reg_value('psp'), get_expected_reg_value('primask')]
+        assert regcache.read_core_registers_raw(['s3']) == [get_expected_reg_value('s3') + 7]
+        # The other FPU registers were read with s3.
+        mockcore.write_core_registers_raw(['s4', 'fpscr'], [1, 2])
+        assert regcache.read_core_registers_raw(['s4', 'fpscr']) == [
+            get_expected_reg_value('s4') + 7, get_expected_reg_value('fpscr') + 7]
+
+    def test_halt_snapshot_no_fpu(self, mockcore_no_fpu, regcache_no_fpu):
+        assert regcache_no_fpu.read_core_registers_raw(['r0']) == [0]
+        mockcore_no_fpu.write_core_registers_raw(['pc'], [0x1000])
+        assert regcache_no_fpu.read_core_registers_raw(['pc']) == [0]
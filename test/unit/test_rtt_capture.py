@@ -0,0 +1,157 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import struct
+
+import pytest
+
+from pyocd.core import exceptions
+from pyocd.utility.rtt_capture import (
+    MAX_FRAME_PAYLOAD,
+    PCAP_LINKTYPE_USER0,
+    PCAP_MAGIC_NS,
+    RTTCapture,
+    RTTCaptureReader,
+    write_pcap,
+    write_text,
+    )
+from pyocd.utility.rtt_server import RTTChanFileWorker
+
+def read_frames(path):
+    with open(path, 'rb') as f:
+        reader = RTTCaptureReader(f)
+        return reader.start_time, list(reader.frames())
+
+class TestRTTCapture:
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "capture.bin")
+        capture = RTTCapture(path)
+        capture.add(0, b'hello ')
+        capture.add(1, bytearray(b'second channel'))
+        capture.add(0, b'')
+        capture.add(0, b'world')
+        capture.close()
+        _, frames = read_frames(path)
+        assert [(channel, data) for _, channel, data in frames] == [
+                (0, b'hello '), (1, b'second channel'), (0, b'world')]
+        timestamps = [timestamp for timestamp, _, _ in frames]
+        assert timestamps == sorted(timestamps)
+        assert capture.frames == 3
+        assert capture.bytes_captured == 25
+
+    def test_ring_wraps(self, tmp_path):
+        path = str(tmp_path / "capture.bin")
+        # The ring only holds a couple of frames, so it wraps many times.
+        capture = RTTCapture(path, buffer_size=64)
+        chunks = [bytes([i]) * (i % 40 + 1) for i in range(200)]
+        for chunk in chunks:
+            # Retry each frame that is dropped until the writer has made space for it.
+            frames = capture.frames
+            while capture.frames == frames:
+                capture.add(2, chunk)
+        capture.close()
+        _, frames = read_frames(path)
+        assert [data for _, _, data in frames] == chunks
+
+    def test_split_large_chunk(self, tmp_path):
+        path = str(tmp_path / "capture.bin")
+        capture = RTTCapture(path)
+        data = bytes(range(256)) * 300
+        capture.add(3, data)
+        capture.close()
+        _, frames = read_frames(path)
+        assert [len(d) for _, _, d in frames] == [MAX_FRAME_PAYLOAD, len(data) - MAX_FRAME_PAYLOAD]
+        assert b''.join(d for _, _, d in frames) == data
+
+    def test_drop_when_full(self, tmp_path):
+        path = str(tmp_path / "capture.bin")
+        capture = RTTCapture(path, buffer_size=32)
+        capture.add(0, bytes(100))
+        capture.add(0, b'fits')
+        capture.close()
+        assert capture.dropped_frames == 1
+        assert capture.dropped_bytes == 100
+        _, frames = read_frames(path)
+        assert [d for _, _, d in frames] == [b'fits']
+
+    def test_file_worker(self, tmp_path):
+        path = str(tmp_path / "capture.bin")
+        capture = RTTCapture(path)
+        worker = RTTChanFileWorker(capture, 4)
+        assert worker.write_up_data(b'data') == 4
+        assert worker.get_down_data() == b''
+        worker.close()
+        capture.close()
+        _, frames = read_frames(path)
+        assert [(channel, data) for _, channel, data in frames] == [(4, b'data')]
+
+class TestRTTCaptureReader:
+    def test_not_a_capture(self):
+        with pytest.raises(exceptions.RTTError):
+            RTTCaptureReader(io.BytesIO(b'not a capture file at all'))
+
+    def test_truncated_frame(self, tmp_path):
+        path = tmp_path / "capture.bin"
+        capture = RTTCapture(str(path))
+        capture.add(0, b'complete')
+        capture.add(0, b'cut short')
+        capture.close()
+        data = path.read_bytes()
+        reader = RTTCaptureReader(io.BytesIO(data[:-3]))
+        assert [d for _, _, d in reader.frames()] == [b'complete']
+
+class TestConvert:
+    FRAMES = [
+        (1000000, 0, b'first li'),
+        (2000000, 1, b'other\n'),
+        (3000000, 0, b'ne\r\nsecond line\nthird'),
+        ]
+
+    def test_text(self):
+        output = io.StringIO()
+        write_text(self.FRAMES, output)
+        assert output.getvalue().splitlines() == [
+            "      0.002000 1: other",
+            "      0.001000 0: first line",
+            "      0.003000 0: second line",
+            "      0.003000 0: third",
+            ]
+
+    def test_text_channels(self):
+        output = io.StringIO()
+        write_text(self.FRAMES, output, channels=[1])
+        assert output.getvalue() == "      0.002000 1: other\n"
+
+    def test_pcap(self):
+        output = io.BytesIO()
+        write_pcap(self.FRAMES, output, 100.5)
+        data = output.getvalue()
+        magic, major, minor, _, _, _, linktype = struct.unpack_from('<IHHiIII', data)
+        assert (magic, major, minor, linktype) == (PCAP_MAGIC_NS, 2, 4, PCAP_LINKTYPE_USER0)
+        offset = 24
+        packets = []
+        while offset < len(data):
+            seconds, nanoseconds, length, orig_length = struct.unpack_from('<IIII', data, offset)
+            offset += 16
+            assert length == orig_length
+            packets.append((seconds, nanoseconds, data[offset], data[offset + 1:offset + length]))
+            offset += length
+        assert packets == [
+            (100, 501000000, 0, b'first li'),
+            (100, 502000000, 1, b'other\n'),
+            (100, 503000000, 0, b'ne\r\nsecond line\nthird'),
+            ]
@@ -0,0 +1,899 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import logging
+import random
+import socket
+import struct
+import threading
+import pytest
+
+from pyocd.core import exceptions
+from pyocd.core.session import Session
+from pyocd.core.target import Target
+from pyocd.coresight.dwt import DWT
+from pyocd.debug.rtt import (GenericRTTControlBlock, RTTPollInterval)
+from pyocd.gdbserver.context_facade import GDBDebugContextFacade
+from pyocd.gdbserver.crc import (_compute_crc_on_target, compute_gdb_crc, gdb_crc32)
+from pyocd.flash.loader import StreamingMemoryLoader
+from pyocd.gdbserver.gdbserver import (GDBServer, escape, unescape)
+from pyocd.probe.cmsis_dap_probe import CMSISDAPProbe
+from pyocd.probe.pydapaccess.dap_access_api import DAPAccessIntf
+from pyocd.probe.pydapaccess.cmsis_dap_core import Command
+from pyocd.probe.pydapaccess.dap_access_cmsis_dap import DAPAccessCMSISDAP
+from pyocd.probe.pydapaccess.interface.simulated_backend import SimulatedInterface
+from pyocd.rtos.zephyr import (ZephyrThread, ZephyrThreadProvider)
+from pyocd.probe.pydapaccess.interface.simulated_target import (
+    DPIDR,
+    FLASH_PAGE_SIZE,
+    FLASH_SECTOR_SIZE,
+    RAM_SIZE,
+    RAM_START,
+    )
+
+SESSION_OPTIONS = {
+    'reset.post_delay': 0,
+    'target_override': 'sim_cortex_m',
+    }
+
+@pytest.fixture(scope='function')
+def sim():
+    return SimulatedInterface(packet_size=64, packet_count=4)
+
+@pytest.fixture(scope='function')
+def session(sim):
+    probe = CMSISDAPProbe(DAPAccessCMSISDAP(None, interface=sim))
+    session = Session(probe, no_config=True, options=SESSION_OPTIONS)
+    session.open()
+    yield session
+    session.close()
+
+def _lock_is_free(session):
+    """@brief Whether another thread can take the probe lock."""
+    acquired = []
+    def take_lock():
+        acquired.append(session.probe._lock.acquire(timeout=2))
+        if acquired[0]:
+            session.probe._lock.release()
+    thread = threading.Thread(target=take_lock)
+    thread.start()
+    thread.join()
+    return acquired == [True]
+
+def random_bytes(seed, length):
+    rng = random.Random(seed)
+    return bytes(rng.getrandbits(8) for _ in range(length))
+
+class TestSimulatedDAP:
+    def test_read_dpidr(self, sim):
+        dap = DAPAccessCMSISDAP(None, interface=sim)
+        dap.open()
+        assert dap.identify(DAPAccessIntf.ID.MAX_PACKET_SIZE) == 64
+        dap.connect()
+        assert dap.read_reg(DAPAccessIntf.REG.DP_0x0) == DPIDR
+        dap.close()
+
+    def test_packet_size_limit(self, sim):
+        with pytest.raises(DAPAccessIntf.DeviceError):
+            sim.write(bytearray(65))
+
+    def test_packet_count_limit(self, sim):
+        for _ in range(4):
+            sim.write(bytearray([0, 0xfe]))
+        with pytest.raises(DAPAccessIntf.DeviceError):
+            sim.write(bytearray([0, 0xfe]))
+
+    def test_tar_wrap(self, sim):
+        dap = DAPAccessCMSISDAP(None, interface=sim)
+        dap.open()
+        dap.connect()
+        dap.write_reg(DAPAccessIntf.REG.AP_0x0, 0x23000052) # 32-bit, auto-increment
+        dap.write_reg(DAPAccessIntf.REG.AP_0x4, RAM_START + 0xff8)
+        dap.reg_write_repeat(4, DAPAccessIntf.REG.AP_0xC, [1, 2, 3, 4])
+        # The last two words wrap to the start of the 4 kB block.
+        assert sim.device.read32(RAM_START + 0xffc) == 2
+        assert sim.device.read32(RAM_START + 0x1000) == 0
+        assert sim.device.read32(RAM_START) == 3
+        dap.close()
+
+@pytest.fixture(scope='function')
+def dap(sim):
+    dap = DAPAccessCMSISDAP(None, interface=sim)
+    dap.open()
+    dap.set_deferred_transfer(True)
+    dap.connect()
+    dap.flush()
+    sim.stats.reset()
+    yield dap
+    dap.close()
+
+class TestCommandBatching:
+    def test_sequence_batched_with_transfer(self, dap, sim):
+        dap.swj_sequence(51, 0xffffffffffffff)
+        dap.swj_sequence(16, 0xe79e)
+        assert dap.read_reg(DAPAccessIntf.REG.DP_0x0) == DPIDR
+        assert sim.stats.packets == 1
+        assert sim.stats.commands[Command.DAP_EXECUTE_COMMANDS] == 1
+        assert sim.stats.commands[Command.DAP_SWJ_SEQUENCE] == 2
+
+    def test_queued_commands(self, dap, sim):
+        # 20 sequences of 8 bytes each are too large for one 64 byte packet.
+        for _ in range(20):
+            dap.swj_sequence(51, 0xffffffffffffff)
+        assert dap.read_reg(DAPAccessIntf.REG.DP_0x0) == DPIDR
+        assert sim.stats.commands[Command.DAP_SWJ_SEQUENCE] == 20
+        assert sim.stats.commands[Command.DAP_QUEUE_COMMANDS] > 0
+        assert sim.stats.round_trips == 1
+
+    def test_not_batched_without_deferred_transfers(self, dap, sim):
+        dap.set_deferred_transfer(False)
+        dap.swj_sequence(51, 0xffffffffffffff)
+        assert sim.stats.packets == 1
+        assert sim.stats.commands[Command.DAP_EXECUTE_COMMANDS] == 0
+
+    def test_not_batched_for_protocol_2_0(self, sim):
+        sim.PROTOCOL_VERSION = "2.0.0"
+        dap = DAPAccessCMSISDAP(None, interface=sim)
+        dap.open()
+        assert not dap.has_command_batching
+        dap.connect()
+        assert sim.stats.commands[Command.DAP_EXECUTE_COMMANDS] == 0
+        dap.close()
+
+class TestSimulatedTarget:
+    def test_connect(self, session):
+        assert session.target.get_state() == Target.State.HALTED
+        assert session.target.selected_core.core_registers.by_name['pc']
+
+    def test_memory_across_tar_wrap(self, session, sim):
+        data = bytes((i * 7) & 0xff for i in range(9000))
+        session.target.write_memory_bytes(RAM_START + 0xffd, data)
+        session.target.flush()
+        assert sim.device.read_bytes(RAM_START + 0xffd, len(data)) == data
+        assert bytes(session.target.read_memory_bytes(RAM_START + 0xffd, len(data))) == data
+
+    def test_word_and_byte_access(self, session, sim):
+        session.target.write32(RAM_START + 0x100, 0x12345678)
+        assert session.target.read8(RAM_START + 0x101) == 0x56
+        session.target.write16(RAM_START + 0x102, 0xabcd)
+        session.target.flush()
+        assert sim.device.read32(RAM_START + 0x100) == 0xabcd5678
+
+    def test_fault(self, session):
+        with pytest.raises(exceptions.TransferFaultError):
+            session.target.read_memory_block32(0x60000000, 4)
+        # The sticky error is cleared and later accesses succeed.
+        session.target.write32(RAM_START, 1)
+        assert session.target.read32(RAM_START) == 1
+
+    def test_core_registers(self, session):
+        session.target.write_core_register('r5', 0xdeadbeef)
+        assert session.target.read_core_register('r5') == 0xdeadbeef
+
+    def test_register_snapshot(self, session, sim):
+        context = session.target.selected_core.get_target_context()
+        session.target.step()
+        sim.stats.reset()
+        context.read_core_registers_raw(['pc'])
+        sim.stats.reset()
+        # The rest of the registers were read with pc, and the core state was checked then.
+        context.read_core_registers_raw(['r%d' % n for n in range(13)] + ['sp', 'lr', 'xpsr', 'msp', 'psp'])
+        assert sim.stats.packets == 0
+
+    def test_read_memory_ranges(self, session, sim):
+        data = random_bytes(17, 0x800)
+        sim.device.write_bytes(RAM_START + 0x1000, data)
+        core = session.target.selected_core
+        ranges = [(RAM_START + 0x1000, 0x200), (RAM_START + 0x1400, 0x3fc)]
+        sim.stats.reset()
+        results = core.read_memory_ranges(ranges)
+        queued_round_trips = sim.stats.round_trips
+        assert [bytes(r) for r in results] == [data[0:0x200], data[0x400:0x7fc]]
+
+        sim.stats.reset()
+        for addr, size in ranges:
+            core.read_memory_bytes(addr, size)
+        assert queued_round_trips < sim.stats.round_trips
+
+        # Unaligned ranges are read separately.
+        assert [bytes(r) for r in core.read_memory_ranges([(RAM_START + 0x1002, 3), ranges[0]])] \
+                == [data[2:5], data[0:0x200]]
+
+    def test_read_memory_ranges_fault_releases_lock(self, session):
+        # The fault on the first range is raised while the later ranges are still being queued.
+        core = session.target.selected_core
+        ranges = [(0x60000000, 0x40)] + [(RAM_START + 0x100 * i, 0x40) for i in range(40)]
+        with pytest.raises(exceptions.TransferFaultError):
+            core.read_memory_ranges(ranges)
+
+        assert _lock_is_free(session)
+
+    def test_stop_prefetch(self, session, sim):
+        stack = random_bytes(18, 0x80)
+        sim.device.write_bytes(RAM_START + 0x2000, stack)
+        target = session.target
+        target.write_core_register('sp', RAM_START + 0x2000)
+        target.write_core_register('pc', RAM_START + 0x200)
+        target.step()
+        context = target.selected_core.get_target_context()
+        facade = GDBDebugContextFacade(context)
+
+        response = facade.get_t_response()
+        assert b'0d:%s;' % (RAM_START + 0x2000).to_bytes(4, 'little').hex().encode() in response
+
+        # The stack and the code around the pc were read into the cache with the stop reply, so
+        # only the core state is checked, once, by these reads.
+        sim.stats.reset()
+        assert bytes(context.read_memory_bytes(RAM_START + 0x2000, 0x80)) == stack
+        context.read_memory_bytes(RAM_START + 0x1f0, 0x20)
+        assert sim.stats.packets == 1
+
+    def test_expedited_registers_option(self, session):
+        session.options['gdbserver.expedited_registers'] = 'pc, r0,bogus'
+        facade = GDBDebugContextFacade(session.target.selected_core.get_target_context())
+        response = facade.get_t_response(force_signal=5)
+        assert response.startswith(b'T05')
+        assert [pair.split(b':')[0] for pair in response[3:].split(b';') if pair] == [b'0f', b'00']
+
+    def test_register_access_with_accelerated_memory(self, session, monkeypatch):
+        # Core registers are accessed through the memory interface when the probe accelerates it,
+        # rather than with banked AP register transfers.
+        core = session.target.selected_core
+        ap = core.ap
+        monkeypatch.setattr(ap, '_accelerated_memory_interface', object())
+        def fail_banked(addr):
+            raise AssertionError("banked access used with an accelerated memory interface")
+        monkeypatch.setattr(ap, 'set_banked_address', fail_banked)
+        core._base_write_core_registers_raw([6], [0x12345678])
+        assert core._base_read_core_registers_raw([6]) == [0x12345678]
+
+    def test_step(self, session):
+        session.target.write_core_register('pc', RAM_START + 0x200)
+        session.target.step()
+        assert session.target.read_core_register('pc') == RAM_START + 0x202
+
+    def test_flash_program(self, session, sim):
+        flash = session.target.memory_map.get_boot_memory().flash
+        image = bytes((i * 13) & 0xff for i in range(FLASH_SECTOR_SIZE * 2 + 100))
+        flash.flash_block(0, image)
+        assert sim.device.read_bytes(0, len(image)) == image
+
+        # Programming the same image again is skipped using the CRC analyzer.
+        info = flash.flash_block(0, image)
+        assert info.program_byte_count == 0
+
+    def test_compressed_flash_program(self, session, sim):
+        flash = session.target.memory_map.get_boot_memory().flash
+        # Compressible pages, with one page of random data that is sent uncompressed.
+        rng = random.Random(0)
+        image = bytes((i // 16) & 0xff for i in range(FLASH_SECTOR_SIZE * 2)) \
+                + bytes(rng.getrandbits(8) for _ in range(FLASH_PAGE_SIZE))
+        builder = flash.get_flash_builder()
+        builder.enable_compression(True)
+        builder.add_data(0, image)
+        info = builder.program(smart_flash=False)
+        assert sim.device.read_bytes(0, len(image)) == image
+        assert info.compressed
+        assert info.compression_ratio > 2
+        assert info.transferred_byte_count < len(image)
+        assert info.throughput > 0
+
+    def test_streaming_flash_program(self, session, sim, caplog):
+        image = random_bytes(14, FLASH_SECTOR_SIZE * 3 + 100)
+        loader = StreamingMemoryLoader(session, progress=lambda amount: None)
+        loader.add_erase_range(0, FLASH_SECTOR_SIZE * 4)
+        for offset in range(0, len(image), 0x300):
+            loader.add_data(offset, image[offset:offset + 0x300])
+        # Every sector except the last has been passed to the worker before commit.
+        assert sorted(loader._queued_sectors) == [0, FLASH_SECTOR_SIZE, FLASH_SECTOR_SIZE * 2]
+        loader.commit()
+        assert sim.device.read_bytes(0, len(image)) == image
+
+        # Smart flash still skips unchanged pages.
+        caplog.set_level(logging.INFO, logger='pyocd.flash.loader')
+        loader.add_data(0, image)
+        loader.commit()
+        assert "programmed 0 bytes" in caplog.text
+
+    def test_streaming_flash_out_of_order(self, session, sim):
+        image = random_bytes(15, FLASH_SECTOR_SIZE * 2 + 0x10)
+        loader = StreamingMemoryLoader(session, progress=lambda amount: None)
+        loader.add_data(FLASH_SECTOR_SIZE, image[FLASH_SECTOR_SIZE:FLASH_SECTOR_SIZE + 0x800])
+        loader.add_data(FLASH_SECTOR_SIZE * 2, image[FLASH_SECTOR_SIZE * 2:])
+        assert FLASH_SECTOR_SIZE in loader._queued_sectors
+        # The rest of the queued sector and an earlier sector arrive afterwards.
+        loader.add_data(FLASH_SECTOR_SIZE + 0x800, image[FLASH_SECTOR_SIZE + 0x800:FLASH_SECTOR_SIZE * 2])
+        loader.add_data(0, image[:FLASH_SECTOR_SIZE])
+        loader.commit()
+        assert sim.device.read_bytes(0, len(image)) == image
+
+## Thumb test program for range stepping.
+#
+#   0x00  movs r0, #0
+#   0x02  movs r1, #125
+#   0x04  lsls r1, r1, #3
+#   0x06  adds r0, #3       <- loop
+#   0x08  subs r1, #1
+#   0x0a  bne loop
+#   0x0c  adr r2, target
+#   0x0e  adds r2, #1
+#   0x10  bx r2
+#   0x12  nop
+#   0x14  adds r0, #1       <- target
+#   0x16  bl func
+#   0x1a  b .
+#   0x1c  nop
+#   0x1e  bx lr             <- func
+RANGE_STEP_CODE = bytes.fromhex("00207d21c90003300139fcd101a20132104700bf013000f002f8fee700bf7047")
+
+class TestRangeStep:
+    @pytest.fixture(params=[FLASH_SECTOR_SIZE, RAM_START + 0x3000], ids=['flash', 'ram'])
+    def code_address(self, request, sim):
+        address = request.param
+        if address < RAM_START:
+            sim.device.flash.data[address:address + len(RANGE_STEP_CODE)] = RANGE_STEP_CODE
+        else:
+            sim.device.write_bytes(address, RANGE_STEP_CODE)
+        return address
+
+    def test_loop(self, session, sim, code_address):
+        target = session.target
+        target.write_core_register('pc', code_address)
+        sim.stats.reset()
+        target.step(start=code_address, end=code_address + 0xc)
+        assert target.read_core_register('pc') == code_address + 0xc
+        assert target.read_core_register('r0') == 3000
+        # Stepping each of the 3000 instructions would take several round trips each.
+        assert sim.stats.round_trips < 100
+        # Temporary breakpoints are removed.
+        assert target.selected_core.fpb.available_breakpoints == 6
+        assert sim.device.read_bytes(code_address, len(RANGE_STEP_CODE)) == RANGE_STEP_CODE
+
+    def test_indirect_branch_and_call(self, session, code_address):
+        target = session.target
+        target.write_core_register('pc', code_address + 0xc)
+        target.write_core_register('r0', 0)
+        target.step(start=code_address + 0xc, end=code_address + 0x1a)
+        # Stopped at the first instruction of the called function.
+        assert target.read_core_register('pc') == code_address + 0x1e
+        assert target.read_core_register('lr') == code_address + 0x1b
+        assert target.read_core_register('r0') == 1
+
+    def test_host_stepping(self, session, code_address):
+        session.options['cpu.step.range.breakpoints'] = False
+        target = session.target
+        target.write_core_register('pc', code_address)
+        target.step(start=code_address, end=code_address + 0xc)
+        assert target.read_core_register('pc') == code_address + 0xc
+        assert target.read_core_register('r0') == 3000
+
+    def test_user_breakpoint_stops(self, session, code_address):
+        target = session.target
+        target.write_core_register('pc', code_address)
+        target.set_breakpoint(code_address + 0x8)
+        target.step(start=code_address, end=code_address + 0xc)
+        assert target.read_core_register('pc') == code_address + 0x8
+        assert target.read_core_register('r0') == 3
+        target.remove_breakpoint(code_address + 0x8)
+
+    def test_timeout(self, session, code_address):
+        # The 'b .' never leaves the range, so the core is halted when the step times out.
+        session.options['cpu.step.instruction.timeout'] = 0.2
+        target = session.target
+        target.write_core_register('pc', code_address + 0x1a)
+        target.step(start=code_address + 0x1a, end=code_address + 0x1c)
+        assert target.get_state() == Target.State.HALTED
+        assert target.read_core_register('pc') == code_address + 0x1a
+
+def _gdb_packet(sock, data):
+    checksum = sum(data) & 0xff
+    sock.sendall(b'$' + data + b'#%02x' % checksum)
+    response = b''
+    while not response.endswith(b'#') and b'#' not in response:
+        response += sock.recv(4096)
+    while len(response) < response.index(b'#') + 3:
+        response += sock.recv(4096)
+    response = response.lstrip(b'+')
+    sock.sendall(b'+')
+    return response[1:response.index(b'#')]
+
+class TestTargetCrc:
+    def test_crc_on_target(self, session, sim):
+        data = random_bytes(11, 0x3000)
+        sim.device.write_bytes(RAM_START + 0x4000, data)
+        saved_ram = sim.device.read_bytes(RAM_START, 0x800)
+        target = session.target
+        target.halt()
+        target.write_core_register('r4', 0x1234)
+        target.write_core_register('pc', 0x100)
+
+        assert _compute_crc_on_target(target.selected_core, RAM_START, RAM_START + 0x4000,
+                len(data)) == gdb_crc32(data)
+        assert sim.device.read_bytes(RAM_START, 0x800) == saved_ram
+        assert target.read_core_register('r4') == 0x1234
+        assert target.read_core_register('pc') == 0x100
+        assert target.get_state() == Target.State.HALTED
+
+    def test_crc_host_fallback(self, session, sim):
+        data = random_bytes(12, 0x100)
+        sim.device.write_bytes(RAM_START + 0x4000, data)
+        target = session.target
+        target.halt()
+        assert compute_gdb_crc(target.selected_core, target.selected_core, RAM_START + 0x4000,
+                len(data)) == gdb_crc32(data)
+
+ZEPHYR_KERNEL = RAM_START + 0x1000
+ZEPHYR_OFFSETS_TABLE = RAM_START + 0x1100
+ZEPHYR_SIZE_T_SIZE = RAM_START + 0x1200
+ZEPHYR_THREADS = RAM_START + 0x2000
+ZEPHYR_THREAD_COUNT = 8
+# version, k_curr_thread, k_threads, t_entry, t_next_thread, t_state, t_user_options, t_prio,
+# t_stack_ptr, t_name
+ZEPHYR_OFFSETS = [1, 0x8, 0x30, 0x50, 0x60, 0xd, 0xc, 0xe, 0x28, 0x70]
+
+class ZephyrSymbols:
+    SYMBOLS = {
+        "_kernel": ZEPHYR_KERNEL,
+        "_kernel_thread_info_offsets": ZEPHYR_OFFSETS_TABLE,
+        "_kernel_thread_info_size_t_size": ZEPHYR_SIZE_T_SIZE,
+        }
+
+    def get_symbol_value(self, name):
+        return self.SYMBOLS.get(name)
+
+class TestZephyrThreads:
+    @pytest.fixture(scope='function')
+    def provider(self, session, sim):
+        dev = sim.device
+        for i, offset in enumerate(ZEPHYR_OFFSETS):
+            dev.write32(ZEPHYR_OFFSETS_TABLE + i * 4, offset)
+        dev.write_bytes(ZEPHYR_SIZE_T_SIZE, b'\x04')
+        for i in range(ZEPHYR_THREAD_COUNT):
+            base = ZEPHYR_THREADS + i * 0x100
+            next_base = (base + 0x100) if (i < ZEPHYR_THREAD_COUNT - 1) else 0
+            dev.write32(base + 0x60, next_base)
+            dev.write_bytes(base + 0xd, bytes([ZephyrThread.PENDING, i]))
+            dev.write_bytes(base + 0x70, b'thread%d\0' % i)
+        dev.write32(ZEPHYR_KERNEL + 0x30, ZEPHYR_THREADS)
+        dev.write32(ZEPHYR_KERNEL + 0x8, ZEPHYR_THREADS)
+        # A branch to itself to run between halts.
+        dev.write_bytes(RAM_START + 0x100, bytes.fromhex("fee7"))
+
+        target = session.target
+        target.halt()
+        target.write_core_register('pc', RAM_START + 0x100)
+        provider = ZephyrThreadProvider(target)
+        assert provider.init(ZephyrSymbols())
+        provider.read_from_target = True
+        return provider
+
+    def _run(self, session):
+        session.target.resume()
+        session.target.halt()
+        session.target.write_core_register('pc', RAM_START + 0x100)
+
+    def test_thread_list(self, session, sim, provider):
+        threads = sorted(provider.get_threads(), key=lambda t: t.unique_id)
+        assert [t.name for t in threads] == ["thread%d" % i for i in range(ZEPHYR_THREAD_COUNT)]
+        assert threads[0].state == ZephyrThread.RUNNING
+        assert threads[1].state == ZephyrThread.PENDING
+        assert threads[3].priority == 3
+
+    def test_update_after_run(self, session, sim, provider):
+        provider.get_threads()
+        thread3 = ZEPHYR_THREADS + 0x300
+        sim.device.write_bytes(thread3 + 0x70, b'renamed\0')
+        sim.device.write32(ZEPHYR_KERNEL + 0x8, thread3)
+        self._run(session)
+
+        sim.stats.reset()
+        threads = {t.unique_id: t for t in provider.get_threads()}
+        # The known threads are read together instead of walking the list one read at a time,
+        # which takes about 5 round trips per thread.
+        assert sim.stats.round_trips < ZEPHYR_THREAD_COUNT * 2
+        assert threads[thread3].name == "renamed"
+        assert threads[thread3].state == ZephyrThread.RUNNING
+        assert threads[ZEPHYR_THREADS].state == ZephyrThread.PENDING
+
+    def test_new_thread(self, session, sim, provider):
+        provider.get_threads()
+        new_thread = ZEPHYR_THREADS + ZEPHYR_THREAD_COUNT * 0x100
+        sim.device.write32(new_thread - 0x100 + 0x60, new_thread)
+        sim.device.write32(new_thread + 0x60, 0)
+        sim.device.write_bytes(new_thread + 0x70, b'new\0')
+        self._run(session)
+        threads = {t.unique_id: t for t in provider.get_threads()}
+        assert len(threads) == ZEPHYR_THREAD_COUNT + 1
+        assert threads[new_thread].name == "new"
+
+    def test_threads_xml_cache(self, session, sim):
+        server = GDBServer(session, core=0, port=0)
+        try:
+            session.target.halt()
+            xml = server._get_cached_threads_xml()
+            assert server._get_cached_threads_xml() is xml
+            session.target.resume()
+            session.target.halt()
+            assert server._get_cached_threads_xml() is not xml
+        finally:
+            server._cleanup()
+
+def _write_rtt_control_block(dev, addr, up_buffers=(), down_buffers=()):
+    """@brief Write an RTT control block with (address, size) buffers and no channel names."""
+    data = b'SEGGER RTT'.ljust(16, b'\0') + struct.pack('<2i', len(up_buffers), len(down_buffers))
+    for buffer_addr, size in list(up_buffers) + list(down_buffers):
+        data += struct.pack('<6I', 0, buffer_addr, size, 0, 0, 0)
+    dev.write_bytes(addr, data)
+
+def _write_rtt_offsets(dev, cb_addr, channel, write_off, read_off):
+    """@brief Set the WrOff and RdOff of an up channel of an RTT control block."""
+    dev.write_bytes(cb_addr + 24 + channel * 24 + 12, struct.pack('<2I', write_off, read_off))
+
+class FakeSymbol:
+    def __init__(self, address):
+        self.address = address
+
+class FakeElf:
+    def __init__(self, symbols):
+        self.symbol_decoder = self
+        self._symbols = symbols
+
+    def get_symbol_for_name(self, name):
+        address = self._symbols.get(name)
+        return FakeSymbol(address) if address is not None else None
+
+class FakeElfWithoutSymtab:
+    @property
+    def symbol_decoder(self):
+        # Like ElfSymbolDecoder for an ELF without a .symtab section.
+        raise AttributeError("'NoneType' object has no attribute 'num_symbols'")
+
+class TestRTTControlBlock:
+    @pytest.fixture(autouse=True)
+    def clear_found_addresses(self):
+        GenericRTTControlBlock._found_addresses.clear()
+
+    def test_search_across_chunks(self, session, sim):
+        # Decoy IDs that aren't word aligned are skipped.
+        sim.device.write_bytes(RAM_START + 0x101, b'SEGGER RTT')
+        # This control block straddles the boundary between the first two search reads.
+        cb_addr = RAM_START + GenericRTTControlBlock.SEARCH_CHUNK_SIZE - 4
+        _write_rtt_control_block(sim.device, cb_addr, up_buffers=[(RAM_START + 0x200, 64)])
+        sim.stats.reset()
+        control_block = GenericRTTControlBlock(session.target)
+        control_block.start()
+        assert len(control_block.up_channels) == 1
+        assert control_block.up_channels[0].size == 64
+        # Large reads are pipelined, so the search takes a few dozen round trips. Reading 32 bytes
+        # at a time would take over 1000.
+        assert sim.stats.round_trips < 100
+
+        # A second search for the same firmware image reuses the address.
+        sim.stats.reset()
+        control_block = GenericRTTControlBlock(session.target)
+        control_block.start()
+        assert len(control_block.up_channels) == 1
+        assert sim.stats.round_trips < 40
+
+    def test_not_found(self, session, sim):
+        control_block = GenericRTTControlBlock(session.target, RAM_START, 0x1000)
+        with pytest.raises(exceptions.RTTError):
+            control_block.start()
+
+    def test_elf_symbol(self, session, sim):
+        cb_addr = RAM_START + 0xc000
+        _write_rtt_control_block(sim.device, cb_addr, up_buffers=[(RAM_START + 0x200, 64)])
+        core = session.target.selected_core
+        core.elf = FakeElf({GenericRTTControlBlock.CONTROL_BLOCK_SYMBOL: cb_addr})
+        try:
+            sim.stats.reset()
+            control_block = GenericRTTControlBlock(core)
+            control_block.start()
+            assert len(control_block.up_channels) == 1
+            assert sim.stats.round_trips < 20
+        finally:
+            core.elf = None
+
+    def test_elf_without_symtab(self, session, sim):
+        # The control block is found by searching memory instead.
+        cb_addr = RAM_START + 0x100
+        _write_rtt_control_block(sim.device, cb_addr, up_buffers=[(RAM_START + 0x200, 64)])
+        core = session.target.selected_core
+        core.elf = FakeElfWithoutSymtab()
+        try:
+            control_block = GenericRTTControlBlock(core)
+            control_block.start()
+            assert len(control_block.up_channels) == 1
+        finally:
+            core.elf = None
+
+    def test_read_up_channels(self, session, sim):
+        cb_addr = RAM_START + 0x100
+        buffers = [(RAM_START + 0x1000, 64), (RAM_START + 0x2000, 64), (RAM_START + 0x3000, 64)]
+        _write_rtt_control_block(sim.device, cb_addr, up_buffers=buffers)
+        for addr, size in buffers:
+            sim.device.write_bytes(addr, bytes(range(size)))
+        # Channel 0 has contiguous data, channel 1 is full with data that wraps, channel 2 is empty.
+        _write_rtt_offsets(sim.device, cb_addr, 0, 30, 10)
+        _write_rtt_offsets(sim.device, cb_addr, 1, 9, 10)
+        _write_rtt_offsets(sim.device, cb_addr, 2, 5, 5)
+        control_block = GenericRTTControlBlock(session.target, cb_addr)
+        control_block.start()
+
+        sim.stats.reset()
+        data = control_block.read_up_channels()
+        # The descriptors and the data of all channels are each read in two 64 byte packets, then
+        # the read offsets are written in one. Reading the channels one at a time takes eight.
+        assert sim.stats.round_trips <= 5
+        assert data == {0: bytes(range(10, 30)), 1: bytes(range(10, 64)) + bytes(range(9)), 2: b''}
+        for channel, read_off in ((0, 30), (1, 9), (2, 5)):
+            desc_addr = cb_addr + 24 + channel * 24
+            assert struct.unpack('<I', sim.device.read_bytes(desc_addr + 16, 4))[0] == read_off
+
+        stats = [chan.stats for chan in control_block.up_channels]
+        assert [s.bytes for s in stats] == [20, 63, 0]
+        assert [s.overflows for s in stats] == [0, 1, 0]
+        assert stats[1].max_fill == 1.0
+        assert control_block.read_up_channels([1, 2]) == {1: b'', 2: b''}
+        assert stats[1].last_fill == 0.0
+
+    def test_read_wrapped_up_channel(self, session, sim):
+        cb_addr = RAM_START + 0x100
+        _write_rtt_control_block(sim.device, cb_addr, up_buffers=[(RAM_START + 0x1000, 64)])
+        sim.device.write_bytes(RAM_START + 0x1000, bytes(range(64)))
+        _write_rtt_offsets(sim.device, cb_addr, 0, 4, 60)
+        control_block = GenericRTTControlBlock(session.target, cb_addr)
+        control_block.start()
+        chan = control_block.up_channels[0]
+        assert chan.bytes_available == 8
+        assert chan.read() == bytes(range(60, 64)) + bytes(range(4))
+        assert chan.read() == b''
+        assert chan.stats.bytes == 8
+
+class TestRTTPollInterval:
+    def test_adapts_to_traffic(self):
+        interval = RTTPollInterval(0.001, 0.004)
+        assert interval.update(0, 0.0) == 0.001
+        assert interval.update(0, 0.0) == 0.0015
+        # Data resets the interval to the minimum.
+        assert interval.update(10, 0.1) == 0.001
+        # A buffer at least half full is polled again immediately.
+        assert interval.update(100, 0.5) == 0.0
+        assert interval.update(0, 0.0) == 0.001
+        for _ in range(10):
+            interval.update(0, 0.0)
+        assert interval.update(0, 0.0) == 0.004
+
+class TestDWTPCSampling:
+    def test_read_pc_samples(self, session, sim):
+        core = session.target.selected_core
+        core.write_core_register('pc', RAM_START + 0x100)
+        # No samples can be taken while the core is halted.
+        assert core.dwt.read_pc_samples(2) == [DWT.DWT_PCSR_NO_SAMPLE] * 2
+        session.target.resume()
+        sim.stats.reset()
+        samples = core.dwt.read_pc_samples(64)
+        assert len(samples) == 64
+        # The simulated core runs on from the PC through RAM.
+        assert all(RAM_START + 0x100 <= pc <= RAM_START + RAM_SIZE for pc in samples)
+        # The reads are queued together rather than waiting for each in turn.
+        assert sim.stats.round_trips <= 4
+
+    def test_read_pc_samples_fault_releases_lock(self, session, monkeypatch):
+        dwt = session.target.selected_core.dwt
+        monkeypatch.setattr(dwt, 'address', 0x60000000 - DWT.DWT_PCSR)
+        with pytest.raises(exceptions.TransferFaultError):
+            dwt.read_pc_samples(8)
+        assert _lock_is_free(session)
+
+    def test_enable_pc_sampling(self, session):
+        dwt = session.target.selected_core.dwt
+        assert dwt.enable_pc_sampling(1000) == 16 * 64
+        ctrl = session.target.read32(dwt.address + DWT.DWT_CTRL)
+        assert ctrl & DWT.DWT_CTRL_PCSAMPLENA_MASK
+        assert not (ctrl & DWT.DWT_CTRL_CYCTAP_MASK)
+        assert (ctrl & DWT.DWT_CTRL_POSTRESET_MASK) >> DWT.DWT_CTRL_POSTRESET_SHIFT == 15
+        # Longer intervals use the slower tap of the cycle counter.
+        assert dwt.enable_pc_sampling(5000) == 5 * 1024
+        ctrl = session.target.read32(dwt.address + DWT.DWT_CTRL)
+        assert ctrl & DWT.DWT_CTRL_CYCTAP_MASK
+        assert (ctrl & DWT.DWT_CTRL_POSTINIT_MASK) >> DWT.DWT_CTRL_POSTINIT_SHIFT == 4
+        dwt.disable_pc_sampling()
+        assert not (session.target.read32(dwt.address + DWT.DWT_CTRL) & DWT.DWT_CTRL_PCSAMPLENA_MASK)
+
+class TestSimulatedGdbServer:
+    def test_memory_read(self, session, sim):
+        sim.device.write_bytes(RAM_START, bytes(range(16)))
+        server = GDBServer(session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=10) as sock:
+                assert b'PacketSize' in _gdb_packet(sock, b'qSupported:swbreak+')
+                assert _gdb_packet(sock, b'm%x,10' % RAM_START) == bytes(range(16)).hex().encode()
+                _gdb_packet(sock, b'D')
+        finally:
+            server.stop()
+
+    def test_binary_memory_read(self, session, sim):
+        data = b'#$}*' + bytes(range(256)) * 64
+        sim.device.write_bytes(RAM_START, data)
+        server = GDBServer(session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=10) as sock:
+                features = _gdb_packet(sock, b'qSupported:swbreak+').split(b';')
+                assert b'binary-upload+' in features
+                assert b'PacketSize=20000' in features
+                response = _gdb_packet(sock, b'x%x,%x' % (RAM_START, len(data)))
+                assert response[:1] == b'b'
+                assert bytes(unescape(response[1:])) == data
+                _gdb_packet(sock, b'D')
+        finally:
+            server.stop()
+
+    def test_crc_query(self, session, sim):
+        data = random_bytes(13, 0x2000)
+        sim.device.write_bytes(RAM_START + 0x8000, data)
+        session.target.halt()
+        server = GDBServer(session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=10) as sock:
+                _gdb_packet(sock, b'qSupported:swbreak+')
+                sim.stats.reset()
+                assert _gdb_packet(sock, b'qCRC:%x,%x' % (RAM_START + 0x8000, len(data))) \
+                        == b'C%08x' % gdb_crc32(data)
+                # Only the routine and saved RAM are transferred, not the data.
+                assert sim.stats.packets < 200
+                assert _gdb_packet(sock, b'qCRC:%x,10' % (RAM_START + 0x8000)) \
+                        == b'C%08x' % gdb_crc32(data[:16])
+                _gdb_packet(sock, b'D')
+        finally:
+            server.stop()
+
+    def test_event_loop(self, session, sim):
+        sim.device.write_bytes(RAM_START, bytes(range(16)))
+        session.options['gdbserver.event_loop'] = True
+        server = GDBServer(session, core=0, port=0)
+        assert server.event_loop is not None
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=10) as sock:
+                assert b'PacketSize' in _gdb_packet(sock, b'qSupported:swbreak+')
+                assert _gdb_packet(sock, b'm%x,10' % RAM_START) == bytes(range(16)).hex().encode()
+
+                # The stop reply for a continue is sent after the Ctrl-C.
+                sock.sendall(b'$c#63')
+                assert sock.recv(1) == b'+'
+                sock.settimeout(0.2)
+                with pytest.raises(socket.timeout):
+                    sock.recv(1)
+                sock.settimeout(10)
+                assert session.target.get_state() == Target.State.RUNNING
+                sock.sendall(b'\x03')
+                response = b''
+                while b'#' not in response or len(response) < response.index(b'#') + 3:
+                    response += sock.recv(4096)
+                sock.sendall(b'+')
+                assert response.startswith(b'$T02')
+                assert session.target.get_state() == Target.State.HALTED
+
+                _gdb_packet(sock, b'D')
+            server.join(10)
+            assert not server.is_alive()
+        finally:
+            server.stop()
+
+    @pytest.mark.parametrize("event_loop", [False, True], ids=['threads', 'event_loop'])
+    def test_non_stop(self, session, sim, event_loop):
+        # A branch to itself leaves the simulated core running.
+        sim.device.write_bytes(RAM_START + 0x100, bytes.fromhex("fee7"))
+        sim.device.write_bytes(RAM_START, bytes(range(16)))
+        session.options['gdbserver.event_loop'] = event_loop
+        target = session.target
+        target.halt()
+        target.write_core_register('pc', RAM_START + 0x100)
+        server = GDBServer(session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=10) as sock:
+                _gdb_packet(sock, b'qSupported:swbreak+')
+                assert _gdb_packet(sock, b'QNonStop:1') == b'OK'
+                assert _gdb_packet(sock, b'vCont;c') == b'OK'
+                assert target.get_state() == Target.State.RUNNING
+
+                # Memory can be read while the target runs.
+                assert _gdb_packet(sock, b'm%x,10' % RAM_START) == bytes(range(16)).hex().encode()
+
+                # A halt is reported with an asynchronous stop notification.
+                target.halt()
+                response = b''
+                while b'#' not in response or len(response) < response.index(b'#') + 3:
+                    response += sock.recv(4096)
+                assert response.startswith(b'%Stop:T')
+                assert _gdb_packet(sock, b'vStopped') == b'OK'
+                _gdb_packet(sock, b'D')
+        finally:
+            server.stop()
+
+    def test_packet_stats(self, session, sim, tmp_path):
+        stats_file = tmp_path / "stats-{core}.json"
+        session.options['gdbserver.stats_file'] = str(stats_file)
+        server = GDBServer(session, core=0, port=0)
+        session.gdbservers[0] = server
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=10) as sock:
+                _gdb_packet(sock, b'qSupported:swbreak+')
+                sim.stats.reset()
+                _gdb_packet(sock, b'm%x,400' % RAM_START)
+                round_trips = sim.stats.round_trips
+                output = bytes.fromhex(_gdb_packet(sock, b'qRcmd,' + b'stats'.hex().encode()).decode())
+                assert b'qSupported' in output
+                assert b'Round trips' in output
+                _gdb_packet(sock, b'D')
+            server.join(10)
+        finally:
+            server.stop()
+
+        with open(str(tmp_path / "stats-0.json")) as f:
+            stats = json.load(f)
+        assert stats['core'] == 0
+        m_stats = stats['commands']['m']
+        assert m_stats['count'] == 1
+        assert m_stats['round_trips'] == round_trips
+        assert m_stats['bytes_out'] == len(b'$#00') + 0x800
+        assert sum(m_stats['histograms']['total']) == 1
+        assert stats['commands']['qRcmd']['count'] == 1
+
+    def test_monitor_write_seen_by_gdb(self, session, sim):
+        sim.device.write_bytes(RAM_START, bytes(range(16)))
+        session.target.halt()
+        server = GDBServer(session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=10) as sock:
+                _gdb_packet(sock, b'qSupported:swbreak+')
+                assert _gdb_packet(sock, b'm%x,4' % RAM_START) == b'00010203'
+                # A cached read while halted needs no probe traffic.
+                sim.stats.reset()
+                assert _gdb_packet(sock, b'm%x,4' % RAM_START) == b'00010203'
+                assert sim.stats.round_trips == 0
+
+                # The commander writes through the core, so the gdbserver's cache is dropped.
+                _gdb_packet(sock, b'qRcmd,' + (b'write32 0x%x 0x11223344' % RAM_START).hex().encode())
+                assert _gdb_packet(sock, b'm%x,4' % RAM_START) == b'44332211'
+                _gdb_packet(sock, b'D')
+        finally:
+            server.stop()
+
+    def test_flash_load(self, session, sim):
+        image = random_bytes(16, FLASH_SECTOR_SIZE * 2 + 0x80)
+        server = GDBServer(session, core=0, port=0)
+        server.start()
+        try:
+            with socket.create_connection(('localhost', server.port), timeout=10) as sock:
+                _gdb_packet(sock, b'qSupported:swbreak+')
+                assert _gdb_packet(sock, b'vFlashErase:0,%x' % (FLASH_SECTOR_SIZE * 3)) == b'OK'
+                for offset in range(0, len(image), 0x400):
+                    assert _gdb_packet(sock, b'vFlashWrite:%x:' % offset
+                            + escape(image[offset:offset + 0x400])) == b'OK'
+                assert _gdb_packet(sock, b'vFlashDone') == b'OK'
+                _gdb_packet(sock, b'D')
+        finally:
+            server.stop()
+        assert sim.device.read_bytes(0, len(image)) == image
@@ -0,0 +1,96 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pytest
+
+from pyocd.core import exceptions
+from pyocd.core.core_target import CoreTarget
+from pyocd.core.target import Target
+from pyocd.gdbserver.state_poller import CoreStatePoller
+from pyocd.utility.timeout import PollInterval
+
+class MockCore(CoreTarget):
+    """@brief Core whose deferred state reads are counted in a shared batch list."""
+
+    def __init__(self, batches, state=Target.State.RUNNING):
+        self.batches = batches
+        self.state = state
+
+    def get_state_later(self):
+        self.batches[-1].append(self)
+        state = self.state
+        def get_state_cb():
+            if isinstance(state, Exception):
+                raise state
+            return state
+        return get_state_cb
+
+class TestPollInterval:
+    def test_backoff(self):
+        interval = PollInterval(0.01, 0.05)
+        assert [interval.next() for _ in range(6)] == pytest.approx([0.01, 0.015, 0.0225, 0.03375,
+                0.05, 0.05])
+        interval.reset()
+        assert interval.next() == 0.01
+
+    def test_max_below_min(self):
+        interval = PollInterval(0.1, 0.01)
+        assert interval.next() == 0.1
+        assert interval.next() == 0.1
+
+class TestCoreStatePoller:
+    def test_batched_sample(self):
+        batches = [[]]
+        core0 = MockCore(batches)
+        core1 = MockCore(batches, Target.State.HALTED)
+        poller = CoreStatePoller()
+        assert poller.get_state(core0, 10) == Target.State.RUNNING
+        assert batches == [[core0]]
+
+        # Once core1 is being polled, each sample reads both cores.
+        batches.append([])
+        assert poller.get_state(core1, 10) == Target.State.HALTED
+        assert batches[-1] == [core0, core1]
+        batches.append([])
+        assert poller.get_state(core0, 10) == Target.State.RUNNING
+        assert batches[-1] == []
+
+        # The sample is used only once.
+        assert poller.get_state(core0, 10) == Target.State.RUNNING
+        assert batches[-1] == [core0, core1]
+
+    def test_discard(self):
+        batches = [[]]
+        core0 = MockCore(batches)
+        core1 = MockCore(batches, Target.State.HALTED)
+        poller = CoreStatePoller()
+        poller.get_state(core0, 10)
+        poller.get_state(core1, 10)
+        core0.state = Target.State.HALTED
+        poller.discard(core0)
+        assert poller.get_state(core0, 10) == Target.State.HALTED
+
+    def test_error_for_one_core(self):
+        batches = [[]]
+        core0 = MockCore(batches)
+        core1 = MockCore(batches, exceptions.TransferFaultError())
+        poller = CoreStatePoller()
+        poller.get_state(core0, 10)
+        with pytest.raises(exceptions.TransferFaultError):
+            poller.get_state(core1, 10)
+        assert poller.get_state(core0, 10) == Target.State.RUNNING
+        with pytest.raises(exceptions.TransferFaultError):
+            poller.get_state(core1, 10)
@@ -0,0 +1,229 @@
+# pyOCD debugger
+# Copyright (c) 2025 Arm Limited
+# SPDX-License-Identifier: Apache-2.0
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+import struct
+import threading
+from time import sleep
+
+from pyocd.trace import events
+from pyocd.trace.sink import TraceEventSink
+from pyocd.trace.swo import SWOParser
+from pyocd.trace.swv import (
+    BoundedQueue,
+    SWVEventSink,
+    SWVPipeline,
+    SWVStatisticsSink,
+    )
+
+class MockCore:
+    def exception_number_to_name(self, exception_number):
+        return "exc%d" % exception_number
+
+class RecordingSink(TraceEventSink):
+    def __init__(self):
+        self.events = []
+        self.batches = 0
+
+    def receive(self, event):
+        self.events.append(event)
+
+    def receive_batch(self, events):
+        self.batches += 1
+        super().receive_batch(events)
+
+def parse(data, chunk_size=None):
+    sink = RecordingSink()
+    parser = SWOParser(MockCore(), sink)
+    if chunk_size is None:
+        parser.parse(data)
+    else:
+        for offset in range(0, len(data), chunk_size):
+            parser.parse(data[offset:offset + chunk_size])
+    assert parser.bytes_parsed == len(data)
+    return [str(event) for event in sink.events]
+
+SYNC = b'\0\0\0\0\0\x80'
+
+## Text on port 0, a timestamp, a 32-bit write to port 1 on page 1, a multi-byte timestamp, then
+# PC samples, an exception, and an overflow that flushes the events without a timestamp.
+STREAM = (SYNC
+    + b''.join(bytes((0x01, c)) for c in b'hello\n')
+    + b'\x20'
+    + b'\x18' + struct.pack('<BI', 0x0b, 0x12345678)
+    + b'\xc0\x81\x02'
+    + struct.pack('<BI', 0x17, 0x08001234) * 3
+    + struct.pack('<BH', 0x0e, 11 | (1 << 12))
+    + b'\x70')
+
+class TestSWOParser:
+    def test_decode(self):
+        # Timestamps are applied to the events before them, and aren't passed on themselves.
+        assert parse(STREAM) == (
+            ["[2] ITM: port=0 data={:#04x}".format(c) for c in b'hello\n']
+            + ["[132] ITM: port=33 data=0x12345678",
+               "[132] DWT: PC=0x08001234",
+               "[132] DWT: PC=0x08001234",
+               "[132] DWT: PC=0x08001234",
+               "[132] DWT: Exception #11 Entered exc11",
+               "[132] overflow",
+               ])
+
+    def test_split_anywhere(self):
+        expected = parse(STREAM)
+        for chunk_size in range(1, 12):
+            assert parse(STREAM, chunk_size) == expected
+
+    def test_itm_run_widths(self):
+        data = (struct.pack('<BH', 0x02, 0xbeef) * 3 + struct.pack('<BI', 0x0b, 0xdeadbeef) * 2
+                + b'\x10')
+        assert parse(data) == (["[1] ITM: port=0 data=0xbeef"] * 3
+                + ["[1] ITM: port=1 data=0xdeadbeef"] * 2)
+
+    def test_long_itm_run(self):
+        text = bytes(range(32, 127)) * 100
+        data = b''.join(bytes((0x01, c)) for c in text) + b'\x70'
+        results = parse(data, 1000)
+        assert results[:-1] == ["[0] ITM: port=0 data={:#04x}".format(c) for c in text]
+
+    def test_sync_resets_page(self):
+        data = b'\x18' + b'\0' * 3
+        sink = RecordingSink()
+        parser = SWOParser(MockCore(), sink)
+        parser.parse(data)
+        # The page is reset when the sync packet ends, in the next buffer.
+        parser.parse(b'\0\0\x80' + b'\x01A\x70')
+        assert [str(e) for e in sink.events] == ["[0] ITM: port=0 data=0x41", "[0] overflow"]
+
+    def test_events_delivered_in_batches(self):
+        sink = RecordingSink()
+        parser = SWOParser(MockCore(), sink)
+        parser.parse(b''.join(bytes((0x01, c)) for c in b'abc') + b'\x10' + b'\x01d\x10')
+        assert sink.batches == 1
+        assert len(sink.events) == 4
+        # Events are held until a timestamp or overflow.
+        parser.parse(b'\x01e')
+        assert sink.batches == 1
+
+class TestSWVEventSink:
+    def test_receive_batch(self):
+        console = io.StringIO()
+        sink = SWVEventSink(console)
+        sink.receive_batch([
+            events.TraceITMEvent(0, ord('h'), 1),
+            events.TraceTimestamp(0, 1),
+            events.TraceITMEvent(0, 0x6c6c65, 4),
+            events.TraceITMEvent(0, 0x0a6f, 2),
+            ])
+        assert console.getvalue() == "hell\x00o\n"
+
+class BlockedSink(RecordingSink):
+    """@brief Sink that doesn't take events until it is unblocked."""
+    def __init__(self):
+        super().__init__()
+        self.unblock = threading.Event()
+
+    def receive_batch(self, events):
+        self.unblock.wait()
+        super().receive_batch(events)
+
+class TestBoundedQueue:
+    def test_drop_and_gap(self):
+        queue = BoundedQueue(8)
+        assert queue.put(b'12345')
+        assert not queue.put(b'6789')
+        assert queue.put(b'abc')
+        assert not queue.put(b'x')
+        assert queue.dropped_items == 2
+        assert queue.dropped_length == 5
+        assert queue.get() == [(b'12345', False), (b'abc', True)]
+        # The next item after a drop is flagged even if the queue was emptied in between.
+        assert queue.put(b'y')
+        queue.close()
+        assert queue.get() == [(b'y', True)]
+        assert queue.get() is None
+
+    def test_oversized_item(self):
+        # An item longer than the limit is queued only when the queue is empty.
+        queue = BoundedQueue(10)
+        assert queue.put(list(range(11)))
+        assert not queue.put([0])
+        assert queue.get() == [(list(range(11)), False)]
+        assert queue.put(list(range(11)))
+        assert queue.dropped_items == 1
+
+class TestSWVPipeline:
+    def test_fan_out(self):
+        pipeline = SWVPipeline(MockCore())
+        first = RecordingSink()
+        second = RecordingSink()
+        stats = SWVStatisticsSink()
+        raw = io.BytesIO()
+        pipeline.add_sink("first", first)
+        pipeline.add_sink("second", second)
+        pipeline.add_sink("statistics", stats)
+        pipeline.add_raw_output("raw", raw)
+        pipeline.start()
+        for offset in range(0, len(STREAM), 7):
+            assert pipeline.put(STREAM[offset:offset + 7])
+        pipeline.close()
+        expected = parse(STREAM)
+        assert [str(e) for e in first.events] == expected
+        assert [str(e) for e in second.events] == expected
+        assert raw.getvalue() == STREAM
+        assert pipeline.bytes_decoded == len(STREAM)
+        assert stats.event_counts['TraceITMEvent'] == 7
+        assert stats.event_counts['TracePeriodicPC'] == 3
+        assert stats.itm_bytes == {0: 6, 33: 4}
+
+    def test_slow_sink_drops(self):
+        pipeline = SWVPipeline(MockCore())
+        slow = BlockedSink()
+        fast = RecordingSink()
+        slow_output = pipeline.add_sink("slow", slow, limit=4)
+        fast_output = pipeline.add_sink("fast", fast)
+        pipeline.start()
+        # Each put is decoded as its own batch before the next, while the slow sink is blocked.
+        for n in range(5):
+            pipeline.put(b'\x01A\x01B\x10')
+            while len(fast.events) < 2 * (n + 1):
+                sleep(0.001)
+        slow.unblock.set()
+        pipeline.close()
+        assert fast_output.dropped == 0
+        assert len(fast.events) == 10
+        # The slow sink's queue filled up while it was blocked, and the rest were dropped.
+        assert slow_output.dropped > 0
+        assert len(slow.events) + slow_output.dropped == 10
+
+    def test_decoder_drops(self):
+        pipeline = SWVPipeline(MockCore(), buffer_size=8)
+        sink = RecordingSink()
+        pipeline.add_sink("sink", sink)
+        # Data is only buffered until the pipeline is started.
+        assert pipeline.put(b'\x01A\x01B\x10')
+        assert not pipeline.put(b'\x01C\x01D\x10')
+        assert pipeline.put(b'\x01E\x10')
+        pipeline.start()
+        pipeline.close()
+        assert pipeline.dropped_bytes == 5
+        # The lost data is replaced by an overflow event.
+        assert [str(e) for e in sink.events] == [
+                "[1] ITM: port=0 data=0x41",
+                "[1] ITM: port=0 data=0x42",
+                "[0] overflow",
+                "[1] ITM: port=0 data=0x45",
+                ]